@@ -0,0 +1,13 @@
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""
+Micro benchmarks for the marshalling, unmarshalling and dispatch hot paths.
+
+Run all of them with:
+
+    python-scsi $ python -m benchmarks
+
+See python -m benchmarks --help for filtering, saving and comparing results.
+"""
@@ -0,0 +1,77 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import argparse
+import json
+import platform
+import sys
+
+# importing the bench modules registers their cases
+from benchmarks import (  # noqa: F401
+    bench_commands,
+    bench_converter,
+    bench_dispatch,
+    bench_sense,
+    bench_unmarshall,
+    harness,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the python-scsi hot paths.",
+    )
+    parser.add_argument("-k", dest="pattern", help="only run cases containing PATTERN")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    parser.add_argument(
+        "--quick", action="store_true", help="short runs, for smoke testing"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="runs per case (default 5)"
+    )
+    parser.add_argument("--json", metavar="FILE", help="save the results to FILE")
+    parser.add_argument(
+        "--compare", metavar="FILE", help="compare with results saved before"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="tolerated slowdown or allocation growth for --compare (default 0.1)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, _ in harness.cases(args.pattern):
+            print(name)
+        return 0
+
+    min_time, repeat = (0.01, 1) if args.quick else (0.2, args.repeat)
+    results = harness.run(args.pattern, min_time=min_time, repeat=repeat)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {"python": platform.python_version(), "results": results},
+                f,
+                indent=1,
+                sort_keys=True,
+            )
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = harness.compare(results, baseline, args.threshold)
+        for name, what in regressions:
+            print("REGRESSION %s: %s" % (name, what))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+from benchmarks.harness import benchmark
+from pyscsi.pyscsi.scsi_cdb_read16 import Read16
+from pyscsi.pyscsi.scsi_cdb_unmap import Unmap
+from pyscsi.pyscsi.scsi_cdb_write16 import Write16
+from pyscsi.pyscsi.scsi_enum_command import sbc
+
+
+@benchmark("command.read16")
+def read16():
+    def run():
+        Read16(sbc.READ_16, 512, 1 << 20, 8)
+
+    return run
+
+
+@benchmark("command.read16.buffer")
+def read16_buffer():
+    buf = bytearray(4096)
+
+    def run():
+        Read16(sbc.READ_16, 512, 1 << 20, 8, buf=buf)
+
+    return run
+
+
+@benchmark("command.write16")
+def write16():
+    data = bytes(4096)
+
+    def run():
+        Write16(sbc.WRITE_16, 512, 1 << 20, 8, data)
+
+    return run
+
+
+@benchmark("command.unmap.64_descriptors")
+def unmap():
+    lbas = [{"lba": i << 16, "num_blocks": 1 << 12} for i in range(64)]
+
+    def run():
+        Unmap(sbc.UNMAP, lbas)
+
+    return run
@@ -0,0 +1,55 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+from benchmarks.harness import benchmark
+from pyscsi.pyscsi.scsi_cdb_inquiry import Inquiry
+from pyscsi.pyscsi.scsi_cdb_read16 import Read16
+from pyscsi.utils.converter import decode_bits, encode_dict
+
+CDB = {"opcode": 0x88, "rdprotect": 2, "fua": 1, "lba": 1 << 40, "tl": 256, "group": 3}
+
+
+@benchmark("converter.decode_bits.read16_cdb")
+def decode_read16_cdb():
+    cdb = Read16.marshall_cdb(dict(CDB))
+    bits = Read16._cdb_bits
+
+    def run():
+        decode_bits(cdb, bits, {})
+
+    return run
+
+
+@benchmark("converter.encode_dict.read16_cdb")
+def encode_read16_cdb():
+    d = dict(CDB)
+    bits = Read16._cdb_bits
+
+    def run():
+        encode_dict(d, bits, bytearray(16))
+
+    return run
+
+
+@benchmark("converter.decode_bits.block_limits")
+def decode_block_limits():
+    data = Inquiry.marshall_datain(
+        {
+            "page_code": Inquiry.VPD.BLOCK_LIMITS,
+            "max_xfer_len": 65535,
+            "opt_xfer_len": 2048,
+            "max_unmap_lba_count": 1 << 20,
+            "max_unmap_bd_count": 64,
+            "opt_unmap_gran": 128,
+            "max_ws_len": 1 << 20,
+        }
+    )
+    bits = Inquiry._block_limits_bits
+
+    def run():
+        decode_bits(data, bits, {})
+
+    return run
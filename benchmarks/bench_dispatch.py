@@ -0,0 +1,81 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+from benchmarks.harness import benchmark
+from pyscsi.pyscsi.scsi import SCSI
+from pyscsi.pyscsi.scsi_device_emulated import SCSIEmulatedDevice
+from pyscsi.pyscsi.scsi_enum_command import sbc
+
+
+class NullDevice(object):
+    """
+    A device that completes every command without touching the data, so only
+    the cost of the SCSI class and the command objects is measured
+    """
+
+    def __init__(self, opcodes):
+        self.opcodes = opcodes
+
+    def execute(self, cmd, en_raw_sense=False):
+        pass
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@benchmark("dispatch.null.testunitready")
+def null_testunitready():
+    s = SCSI(NullDevice(sbc), 512)
+
+    def run():
+        s.testunitready()
+
+    return run
+
+
+@benchmark("dispatch.null.read16")
+def null_read16():
+    s = SCSI(NullDevice(sbc), 512)
+
+    def run():
+        s.read16(1 << 20, 8)
+
+    return run
+
+
+@benchmark("dispatch.emulated.read16")
+def emulated_read16():
+    s = SCSI(SCSIEmulatedDevice(1 << 16, 512), 512)
+    s.write16(0, 8, bytes(range(256)) * 16)
+
+    def run():
+        s.read16(0, 8)
+
+    return run
+
+
+@benchmark("dispatch.emulated.write16")
+def emulated_write16():
+    s = SCSI(SCSIEmulatedDevice(1 << 16, 512), 512)
+    data = bytes(range(256)) * 16
+
+    def run():
+        s.write16(0, 8, data)
+
+    return run
+
+
+@benchmark("dispatch.emulated.inquiry_vpd")
+def emulated_inquiry_vpd():
+    s = SCSI(SCSIEmulatedDevice(1 << 16, 512), 512)
+
+    def run():
+        s.inquiry(evpd=1, page_code=0xB0, alloclen=64)
+
+    return run
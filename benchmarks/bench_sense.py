@@ -0,0 +1,44 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+from benchmarks.harness import benchmark
+from pyscsi.pyscsi.scsi_sense import SCSICheckCondition
+
+# NOT READY, LOGICAL UNIT IS IN PROCESS OF BECOMING READY
+FIXED = bytes([0x70, 0, 0x02, 0, 0, 0, 0, 10, 0, 0, 0, 0, 0x04, 0x01, 0, 0, 0, 0])
+
+# MEDIUM ERROR, UNRECOVERED READ ERROR with an information descriptor
+# and a progress indication
+DESCRIPTOR = (
+    bytes([0x72, 0x03, 0x11, 0x00, 0, 0, 0, 20])
+    + bytes([0x00, 0x0A, 0x80, 0])
+    + (0x12345678).to_bytes(8, "big")
+    + bytes([0x0A, 0x06, 0x02, 0x04, 0x04, 0, 0x80, 0x00])
+)
+
+
+@benchmark("sense.fixed")
+def fixed():
+    def run():
+        SCSICheckCondition(FIXED)
+
+    return run
+
+
+@benchmark("sense.fixed.str")
+def fixed_str():
+    def run():
+        str(SCSICheckCondition(FIXED))
+
+    return run
+
+
+@benchmark("sense.descriptor")
+def descriptor():
+    def run():
+        SCSICheckCondition(DESCRIPTOR)
+
+    return run
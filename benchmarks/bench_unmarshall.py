@@ -0,0 +1,224 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import random
+
+from benchmarks.harness import benchmark
+from pyscsi.pyscsi import scsi_enum_readelementstatus as READELEMENTSTATUS
+from pyscsi.pyscsi.scsi_cdb_getlbastatus import GetLBAStatus
+from pyscsi.pyscsi.scsi_cdb_inquiry import Inquiry
+from pyscsi.pyscsi.scsi_cdb_readcd import ReadCd
+from pyscsi.pyscsi.scsi_cdb_readelementstatus import ReadElementStatus
+from pyscsi.pyscsi.scsi_enum_inquiry import VPD
+
+# a fixed seed, so every run decodes the same data
+SEED = 0x5C51
+
+
+def _page(page_code, payload):
+    return bytes([0, page_code]) + len(payload).to_bytes(2, "big") + payload
+
+
+def _designator(code_set, piv_assoc_type, designator):
+    return bytes([code_set, piv_assoc_type, 0, len(designator)]) + designator
+
+
+def vpd_pages():
+    """
+    the raw data of every VPD page Inquiry.unmarshall_datain decodes
+
+    :return: a dict mapping page codes to byte arrays
+    """
+    pages = {
+        VPD.SUPPORTED_VPD_PAGES: {
+            "vpd_pages": [0x00, 0x80, 0x83, 0x86, 0x89, 0xB0, 0xB1, 0xB2, 0xB3]
+        },
+        VPD.UNIT_SERIAL_NUMBER: {"unit_serial_number": b"SN0123456789ABCDEF"},
+        VPD.EXTENDED_INQUIRY_DATA: {"spt": 1, "grd_chk": 1, "headsup": 1, "v_sup": 1},
+        VPD.BLOCK_LIMITS: {
+            "max_xfer_len": 65535,
+            "opt_xfer_len": 2048,
+            "max_unmap_lba_count": 1 << 20,
+            "max_unmap_bd_count": 64,
+            "opt_unmap_gran": 128,
+            "max_ws_len": 1 << 20,
+        },
+        VPD.LOGICAL_BLOCK_PROVISIONING: {"lbpu": 1, "lpbws": 1, "lbprz": 1},
+        VPD.REFERRALS: {"user_data_segment_size": 1024},
+    }
+    result = {}
+    for page_code, d in pages.items():
+        d["page_code"] = page_code
+        result[page_code] = bytes(Inquiry.marshall_datain(d))
+    result[VPD.BLOCK_DEVICE_CHARACTERISTICS] = _page(
+        VPD.BLOCK_DEVICE_CHARACTERISTICS, bytes([0, 1]) + bytes(58)
+    )
+    result[VPD.ATA_INFORMATION] = _page(VPD.ATA_INFORMATION, bytes(568))
+    result[VPD.DEVICE_IDENTIFICATION] = _page(
+        VPD.DEVICE_IDENTIFICATION,
+        _designator(0x02, 0x01, b"PYSCSI  LUN0123456789")
+        + _designator(0x01, 0x02, bytes.fromhex("0011223344556677"))
+        + _designator(0x01, 0x03, bytes.fromhex("60014051234567890123456789abcdef"))
+        + _designator(0x51, 0x94, bytes.fromhex("00000001")),
+    )
+    return result
+
+
+def _vpd_case(name, data):
+    @benchmark("unmarshall.inquiry.vpd.%s" % name.lower())
+    def setup():
+        def run():
+            Inquiry.unmarshall_datain(data, evpd=1)
+
+        return run
+
+
+for _code, _data in sorted(vpd_pages().items()):
+    _vpd_case(VPD[_code], _data)
+
+
+@benchmark("unmarshall.inquiry.standard")
+def inquiry_standard():
+    data = bytes(
+        Inquiry.marshall_datain(
+            {
+                "additional_length": 91,
+                "t10_vendor_identification": b"PYSCSI  ",
+                "product_identification": b"BENCHMARK       ",
+                "product_revision_level": b"0001",
+            }
+        )
+    )
+
+    def run():
+        Inquiry.unmarshall_datain(data)
+
+    return run
+
+
+def element_status(slots, drives=4):
+    """
+    the READ ELEMENT STATUS data of a tape library with volume tags
+
+    :param slots: the number of storage elements
+    :param drives: the number of data transfer elements
+    :return: a byte array
+    """
+    rnd = random.Random(SEED)
+    pages = []
+    for element_type, first, count in (
+        (READELEMENTSTATUS.ELEMENT_TYPE.DATA_TRANSFER, 256, drives),
+        (READELEMENTSTATUS.ELEMENT_TYPE.STORAGE, 1024, slots),
+    ):
+        pages.append(
+            {
+                "element_type": element_type,
+                "pvoltag": 1,
+                "avoltag": 0,
+                "element_descriptors": [
+                    {
+                        "element_address": first + i,
+                        "full": rnd.random() < 0.8,
+                        "access": 1,
+                        "svalid": 1,
+                        "medium_type": 1,
+                        "source_storage_element_address": first + i,
+                    }
+                    for i in range(count)
+                ],
+            }
+        )
+    return bytes(
+        ReadElementStatus.marshall_datain(
+            {
+                "first_element_address_reported": 256,
+                "num_elements_available": slots + drives,
+                "element_status_pages": pages,
+            }
+        )
+    )
+
+
+@benchmark("unmarshall.readelementstatus.1000_slots")
+def readelementstatus():
+    data = element_status(1000)
+
+    def run():
+        ReadElementStatus.unmarshall_datain(data)
+
+    return run
+
+
+@benchmark("unmarshall.readelementstatus.5000_slots")
+def readelementstatus_5000():
+    data = element_status(5000)
+
+    def run():
+        ReadElementStatus.unmarshall_datain(data)
+
+    return run
+
+
+def lba_status(descriptors):
+    """
+    a GET LBA STATUS response of alternating mapped and deallocated extents
+
+    :param descriptors: the number of LBA status descriptors
+    :return: a byte array
+    """
+    rnd = random.Random(SEED)
+    lbas = []
+    lba = 0
+    for i in range(descriptors):
+        n = rnd.randrange(1, 1 << 16)
+        lbas.append({"lba": lba, "num_blocks": n, "p_status": i & 1})
+        lba += n
+    return bytes(GetLBAStatus.marshall_datain({"lbas": lbas}))
+
+
+@benchmark("unmarshall.getlbastatus.16k")
+def getlbastatus():
+    # the default allocation length of 16384 bytes holds 1023 descriptors
+    data = lba_status((16384 - 8) // 16)
+
+    def run():
+        GetLBAStatus.unmarshall_datain(data)
+
+    return run
+
+
+@benchmark("unmarshall.getlbastatus.16k.extents")
+def getlbastatus_extents():
+    data = lba_status((16384 - 8) // 16)
+
+    def run():
+        GetLBAStatus.unmarshall_extents(data)
+
+    return run
+
+
+@benchmark("unmarshall.getlbastatus.16k.extents_stdlib")
+def getlbastatus_extents_stdlib():
+    data = lba_status((16384 - 8) // 16)
+
+    def run():
+        GetLBAStatus.unmarshall_extents(data, use_numpy=False)
+
+    return run
+
+
+_SYNC = bytes([0x00] + [0xFF] * 10 + [0x00])
+
+
+@benchmark("unmarshall.readcd.sync_subchannel_64")
+def readcd():
+    sector = _SYNC + bytes.fromhex("4101010008400000104019cd00000000")
+    data = sector * 64
+
+    def run():
+        ReadCd.unmarshall_datain(data, 640, 64, est=2, mcsb=0x10, c2ei=0, scsb=2)
+
+    return run
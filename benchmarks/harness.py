@@ -0,0 +1,154 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import gc
+import statistics
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+#
+# A small benchmark runner with no dependencies beyond the standard library
+#
+
+_cases: List[Tuple[str, Callable[[], Callable[[], object]]]] = []
+
+
+def benchmark(name):
+    """
+    register a benchmark case
+
+    The decorated function does the setup and returns the callable that is
+    timed, so building the input data is not part of the measurement.
+
+    :param name: a dotted name like "unmarshall.getlbastatus_16k"
+    """
+    if any(c[0] == name for c in _cases):
+        raise ValueError("duplicate benchmark case %r" % name)
+
+    def register(setup):
+        _cases.append((name, setup))
+        return setup
+
+    return register
+
+
+def cases(pattern=None):
+    """
+    the registered cases, optionally only those containing pattern
+
+    :param pattern: a substring of the case names to select
+    :return: a list of (name, setup) tuples sorted by name
+    """
+    return sorted(
+        (c for c in _cases if pattern is None or pattern in c[0]), key=lambda c: c[0]
+    )
+
+
+def _time(fn, number):
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def allocations(fn):
+    """
+    the memory allocated by a single call
+
+    :param fn: the callable to measure
+    :return: a tuple with the peak bytes allocated during the call and the
+             bytes still allocated after it returned
+    """
+    fn()
+    tracemalloc.start()
+    try:
+        fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, current
+
+
+def measure(fn, min_time=0.2, repeat=5):
+    """
+    time a callable
+
+    The number of calls per run is doubled until a run takes min_time / 10,
+    then repeat runs of min_time each are timed with the garbage collector
+    disabled.
+
+    :param fn: the callable to measure
+    :param min_time: the seconds each run should take
+    :param repeat: the number of runs
+    :return: a dict with the results
+    """
+    number = 1
+    while True:
+        t = _time(fn, number)
+        if t >= min_time / 10:
+            break
+        number *= 2
+    number = max(int(number * min_time / t), 1)
+    timings = [_time(fn, number) / number for _ in range(repeat)]
+    peak, retained = allocations(fn)
+    return {
+        "ops": 1 / min(timings),
+        "median_ops": 1 / statistics.median(timings),
+        "usec": min(timings) * 1e6,
+        "peak_bytes": peak,
+        "retained_bytes": retained,
+    }
+
+
+def run(pattern=None, min_time=0.2, repeat=5, report=print):
+    """
+    run the registered cases
+
+    :param pattern: a substring of the case names to select
+    :param min_time: the seconds each run should take
+    :param repeat: the number of runs per case
+    :param report: called with a line of text for each case
+    :return: a dict mapping case names to their results
+    """
+    results = {}
+    report("%-52s %14s %10s %12s" % ("benchmark", "ops/s", "usec/op", "peak bytes"))
+    for name, setup in cases(pattern):
+        r = measure(setup(), min_time=min_time, repeat=repeat)
+        results[name] = r
+        report(
+            "%-52s %14.1f %10.2f %12d" % (name, r["ops"], r["usec"], r["peak_bytes"])
+        )
+    return results
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    find the cases that got slower or allocate more than in a baseline
+
+    :param results: a dict returned by run()
+    :param baseline: a dict returned by an earlier run()
+    :param threshold: the tolerated relative change
+    :return: a list of (name, description) tuples
+    """
+    regressions = []
+    for name, r in sorted(results.items()):
+        b = baseline.get(name)
+        if b is None:
+            continue
+        if r["ops"] < b["ops"] * (1 - threshold):
+            regressions.append((name, "%.1f ops/s, was %.1f" % (r["ops"], b["ops"])))
+        if r["peak_bytes"] > b["peak_bytes"] * (1 + threshold) + 64:
+            regressions.append(
+                (name, "%d peak bytes, was %d" % (r["peak_bytes"], b["peak_bytes"]))
+            )
+    return regressions
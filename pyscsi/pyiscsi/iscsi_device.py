@@ -36,6 +36,9 @@ class ISCSIDevice(metaclass=ExMETA):
     Note: The workflow above is already implemented in the SCSI class
     """
 
+    # a libiscsi context can not be shared between threads
+    thread_safe = False
+
     def __init__(self, device, initiator_name=""):
         """
         initialize a  new instance of a ISCSIDevice
@@ -86,7 +89,13 @@ class ISCSIDevice(metaclass=ExMETA):
     def execute(self, cmd, en_raw_sense=False):
         """
         execute a scsi command
+
+        A CHECK CONDITION is raised as a CheckCondition exception, unless
+        en_raw_sense is set: ATA PASS-THROUGH commands return their results in
+        the sense data, so it is only stored in cmd.raw_sense_data then.
+
         :param cmd: a scsi command
+        :param en_raw_sense: store the sense data instead of raising it
         """
         dir = iscsi.scsi_xfer_dir.SCSI_XFER_NONE
         xferlen = 0
@@ -107,7 +116,7 @@ class ISCSIDevice(metaclass=ExMETA):
             # Match recent addition to SCSIDevice
             if en_raw_sense:
                 cmd.raw_sense_data = cmd.sense
-            # No sense information propagated.
+                return
             raise self.CheckCondition(cmd.sense)
         if task.status == scsi_enum_command.SCSI_STATUS.GOOD:
             return
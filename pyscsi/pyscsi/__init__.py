@@ -4,6 +4,7 @@
 
 __all__ = [
     "scsi",
+    "scsi_async",
     "scsi_cdb_exchangemedium",
     "scsi_cdb_getlbastatus",
     "scsi_cdb_initelementstatus",
@@ -13,6 +14,7 @@ __all__ = [
     "scsi_cdb_modesense10",
     "scsi_cdb_movemedium",
     "scsi_cdb_openclose_exportimport_element",
+    "scsi_cdb_populate_token",
     "scsi_cdb_positiontoelement",
     "scsi_cdb_preventallow_mediumremoval",
     "scsi_cdb_read10",
@@ -23,6 +25,7 @@ __all__ = [
     "scsi_cdb_readcd",
     "scsi_cdb_readelementstatus",
     "scsi_cdb_readdiscinformation",
+    "scsi_cdb_receive_copy_results",
     "scsi_cdb_report_luns",
     "scsi_cdb_report_priority",
     "scsi_cdb_synchronize_cache10",
@@ -31,10 +34,23 @@ __all__ = [
     "scsi_cdb_write10",
     "scsi_cdb_write12",
     "scsi_cdb_write16",
+    "scsi_cdb_write_using_token",
     "scsi_cdb_writesame10",
     "scsi_cdb_writesame16",
     "scsi_command",
+    "scsi_copy",
     "scsi_device",
+    "scsi_device_emulated",
+    "scsi_device_queued",
+    "scsi_discard",
+    "scsi_discovery",
     "scsi_exception",
+    "scsi_inventory",
+    "scsi_offload",
+    "scsi_provisioning",
+    "scsi_retry",
     "scsi_sense",
+    "scsi_stream",
+    "scsi_submit",
+    "scsi_throttle",
 ]
@@ -25,6 +25,7 @@ from pyscsi.pyscsi.scsi_cdb_openclose_exportimport_element import (
 )
 from pyscsi.pyscsi.scsi_cdb_persistentreservein import *
 from pyscsi.pyscsi.scsi_cdb_persistentreserveout import PersistentReserveOut
+from pyscsi.pyscsi.scsi_cdb_populate_token import PopulateToken
 from pyscsi.pyscsi.scsi_cdb_positiontoelement import PositionToElement
 from pyscsi.pyscsi.scsi_cdb_preventallow_mediumremoval import PreventAllowMediumRemoval
 from pyscsi.pyscsi.scsi_cdb_read10 import Read10
@@ -35,6 +36,12 @@ from pyscsi.pyscsi.scsi_cdb_readcapacity16 import ReadCapacity16
 from pyscsi.pyscsi.scsi_cdb_readcd import ReadCd
 from pyscsi.pyscsi.scsi_cdb_readdiscinformation import ReadDiscInformation
 from pyscsi.pyscsi.scsi_cdb_readelementstatus import ReadElementStatus
+from pyscsi.pyscsi.scsi_cdb_receive_copy_results import (
+    ReceiveCopyResultsCopyStatus,
+    ReceiveCopyResultsCopyStatusLID4,
+    ReceiveCopyResultsOperatingParameters,
+    ReceiveCopyResultsRODTokenInformation,
+)
 from pyscsi.pyscsi.scsi_cdb_report_luns import ReportLuns
 from pyscsi.pyscsi.scsi_cdb_report_priority import ReportPriority
 from pyscsi.pyscsi.scsi_cdb_report_target_port_groups import ReportTargetPortGroups
@@ -45,10 +52,13 @@ from pyscsi.pyscsi.scsi_cdb_unmap import Unmap
 from pyscsi.pyscsi.scsi_cdb_write10 import Write10
 from pyscsi.pyscsi.scsi_cdb_write12 import Write12
 from pyscsi.pyscsi.scsi_cdb_write16 import Write16
+from pyscsi.pyscsi.scsi_cdb_write_using_token import WriteUsingToken
 from pyscsi.pyscsi.scsi_cdb_writesame10 import WriteSame10
 from pyscsi.pyscsi.scsi_cdb_writesame16 import WriteSame16
-from pyscsi.pyscsi.scsi_enum_command import mmc, sbc, smc, spc, ssc
-from pyscsi.utils.converter import get_opcode
+from pyscsi.pyscsi.scsi_discovery import DeviceInfo
+from pyscsi.pyscsi.scsi_enum_command import device_type_opcodes, dispatch_table
+from pyscsi.pyscsi.scsi_enum_inquiry import VPD
+from pyscsi.utils.converter import scsi_ba_to_int
 
 
 class SCSI(object):
@@ -56,15 +66,23 @@ class SCSI(object):
     The interface to  the specialized scsi classes
     """
 
-    def __init__(self, dev, blocksize=0):
+    _cache = None
+    _info = None
+    retry = None
+
+    def __init__(self, dev, blocksize=0, cache=None, retry=None):
         """
         initialize a new instance
 
         :param dev: a SCSIDevice object
         :param blocksize:  integer defining a blocksize
+        :param cache: a DeviceCache object to skip the discovery of known devices
+        :param retry: a RetryPolicy object to retry failed commands with
         """
         self.device = dev
         self._blocksize = blocksize
+        self._cache = cache
+        self.retry = retry
         self.__init_opcode()
 
     def __call__(self, dev):
@@ -74,6 +92,7 @@ class SCSI(object):
         :param dev: a SCSIDevice or ISCSIDevice object
         """
         self.device = dev
+        self._info = None
         self.__init_opcode()
 
     def __enter__(self):
@@ -89,33 +108,109 @@ class SCSI(object):
         mapper.
         """
         if self.device is not None:
-            self.device.devicetype = self.inquiry().result["peripheral_device_type"]
-            if self.device.devicetype in (
-                0x00,
-                0x04,
-                0x07,
-            ):  # sbc
-                self.device.opcodes = sbc
-            elif self.device.devicetype in (0x01, 0x02, 0x09):  # ssc
-                self.device.opcodes = ssc
-            elif self.device.devicetype in (0x03,):  # spc
-                self.device.opcodes = spc
-            elif self.device.devicetype in (0x08,):  # smc
-                self.device.opcodes = smc
-            elif self.device.devicetype in (0x05,):  # mmc
-                self.device.opcodes = mmc
+            info = self._cached_info()
+            if info is None:
+                info = DeviceInfo(self.inquiry().result["peripheral_device_type"])
+            self._use_info(info)
+
+    def _cached_info(self):
+        """
+        look up the device in the discovery cache
+
+        :return: a DeviceInfo object, None if the device is not cached
+        """
+        if self._cache is None:
+            return None
+        return self._cache.get(self.device)
+
+    def _use_info(self, info):
+        """
+        Small helper method to apply a discovered DeviceInfo and to keep
+        the discovery cache up to date.
+
+        :param info: a DeviceInfo object
+        """
+        changed = self._cached_info() is not info
+        self._info = info
+        self._set_devicetype(info.devicetype)
+        if not self._blocksize:
+            self._blocksize = info.blocksize
+        elif not info.blocksize:
+            info.blocksize = self._blocksize
+            changed = True
+        if changed:
+            self._remember()
+
+    def _remember(self):
+        if self._cache is not None and self._info is not None:
+            self._cache.put(self.device, self._info)
+
+    def _set_devicetype(self, devicetype):
+        """
+        Small helper method to assign the opcode mapper matching
+        a peripheral device type to the device.
+
+        :param devicetype: the peripheral device type from the INQUIRY data
+        """
+        self.device.devicetype = devicetype
+        opcodes = device_type_opcodes.get(devicetype)
+        if opcodes is not None:
+            self.device.opcodes = opcodes
+
+    def supports(self, command):
+        """
+        whether the opcodes of the device include a command
+
+        :param command: the name of an opcode or a service action, like
+                        "READ_16" or "GET_LBA_STATUS"
+        :return: a bool
+        """
+        return command in dispatch_table(self.device.opcodes)
+
+    def _opcode(self, command):
+        """
+        the OpCode of a command in the opcodes of the device
+
+        :param command: the name of an opcode or a service action
+        :return: an OpCode object
+        """
+        entry = dispatch_table(self.device.opcodes).get(command)
+        if entry is None:
+            raise AttributeError("the device has no %s command" % command)
+        return entry.opcode
 
     def execute(self, cmd, en_raw_sense=False):
         """
         wrapper method to call the SCSIDevice.execute method
 
+        With a retry policy, failed commands are executed again as its
+        rules say.
+
         :param cmd: a SCSICommand object
         """
+        if self.retry is not None:
+            self.retry.execute(self.device, cmd, en_raw_sense=en_raw_sense)
+            return
         try:
             self.device.execute(cmd, en_raw_sense=en_raw_sense)
         except Exception as e:
             raise e
 
+    def _execute(self, cmd, en_raw_sense=False, unmarshall=False, **kwargs):
+        """
+        execute a command built by one of the command methods
+
+        :param cmd: a SCSICommand object
+        :param en_raw_sense: keep the raw sense data in the command
+        :param unmarshall: unmarshall the datain of the command
+        :param kwargs: keyword arguments for the unmarshall method of the command
+        :return: the SCSICommand object
+        """
+        self.execute(cmd, en_raw_sense=en_raw_sense)
+        if unmarshall:
+            cmd.unmarshall(**kwargs)
+        return cmd
+
     @property
     def blocksize(self):
         """
@@ -133,6 +228,9 @@ class SCSI(object):
         :param: blocksize in bytes
         """
         self._blocksize = value
+        if self._info is not None and value and self._info.blocksize != value:
+            self._info.blocksize = value
+            self._remember()
 
     def exchangemedium(self, xfer, source, dest1, dest2, **kwargs):
         """
@@ -148,23 +246,22 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.EXCHANGE_MEDIUM
         cmd = ExchangeMedium(opcode, xfer, source, dest1, dest2, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
-    def getlbastatus(self, lba, **kwargs):
+    def getlbastatus(self, lba, extents=False, **kwargs):
         """
         Returns a GetLBAStatus Instance
 
         :param lba: starting lba
+        :param extents: return the descriptors as a table in result["extents"]
+                        instead of a list of dicts in result["lbas"]
         :param kwargs: a dict with key/value pairs
                        alloc_len = 16384: size of requested datain
         :return: a GetLBAStatus instance
         """
-        opcode = next(get_opcode(self.device.opcodes, "9E"))
+        opcode = self._opcode("GET_LBA_STATUS")
         cmd = GetLBAStatus(opcode, lba, **kwargs)
-        self.execute(cmd)
-        cmd.unmarshall()
-        return cmd
+        return self._execute(cmd, unmarshall=True, extents=extents)
 
     def inquiry(self, evpd=0, page_code=0, alloclen=96):
         """
@@ -177,9 +274,51 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.INQUIRY
         cmd = Inquiry(opcode, evpd=evpd, page_code=page_code, alloclen=alloclen)
-        self.execute(cmd)
-        cmd.unmarshall(evpd=evpd)
-        return cmd
+        return self._execute(cmd, unmarshall=True, evpd=evpd)
+
+    def vpd(self, page_code):
+        """
+        Returns the decoded data of a VPD page
+
+        Each page is only fetched once per device, and kept in the
+        discovery cache if there is one.
+
+        :param page_code: a byte representing a page code for vpd
+        :return: a dict, empty if the device does not support the page
+        """
+        result = self._cached_vpd(page_code)
+        if result is not None:
+            return result
+        if page_code != VPD.SUPPORTED_VPD_PAGES:
+            if page_code not in self.vpd(VPD.SUPPORTED_VPD_PAGES)["vpd_pages"]:
+                return {}
+        cmd = self.inquiry(evpd=1, page_code=page_code, alloclen=255)
+        if self._vpd_length(cmd) > 255:
+            cmd = self.inquiry(
+                evpd=1, page_code=page_code, alloclen=self._vpd_length(cmd)
+            )
+        self._store_vpd(page_code, cmd)
+        return cmd.result
+
+    def _cached_vpd(self, page_code):
+        """
+        the decoded data of a VPD page from the device info
+
+        :param page_code: a byte representing a page code for vpd
+        :return: a dict, None if the page was not fetched yet
+        """
+        if self._info is None or page_code not in self._info.vpd:
+            return None
+        return Inquiry.unmarshall_datain(bytearray(self._info.vpd[page_code]), evpd=1)
+
+    @staticmethod
+    def _vpd_length(cmd):
+        return 4 + scsi_ba_to_int(cmd.datain[2:4])
+
+    def _store_vpd(self, page_code, cmd):
+        if self._info is not None:
+            self._info.vpd[page_code] = bytes(cmd.datain[: self._vpd_length(cmd)])
+            self._remember()
 
     def initializeelementstatus(self):
         """
@@ -189,8 +328,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.INITIALIZE_ELEMENT_STATUS
         cmd = InitializeElementStatus(opcode)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def initializeelementstatuswithrange(self, xfer, elements, **kwargs):
         """
@@ -207,8 +345,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.INITIALIZE_ELEMENT_STATUS_WITH_RANGE
         cmd = InitializeElementStatusWithRange(opcode, xfer, elements, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def modeselect6(self, data, **kwargs):
         """
@@ -222,9 +359,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.MODE_SELECT_6
         cmd = ModeSelect6(opcode, data, **kwargs)
-        self.execute(cmd)
-        cmd.unmarshall()
-        return cmd
+        return self._execute(cmd, unmarshall=True)
 
     def modesense6(self, page_code, **kwargs):
         """
@@ -240,9 +375,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.MODE_SENSE_6
         cmd = ModeSense6(opcode, page_code, **kwargs)
-        self.execute(cmd)
-        cmd.unmarshall()
-        return cmd
+        return self._execute(cmd, unmarshall=True)
 
     def modesense10(self, page_code, **kwargs):
         """
@@ -259,9 +392,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.MODE_SENSE_10
         cmd = ModeSense10(opcode, page_code, **kwargs)
-        self.execute(cmd)
-        cmd.unmarshall()
-        return cmd
+        return self._execute(cmd, unmarshall=True)
 
     def modeselect10(self, data, **kwargs):
         """
@@ -275,9 +406,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.MODE_SELECT_10
         cmd = ModeSelect10(opcode, data, **kwargs)
-        self.execute(cmd)
-        cmd.unmarshall()
-        return cmd
+        return self._execute(cmd, unmarshall=True)
 
     def opencloseimportexportelement(self, xfer, acode, **kwargs):
         """
@@ -290,8 +419,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.OPEN_CLOSE_IMPORT_EXPORT_ELEMENT
         cmd = OpenCloseImportExportElement(opcode, xfer, acode, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def positiontoelement(self, xfer, dest, **kwargs):
         """
@@ -305,8 +433,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.POSITION_TO_ELEMENT
         cmd = PositionToElement(opcode, xfer, dest, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def preventallowmediumremoval(self, **kwargs):
         """
@@ -318,8 +445,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.PREVENT_ALLOW_MEDIUM_REMOVAL
         cmd = PreventAllowMediumRemoval(opcode=opcode, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def read10(self, lba, tl, **kwargs):
         """
@@ -333,12 +459,12 @@ class SCSI(object):
                        fua = 0, Force Unit Access flag
                        rarc = 0, Rebuild Assist Recovery control flag
                        group = 0, Group Number
+                       buf = None, writable buffer the data is read into
         :returns a Read10 Instance
         """
         opcode = self.device.opcodes.READ_10
         cmd = Read10(opcode, self.blocksize, lba, tl, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def read12(self, lba, tl, **kwargs):
         """
@@ -352,12 +478,12 @@ class SCSI(object):
                        fua = 0, Force Unit Access flag
                        rarc = 0, Rebuild Assist Recovery control flag
                        group = 0, Group Number
+                       buf = None, writable buffer the data is read into
         :returns a Read12 Instance
         """
         opcode = self.device.opcodes.READ_12
         cmd = Read12(opcode, self.blocksize, lba, tl, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def read16(self, lba, tl, **kwargs):
         """
@@ -371,12 +497,12 @@ class SCSI(object):
                        fua = 0, Force Unit Access flag
                        rarc = 0, Rebuild Assist Recovery control flag
                        group = 0, Group Number
+                       buf = None, writable buffer the data is read into
         :returns a Read16 Instance
         """
         opcode = self.device.opcodes.READ_16
         cmd = Read16(opcode, self.blocksize, lba, tl, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def readcapacity10(self, **kwargs):
         """
@@ -388,9 +514,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.READ_CAPACITY_10
         cmd = ReadCapacity10(opcode=opcode, **kwargs)
-        self.execute(cmd)
-        cmd.unmarshall()
-        return cmd
+        return self._execute(cmd, unmarshall=True)
 
     def readcapacity16(self, **kwargs):
         """
@@ -400,11 +524,9 @@ class SCSI(object):
                        alloc_len = 32, size of requested datain
         :return: a ReadCapacity16 instance
         """
-        opcode = next(get_opcode(self.device.opcodes, "9E"))
+        opcode = self._opcode("READ_CAPACITY_16")
         cmd = ReadCapacity16(opcode=opcode, **kwargs)
-        self.execute(cmd)
-        cmd.unmarshall()
-        return cmd
+        return self._execute(cmd, unmarshall=True)
 
     def readcd(self, lba, tl, **kwargs):
         """
@@ -422,9 +544,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.READ_CD
         cmd = ReadCd(opcode, lba, tl, **kwargs)
-        self.execute(cmd)
-        cmd.unmarshall(lba=lba, tl=tl, **kwargs)
-        return cmd
+        return self._execute(cmd, unmarshall=True, lba=lba, tl=tl, **kwargs)
 
     def readdiscinformation(self, data_type, alloc_len=4096):
         """
@@ -437,9 +557,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.READ_DISC_INFORMATION
         cmd = ReadDiscInformation(opcode, data_type, alloc_len=alloc_len)
-        self.execute(cmd)
-        cmd.unmarshall()
-        return cmd
+        return self._execute(cmd, unmarshall=True)
 
     def readelementstatus(self, start, num, **kwargs):
         """
@@ -457,9 +575,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.READ_ELEMENT_STATUS
         cmd = ReadElementStatus(opcode, start, num, **kwargs)
-        self.execute(cmd)
-        cmd.unmarshall()
-        return cmd
+        return self._execute(cmd, unmarshall=True)
 
     def movemedium(self, xfer, source, dest, **kwargs):
         """
@@ -474,8 +590,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.MOVE_MEDIUM
         cmd = MoveMedium(opcode, xfer, source, dest, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def synchronizecache10(self, lba, numblks, **kwargs):
         """
@@ -494,8 +609,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.SYNCHRONIZE_CACHE_10
         cmd = SynchronizeCache10(opcode, lba, numblks, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def synchronizecache16(self, lba, numblks, **kwargs):
         """
@@ -514,8 +628,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.SYNCHRONIZE_CACHE_16
         cmd = SynchronizeCache16(opcode, lba, numblks, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def testunitready(self):
         """
@@ -524,8 +637,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.TEST_UNIT_READY
         cmd = TestUnitReady(opcode)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def unmap(self, lbas, **kwargs):
         """
@@ -540,8 +652,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.UNMAP
         cmd = Unmap(opcode, lbas, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def write10(self, lba, tl, data, **kwargs):
         """
@@ -549,7 +660,7 @@ class SCSI(object):
 
         :param lba: Logical Block Address to write to
         :param tl: Transfer Length in blocks
-        :param data: bytearray containing the data to write
+        :param data: bytearray or any other buffer containing the data to write
         :param kwargs: a dict with key/value pairs
                        wrprotect = 0, WriteProtect flags
                        dpo = 0, disable Page Out flag
@@ -559,8 +670,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.WRITE_10
         cmd = Write10(opcode, self.blocksize, lba, tl, data, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def write12(self, lba, tl, data, **kwargs):
         """
@@ -568,7 +678,7 @@ class SCSI(object):
 
         :param lba: Logical Block Address to write to
         :param tl: Transfer Length in blocks
-        :param data: bytearray containing the data to write
+        :param data: bytearray or any other buffer containing the data to write
         :param kwargs: a dict with key/value pairs
                        wrprotect = 0, WriteProtect flags
                        dpo = 0, disable Page Out flag
@@ -578,8 +688,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.WRITE_12
         cmd = Write12(opcode, self.blocksize, lba, tl, data, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def write16(self, lba, tl, data, **kwargs):
         """
@@ -587,7 +696,7 @@ class SCSI(object):
 
         :param lba: Logical Block Address to write to
         :param tl: Transfer Length in blocks
-        :param data: bytearray containing the data to write
+        :param data: bytearray or any other buffer containing the data to write
         :param kwargs: a dict with key/value pairs
                        wrprotect = 0, WriteProtect flags
                        dpo = 0, disable Page Out flag
@@ -597,8 +706,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.WRITE_16
         cmd = Write16(opcode, self.blocksize, lba, tl, data, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def writesame16(self, lba, nb, data, **kwargs):
         """
@@ -617,8 +725,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.WRITE_SAME_16
         cmd = WriteSame16(opcode, self.blocksize, lba, nb, data, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def writesame10(self, lba, nb, data, **kwargs):
         """
@@ -636,8 +743,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.WRITE_SAME_10
         cmd = WriteSame10(opcode, self.blocksize, lba, nb, data, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def reportluns(self, **kwargs):
         """
@@ -650,9 +756,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.REPORT_LUNS
         cmd = ReportLuns(opcode=opcode, **kwargs)
-        self.execute(cmd)
-        cmd.unmarshall()
-        return cmd
+        return self._execute(cmd, unmarshall=True)
 
     def reportpriority(self, **kwargs):
         """
@@ -663,11 +767,9 @@ class SCSI(object):
                        alloclen=16384, size of requested datain
         :return: a ReportLuns instance
         """
-        opcode = next(get_opcode(self.device.opcodes, "A3"))
+        opcode = self._opcode("REPORT_PRIORITY")
         cmd = ReportPriority(opcode=opcode, **kwargs)
-        self.execute(cmd)
-        cmd.unmarshall()
-        return cmd
+        return self._execute(cmd, unmarshall=True)
 
     def reporttargetportgroups(self, **kwargs):
         """
@@ -679,11 +781,9 @@ class SCSI(object):
                        alloclen=16384, size of requested datain
         :return: a ReportTargetPortGroups instance
         """
-        opcode = next(get_opcode(self.device.opcodes, "A3"))
+        opcode = self._opcode("REPORT_TARGET_PORT_GROUPS")
         cmd = ReportTargetPortGroups(opcode=opcode, **kwargs)
-        self.execute(cmd)
-        cmd.unmarshall()
-        return cmd
+        return self._execute(cmd, unmarshall=True)
 
     def atapassthrough12(
         self,
@@ -736,8 +836,7 @@ class SCSI(object):
             command,
             **kwargs
         )
-        self.execute(cmd, en_raw_sense=True)
-        return cmd
+        return self._execute(cmd, en_raw_sense=True)
 
     def atapassthrough16(
         self,
@@ -791,8 +890,7 @@ class SCSI(object):
             command,
             **kwargs
         )
-        self.execute(cmd, en_raw_sense=True)
-        return cmd
+        return self._execute(cmd, en_raw_sense=True)
 
     def persistentreservein(self, service_action, **kwargs):
         """
@@ -815,9 +913,7 @@ class SCSI(object):
         else:
             raise ValueError("Invalid Service Action")
 
-        self.execute(cmd)
-        cmd.unmarshall()
-        return cmd
+        return self._execute(cmd, unmarshall=True)
 
     def persistentreserveout(self, service_action, scope=0, pr_type=0, **kwargs):
         """
@@ -877,8 +973,7 @@ class SCSI(object):
         """
         opcode = self.device.opcodes.PERSISTENT_RESERVE_OUT
         cmd = PersistentReserveOut(opcode, service_action, scope, pr_type, **kwargs)
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def extendedcopy4(
         self,
@@ -901,8 +996,7 @@ class SCSI(object):
             segment_descriptor_list,
             inline_data,
         )
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
 
     def extendedcopy5(
         self,
@@ -929,5 +1023,68 @@ class SCSI(object):
             segment_descriptor_list,
             inline_data,
         )
-        self.execute(cmd)
-        return cmd
+        return self._execute(cmd)
+
+    def receivecopyresults(self, service_action, list_identifier=0, **kwargs):
+        """
+        Return a ReceiveCopyResults Instance
+
+        :param service_action: an int, the SERVICE ACTION code
+        :param list_identifier: the list identifier of the EXTENDED COPY, POPULATE
+                                TOKEN or WRITE USING TOKEN command
+        :param kwargs: a dict with key/value pairs
+                       alloclen=1024, size of requested datain
+        :return: a ReceiveCopyResults instance
+        """
+        opcode = self.device.opcodes.RECEIVE_COPY_RESULTS
+        if service_action == opcode.serviceaction.COPY_STATUS:
+            cmd = ReceiveCopyResultsCopyStatus(opcode, list_identifier, **kwargs)
+        elif service_action == opcode.serviceaction.COPY_STATUS_LID4:
+            cmd = ReceiveCopyResultsCopyStatusLID4(opcode, list_identifier, **kwargs)
+        elif service_action == opcode.serviceaction.OPERATING_PARAMETERS:
+            cmd = ReceiveCopyResultsOperatingParameters(opcode, **kwargs)
+        elif service_action == opcode.serviceaction.ROD_TOKEN_INFORMATION:
+            cmd = ReceiveCopyResultsRODTokenInformation(
+                opcode, list_identifier, **kwargs
+            )
+        else:
+            raise ValueError("Invalid Service Action")
+
+        return self._execute(cmd, unmarshall=True)
+
+    def populatetoken(self, list_identifier, ranges, **kwargs):
+        """
+        Returns a PopulateToken Instance
+
+        :param list_identifier: identifies the token in RECEIVE ROD TOKEN INFORMATION
+        :param ranges: a list of dicts, each with 'lba' and 'num_blocks' keys,
+                       specifying the LBA ranges the token represents
+        :param kwargs: a dict with key/value pairs
+                       immed = 0, return before the token is created
+                       inactivity_timeout = 0, seconds the token stays valid
+                       rod_type = 0, the ROD type of the token
+                       group = 0, Group Number
+        :return: a PopulateToken instance
+        """
+        opcode = self.device.opcodes.EXTENDED_COPY
+        cmd = PopulateToken(opcode, list_identifier, ranges, **kwargs)
+        return self._execute(cmd)
+
+    def writeusingtoken(self, list_identifier, rod_token, ranges, **kwargs):
+        """
+        Returns a WriteUsingToken Instance
+
+        :param list_identifier: identifies the command in RECEIVE COPY STATUS(LID4)
+        :param rod_token: the 512 byte ROD token to write the data of
+        :param ranges: a list of dicts, each with 'lba' and 'num_blocks' keys,
+                       specifying the LBA ranges to write
+        :param kwargs: a dict with key/value pairs
+                       offset_into_rod = 0, the first block of the token to write
+                       immed = 0, return before the data is written
+                       del_tkn = 0, delete the token once the command completes
+                       group = 0, Group Number
+        :return: a WriteUsingToken instance
+        """
+        opcode = self.device.opcodes.EXTENDED_COPY
+        cmd = WriteUsingToken(opcode, list_identifier, rod_token, ranges, **kwargs)
+        return self._execute(cmd)
@@ -0,0 +1,191 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from pyscsi.pyscsi.scsi import SCSI
+from pyscsi.pyscsi.scsi_discovery import DeviceInfo
+from pyscsi.pyscsi.scsi_enum_inquiry import VPD
+
+# the worker threads shared by all AsyncSCSI instances for blocking devices
+_max_workers = 32
+_executor = None
+
+
+def _shared_executor():
+    """
+    the thread pool running the blocking device methods, created on first use
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=_max_workers, thread_name_prefix="AsyncSCSI"
+        )
+    return _executor
+
+
+class AsyncSCSI(SCSI):
+    """
+    The asyncio interface to the specialized scsi classes
+
+    Every command method of the SCSI class is available with the same
+    arguments, but returns an awaitable that resolves to the command:
+
+        async with AsyncSCSI(dev, blocksize=512) as s:
+            r = await s.read16(0, 8)
+
+    Devices that provide an execute_async coroutine, like SCSIQueuedDevice,
+    are driven from the event loop directly. Any other device, like
+    SCSIDevice or ISCSIDevice, still blocks in execute, so its commands run on
+    a pool of worker threads shared by all instances and bounded at 32
+    threads, however many devices are open. They run one at a time per
+    instance unless the device is thread_safe, as a device object like
+    ISCSIDevice can not be used from several threads at once. Polling the
+    file descriptor of a libiscsi context from the event loop is not
+    implemented.
+
+    Unlike SCSI, the device type is not discovered in the constructor, use
+    "async with" or await init_opcode() before issuing device type specific
+    commands.
+    """
+
+    _lock = None
+
+    def __init__(self, dev, blocksize=0, cache=None, retry=None):
+        """
+        initialize a new instance
+
+        :param dev: a SCSIDevice object
+        :param blocksize:  integer defining a blocksize
+        :param cache: a DeviceCache object to skip the discovery of known devices
+        :param retry: a RetryPolicy object to retry failed commands with
+        """
+        self.device = dev
+        self._blocksize = blocksize
+        self._cache = cache
+        self.retry = retry
+
+    def __call__(self, dev):
+        """
+        call the instance again with new device, await init_opcode()
+        afterwards to discover the device type
+
+        :param dev: a SCSIDevice or ISCSIDevice object
+        """
+        self.device = dev
+        self._info = None
+        self._lock = None
+
+    async def __aenter__(self):
+        await self.init_opcode()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """
+        wait for the commands in flight and close the device without
+        blocking the event loop
+        """
+        drain_async = getattr(self.device, "drain_async", None)
+        if drain_async is not None:
+            await drain_async()
+            self.device.close()
+            return
+        await self._run_blocking(self.device.close)
+
+    async def _run_blocking(self, func):
+        """
+        run a blocking device method on the shared worker threads
+
+        The lock is created in the running event loop, as on Python 3.7 an
+        asyncio.Lock binds to the current loop when it is created.
+
+        :param func: a callable without arguments
+        """
+        loop = asyncio.get_running_loop()
+        if getattr(self.device, "thread_safe", False):
+            await loop.run_in_executor(_shared_executor(), func)
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await loop.run_in_executor(_shared_executor(), func)
+
+    async def init_opcode(self):
+        """
+        Send a standard INQUIRY to determine the type of the
+        scsi device and assign a proper opcode mapper.
+        """
+        if self.device is not None:
+            info = self._cached_info()
+            if info is None:
+                cmd = await self.inquiry()
+                info = DeviceInfo(cmd.result["peripheral_device_type"])
+            self._use_info(info)
+
+    async def vpd(self, page_code):
+        """
+        Returns the decoded data of a VPD page
+
+        :param page_code: a byte representing a page code for vpd
+        :return: a dict, empty if the device does not support the page
+        """
+        result = self._cached_vpd(page_code)
+        if result is not None:
+            return result
+        if page_code != VPD.SUPPORTED_VPD_PAGES:
+            pages = await self.vpd(VPD.SUPPORTED_VPD_PAGES)
+            if page_code not in pages["vpd_pages"]:
+                return {}
+        cmd = await self.inquiry(evpd=1, page_code=page_code, alloclen=255)
+        if self._vpd_length(cmd) > 255:
+            alloclen = self._vpd_length(cmd)
+            cmd = await self.inquiry(evpd=1, page_code=page_code, alloclen=alloclen)
+        self._store_vpd(page_code, cmd)
+        return cmd.result
+
+    async def execute(self, cmd, en_raw_sense=False):
+        """
+        wrapper coroutine to call the device execute method
+
+        With a retry policy, failed commands are executed again as its
+        rules say.
+
+        :param cmd: a SCSICommand object
+        """
+        execute_async = getattr(self.device, "execute_async", None)
+        if execute_async is not None:
+            if self.retry is not None:
+                await self.retry.execute_async(self.device, cmd, en_raw_sense)
+            else:
+                await execute_async(cmd, en_raw_sense=en_raw_sense)
+            return
+        if self.retry is not None:
+            execute = functools.partial(self.retry.execute, self.device)
+        else:
+            execute = self.device.execute
+        await self._run_blocking(
+            functools.partial(execute, cmd, en_raw_sense=en_raw_sense)
+        )
+
+    async def _execute(self, cmd, en_raw_sense=False, unmarshall=False, **kwargs):
+        """
+        execute a command built by one of the command methods
+
+        :param cmd: a SCSICommand object
+        :param en_raw_sense: keep the raw sense data in the command
+        :param unmarshall: unmarshall the datain of the command
+        :param kwargs: keyword arguments for the unmarshall method of the command
+        :return: the SCSICommand object
+        """
+        await self.execute(cmd, en_raw_sense=en_raw_sense)
+        if unmarshall:
+            cmd.unmarshall(**kwargs)
+        return cmd
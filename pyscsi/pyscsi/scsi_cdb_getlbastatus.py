@@ -5,18 +5,83 @@
 #
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
+import struct
+import sys
+from array import array
+
 from pyscsi.pyscsi.scsi_command import SCSICommand
-from pyscsi.utils.converter import (
-    decode_bits,
-    encode_dict,
-    scsi_ba_to_int,
-    scsi_int_to_ba,
-)
+from pyscsi.utils.converter import encode_dict, scsi_ba_to_int, scsi_int_to_ba
+
+try:
+    import numpy
+
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
 
 #
 # SCSI GetLBAStatus command and definitions
 #
 
+# an LBA status descriptor: lba, num_blocks, p_status and 3 reserved bytes
+_descriptor = struct.Struct(">QIB3x")
+
+# the typecode of an array of unsigned 32 bit integers
+_uint32 = "I" if array("I").itemsize == 4 else "L"
+
+# a translation table masking the reserved bits of p_status
+_p_status_mask = bytes(i & 0x0F for i in range(256))
+
+if _has_numpy:
+    # the descriptor on the wire, and the native structured array returned
+    _descriptor_dtype = numpy.dtype(
+        {
+            "names": ["lba", "num_blocks", "p_status"],
+            "formats": [">u8", ">u4", "u1"],
+            "offsets": [0, 8, 12],
+            "itemsize": 16,
+        }
+    )
+    EXTENT_DTYPE = numpy.dtype(
+        [("lba", "u8"), ("num_blocks", "u4"), ("p_status", "u1")]
+    )
+
+
+class ExtentTable(object):
+    """
+    The LBA status descriptors of a GET LBA STATUS response as columns
+
+    This is what GetLBAStatus.unmarshall_extents returns when NumPy is not
+    installed. Like the NumPy structured array it replaces, table["lba"],
+    table["num_blocks"] and table["p_status"] are the columns, here as
+    array.array objects, and iterating yields (lba, num_blocks, p_status).
+    """
+
+    __slots__ = ("lba", "num_blocks", "p_status")
+
+    def __init__(self, lba, num_blocks, p_status):
+        """
+        initialize a new instance
+
+        :param lba: an array of the first LBA of each extent
+        :param num_blocks: an array of the number of blocks of each extent
+        :param p_status: an array of the provisioning status of each extent
+        """
+        self.lba = lba
+        self.num_blocks = num_blocks
+        self.p_status = p_status
+
+    def __getitem__(self, field):
+        if field not in self.__slots__:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __len__(self):
+        return len(self.lba)
+
+    def __iter__(self):
+        return zip(self.lba, self.num_blocks, self.p_status)
+
 
 class GetLBAStatus(SCSICommand):
     """
@@ -51,26 +116,71 @@ class GetLBAStatus(SCSICommand):
             alloc_len=alloclen,
         )
 
+    @staticmethod
+    def _descriptors(data):
+        """
+        the complete LBA status descriptors of the datain
+
+        :param data: a byte array
+        :return: a memoryview of a multiple of 16 bytes
+        """
+        view = memoryview(data).cast("B")
+        end = min(scsi_ba_to_int(view[:4]) + 4, len(view))
+        return view[8 : max(8 + (end - 8) // 16 * 16, 8)]
+
     @classmethod
-    def unmarshall_datain(cls, data):
+    def unmarshall_datain(cls, data, extents=False):
         """
         Unmarshall the GetLBAStatus datain.
 
         :param data: a byte array
+        :param extents: return the descriptors as a table instead of a list of
+                        dicts, see unmarshall_extents
         :return result: a dict
         """
-        result = {}
-        _data = data[8 : scsi_ba_to_int(data[:4]) + 4]
-        _lbas = []
-        while len(_data):
-            _r = {}
-            decode_bits(_data[:16], cls._datain_bits, _r)
+        if extents:
+            return {"extents": cls.unmarshall_extents(data)}
+        _lbas = [
+            {"lba": lba, "num_blocks": num_blocks, "p_status": p_status & 0x0F}
+            for lba, num_blocks, p_status in _descriptor.iter_unpack(
+                cls._descriptors(data)
+            )
+        ]
+        return {"lbas": _lbas}
+
+    @classmethod
+    def unmarshall_extents(cls, data, use_numpy=True):
+        """
+        Unmarshall the GetLBAStatus datain into a table of extents.
 
-            _lbas.append(_r)
-            _data = _data[16:]
+        With NumPy installed the table is a structured array of EXTENT_DTYPE,
+        decoded from the buffer with a single numpy.frombuffer, otherwise an
+        ExtentTable. Both are indexed by field name: table["lba"],
+        table["num_blocks"] and table["p_status"].
 
-        result.update({"lbas": _lbas})
-        return result
+        :param data: a byte array
+        :param use_numpy: False to build an ExtentTable even if NumPy is installed
+        :return: a structured array or an ExtentTable
+        """
+        view = cls._descriptors(data)
+        if _has_numpy and use_numpy:
+            raw = numpy.frombuffer(view, dtype=_descriptor_dtype)
+            table = numpy.empty(len(raw), dtype=EXTENT_DTYPE)
+            table["lba"] = raw["lba"]
+            table["num_blocks"] = raw["num_blocks"]
+            table["p_status"] = raw["p_status"] & 0x0F
+            return table
+        # every other quad word is an lba, every fourth double word from
+        # the third on a num_blocks
+        lba = array("Q")
+        lba.frombytes(view.cast("Q")[::2].tobytes())
+        num_blocks = array(_uint32)
+        num_blocks.frombytes(view.cast(_uint32)[2::4].tobytes())
+        if sys.byteorder == "little":
+            lba.byteswap()
+            num_blocks.byteswap()
+        p_status = array("B", view[12::16].tobytes().translate(_p_status_mask))
+        return ExtentTable(lba, num_blocks, p_status)
 
     @classmethod
     def marshall_datain(cls, data):
@@ -82,7 +82,7 @@ class Inquiry(SCSICommand):
         "max_unmap_bd_count": [0xFFFFFFFF, 24],
         "opt_unmap_gran": [0xFFFFFFFF, 28],
         "unmap_gran_alignment": [0xFFFFFFFF, 32],
-        "max_ws_len": [0xFFFFFFFF, 36],
+        "max_ws_len": [0xFFFFFFFFFFFFFFFF, 36],
     }
 
     _block_dev_char_bits = {
@@ -138,6 +138,36 @@ class Inquiry(SCSICommand):
         "maximum_supported_sense_data_length": [0xFF, 13],
     }
 
+    # SPC-4 7.8.17 Third-party Copy VPD page, and SBC-4 6.6.7 for the Block
+    # Device ROD Token Limits descriptor
+    _third_party_copy_descriptor_bits = {
+        "descriptor_type": [0xFFFF, 0],
+        "descriptor_length": [0xFFFF, 2],
+    }
+
+    _block_device_rod_token_limits_bits = {
+        "maximum_range_descriptors": [0xFFFF, 10],
+        "maximum_inactivity_timeout": [0xFFFFFFFF, 12],
+        "default_inactivity_timeout": [0xFFFFFFFF, 16],
+        "maximum_token_transfer_size": [0xFFFFFFFFFFFFFFFF, 20],
+        "optimal_transfer_count": [0xFFFFFFFFFFFFFFFF, 28],
+    }
+
+    _copy_parameter_data_bits = {
+        "maximum_cscd_descriptor_count": [0xFFFF, 8],
+        "maximum_segment_descriptor_count": [0xFFFF, 10],
+        "maximum_descriptor_list_length": [0xFFFFFFFF, 12],
+        "maximum_inline_data_length": [0xFFFFFFFF, 16],
+    }
+
+    _general_copy_operations_bits = {
+        "total_concurrent_copies": [0xFFFFFFFF, 4],
+        "maximum_identified_concurrent_copies": [0xFFFFFFFF, 8],
+        "maximum_segment_length": [0xFFFFFFFF, 12],
+        "data_segment_granularity": [0xFF, 16],
+        "inline_data_granularity": [0xFF, 17],
+    }
+
     _designator_bits = {
         "protocol_identifier": [0xF0, 0],
         "code_set": [0x0F, 0],
@@ -384,6 +414,68 @@ class Inquiry(SCSICommand):
             convert.decode_bits(data, cls._pci_express_routing_id_bits, _d)
         return _d
 
+    @classmethod
+    def unmarshall_third_party_copy_descriptor(cls, data):
+        """
+        static helper method to unmarshall a third-party copy descriptor
+
+        Descriptors without a decoder keep their data in "descriptor".
+
+        :param data: a byte array with the descriptor
+        :return: a dict
+        """
+        _d = {}
+        convert.decode_bits(data, cls._third_party_copy_descriptor_bits, _d)
+        _type = _d["descriptor_type"]
+        if _type == cls.THIRD_PARTY_COPY_DESCRIPTOR.BLOCK_DEVICE_ROD_TOKEN_LIMITS:
+            convert.decode_bits(data, cls._block_device_rod_token_limits_bits, _d)
+        elif _type == cls.THIRD_PARTY_COPY_DESCRIPTOR.PARAMETER_DATA:
+            convert.decode_bits(data, cls._copy_parameter_data_bits, _d)
+        elif _type == cls.THIRD_PARTY_COPY_DESCRIPTOR.GENERAL_COPY_OPERATIONS:
+            convert.decode_bits(data, cls._general_copy_operations_bits, _d)
+        elif _type == cls.THIRD_PARTY_COPY_DESCRIPTOR.SUPPORTED_COMMANDS:
+            # opcode -> the list of its supported service actions
+            _commands = {}
+            _data = data[5 : 5 + data[4]]
+            while len(_data) >= 2:
+                _commands[_data[0]] = list(_data[2 : 2 + _data[1]])
+                _data = _data[2 + _data[1] :]
+            _d["supported_commands"] = _commands
+        else:
+            _d["descriptor"] = bytes(data[4 : 4 + _d["descriptor_length"]])
+        return _d
+
+    @classmethod
+    def marshall_third_party_copy_descriptor(cls, data):
+        """
+        static helper method to marshall a third-party copy descriptor
+
+        :param data: a dict with descriptor data
+        :return: a byte array
+        """
+        _type = data["descriptor_type"]
+        if _type == cls.THIRD_PARTY_COPY_DESCRIPTOR.BLOCK_DEVICE_ROD_TOKEN_LIMITS:
+            _r = bytearray(36)
+            convert.encode_dict(data, cls._block_device_rod_token_limits_bits, _r)
+        elif _type == cls.THIRD_PARTY_COPY_DESCRIPTOR.PARAMETER_DATA:
+            _r = bytearray(32)
+            convert.encode_dict(data, cls._copy_parameter_data_bits, _r)
+        elif _type == cls.THIRD_PARTY_COPY_DESCRIPTOR.GENERAL_COPY_OPERATIONS:
+            _r = bytearray(36)
+            convert.encode_dict(data, cls._general_copy_operations_bits, _r)
+        elif _type == cls.THIRD_PARTY_COPY_DESCRIPTOR.SUPPORTED_COMMANDS:
+            _r = bytearray(5)
+            for _opcode, _sas in data["supported_commands"].items():
+                _r += bytearray([_opcode, len(_sas)] + list(_sas))
+            _r[4] = len(_r) - 5
+        else:
+            _r = bytearray(4) + data["descriptor"]
+        # descriptors are padded to a multiple of four bytes
+        _r += bytearray(-len(_r) % 4)
+        convert.encode_dict(data, cls._third_party_copy_descriptor_bits, _r)
+        _r[2:4] = convert.scsi_int_to_ba(len(_r) - 4, 2)
+        return _r
+
     @classmethod
     def unmarshall_ata_information(cls, data):
         result = {}
@@ -453,6 +545,17 @@ class Inquiry(SCSICommand):
             result.update(cls.unmarshall_ata_information(data))
             return result
 
+        if result["page_code"] == cls.VPD.THIRD_PARTY_COPY:
+            data = data[4:]
+            _d = []
+            while len(data) >= 4:
+                _bc = convert.scsi_ba_to_int(data[2:4]) + 4
+                _d.append(cls.unmarshall_third_party_copy_descriptor(data[:_bc]))
+                data = data[_bc:]
+
+            result.update({"third_party_copy_descriptors": _d})
+            return result
+
         if result["page_code"] == cls.VPD.DEVICE_IDENTIFICATION:
             data = data[4:]
             _d = []
@@ -491,6 +594,11 @@ class Inquiry(SCSICommand):
         result = bytearray(4)
         convert.encode_dict(data, cls._datain_bits, result)
         convert.encode_dict(data, cls._pagecode_bits, result)
+        if data["page_code"] == cls.VPD.SUPPORTED_VPD_PAGES:
+            result += bytearray(data["vpd_pages"])
+        if data["page_code"] == cls.VPD.BLOCK_LIMITS:
+            result += bytearray(60)
+            convert.encode_dict(data, cls._block_limits_bits, result)
         if data["page_code"] == cls.VPD.LOGICAL_BLOCK_PROVISIONING:
             result += bytearray(4)
             convert.encode_dict(data, cls._logical_block_provisioning_bits, result)
@@ -502,6 +610,9 @@ class Inquiry(SCSICommand):
         if data["page_code"] == cls.VPD.EXTENDED_INQUIRY_DATA:
             result += bytearray(60)
             convert.encode_dict(data, cls._extended_bits, result)
+        if data["page_code"] == cls.VPD.THIRD_PARTY_COPY:
+            for _dd in data["third_party_copy_descriptors"]:
+                result += cls.marshall_third_party_copy_descriptor(_dd)
         if data["page_code"] == cls.VPD.DEVICE_IDENTIFICATION:
             for _dd in data["designator_descriptors"]:
                 _r = cls.marshall_designation_descriptor(_dd)
@@ -0,0 +1,146 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+from pyscsi.pyscsi.scsi_command import SCSICommand
+from pyscsi.utils.converter import decode_bits, encode_dict, scsi_int_to_ba
+
+#
+# SCSI POPULATE TOKEN command and definitions
+#
+# See SBC-4 5.9 POPULATE TOKEN command
+#
+
+
+class PopulateToken(SCSICommand):
+    """
+    A class to send a PopulateToken command to a scsi device
+    """
+
+    _cdb_bits = {
+        "opcode": [0xFF, 0],
+        "service_action": [0x1F, 1],
+        "list_identifier": [0xFFFFFFFF, 6],
+        "parameter_list_length": [0xFFFFFFFF, 10],
+        "group": [0x1F, 14],
+    }
+
+    # Table 45 - POPULATE TOKEN parameter list
+    _dataout_bits = {
+        "rtv": [0x02, 2],
+        "immed": [0x01, 2],
+        "inactivity_timeout": [0xFFFFFFFF, 4],
+        "rod_type": [0xFFFFFFFF, 8],
+        "block_device_range_descriptor_length": [0xFFFF, 14],
+    }
+
+    # Table 40 - Block device range descriptor
+    _range_descriptor_bits = {
+        "lba": [0xFFFFFFFFFFFFFFFF, 0],
+        "num_blocks": [0xFFFFFFFF, 8],
+    }
+
+    @classmethod
+    def marshall_range_descriptors(cls, ranges):
+        """
+        Marshall block device range descriptors.
+
+        :param ranges: a list of dicts, each with 'lba' and 'num_blocks' keys
+        :return: a bytearray
+        """
+        result = bytearray()
+        for entry in ranges:
+            d = bytearray(16)
+            encode_dict(entry, cls._range_descriptor_bits, d)
+            result += d
+        return result
+
+    @classmethod
+    def unmarshall_range_descriptors(cls, data):
+        """
+        Unmarshall block device range descriptors.
+
+        :param data: a byte array
+        :return: a list of dicts with 'lba' and 'num_blocks' keys
+        """
+        result = []
+        for pos in range(0, len(data) - 15, 16):
+            d = {}
+            decode_bits(data[pos : pos + 16], cls._range_descriptor_bits, d)
+            result.append(d)
+        return result
+
+    @classmethod
+    def marshall_dataout(cls, data):
+        """
+        Marshall the PopulateToken dataout.
+
+        :param data: a dict with the parameter list, the ranges to represent
+                     by the token are in "ranges"
+        :return: a bytearray
+        """
+        descriptors = cls.marshall_range_descriptors(data["ranges"])
+        result = bytearray(16)
+        encode_dict(data, cls._dataout_bits, result)
+        result[14:16] = scsi_int_to_ba(len(descriptors), 2)
+        result += descriptors
+        result[0:2] = scsi_int_to_ba(len(result) - 2, 2)
+        return result
+
+    @classmethod
+    def unmarshall_dataout(cls, data):
+        """
+        Unmarshall the PopulateToken dataout.
+
+        :param data: a byte array
+        :return: a dict
+        """
+        result = {}
+        decode_bits(data, cls._dataout_bits, result)
+        end = 16 + result.pop("block_device_range_descriptor_length")
+        result["ranges"] = cls.unmarshall_range_descriptors(data[16:end])
+        return result
+
+    def __init__(
+        self,
+        opcode,
+        list_identifier,
+        ranges,
+        immed=0,
+        inactivity_timeout=0,
+        rod_type=0,
+        group=0,
+    ):
+        """
+        initialize a new instance
+
+        :param opcode: an OpCode instance
+        :param list_identifier: identifies the token in RECEIVE ROD TOKEN INFORMATION
+        :param ranges: a list of dicts, each with 'lba' and 'num_blocks' keys,
+                       specifying the LBA ranges the token represents
+        :param immed: return before the token is created
+        :param inactivity_timeout: seconds the token stays valid unused, 0 for
+                                   the default of the copy manager
+        :param rod_type: the ROD type of the token, 0 to let the copy manager choose
+        :param group: Group Number
+        """
+        _data = self.marshall_dataout(
+            {
+                "rtv": 1 if rod_type else 0,
+                "immed": immed,
+                "inactivity_timeout": inactivity_timeout,
+                "rod_type": rod_type,
+                "ranges": ranges,
+            }
+        )
+        SCSICommand.__init__(self, opcode, 0, 0)
+        self.dataout = _data
+        self.cdb = self.build_cdb(
+            opcode=self.opcode.value,
+            service_action=self.opcode.serviceaction.POPULATE_TOKEN,
+            list_identifier=list_identifier,
+            parameter_list_length=len(_data),
+            group=group,
+        )
@@ -29,7 +29,17 @@ class Read16(SCSICommand):
     }
 
     def __init__(
-        self, opcode, blocksize, lba, tl, rdprotect=0, dpo=0, fua=0, rarc=0, group=0
+        self,
+        opcode,
+        blocksize,
+        lba,
+        tl,
+        rdprotect=0,
+        dpo=0,
+        fua=0,
+        rarc=0,
+        group=0,
+        buf=None,
     ):
         """
         initialize a new instance
@@ -43,11 +53,16 @@ class Read16(SCSICommand):
         :param fua=0:
         :param rarc=0:
         :param group=0:
+        :param buf=None: a writable buffer to read into instead of a new bytearray
         """
         if blocksize == 0:
             raise SCSICommand.MissingBlocksizeException
 
-        SCSICommand.__init__(self, opcode, 0, blocksize * tl)
+        if buf is None:
+            SCSICommand.__init__(self, opcode, 0, blocksize * tl)
+        else:
+            SCSICommand.__init__(self, opcode, 0, 0)
+            self.datain = self.init_buffer(buf, blocksize * tl, writable=True)
 
         self.cdb = self.build_cdb(
             opcode=self.opcode.value,
@@ -5,9 +5,14 @@
 #
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
+from collections.abc import Mapping
+from typing import Dict, Tuple
+
 import pyscsi.pyscsi.scsi_enum_readelementstatus as readelementstatus_enums
 from pyscsi.pyscsi.scsi_command import SCSICommand
 from pyscsi.utils.converter import (
+    BitCodec,
+    compile_bits,
     decode_bits,
     encode_dict,
     scsi_ba_to_int,
@@ -26,6 +31,51 @@ _enums = (
 )
 
 
+class ElementDescriptor(Mapping):
+    """
+    A compact, read-only record of one element status descriptor
+
+    Descriptors of the same page share the dict mapping field names to
+    positions, so a record only holds a tuple of values. It can be used like
+    the dict it replaces, and fields are also available as attributes:
+
+        d["full"], d.get("primary_volume_tag"), d.element_address
+    """
+
+    __slots__ = ("_index", "_values")
+
+    def __init__(self, index, values):
+        """
+        initialize a new instance
+
+        :param index: a dict mapping field names to positions in values
+        :param values: a tuple with the field values
+        """
+        self._index = index
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._index[key]]
+
+    def __getattr__(self, name):
+        try:
+            return self._values[self._index[name]]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __repr__(self):
+        return "ElementDescriptor(%r)" % dict(self)
+
+    def __reduce__(self):
+        return ElementDescriptor, (self._index, self._values)
+
+
 class ReadElementStatus(SCSICommand):
     """
     A class to hold information from a readelementstatus command
@@ -83,6 +133,22 @@ class ReadElementStatus(SCSICommand):
         "impexp": [0x02, 2],
     }
 
+    # the type specific bits of the element descriptors, by element type
+    _descriptor_bits_by_type = {
+        getattr(readelementstatus_enums.ELEMENT_TYPE, "DATA_TRANSFER"): (
+            _data_transfer_descriptor_bits
+        ),
+        getattr(readelementstatus_enums.ELEMENT_TYPE, "STORAGE"): (
+            _storage_descriptor_bits
+        ),
+        getattr(readelementstatus_enums.ELEMENT_TYPE, "IMPORT_EXPORT"): (
+            _import_export_descriptor_bits
+        ),
+    }
+
+    # (element type, pvoltag, avoltag) -> layout, see _element_layout()
+    _element_layouts: Dict[Tuple[int, int, int], Tuple[Dict[str, int], BitCodec]] = {}
+
     # HACK: we update the baseclass with enums for the subclass, if there is a better way
     #       to add this to the subclass we should use it instead :-)
     for enum in _enums:
@@ -124,57 +190,78 @@ class ReadElementStatus(SCSICommand):
             alloc_len=alloclen,
         )
 
+    @classmethod
+    def _element_layout(cls, element_type, pvoltag, avoltag):
+        """
+        the field names and codec shared by all descriptors of a page
+
+        :param element_type: the element type of the page
+        :param pvoltag: 1 if the descriptors carry a primary volume tag
+        :param avoltag: 1 if the descriptors carry an alternate volume tag
+        :return: a tuple with a dict mapping field names to their index in
+                 the record and a BitCodec for the fixed fields
+        """
+        key = (element_type, pvoltag, avoltag)
+        layout = cls._element_layouts.get(key)
+        if layout is None:
+            bits = dict(cls._element_status_descriptor_bits)
+            bits.update(cls._descriptor_bits_by_type.get(element_type, {}))
+            codec = compile_bits(bits)
+            names = codec.keys()
+            if pvoltag:
+                names += ("primary_volume_tag",)
+            if avoltag:
+                names += ("alternate_volume_tag",)
+            layout = ({name: i for i, name in enumerate(names)}, codec)
+            cls._element_layouts[key] = layout
+        return layout
+
     @classmethod
     def unmarshall_datain(cls, data):
         """
         Unmarshall the ReadElementStatus datain buffer.
 
+        The buffer is walked by offset, so decoding is linear in its size, and
+        every element descriptor becomes an ElementDescriptor record.
+
         :param data: a byte array
         :return result: a dict
         """
         result = {}
-        _esd = []
-        decode_bits(data, cls._datain_bits, result)
+        view = memoryview(data).cast("B")
+        decode_bits(view, cls._datain_bits, result)
 
         #
         # Loop over the remaining data until we have consumed all
         # element status pages
         #
-        _bc = scsi_ba_to_int(data[5:8])
-        data = data[8 : 8 + _bc]
-        while len(data):
+        _esd = []
+        end = min(8 + scsi_ba_to_int(view[5:8]), len(view))
+        pos = 8
+        while pos + 8 <= end:
             _r = {}
-            _bc = scsi_ba_to_int(data[5:8])
-            _edl = scsi_ba_to_int(data[2:4])
-
-            decode_bits(data, cls._element_status_page_bits, _r)
-            _d = data[8 : 8 + _bc]
+            decode_bits(view[pos : pos + 8], cls._element_status_page_bits, _r)
+            _edl = scsi_ba_to_int(view[pos + 2 : pos + 4])
+            page_end = min(pos + 8 + scsi_ba_to_int(view[pos + 5 : pos + 8]), end)
+            index, codec = cls._element_layout(
+                _r["element_type"], _r["pvoltag"], _r["avoltag"]
+            )
+            values = codec.values
             _ed = []
-            while len(_d):
-                _rr = {}
-
-                decode_bits(_d, cls._element_status_descriptor_bits, _rr)
-                _dd = _d[12:]
+            d = pos + 8
+            while _edl >= 12 and d + _edl <= page_end:
+                _rr = values(view, d)
+                tag = d + 12
                 if _r["pvoltag"]:
-                    _rr.update({"primary_volume_tag": _dd[0:36]})
-                    _dd = _dd[36:]
+                    _rr += (bytes(view[tag : tag + 36]),)
+                    tag += 36
                 if _r["avoltag"]:
-                    _rr.update({"alternate_volume_tag": _dd[0:36]})
-                    _dd = _dd[
-                        36:
-                    ]  # this is not going to used again so we may just delete it?
-
-                if _r["element_type"] == cls.ELEMENT_TYPE.DATA_TRANSFER:
-                    decode_bits(_d, cls._data_transfer_descriptor_bits, _rr)
-                if _r["element_type"] == cls.ELEMENT_TYPE.STORAGE:
-                    decode_bits(_d, cls._storage_descriptor_bits, _rr)
-                if _r["element_type"] == cls.ELEMENT_TYPE.IMPORT_EXPORT:
-                    decode_bits(_d, cls._import_export_descriptor_bits, _rr)
-                _ed.append(_rr)
-                _d = _d[_edl:]
+                    _rr += (bytes(view[tag : tag + 36]),)
+                _ed.append(ElementDescriptor(index, _rr))
+                d += _edl
             _r.update({"element_descriptors": _ed})
             _esd.append(_r)
-            data = data[8 + _bc :]
+            pos = page_end
         result.update({"element_status_pages": _esd})
         return result
 
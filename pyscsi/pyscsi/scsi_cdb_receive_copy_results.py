@@ -0,0 +1,321 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import pyscsi.pyscsi.scsi_enum_receivecopyresults as receivecopyresults_enums
+from pyscsi.pyscsi.scsi_command import SCSICommand
+from pyscsi.utils.converter import (
+    decode_bits,
+    encode_dict,
+    scsi_ba_to_int,
+    scsi_int_to_ba,
+)
+
+#
+# SCSI ReceiveCopyResults command and definitions
+#
+# The response of RECEIVE COPY RESULTS depends on the service action, so like
+# PersistentReserveIn there is a subclass for each service action and
+# receivecopyresults returns the appropriate one
+#
+
+__all__ = [
+    "ReceiveCopyResults",
+    "ReceiveCopyResultsCopyStatus",
+    "ReceiveCopyResultsCopyStatusLID4",
+    "ReceiveCopyResultsOperatingParameters",
+    "ReceiveCopyResultsRODTokenInformation",
+]
+
+# we get a generator for all receivecopyresults enums, so we can add them to the class
+_enums = (
+    (key, receivecopyresults_enums.__dict__[key])
+    for key in receivecopyresults_enums.__dict__.keys()
+    if key in receivecopyresults_enums.__all__
+)
+
+
+class ReceiveCopyResults(SCSICommand):
+    """
+    A class to hold information from a ReceiveCopyResults command to a scsi device
+    """
+
+    # See SPC-4 6.18.1 RECEIVE COPY RESULTS command introduction
+    # Table 202 - RECEIVE COPY RESULTS command, and SPC-5 6.20 for the LID4
+    # service actions with a 32 bit list identifier
+    _cdb_bits = {
+        "opcode": [0xFF, 0],
+        "service_action": [0x1F, 1],
+        "list_identifier_lid1": [0xFF, 2],
+        "list_identifier": [0xFFFFFFFF, 2],
+        "alloc_len": [0xFFFFFFFF, 10],
+    }
+
+    # the service actions with a 32 bit list identifier
+    _lid4_service_actions = (0x05, 0x06, 0x07)
+
+    # HACK: we update the baseclass with enums for the subclass, if there is a better way
+    #       to add this to the subclass we should use it instead :-)
+    for enum in _enums:
+        setattr(SCSICommand, enum[0], enum[1])
+
+    def __init__(self, opcode, service_action, list_identifier=0, alloclen=1024):
+        """
+        initialize a new instance
+
+        :param opcode: a OpCode instance
+        :param service_action: service action code
+        :param list_identifier: the list identifier of the EXTENDED COPY command
+        :param alloclen: the max number of bytes allocated for the data_in buffer
+        """
+        SCSICommand.__init__(self, opcode, 0, alloclen)
+
+        if service_action in self._lid4_service_actions:
+            lid = {"list_identifier": list_identifier}
+        else:
+            lid = {"list_identifier_lid1": list_identifier}
+        self.cdb = self.build_cdb(
+            opcode=self.opcode.value,
+            service_action=service_action,
+            alloc_len=alloclen,
+            **lid,
+        )
+
+
+class ReceiveCopyResultsCopyStatus(ReceiveCopyResults):
+    """
+    A class to hold information from a ReceiveCopyResults command with the
+    COPY STATUS service action, for an EXTENDED COPY(LID1) command
+    """
+
+    # See SPC-4 6.18.2 COPY STATUS service action
+    # Table 203 - Parameter data for the COPY STATUS service action
+    _datain_bits = {
+        "available_data": [0xFFFFFFFF, 0],
+        "hdd": [0x80, 4],
+        "copy_manager_status": [0x7F, 4],
+        "segments_processed": [0xFFFF, 5],
+        "transfer_count_units": [0xFF, 7],
+        "transfer_count": [0xFFFFFFFF, 8],
+    }
+
+    def __init__(self, opcode, list_identifier=0, alloclen=1024, **kwargs):
+        ReceiveCopyResults.__init__(
+            self,
+            opcode,
+            opcode.serviceaction.COPY_STATUS,
+            list_identifier,
+            alloclen,
+        )
+
+    @classmethod
+    def unmarshall_datain(cls, data):
+        """
+        Unmarshall the ReceiveCopyResultsCopyStatus datain.
+
+        :param data: a byte array
+        :return result: a dict
+        """
+        result = {}
+        decode_bits(data, cls._datain_bits, result)
+        return result
+
+    @classmethod
+    def marshall_datain(cls, data):
+        """
+        Marshall the ReceiveCopyResultsCopyStatus datain.
+
+        :param data: a dict
+        :return result: a byte array
+        """
+        result = bytearray(12)
+        encode_dict(data, cls._datain_bits, result)
+        result[0:4] = scsi_int_to_ba(len(result) - 4, 4)
+        return result
+
+
+class ReceiveCopyResultsCopyStatusLID4(ReceiveCopyResults):
+    """
+    A class to hold information from a ReceiveCopyResults command with the
+    RECEIVE COPY STATUS(LID4) service action, for an EXTENDED COPY(LID4) command
+    """
+
+    # See SPC-5 6.21.2 RECEIVE COPY STATUS(LID4) parameter data
+    # Table 130 - RECEIVE COPY STATUS(LID4) parameter data
+    _datain_bits = {
+        "available_data": [0xFFFFFFFF, 0],
+        "response_to_service_action": [0x1F, 4],
+        "copy_operation_status": [0x7F, 5],
+        "operation_counter": [0xFFFF, 6],
+        "estimated_status_update_delay": [0xFFFFFFFF, 8],
+        "extended_copy_completion_status": [0xFF, 12],
+        "sense_data_field_length": [0xFF, 13],
+        "sense_data_length": [0xFF, 14],
+        "transfer_count_units": [0xFF, 15],
+        "transfer_count": [0xFFFFFFFFFFFFFFFF, 16],
+        "segments_processed": [0xFFFF, 24],
+    }
+
+    def __init__(self, opcode, list_identifier=0, alloclen=1024, **kwargs):
+        ReceiveCopyResults.__init__(
+            self,
+            opcode,
+            opcode.serviceaction.COPY_STATUS_LID4,
+            list_identifier,
+            alloclen,
+        )
+
+    @classmethod
+    def unmarshall_datain(cls, data):
+        """
+        Unmarshall the ReceiveCopyResultsCopyStatusLID4 datain.
+
+        :param data: a byte array
+        :return result: a dict, the sense data of a failed copy is in "sense"
+        """
+        result = {}
+        decode_bits(data, cls._datain_bits, result)
+        end = min(32 + result["sense_data_length"], len(data))
+        result["sense"] = bytes(data[32:end])
+        return result
+
+    @classmethod
+    def marshall_datain(cls, data):
+        """
+        Marshall the ReceiveCopyResultsCopyStatusLID4 datain.
+
+        :param data: a dict
+        :return result: a byte array
+        """
+        sense = data.get("sense", b"")
+        result = bytearray(32)
+        encode_dict(data, cls._datain_bits, result)
+        result[13] = len(sense)
+        result[14] = len(sense)
+        result += sense
+        result[0:4] = scsi_int_to_ba(len(result) - 4, 4)
+        return result
+
+
+class ReceiveCopyResultsOperatingParameters(ReceiveCopyResults):
+    """
+    A class to hold information from a ReceiveCopyResults command with the
+    OPERATING PARAMETERS service action
+    """
+
+    # See SPC-4 6.18.4 OPERATING PARAMETERS service action
+    # Table 210 - Parameter data for the OPERATING PARAMETERS service action
+    _datain_bits = {
+        "available_data": [0xFFFFFFFF, 0],
+        "snlid": [0x01, 4],
+        "maximum_cscd_descriptor_count": [0xFFFF, 8],
+        "maximum_segment_descriptor_count": [0xFFFF, 10],
+        "maximum_descriptor_list_length": [0xFFFFFFFF, 12],
+        "maximum_segment_length": [0xFFFFFFFF, 16],
+        "maximum_inline_data_length": [0xFFFFFFFF, 20],
+        "held_data_limit": [0xFFFFFFFF, 24],
+        "maximum_stream_device_transfer_size": [0xFFFFFFFF, 28],
+        "total_concurrent_copies": [0xFFFF, 34],
+        "maximum_concurrent_copies": [0xFF, 36],
+        "data_segment_granularity": [0xFF, 37],
+        "inline_data_granularity": [0xFF, 38],
+        "held_data_granularity": [0xFF, 39],
+        "implemented_descriptor_list_length": [0xFF, 43],
+    }
+
+    def __init__(self, opcode, list_identifier=0, alloclen=1024, **kwargs):
+        ReceiveCopyResults.__init__(
+            self,
+            opcode,
+            opcode.serviceaction.OPERATING_PARAMETERS,
+            list_identifier,
+            alloclen,
+        )
+
+    @classmethod
+    def unmarshall_datain(cls, data):
+        """
+        Unmarshall the ReceiveCopyResultsOperatingParameters datain.
+
+        :param data: a byte array
+        :return result: a dict, the descriptor type codes the copy manager
+                        implements are in "implemented_descriptor_type_codes"
+        """
+        result = {}
+        decode_bits(data, cls._datain_bits, result)
+        end = min(44 + result["implemented_descriptor_list_length"], len(data))
+        result["implemented_descriptor_type_codes"] = list(data[44:end])
+        return result
+
+    @classmethod
+    def marshall_datain(cls, data):
+        """
+        Marshall the ReceiveCopyResultsOperatingParameters datain.
+
+        :param data: a dict
+        :return result: a byte array
+        """
+        codes = bytearray(data.get("implemented_descriptor_type_codes", []))
+        result = bytearray(44)
+        encode_dict(data, cls._datain_bits, result)
+        result[43] = len(codes)
+        result += codes
+        result[0:4] = scsi_int_to_ba(len(result) - 4, 4)
+        return result
+
+
+class ReceiveCopyResultsRODTokenInformation(ReceiveCopyResultsCopyStatusLID4):
+    """
+    A class to hold information from a ReceiveCopyResults command with the
+    RECEIVE ROD TOKEN INFORMATION service action, for a POPULATE TOKEN or
+    WRITE USING TOKEN command
+    """
+
+    # See SBC-4 5.21 RECEIVE ROD TOKEN INFORMATION, the parameter data starts
+    # like the RECEIVE COPY STATUS(LID4) data and is followed by the ROD token
+    # descriptors after the sense data field
+
+    def __init__(self, opcode, list_identifier=0, alloclen=1024, **kwargs):
+        ReceiveCopyResults.__init__(
+            self,
+            opcode,
+            opcode.serviceaction.ROD_TOKEN_INFORMATION,
+            list_identifier,
+            alloclen,
+        )
+
+    @classmethod
+    def unmarshall_datain(cls, data):
+        """
+        Unmarshall the ReceiveCopyResultsRODTokenInformation datain.
+
+        :param data: a byte array
+        :return result: a dict, the ROD token created by a POPULATE TOKEN
+                        command is in "rod_token", None if there is none
+        """
+        result = ReceiveCopyResultsCopyStatusLID4.unmarshall_datain(data)
+        pos = 32 + result["sense_data_field_length"]
+        length = scsi_ba_to_int(data[pos : pos + 4]) if len(data) >= pos + 4 else 0
+        # two reserved bytes precede the token
+        token = bytes(data[pos + 6 : pos + 4 + length])
+        result["rod_token"] = token or None
+        return result
+
+    @classmethod
+    def marshall_datain(cls, data):
+        """
+        Marshall the ReceiveCopyResultsRODTokenInformation datain.
+
+        :param data: a dict
+        :return result: a byte array
+        """
+        result = ReceiveCopyResultsCopyStatusLID4.marshall_datain(data)
+        token = data.get("rod_token")
+        if token:
+            result += scsi_int_to_ba(len(token) + 2, 4) + bytearray(2) + token
+        else:
+            result += bytearray(4)
+        result[0:4] = scsi_int_to_ba(len(result) - 4, 4)
+        return result
@@ -37,7 +37,7 @@ class Write16(SCSICommand):
         :param blocksize: a blocksize
         :param lba: Logical Block Address
         :param tl: transfer length
-        :param data: a byte array with data
+        :param data: a byte array or any other buffer with data
         :param wrprotect=0:
         :param dpo=0:
         :param fua=0:
@@ -46,8 +46,9 @@ class Write16(SCSICommand):
         if blocksize == 0:
             raise SCSICommand.MissingBlocksizeException
 
-        SCSICommand.__init__(self, opcode, blocksize * tl, 0)
-        self.dataout = data
+        # no dataout buffer is allocated, data is sent from the caller's buffer
+        SCSICommand.__init__(self, opcode, 0, 0)
+        self.dataout = self.init_buffer(data, blocksize * tl)
         self.cdb = self.build_cdb(
             opcode=self.opcode.value,
             lba=lba,
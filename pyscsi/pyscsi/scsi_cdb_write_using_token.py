@@ -0,0 +1,118 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+from pyscsi.pyscsi.scsi_cdb_populate_token import PopulateToken
+from pyscsi.pyscsi.scsi_command import SCSICommand
+from pyscsi.utils.converter import decode_bits, encode_dict, scsi_int_to_ba
+
+#
+# SCSI WRITE USING TOKEN command and definitions
+#
+# See SBC-4 5.53 WRITE USING TOKEN command
+#
+
+# the length of a ROD token
+ROD_TOKEN_LENGTH = 512
+
+
+class WriteUsingToken(SCSICommand):
+    """
+    A class to send a WriteUsingToken command to a scsi device
+    """
+
+    _cdb_bits = {
+        "opcode": [0xFF, 0],
+        "service_action": [0x1F, 1],
+        "list_identifier": [0xFFFFFFFF, 6],
+        "parameter_list_length": [0xFFFFFFFF, 10],
+        "group": [0x1F, 14],
+    }
+
+    # Table 126 - WRITE USING TOKEN parameter list
+    _dataout_bits = {
+        "del_tkn": [0x02, 2],
+        "immed": [0x01, 2],
+        "offset_into_rod": [0xFFFFFFFFFFFFFFFF, 8],
+        "block_device_range_descriptor_length": [0xFFFF, 534],
+    }
+
+    @classmethod
+    def marshall_dataout(cls, data):
+        """
+        Marshall the WriteUsingToken dataout.
+
+        :param data: a dict with the parameter list, the ROD token is in
+                     "rod_token" and the ranges to write are in "ranges"
+        :return: a bytearray
+        """
+        descriptors = PopulateToken.marshall_range_descriptors(data["ranges"])
+        result = bytearray(536)
+        encode_dict(data, cls._dataout_bits, result)
+        result[16 : 16 + ROD_TOKEN_LENGTH] = data["rod_token"][:ROD_TOKEN_LENGTH]
+        result[534:536] = scsi_int_to_ba(len(descriptors), 2)
+        result += descriptors
+        result[0:2] = scsi_int_to_ba(len(result) - 2, 2)
+        return result
+
+    @classmethod
+    def unmarshall_dataout(cls, data):
+        """
+        Unmarshall the WriteUsingToken dataout.
+
+        :param data: a byte array
+        :return: a dict
+        """
+        result = {}
+        decode_bits(data, cls._dataout_bits, result)
+        result["rod_token"] = bytes(data[16 : 16 + ROD_TOKEN_LENGTH])
+        end = 536 + result.pop("block_device_range_descriptor_length")
+        result["ranges"] = PopulateToken.unmarshall_range_descriptors(data[536:end])
+        return result
+
+    def __init__(
+        self,
+        opcode,
+        list_identifier,
+        rod_token,
+        ranges,
+        offset_into_rod=0,
+        immed=0,
+        del_tkn=0,
+        group=0,
+    ):
+        """
+        initialize a new instance
+
+        :param opcode: an OpCode instance
+        :param list_identifier: identifies the command in RECEIVE COPY STATUS(LID4)
+        :param rod_token: the 512 byte ROD token to write the data of
+        :param ranges: a list of dicts, each with 'lba' and 'num_blocks' keys,
+                       specifying the LBA ranges to write
+        :param offset_into_rod: the first block of the token to write
+        :param immed: return before the data is written
+        :param del_tkn: delete the token once the command completes
+        :param group: Group Number
+        """
+        if len(rod_token) != ROD_TOKEN_LENGTH:
+            raise ValueError("a ROD token is %d bytes" % ROD_TOKEN_LENGTH)
+        _data = self.marshall_dataout(
+            {
+                "del_tkn": del_tkn,
+                "immed": immed,
+                "offset_into_rod": offset_into_rod,
+                "rod_token": rod_token,
+                "ranges": ranges,
+            }
+        )
+        SCSICommand.__init__(self, opcode, 0, 0)
+        self.dataout = _data
+        self.cdb = self.build_cdb(
+            opcode=self.opcode.value,
+            service_action=self.opcode.serviceaction.WRITE_USING_TOKEN,
+            list_identifier=list_identifier,
+            parameter_list_length=len(_data),
+            group=group,
+        )
@@ -7,7 +7,7 @@
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
 from pyscsi.pyscsi.scsi_exception import SCSIDeviceCommandExceptionMeta as ExMETA
-from pyscsi.utils.converter import CheckDict, decode_bits, encode_dict
+from pyscsi.utils.converter import CheckDict, compile_bits, decode_bits, encode_dict
 
 
 class SCSICommand(metaclass=ExMETA):
@@ -25,6 +25,18 @@ class SCSICommand(metaclass=ExMETA):
     _page_code = None
     _opcode = None
 
+    def __init_subclass__(cls):
+        """
+        compile the check dicts of a new command class
+
+        every class attribute named *_bits that holds a check dict is compiled
+        into a BitCodec once, so decode_bits/encode_dict never have to
+        interpret the notation tuples again.
+        """
+        for name, value in vars(cls).items():
+            if name.endswith("_bits") and isinstance(value, dict):
+                compile_bits(value)
+
     def __init__(self, opcode, dataout_alloclen, datain_alloclen):
         """
         initialize a new instance
@@ -33,10 +45,9 @@ class SCSICommand(metaclass=ExMETA):
         :param dataout_alloclen: integer representing the size of the data_out buffer
         :param datain_alloclen: integer representing the size of the data_in buffer
         """
-        # we need the _cdb_bits and _cdb values in staticmethods so we have to set it
-        # on the class and not on the instance of the class. that might be wrong ...
-        SCSICommand._cdb_bits = self._cdb_bits
-        SCSICommand._cdb = SCSICommand.init_cdb(opcode)
+        # the cdb is per instance and the field map stays on the class, so commands
+        # can be built concurrently without sharing any state.
+        self._cdb = self.init_cdb(opcode)
         self.dataout = bytearray(dataout_alloclen)
         self.datain = bytearray(datain_alloclen)
         self.result = {}
@@ -55,19 +66,48 @@ class SCSICommand(metaclass=ExMETA):
         :param opcode: a OpCode object
         :return: a byte array
         """
-        if 0x00 <= opcode.value <= 0x1F:
-            cdb = bytearray(6)
-        elif 0x20 <= opcode.value <= 0x5F:
-            cdb = bytearray(10)
-        elif 0x00 <= opcode.value <= 0x1F:
-            raise SCSICommand.OpcodeException
-        elif 0x80 <= opcode.value <= 0x9F:
-            cdb = bytearray(16)
-        elif 0xA0 <= opcode.value <= 0xBF:
-            cdb = bytearray(12)
-        else:
-            raise SCSICommand.OpcodeException
-        return cdb
+        return bytearray(SCSICommand.cdb_length(opcode.value))
+
+    @staticmethod
+    def init_buffer(buf, length, writable=False):
+        """
+        wrap a caller supplied buffer for the data phase without copying it
+
+        :param buf: any object supporting the buffer protocol, like a bytearray,
+                    memoryview, mmap or numpy array
+        :param length: the number of bytes to transfer
+        :param writable: the buffer receives data from the device
+        :return: a memoryview of the first length bytes of the buffer
+        """
+        view = memoryview(buf)
+        if view.ndim != 1 or view.itemsize != 1:
+            view = view.cast("B")
+        if writable and view.readonly:
+            raise ValueError("buffer is read-only")
+        if view.nbytes < length:
+            raise ValueError(
+                "buffer is too small, %d bytes needed, got %d" % (length, view.nbytes)
+            )
+        return view[:length]
+
+    @staticmethod
+    def cdb_length(value):
+        """
+        the length of a command descriptor block, depending on the group code of
+        the operation code
+
+        :param value: the operation code value
+        :return: a integer
+        """
+        if 0x00 <= value <= 0x1F:
+            return 6
+        if 0x20 <= value <= 0x5F:
+            return 10
+        if 0x80 <= value <= 0x9F:
+            return 16
+        if 0xA0 <= value <= 0xBF:
+            return 12
+        raise SCSICommand.OpcodeException
 
     @property
     def result(self):
@@ -217,20 +257,24 @@ class SCSICommand(metaclass=ExMETA):
         for b in self._cdb:
             print("0x%02X " % b)
 
-    @staticmethod
-    def marshall_cdb(cdb):
+    @classmethod
+    def marshall_cdb(cls, cdb):
         """
         Marshall an SCSICommand cdb
 
+        The length of the code descriptor block follows from the opcode in the dict.
+
         :param cdb: a dict with key:value pairs representing a code descriptor block
         :return result: a byte array representing a code descriptor block
         """
-        result = bytearray(len(SCSICommand._cdb))
-        encode_dict(cdb, SCSICommand._cdb_bits, result)
+        if "opcode" not in cdb:
+            raise SCSICommand.OpcodeException
+        result = bytearray(cls.cdb_length(cdb["opcode"]))
+        encode_dict(cdb, cls._cdb_bits, result)
         return result
 
-    @staticmethod
-    def unmarshall_cdb(cdb):
+    @classmethod
+    def unmarshall_cdb(cls, cdb):
         """
         Unmarshall an SCSICommand cdb
 
@@ -238,7 +282,7 @@ class SCSICommand(metaclass=ExMETA):
         :return result: a dict
         """
         result = {}
-        decode_bits(cdb, SCSICommand._cdb_bits, result)
+        decode_bits(cdb, cls._cdb_bits, result)
         return result
 
     def build_cdb(self, **kwargs):
@@ -248,8 +292,7 @@ class SCSICommand(metaclass=ExMETA):
         :param kwargs: keyword argument dict, content depends on SCSICommand subclass
         :return: a byte array representing a code descriptor block
         """
-        cdb = {key: kwargs[key] for key in kwargs.keys()}
-        return SCSICommand.marshall_cdb(cdb)
+        return self.marshall_cdb(kwargs)
 
     def unmarshall(self, **kwargs):
         """
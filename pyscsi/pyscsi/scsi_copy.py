@@ -0,0 +1,212 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import time
+from collections import deque
+
+from pyscsi.pyscsi import scsi_enum_inquiry as INQUIRY
+from pyscsi.pyscsi.scsi_cdb_read16 import Read16
+from pyscsi.pyscsi.scsi_cdb_unmap import Unmap
+from pyscsi.pyscsi.scsi_cdb_write16 import Write16
+from pyscsi.pyscsi.scsi_discard import plan_unmap, unmap_supported, write_same_commands
+from pyscsi.pyscsi.scsi_enum_getlbastatus import P_STATUS
+from pyscsi.pyscsi.scsi_provisioning import scan_provisioning
+from pyscsi.pyscsi.scsi_stream import block_limits, optimal_transfer_length
+from pyscsi.pyscsi.scsi_submit import Submitter
+
+#
+# Copying the mapped blocks of one logical unit to another
+#
+
+
+class CopyStats(object):
+    """
+    What copy_lun did, and how fast
+    """
+
+    def __init__(self, blocksize):
+        """
+        initialize a new instance
+
+        :param blocksize: the logical block length in bytes
+        """
+        self.blocksize = blocksize
+        self.blocks_copied = 0
+        self.blocks_deallocated = 0
+        self.commands = 0
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    @property
+    def bytes_copied(self):
+        return self.blocks_copied * self.blocksize
+
+    @property
+    def throughput(self):
+        """
+        the copied data in bytes per second
+        """
+        return self.bytes_copied / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def effective_throughput(self):
+        """
+        the copied and deallocated range in bytes per second
+        """
+        if not self.elapsed:
+            return 0.0
+        blocks = self.blocks_copied + self.blocks_deallocated
+        return blocks * self.blocksize / self.elapsed
+
+    def __repr__(self):
+        return "CopyStats(copied=%d, deallocated=%d, %.1f MB/s, %.1f s)" % (
+            self.blocks_copied,
+            self.blocks_deallocated,
+            self.throughput / 1e6,
+            self.elapsed,
+        )
+
+
+def _deallocate_commands(dst, runs, blocksize):
+    """
+    the commands making deallocated runs read as zeros on the destination
+
+    UNMAP is only used if the destination returns zeros for unmapped blocks,
+    otherwise WRITE SAME(16) writes a zero block with the UNMAP bit set, so
+    the device may deallocate the blocks but has to return zeros for them.
+
+    :param dst: a SCSI object
+    :param runs: (lba, num_blocks) tuples
+    :param blocksize: the logical block length in bytes
+    :return: an iterator of (SCSICommand, number of blocks) tuples
+    """
+    lbp = dst.vpd(INQUIRY.VPD.LOGICAL_BLOCK_PROVISIONING)
+    limits = block_limits(dst)
+    opcodes = dst.device.opcodes
+    if lbp.get("lbpu") and lbp.get("lbprz") and unmap_supported(limits):
+        for lbas in plan_unmap(runs, limits, align=False):
+            yield Unmap(opcodes.UNMAP, lbas), sum(d["num_blocks"] for d in lbas)
+        return
+    unmap = 1 if lbp.get("lpbws") else 0
+    yield from write_same_commands(dst, runs, blocksize, unmap=unmap)
+
+
+def copy_lun(
+    src,
+    dst,
+    start=0,
+    end=None,
+    dest_lba=None,
+    transfer_length=0,
+    in_flight=8,
+    zero_unmapped=True,
+    progress=None,
+):
+    """
+    copy the mapped blocks of a logical unit to another one
+
+    The provisioning map of the source is read with GET LBA STATUS, and only
+    mapped extents are copied with READ(16) and WRITE(16). Up to in_flight
+    buffers of transfer_length blocks are in flight at a time, so reads and
+    writes overlap on devices that can have several commands in flight, see
+    Submitter. Other devices execute one command at a time.
+
+    With zero_unmapped the deallocated ranges of the source are deallocated
+    on the destination too, by UNMAP if the destination returns zeros for
+    unmapped blocks or by WRITE SAME(16) with a zero block otherwise. Leave
+    it off for a destination known to read as zeros, like a new thin LUN.
+
+    :param src: a SCSI object to copy from
+    :param dst: a SCSI object to copy to
+    :param start: the first LBA to copy
+    :param end: the LBA after the last one to copy, None for the end of the source
+    :param dest_lba: the destination LBA of start, None for start
+    :param transfer_length: blocks per command, 0 to use the Block Limits pages
+    :param in_flight: the number of buffers in flight
+    :param zero_unmapped: make deallocated ranges read as zeros on the destination
+    :param progress: called with the CopyStats after every completed write
+    :return: a CopyStats object
+    """
+    r = src.readcapacity16().result
+    blocksize = r["block_length"]
+    end = r["returned_lba"] + 1 if end is None else end
+    r = dst.readcapacity16().result
+    if r["block_length"] != blocksize:
+        raise ValueError(
+            "block length differs (%d, %d)" % (blocksize, r["block_length"])
+        )
+    offset = (start if dest_lba is None else dest_lba) - start
+    if end + offset > r["returned_lba"] + 1:
+        raise ValueError("the destination is too small")
+
+    if not transfer_length:
+        transfer_length = min(
+            optimal_transfer_length(block_limits(src), blocksize),
+            optimal_transfer_length(block_limits(dst), blocksize),
+        )
+    stats = CopyStats(blocksize)
+    reader = Submitter(src, in_flight)
+    writer = Submitter(dst, in_flight)
+    free = deque(
+        bytearray(transfer_length * blocksize) for _ in range(max(in_flight, 1))
+    )
+    reads = deque()
+    writes = deque()
+    deallocated = []
+
+    def write(entry):
+        future, lba, n, buf = entry
+        reader.wait(future)
+        data = memoryview(buf)[: n * blocksize]
+        cmd = Write16(dst.device.opcodes.WRITE_16, blocksize, lba + offset, n, data)
+        writes.append((writer.submit(cmd), n, buf))
+
+    def retire():
+        future, n, buf = writes.popleft()
+        writer.wait(future)
+        free.append(buf)
+        stats.blocks_copied += n
+        stats.commands += 2
+        stats.elapsed = time.monotonic() - stats.started
+        if progress is not None:
+            progress(stats)
+
+    try:
+        for lba, num_blocks, p_status in scan_provisioning(src, start, end):
+            if p_status != P_STATUS.MAPPED:
+                deallocated.append((lba + offset, num_blocks))
+                continue
+            last = lba + num_blocks
+            while lba < last:
+                while not free:
+                    if reads:
+                        write(reads.popleft())
+                    else:
+                        retire()
+                n = min(last - lba, transfer_length)
+                buf = free.popleft()
+                opcode = src.device.opcodes.READ_16
+                cmd = Read16(opcode, blocksize, lba, n, buf=buf)
+                reads.append((reader.submit(cmd), lba, n, buf))
+                lba += n
+                while reads and reads[0][0].done():
+                    write(reads.popleft())
+        while reads:
+            write(reads.popleft())
+        while writes:
+            retire()
+
+        if zero_unmapped:
+            for cmd, n in _deallocate_commands(dst, deallocated, blocksize):
+                dst.execute(cmd)
+                stats.blocks_deallocated += n
+                stats.commands += 1
+    finally:
+        # the devices may still use the buffers of the commands in flight
+        reader.close([entry[0] for entry in reads])
+        writer.close([entry[0] for entry in writes])
+    stats.elapsed = time.monotonic() - stats.started
+    return stats
@@ -7,6 +7,7 @@
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
 import os
+import time
 
 import pyscsi.pyscsi.scsi_enum_command as scsi_enum_command
 from pyscsi.pyscsi.scsi_exception import SCSIDeviceCommandExceptionMeta as ExMETA
@@ -44,7 +45,17 @@ class SCSIDevice(metaclass=ExMETA):
     Note: The workflow above is already implemented in the SCSI class
     """
 
-    def __init__(self, device, readwrite=False, detect_replugged=True, buffering=-1):
+    # execute() may reopen the device node, one thread at a time can use it
+    thread_safe = False
+
+    def __init__(
+        self,
+        device,
+        readwrite=False,
+        detect_replugged=True,
+        buffering=-1,
+        replug_interval=1.0,
+    ):
         """
         initialize a  new instance of a SCSIDevice
         :param device: the file descriptor
@@ -52,6 +63,9 @@ class SCSIDevice(metaclass=ExMETA):
         :param detect_replugged: detects device unplugged and plugged events and ensure executions will not fail
         silently due to replugged events
         :param buffering: Set the amount of buffering. For details, refer to the documentation of the open() built-in
+        :param replug_interval: seconds between two checks of the device node while commands succeed. A command
+        failing with an OSError always triggers a check and is retried once on the reopened device. 0 checks the
+        device node before every command
         """
         self._opcodes = scsi_enum_command.spc
         self._file_name = device
@@ -60,6 +74,8 @@ class SCSIDevice(metaclass=ExMETA):
         self._ino = None
         self._detect_replugged = detect_replugged
         self._buffering = buffering
+        self._replug_interval = replug_interval
+        self._replug_deadline = 0.0
 
         if _has_sgio and device[:5] == "/dev/":
             self.open()
@@ -95,6 +111,22 @@ class SCSIDevice(metaclass=ExMETA):
         ino = get_inode(self._file_name)
         return ino != self._ino
 
+    def _reopen_if_replugged(self):
+        #  type: (SCSIDevice) -> bool
+        """
+        reopen the device if the device node was replaced since it was opened
+
+        :return: True if the device was reopened
+        """
+        self._replug_deadline = time.monotonic() + self._replug_interval
+        if not self._is_replugged():
+            return False
+        try:
+            self.close()
+        finally:
+            self.open()
+        return True
+
     def open(self):
         """
 
@@ -108,6 +140,7 @@ class SCSIDevice(metaclass=ExMETA):
             buffering=self._buffering,
         )
         self._ino = get_inode(self._file_name)
+        self._replug_deadline = time.monotonic() + self._replug_interval
 
     def close(self):
         self._file.close()
@@ -116,26 +149,45 @@ class SCSIDevice(metaclass=ExMETA):
         """
         execute a scsi command
 
+        A CHECK CONDITION is raised as a CheckCondition exception, unless
+        en_raw_sense is set: ATA PASS-THROUGH commands return their results in
+        the sense data, so it is only stored in cmd.raw_sense_data then.
+
         :param cmd: a SCSICommand
+        :param en_raw_sense: store the sense data instead of raising it
         """
-        if self._detect_replugged and self._is_replugged():
-            try:
-                self.close()
-            finally:
-                self.open()
+        # The device node is only checked once per replug_interval. A command sent to
+        # an unplugged device fails with ENODEV or ENXIO instead of succeeding silently,
+        # so the node is checked again on errors and the command retried if replugged.
+        if self._detect_replugged and time.monotonic() >= self._replug_deadline:
+            self._reopen_if_replugged()
 
         try:
             # TODO: If exist the corner case that sense cannot be raised by error.sense?
             # will not set return_sense_data=True until i test most of the ata command set.
-            sgio.execute(self._file, cmd.cdb, cmd.dataout, cmd.datain)
+            try:
+                sgio.execute(self._file, cmd.cdb, cmd.dataout, cmd.datain)
+            except sgio.CheckConditionError:
+                raise
+            except OSError:
+                if not self._detect_replugged:
+                    raise
+                try:
+                    replugged = self._reopen_if_replugged()
+                except OSError:
+                    replugged = False
+                if not replugged:
+                    raise
+                sgio.execute(self._file, cmd.cdb, cmd.dataout, cmd.datain)
         except sgio.CheckConditionError as error:
-            self.CheckCondition(error.sense)
             # For ata-passthrough, mostly the scsi command return no real error, here
             # save the raw sense data to command.raw_sense_data for upper level use.
             # If you execute the other scsi commands with en_raw_sense=True, this will
             # be a coppy of error.sense
             if en_raw_sense:
                 cmd.raw_sense_data = error.sense
+                return
+            raise self.CheckCondition(error.sense)
 
     @property
     def opcodes(self):
@@ -0,0 +1,554 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import os
+import threading
+import time
+
+import pyscsi.pyscsi.scsi_enum_command as scsi_enum_command
+from pyscsi.pyscsi import scsi_enum_inquiry as INQUIRY
+from pyscsi.pyscsi.scsi_cdb_getlbastatus import GetLBAStatus
+from pyscsi.pyscsi.scsi_cdb_inquiry import Inquiry
+from pyscsi.pyscsi.scsi_cdb_read10 import Read10
+from pyscsi.pyscsi.scsi_cdb_read12 import Read12
+from pyscsi.pyscsi.scsi_cdb_read16 import Read16
+from pyscsi.pyscsi.scsi_cdb_readcapacity10 import ReadCapacity10
+from pyscsi.pyscsi.scsi_cdb_readcapacity16 import ReadCapacity16
+from pyscsi.pyscsi.scsi_cdb_synchronize_cache10 import SynchronizeCache10
+from pyscsi.pyscsi.scsi_cdb_synchronize_cache16 import SynchronizeCache16
+from pyscsi.pyscsi.scsi_cdb_testunitready import TestUnitReady
+from pyscsi.pyscsi.scsi_cdb_unmap import Unmap
+from pyscsi.pyscsi.scsi_cdb_write10 import Write10
+from pyscsi.pyscsi.scsi_cdb_write12 import Write12
+from pyscsi.pyscsi.scsi_cdb_write16 import Write16
+from pyscsi.pyscsi.scsi_cdb_writesame10 import WriteSame10
+from pyscsi.pyscsi.scsi_cdb_writesame16 import WriteSame16
+from pyscsi.pyscsi.scsi_exception import SCSIDeviceCommandExceptionMeta as ExMETA
+from pyscsi.pyscsi.scsi_sense import SENSE_FORMAT_CURRENT_FIXED
+from pyscsi.utils.converter import scsi_ba_to_int
+
+#
+# An in-memory or file backed SBC target
+#
+
+# sense key, asc, ascq
+INVALID_COMMAND_OPERATION_CODE = (0x05, 0x20, 0x00)
+LBA_OUT_OF_RANGE = (0x05, 0x21, 0x00)
+INVALID_FIELD_IN_CDB = (0x05, 0x24, 0x00)
+INVALID_FIELD_IN_PARAMETER_LIST = (0x05, 0x26, 0x00)
+PARAMETER_LIST_LENGTH_ERROR = (0x05, 0x1A, 0x00)
+
+# service actions of the 0x9E opcode
+_READ_CAPACITY_16 = 0x10
+_GET_LBA_STATUS = 0x12
+
+
+class _Sense(Exception):
+    """
+    raised by the command handlers to end a command with CHECK CONDITION
+    """
+
+    def __init__(self, sense):
+        Exception.__init__(self)
+        self.key, self.asc, self.ascq = sense
+
+
+def fixed_sense(key, asc, ascq):
+    """
+    build fixed format sense data
+
+    :param key: the sense key
+    :param asc: the additional sense code
+    :param ascq: the additional sense code qualifier
+    :return: a bytearray
+    """
+    sense = bytearray(18)
+    sense[0] = SENSE_FORMAT_CURRENT_FIXED
+    sense[2] = key
+    sense[7] = 10
+    sense[12] = asc
+    sense[13] = ascq
+    return sense
+
+
+class _MemoryStore(object):
+    """
+    sparse memory, only granules that were written hold a buffer
+    """
+
+    def __init__(self, granule):
+        self._granule = granule
+        self._buffers = {}
+
+    def read(self, offset, view):
+        granule = self._granule
+        pos = 0
+        while pos < len(view):
+            idx, start = divmod(offset + pos, granule)
+            n = min(granule - start, len(view) - pos)
+            buf = self._buffers.get(idx)
+            if buf is None:
+                view[pos : pos + n] = bytes(n)
+            else:
+                view[pos : pos + n] = buf[start : start + n]
+            pos += n
+
+    def write(self, offset, view):
+        granule = self._granule
+        pos = 0
+        while pos < len(view):
+            idx, start = divmod(offset + pos, granule)
+            n = min(granule - start, len(view) - pos)
+            buf = self._buffers.get(idx)
+            if buf is None:
+                buf = self._buffers[idx] = bytearray(granule)
+            buf[start : start + n] = view[pos : pos + n]
+            pos += n
+
+    def discard(self, idx):
+        self._buffers.pop(idx, None)
+
+    def sync(self):
+        pass
+
+    def close(self):
+        self._buffers.clear()
+
+
+class _FileStore(object):
+    """
+    a regular file, created sparse when it does not exist
+    """
+
+    def __init__(self, path, size, granule):
+        self._granule = granule
+        self.created = not os.path.exists(path)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+
+    def read(self, offset, view):
+        pos = 0
+        while pos < len(view):
+            n = os.preadv(self._fd, [view[pos:]], offset + pos)
+            if n == 0:
+                view[pos:] = bytes(len(view) - pos)
+                break
+            pos += n
+
+    def write(self, offset, view):
+        pos = 0
+        while pos < len(view):
+            pos += os.pwrite(self._fd, view[pos:], offset + pos)
+
+    def discard(self, idx):
+        self.write(idx * self._granule, memoryview(bytes(self._granule)))
+
+    def sync(self):
+        os.fsync(self._fd)
+
+    def close(self):
+        os.close(self._fd)
+
+
+class SCSIEmulatedDevice(metaclass=ExMETA):
+    """
+    An emulated SBC block device
+
+    The device executes commands in process, with the same execute interface as
+    SCSIDevice and ISCSIDevice, so the SCSI class and the tools built on it can
+    be run and benchmarked without hardware:
+
+        s = SCSI(SCSIEmulatedDevice(blocks=2 ** 21, latency=0.0001))
+        s.blocksize = 512
+        s.write16(0, 8, bytes(4096))
+
+    CDBs are decoded with the unmarshall_cdb method of the command classes.
+    Supported are TEST UNIT READY, INQUIRY with the Supported VPD Pages, Unit
+    Serial Number, Device Identification, Block Limits and Logical Block
+    Provisioning pages, READ CAPACITY(10)/(16), READ and WRITE (10)/(12)/(16),
+    WRITE SAME(10)/(16), UNMAP, GET LBA STATUS and SYNCHRONIZE CACHE(10)/(16).
+    Anything else completes with CHECK CONDITION and fixed format sense data.
+
+    Data is kept in sparse memory, or in a file if a path is given. A thin
+    provisioned device starts out deallocated, tracks allocation per granule
+    of opt_unmap_gran blocks and reads zeros from deallocated blocks.
+    """
+
+    # the commands lock the medium and the provisioning map
+    thread_safe = True
+
+    def __init__(
+        self,
+        blocks,
+        blocksize=512,
+        path=None,
+        thin=True,
+        latency=0.0,
+        block_limits=None,
+        serial="0123456789",
+    ):
+        """
+        initialize a new instance
+
+        :param blocks: the number of logical blocks
+        :param blocksize: the logical block length in bytes
+        :param path: a file to keep the data in, None for sparse memory
+        :param thin: emulate a thin provisioned device
+        :param latency: seconds each command takes
+        :param block_limits: a dict overriding fields of the Block Limits VPD page
+        :param serial: the unit serial number
+        """
+        self._opcodes = scsi_enum_command.spc
+        self._devicetype = None
+        self._blocks = blocks
+        self._blocksize = blocksize
+        self._thin = thin
+        self.latency = latency
+        self._serial = serial
+        self._block_limits = {
+            "max_xfer_len": 0xFFFF,
+            "opt_xfer_len": 2048,
+            "opt_xfer_len_gran": 8,
+            "max_unmap_lba_count": 0x400000,
+            "max_unmap_bd_count": 256,
+            "opt_unmap_gran": 128,
+            "unmap_gran_alignment": 0,
+            "max_ws_len": 0x400000,
+        }
+        self._block_limits.update(block_limits or {})
+        self._granule_blocks = self._block_limits["opt_unmap_gran"] or 1
+        granule = self._granule_blocks * blocksize
+        self._lock = threading.Lock()
+        if path is None:
+            self._store = _MemoryStore(granule)
+            mapped = not thin
+        else:
+            self._store = _FileStore(path, blocks * blocksize, granule)
+            mapped = not thin or not self._store.created
+        # one byte per granule, 1 if the granule is mapped
+        granules = -(-blocks // self._granule_blocks)
+        self._map = bytearray(b"\x01" if mapped else b"\x00") * granules
+        sbc = scsi_enum_command.sbc
+        # opcode value -> (command class decoding the cdb, handler)
+        self._commands = {
+            sbc.TEST_UNIT_READY.value: (TestUnitReady, self._test_unit_ready),
+            sbc.INQUIRY.value: (Inquiry, self._inquiry),
+            sbc.READ_CAPACITY_10.value: (ReadCapacity10, self._read_capacity10),
+            sbc.SBC_OPCODE_9E.value: (ReadCapacity16, self._service_action_in),
+            sbc.READ_10.value: (Read10, self._read),
+            sbc.READ_12.value: (Read12, self._read),
+            sbc.READ_16.value: (Read16, self._read),
+            sbc.WRITE_10.value: (Write10, self._write),
+            sbc.WRITE_12.value: (Write12, self._write),
+            sbc.WRITE_16.value: (Write16, self._write),
+            sbc.WRITE_SAME_10.value: (WriteSame10, self._write_same),
+            sbc.WRITE_SAME_16.value: (WriteSame16, self._write_same),
+            sbc.UNMAP.value: (Unmap, self._unmap),
+            sbc.SYNCHRONIZE_CACHE_10.value: (SynchronizeCache10, self._sync),
+            sbc.SYNCHRONIZE_CACHE_16.value: (SynchronizeCache16, self._sync),
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+    def open(self):
+        pass
+
+    def close(self):
+        self._store.close()
+
+    @property
+    def blocks(self):
+        return self._blocks
+
+    @property
+    def blocksize(self):
+        return self._blocksize
+
+    def mapped_blocks(self):
+        """
+        the number of blocks in mapped granules
+
+        :return: a integer
+        """
+        count = self._map.count(1) * self._granule_blocks
+        if self._map and self._map[-1]:
+            count -= len(self._map) * self._granule_blocks - self._blocks
+        return count
+
+    def execute(self, cmd, en_raw_sense=False):
+        """
+        execute a scsi command
+
+        :param cmd: a SCSICommand
+        :param en_raw_sense: keep the sense data in cmd.raw_sense_data
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            entry = self._commands.get(cmd.cdb[0])
+            if entry is None:
+                raise _Sense(INVALID_COMMAND_OPERATION_CODE)
+            cls, handler = entry
+            handler(cmd, cls.unmarshall_cdb(cmd.cdb))
+        except _Sense as e:
+            cmd.sense = fixed_sense(e.key, e.asc, e.ascq)
+            if en_raw_sense:
+                cmd.raw_sense_data = cmd.sense
+            raise self.CheckCondition(cmd.sense)
+
+    def _check_range(self, lba, count):
+        if lba + count > self._blocks:
+            raise _Sense(LBA_OUT_OF_RANGE)
+
+    @staticmethod
+    def _datain(cmd, data):
+        n = min(len(cmd.datain), len(data))
+        cmd.datain[:n] = data[:n]
+
+    def _test_unit_ready(self, cmd, cdb):
+        pass
+
+    def _inquiry(self, cmd, cdb):
+        if not cmd.cdb[1] & 0x01:
+            if cmd.cdb[2]:
+                raise _Sense(INVALID_FIELD_IN_CDB)
+            data = {
+                "peripheral_device_type": INQUIRY.DEVICE_TYPE.BLOCK_DEVICE,
+                "version": 0x06,
+                "response_data_format": 2,
+                "additional_length": 91,
+                "cmdque": 1,
+                "t10_vendor_identification": bytearray(b"PYSCSI  "),
+                "product_identification": bytearray(b"EMULATED DISK   "),
+                "product_revision_level": bytearray(b"0001"),
+            }
+            self._datain(cmd, Inquiry.marshall_datain(data))
+            return
+
+        pages = [
+            INQUIRY.VPD.SUPPORTED_VPD_PAGES,
+            INQUIRY.VPD.UNIT_SERIAL_NUMBER,
+            INQUIRY.VPD.DEVICE_IDENTIFICATION,
+            INQUIRY.VPD.BLOCK_LIMITS,
+        ]
+        if self._thin:
+            pages.append(INQUIRY.VPD.LOGICAL_BLOCK_PROVISIONING)
+        page_code = cmd.cdb[2]
+        if page_code not in pages:
+            raise _Sense(INVALID_FIELD_IN_CDB)
+        data = {"page_code": page_code}
+        if page_code == INQUIRY.VPD.SUPPORTED_VPD_PAGES:
+            data["vpd_pages"] = pages
+        elif page_code == INQUIRY.VPD.UNIT_SERIAL_NUMBER:
+            data["unit_serial_number"] = bytearray(self._serial.encode())
+        elif page_code == INQUIRY.VPD.DEVICE_IDENTIFICATION:
+            # a locally assigned NAA designator made from the serial number
+            value = int.from_bytes(self._serial.encode()[-8:], "big")
+            data["designator_descriptors"] = [
+                {
+                    "code_set": INQUIRY.CODE_SET.BINARY,
+                    "association": INQUIRY.ASSOCIATION.ASSOCIATED_WITH_LUN,
+                    "designator_type": INQUIRY.DESIGNATOR.NAA,
+                    "designator": {
+                        "naa": INQUIRY.NAA.LOCALLY_ASSIGNED,
+                        "locally_administered_value": value & 0x0FFFFFFFFFFFFFFF,
+                    },
+                }
+            ]
+        elif page_code == INQUIRY.VPD.BLOCK_LIMITS:
+            data.update(self._block_limits)
+            data["unmap_gran_alignment"] |= 0x80000000  # UGAVALID
+        else:
+            data.update(lbpu=1, lpbws=1, lbpws10=1, lbprz=1, provisioning_type=2)
+        self._datain(cmd, Inquiry.marshall_datain(data))
+
+    def _read_capacity10(self, cmd, cdb):
+        data = {
+            "returned_lba": min(self._blocks - 1, 0xFFFFFFFF),
+            "block_length": self._blocksize,
+        }
+        self._datain(cmd, ReadCapacity10.marshall_datain(data))
+
+    def _service_action_in(self, cmd, cdb):
+        if cdb["service_action"] == _READ_CAPACITY_16:
+            data = {
+                "returned_lba": self._blocks - 1,
+                "block_length": self._blocksize,
+                "lbpme": 1 if self._thin else 0,
+                "lbprz": 1 if self._thin else 0,
+            }
+            self._datain(cmd, ReadCapacity16.marshall_datain(data))
+        elif cdb["service_action"] == _GET_LBA_STATUS and self._thin:
+            self._get_lba_status(cmd, GetLBAStatus.unmarshall_cdb(cmd.cdb))
+        else:
+            raise _Sense(INVALID_FIELD_IN_CDB)
+
+    def _get_lba_status(self, cmd, cdb):
+        lba = cdb["lba"]
+        self._check_range(lba, 1)
+        count = max((cdb["alloc_len"] - 8) // 16, 1)
+        gb = self._granule_blocks
+        lbas = []
+        with self._lock:
+            g = lba // gb
+            while g < len(self._map) and len(lbas) < count:
+                state = self._map[g]
+                end = self._map.find(b"\x00" if state else b"\x01", g)
+                if end < 0:
+                    end = len(self._map)
+                last = min(end * gb, self._blocks)
+                lbas.append(
+                    {
+                        "lba": lba,
+                        "num_blocks": last - lba,
+                        "p_status": 0 if state else 1,
+                    }
+                )
+                lba = last
+                g = end
+        self._datain(cmd, GetLBAStatus.marshall_datain({"lbas": lbas}))
+
+    def _read(self, cmd, cdb):
+        lba, tl = cdb["lba"], cdb["tl"]
+        self._check_range(lba, tl)
+        if (
+            self._block_limits["max_xfer_len"]
+            and tl > self._block_limits["max_xfer_len"]
+        ):
+            raise _Sense(INVALID_FIELD_IN_CDB)
+        view = memoryview(cmd.datain).cast("B")[: tl * self._blocksize]
+        with self._lock:
+            self._store.read(lba * self._blocksize, view)
+
+    def _write(self, cmd, cdb):
+        lba, tl = cdb["lba"], cdb["tl"]
+        self._check_range(lba, tl)
+        if (
+            self._block_limits["max_xfer_len"]
+            and tl > self._block_limits["max_xfer_len"]
+        ):
+            raise _Sense(INVALID_FIELD_IN_CDB)
+        view = memoryview(cmd.dataout).cast("B")
+        if len(view) < tl * self._blocksize:
+            raise _Sense(PARAMETER_LIST_LENGTH_ERROR)
+        with self._lock:
+            self._write_blocks(lba, view[: tl * self._blocksize])
+
+    def _write_blocks(self, lba, view):
+        self._store.write(lba * self._blocksize, view)
+        gb = self._granule_blocks
+        end = lba + len(view) // self._blocksize
+        for g in range(lba // gb, -(-end // gb)):
+            self._map[g] = 1
+
+    def _write_same(self, cmd, cdb):
+        lba, nb = cdb["lba"], cdb["nb"]
+        ndob = cdb.get("ndob", 0)
+        if nb == 0:
+            nb = self._blocks - lba
+        self._check_range(lba, nb)
+        if self._block_limits["max_ws_len"] and nb > self._block_limits["max_ws_len"]:
+            raise _Sense(INVALID_FIELD_IN_CDB)
+        if ndob:
+            block = bytes(self._blocksize)
+        else:
+            if cmd.dataout is None or len(cmd.dataout) < self._blocksize:
+                raise _Sense(PARAMETER_LIST_LENGTH_ERROR)
+            block = bytes(memoryview(cmd.dataout).cast("B")[: self._blocksize])
+        if cdb["unmap"] and not self._thin:
+            raise _Sense(INVALID_FIELD_IN_CDB)
+        with self._lock:
+            if cdb["unmap"] and not any(block):
+                self._deallocate(lba, nb)
+                return
+            # write at most a granule at a time
+            chunk = block * min(nb, self._granule_blocks)
+            while nb:
+                n = min(nb, self._granule_blocks)
+                self._write_blocks(lba, memoryview(chunk)[: n * self._blocksize])
+                lba += n
+                nb -= n
+
+    def _unmap(self, cmd, cdb):
+        if not self._thin:
+            raise _Sense(INVALID_COMMAND_OPERATION_CODE)
+        data = cmd.dataout
+        if cdb["parameter_list_length"] < 8 or len(data) < 8:
+            return
+        length = scsi_ba_to_int(data[2:4])
+        if length % 16 or len(data) < 8 + length:
+            raise _Sense(PARAMETER_LIST_LENGTH_ERROR)
+        if length // 16 > self._block_limits["max_unmap_bd_count"]:
+            raise _Sense(INVALID_FIELD_IN_PARAMETER_LIST)
+        ranges = []
+        for offset in range(8, 8 + length, 16):
+            lba = scsi_ba_to_int(data[offset : offset + 8])
+            count = scsi_ba_to_int(data[offset + 8 : offset + 12])
+            self._check_range(lba, count)
+            if count > self._block_limits["max_unmap_lba_count"]:
+                raise _Sense(INVALID_FIELD_IN_PARAMETER_LIST)
+            ranges.append((lba, count))
+        with self._lock:
+            for lba, count in ranges:
+                self._deallocate(lba, count)
+
+    def _deallocate(self, lba, count):
+        """
+        deallocate the whole granules of a range and zero the rest of it
+        """
+        gb = self._granule_blocks
+        end = lba + count
+        first = -(-lba // gb)
+        last = end // gb
+        if end == self._blocks:
+            last = len(self._map)
+        if first >= last:
+            self._zero(lba, end)
+            return
+        self._zero(lba, min(first * gb, end))
+        self._zero(min(last * gb, end), end)
+        for g in range(first, last):
+            if self._map[g]:
+                self._store.discard(g)
+                self._map[g] = 0
+
+    def _zero(self, lba, end):
+        # deallocated granules already read as zeros and stay deallocated
+        gb = self._granule_blocks
+        while lba < end:
+            stop = min((lba // gb + 1) * gb, end)
+            if self._map[lba // gb]:
+                zeros = memoryview(bytes((stop - lba) * self._blocksize))
+                self._store.write(lba * self._blocksize, zeros)
+            lba = stop
+
+    def _sync(self, cmd, cdb):
+        with self._lock:
+            self._store.sync()
+
+    @property
+    def opcodes(self):
+        return self._opcodes
+
+    @opcodes.setter
+    def opcodes(self, value):
+        self._opcodes = value
+
+    @property
+    def devicetype(self):
+        return self._devicetype
+
+    @devicetype.setter
+    def devicetype(self, value):
+        self._devicetype = value
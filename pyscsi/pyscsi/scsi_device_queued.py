@@ -0,0 +1,553 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import asyncio
+import ctypes
+import errno
+import os
+import select
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import pyscsi.pyscsi.scsi_enum_command as scsi_enum_command
+from pyscsi.pyscsi.scsi_exception import SCSIDeviceCommandExceptionMeta as ExMETA
+
+#
+# Linux sg driver asynchronous (write()/read()) interface, see sg(4) and
+# <scsi/sg.h>
+#
+SG_INTERFACE_ID_ORIG = ord("S")
+
+SG_DXFER_NONE = -1
+SG_DXFER_TO_DEV = -2
+SG_DXFER_FROM_DEV = -3
+
+# the sg driver never writes more sense data than this
+SG_MAX_SENSE = 252
+
+# the sg DRIVER_SENSE driver_status just flags that sense data is present
+SG_DRIVER_SENSE = 0x08
+
+SG_DEFAULT_TIMEOUT = 60000
+
+# how often a command is sent again after TASK SET FULL or BUSY
+_max_requeues = 8
+
+# seconds such a command is held before it is sent again, doubling with every
+# requeue, unless another command completes first and makes room
+_requeue_delay = 0.001
+
+_congested = (
+    getattr(scsi_enum_command.SCSI_STATUS, "BUSY"),
+    getattr(scsi_enum_command.SCSI_STATUS, "TASK_SET_FULL"),
+)
+
+
+class SGIOHeader(ctypes.Structure):
+    """
+    The sg_io_hdr structure that is written to and read back from a sg device
+    """
+
+    _fields_ = [
+        ("interface_id", ctypes.c_int),
+        ("dxfer_direction", ctypes.c_int),
+        ("cmd_len", ctypes.c_ubyte),
+        ("mx_sb_len", ctypes.c_ubyte),
+        ("iovec_count", ctypes.c_ushort),
+        ("dxfer_len", ctypes.c_uint),
+        ("dxferp", ctypes.c_void_p),
+        ("cmdp", ctypes.c_void_p),
+        ("sbp", ctypes.c_void_p),
+        ("timeout", ctypes.c_uint),
+        ("flags", ctypes.c_uint),
+        ("pack_id", ctypes.c_int),
+        ("usr_ptr", ctypes.c_void_p),
+        ("status", ctypes.c_ubyte),
+        ("masked_status", ctypes.c_ubyte),
+        ("msg_status", ctypes.c_ubyte),
+        ("sb_len_wr", ctypes.c_ubyte),
+        ("host_status", ctypes.c_ushort),
+        ("driver_status", ctypes.c_ushort),
+        ("resid", ctypes.c_int),
+        ("duration", ctypes.c_uint),
+        ("info", ctypes.c_uint),
+    ]
+
+
+def _buffer(data):
+    """
+    Return a ctypes array sharing memory with data.
+
+    Writable buffers (bytearray, memoryview, mmap, ...) are used in place,
+    read-only ones are copied.
+
+    :param data: a bytes-like object
+    :return: a tuple of the ctypes array and whether it is a copy
+    """
+    try:
+        return (ctypes.c_ubyte * len(data)).from_buffer(data), False
+    except TypeError:
+        return (ctypes.c_ubyte * len(data)).from_buffer_copy(data), True
+
+
+class _Request(object):
+    """
+    The state of a command that has been written to the device and has not
+    been read back yet. It keeps every buffer the kernel points into alive.
+    """
+
+    __slots__ = (
+        "cmd",
+        "future",
+        "en_raw_sense",
+        "hdr",
+        "cdb",
+        "data",
+        "copied",
+        "sense",
+        "token",
+        "requeues",
+        "not_before",
+    )
+
+    def __init__(self, cmd, future, en_raw_sense, hdr, cdb, data, copied, sense):
+        self.cmd = cmd
+        self.future = future
+        self.en_raw_sense = en_raw_sense
+        self.hdr = hdr
+        self.cdb = cdb
+        # copied is set if datain was read-only and data is a copy of it
+        self.data = data
+        self.copied = copied
+        self.sense = sense
+        self.token = None
+        self.requeues = 0
+        self.not_before = 0.0
+
+
+class SCSIQueuedDevice(metaclass=ExMETA):
+    """
+    The queued scsi device class
+
+    Unlike SCSIDevice, which blocks in ioctl(SG_IO) for every command, this
+    backend uses the asynchronous write()/read() interface of the Linux sg
+    driver and keeps up to queue_depth commands in flight on the device.
+
+    Commands are queued with submit(), which returns a Future that is
+    resolved when the command has been read back with reap(). execute() is
+    still available and runs a single command to completion, so the device
+    can be used with the SCSI class like any other device.
+
+    With a QueueDepthController as throttle, the commands in flight are
+    also limited to its window, and commands that complete with TASK SET
+    FULL or BUSY shrink the window and are sent again once another command
+    completes, or after a short backoff.
+
+    The device object itself is not thread safe, submit() and reap() must be
+    called from one thread at a time.
+    """
+
+    thread_safe = False
+
+    def __init__(
+        self, device, queue_depth=32, timeout=SG_DEFAULT_TIMEOUT, throttle=None
+    ):
+        """
+        initialize a  new instance of a SCSIQueuedDevice
+
+        :param device: the path of a sg device node
+        :param queue_depth: the max number of commands in flight
+        :param timeout: the timeout of each command in milliseconds
+        :param throttle: a QueueDepthController for the I_T nexus of the device
+        """
+        if queue_depth < 1:
+            raise ValueError("queue_depth must be at least 1")
+        self._opcodes = scsi_enum_command.spc
+        self._file_name = device
+        self._fd = None
+        self._poll = None
+        self._queue_depth = queue_depth
+        self._timeout = timeout
+        self._pending = {}
+        self._deferred = deque()
+        self._throttle = throttle
+        self._pack_id = 0
+        self._reader_loop = None
+
+        if device[:5] == "/dev/":
+            self.open()
+        else:
+            raise NotImplementedError("No backend implemented for %s" % device)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+    def open(self):
+        """
+        open the sg device, the write()/read() interface needs it read/write
+        """
+        self._fd = os.open(self._file_name, os.O_RDWR | os.O_NONBLOCK)
+        self._poll = select.poll()
+        self._poll.register(self._fd, select.POLLIN)
+
+    def close(self):
+        """
+        wait for all commands in flight and close the device
+        """
+        try:
+            self.drain()
+        finally:
+            if self._reader_loop is not None:
+                self._reader_loop.remove_reader(self._fd)
+                self._reader_loop = None
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    @property
+    def queue_depth(self):
+        return self._queue_depth
+
+    @queue_depth.setter
+    def queue_depth(self, value):
+        if value < 1:
+            raise ValueError("queue_depth must be at least 1")
+        self._queue_depth = value
+
+    @property
+    def throttle(self):
+        return self._throttle
+
+    @property
+    def in_flight(self):
+        """
+        the number of commands that have been submitted but not reaped yet
+        """
+        return len(self._pending)
+
+    def _can_write(self):
+        """
+        whether another command may be sent, a device with no command in
+        flight may always send one
+        """
+        if not self._pending:
+            return True
+        if len(self._pending) >= self._queue_depth:
+            return False
+        return self._throttle is None or self._throttle.available()
+
+    def _write_header(self, hdr):
+        """
+        hand a request to the sg driver
+
+        :param hdr: a SGIOHeader
+        """
+        os.write(self._fd, hdr)
+
+    def _read_header(self, hdr, block):
+        """
+        read the header of the next completed request from the sg driver
+
+        :param hdr: a SGIOHeader that is filled in
+        :param block: wait until a request has completed
+        :return: False if block is not set and no request has completed
+        """
+        if block:
+            self._poll.poll()
+        try:
+            os.readv(self._fd, [hdr])
+        except BlockingIOError:
+            if block:
+                return self._read_header(hdr, block)
+            return False
+        return True
+
+    def submit(self, cmd, en_raw_sense=False, callback=None):
+        """
+        queue a scsi command
+
+        If queue_depth commands, or the window of the throttle, are already
+        in flight this waits for one of them to complete first.
+
+        :param cmd: a SCSICommand
+        :param en_raw_sense: store the sense data in cmd.raw_sense_data
+        :param callback: a callable that is called with the Future when the
+                         command completes
+        :return: a concurrent.futures.Future resolved with the command
+        """
+        while not self._can_write():
+            self.reap()
+
+        hdr = SGIOHeader()
+        hdr.interface_id = SG_INTERFACE_ID_ORIG
+        cdb, _ = _buffer(cmd.cdb)
+        sense = (ctypes.c_ubyte * SG_MAX_SENSE)()
+        data = None
+        copied = False
+        if cmd.dataout is not None and len(cmd.dataout):
+            hdr.dxfer_direction = SG_DXFER_TO_DEV
+            data, _ = _buffer(cmd.dataout)
+        elif cmd.datain is not None and len(cmd.datain):
+            hdr.dxfer_direction = SG_DXFER_FROM_DEV
+            data, copied = _buffer(cmd.datain)
+        else:
+            hdr.dxfer_direction = SG_DXFER_NONE
+        if data is not None:
+            hdr.dxfer_len = len(data)
+            hdr.dxferp = ctypes.addressof(data)
+        hdr.cmd_len = len(cdb)
+        hdr.cmdp = ctypes.addressof(cdb)
+        hdr.mx_sb_len = SG_MAX_SENSE
+        hdr.sbp = ctypes.addressof(sense)
+        hdr.timeout = self._timeout
+        self._pack_id = (self._pack_id + 1) & 0x7FFFFFFF
+        hdr.pack_id = self._pack_id
+
+        future = Future()
+        future.set_running_or_notify_cancel()
+        if callback is not None:
+            future.add_done_callback(callback)
+
+        # keep every buffer the kernel points into alive until the command has
+        # been read back
+        self._send(_Request(cmd, future, en_raw_sense, hdr, cdb, data, copied, sense))
+        return future
+
+    def _send(self, request):
+        """
+        write a request to the driver and add it to the requests in flight
+
+        :param request: a _Request
+        """
+        while True:
+            try:
+                self._write_header(request.hdr)
+                break
+            except OSError as e:
+                # the driver queue is full, make room and try again
+                if e.errno not in (errno.EAGAIN, errno.EDOM) or not self._pending:
+                    raise
+                self.reap()
+        if self._throttle is not None:
+            request.token = self._throttle.acquire()
+        self._pending[request.hdr.pack_id] = request
+
+    def _defer(self, request):
+        """
+        hold a request that completed with TASK SET FULL or BUSY
+
+        :param request: a _Request
+        """
+        request.requeues += 1
+        delay = _requeue_delay * (1 << (request.requeues - 1))
+        request.not_before = time.monotonic() + delay
+        self._deferred.append(request)
+
+    def _deferred_delay(self):
+        """
+        the seconds until the first held request may be sent again
+        """
+        return max(0.0, self._deferred[0].not_before - time.monotonic())
+
+    def _send_deferred(self, completed=False):
+        """
+        send the held requests again, as far as the window allows
+
+        :param completed: a command has just completed, so the target has room
+                          and the requests are sent without waiting for their
+                          backoff
+        """
+        while self._deferred and self._can_write():
+            if not completed and self._deferred_delay() > 0:
+                break
+            self._send(self._deferred.popleft())
+
+    def reap(self, block=True):
+        """
+        read back one completed command and resolve its Future
+
+        A command that completed with TASK SET FULL or BUSY on a throttled
+        device is held instead, and sent again when another command
+        completes or its backoff has passed, up to _max_requeues times.
+
+        :param block: wait for a command to complete
+        :return: the number of commands that were read back, 0 or 1, stale
+                 completions of commands sent before the device was reopened
+                 are skipped and count as 0
+        """
+        self._send_deferred()
+        if not self._pending:
+            if not self._deferred or not block:
+                return 0
+            time.sleep(self._deferred_delay())
+            self._send_deferred()
+        hdr = SGIOHeader()
+        if not self._read_header(hdr, block):
+            return 0
+        request = self._pending.pop(hdr.pack_id, None)
+        if request is None:
+            # a completion of a command this object did not send, like one
+            # still queued in the driver from before the device was reopened
+            return 0
+        if self._throttle is not None:
+            congested = hdr.status in _congested
+            self._throttle.release(request.token, congested)
+            if congested and request.requeues < _max_requeues:
+                self._defer(request)
+                return 1
+        try:
+            self._complete(request, hdr)
+        except Exception as e:
+            request.future.set_exception(e)
+        else:
+            request.future.set_result(request.cmd)
+        self._send_deferred(completed=True)
+        return 1
+
+    def drain(self):
+        """
+        wait until all commands in flight have completed
+        """
+        while self._pending or self._deferred:
+            self.reap()
+
+    def _complete(self, request, hdr):
+        """
+        map the status of a completed request to the command or an exception
+
+        :param request: a _Request
+        :param hdr: the SGIOHeader read back from the driver
+        """
+        cmd = request.cmd
+        if request.copied:
+            cmd.datain = bytearray(request.data)
+        if hdr.status == scsi_enum_command.SCSI_STATUS.CHECK_CONDITION:
+            cmd.sense = bytearray(request.sense[: hdr.sb_len_wr])
+            if request.en_raw_sense:
+                cmd.raw_sense_data = cmd.sense
+            raise self.CheckCondition(cmd.sense)
+        if hdr.status == scsi_enum_command.SCSI_STATUS.GOOD:
+            if hdr.host_status or hdr.driver_status & ~SG_DRIVER_SENSE:
+                raise OSError(
+                    errno.EIO,
+                    "SG error: host_status 0x%02X driver_status 0x%02X"
+                    % (hdr.host_status, hdr.driver_status),
+                )
+            return
+        if hdr.status == scsi_enum_command.SCSI_STATUS.RESERVATION_CONFLICT:
+            raise self.ReservationConflict()
+        if hdr.status == scsi_enum_command.SCSI_STATUS.TASK_ABORTED:
+            raise self.TaskAborted()
+        if hdr.status == scsi_enum_command.SCSI_STATUS.BUSY:
+            raise self.BusyStatus()
+        if hdr.status == scsi_enum_command.SCSI_STATUS.TASK_SET_FULL:
+            raise self.TaskSetFull()
+        if hdr.status == scsi_enum_command.SCSI_STATUS.ACA_ACTIVE:
+            raise self.ACAActive()
+        if hdr.status == scsi_enum_command.SCSI_STATUS.CONDITIONS_MET:
+            raise self.ConditionsMet()
+        raise RuntimeError
+
+    def execute(self, cmd, en_raw_sense=False):
+        """
+        execute a scsi command and wait for it to complete
+
+        :param cmd: a SCSICommand
+        """
+        future = self.submit(cmd, en_raw_sense=en_raw_sense)
+        while not future.done():
+            self.reap()
+        future.result()
+
+    async def execute_async(self, cmd, en_raw_sense=False):
+        """
+        execute a scsi command without blocking the running event loop
+
+        The device is registered as a reader with the event loop while
+        commands are in flight, completed commands are reaped from the
+        reader callback.
+
+        :param cmd: a SCSICommand
+        :return: the SCSICommand
+        """
+        loop = asyncio.get_running_loop()
+        while not self._can_write():
+            await asyncio.wait(
+                [asyncio.wrap_future(r.future) for r in self._pending.values()],
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        future = self.submit(cmd, en_raw_sense=en_raw_sense)
+        if self._reader_loop is None:
+            loop.add_reader(self._fd, self._on_readable)
+            self._reader_loop = loop
+        return await asyncio.wrap_future(future)
+
+    async def drain_async(self):
+        """
+        wait until all commands in flight have completed without blocking
+        the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        while self._pending or self._deferred:
+            self._send_deferred()
+            if not self._pending:
+                await asyncio.sleep(self._deferred_delay())
+                continue
+            if self._reader_loop is None:
+                loop.add_reader(self._fd, self._on_readable)
+                self._reader_loop = loop
+            await asyncio.wait(
+                [asyncio.wrap_future(r.future) for r in self._pending.values()]
+            )
+
+    def _on_readable(self):
+        """
+        event loop callback, reap every command that has completed
+        """
+        while self.reap(block=False):
+            pass
+        if not self._pending:
+            loop = self._reader_loop
+            loop.remove_reader(self._fd)
+            self._reader_loop = None
+            if self._deferred:
+                loop.call_later(self._deferred_delay(), self._on_backoff, loop)
+
+    def _on_backoff(self, loop):
+        """
+        event loop callback, send the held requests once their backoff passed
+        """
+        if self._pending or not self._deferred:
+            return
+        self._send_deferred()
+        if self._pending and self._reader_loop is None:
+            loop.add_reader(self._fd, self._on_readable)
+            self._reader_loop = loop
+        elif not self._pending:
+            loop.call_later(self._deferred_delay(), self._on_backoff, loop)
+
+    @property
+    def opcodes(self):
+        return self._opcodes
+
+    @opcodes.setter
+    def opcodes(self, value):
+        self._opcodes = value
+
+    @property
+    def devicetype(self):
+        return self._devicetype
+
+    @devicetype.setter
+    def devicetype(self, value):
+        self._devicetype = value
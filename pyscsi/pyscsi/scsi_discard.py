@@ -0,0 +1,334 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+from collections import deque
+
+from pyscsi.pyscsi import scsi_enum_inquiry as INQUIRY
+from pyscsi.pyscsi.scsi_cdb_unmap import Unmap
+from pyscsi.pyscsi.scsi_cdb_write16 import Write16
+from pyscsi.pyscsi.scsi_cdb_writesame16 import WriteSame16
+from pyscsi.pyscsi.scsi_sense import SCSICheckCondition
+from pyscsi.pyscsi.scsi_stream import block_limits, optimal_transfer_length
+from pyscsi.pyscsi.scsi_submit import Submitter
+
+#
+# Discarding and zeroing LBA ranges of a logical unit within its Block Limits
+#
+
+# the NUMBER OF LOGICAL BLOCKS field of an UNMAP block descriptor is 32 bits,
+# and the parameter list length of the CDB 16 bits
+_max_descriptor_blocks = 0xFFFFFFFF
+_max_descriptors = (0xFFFF - 8) // 16
+
+# the NUMBER OF LOGICAL BLOCKS field of WRITE SAME(16) is 32 bits, and 0 means
+# up to the end of the medium
+_max_write_same_blocks = 0xFFFFFFFF
+
+# the sense key and ASC of a command the device does not implement as sent:
+# INVALID COMMAND OPERATION CODE and INVALID FIELD IN CDB
+_illegal_request = 0x05
+_not_implemented = (0x20, 0x24)
+
+# the UGAVALID bit shares a field with the UNMAP GRANULARITY ALIGNMENT
+_ugavalid = 0x80000000
+
+# the Block Limits fields that are 0 if the device does not implement UNMAP
+_unmap_limits = ("max_unmap_lba_count", "max_unmap_bd_count")
+
+
+def unmap_supported(limits):
+    """
+    whether the Block Limits allow UNMAP commands
+
+    A device without the Block Limits VPD page reports no limits, so UNMAP
+    is only ruled out by a page with a zero maximum unmap LBA count or block
+    descriptor count.
+
+    :param limits: a dict with the Block Limits VPD page
+    :return: False if the device does not implement UNMAP
+    """
+    return all(limits.get(key) != 0 for key in _unmap_limits)
+
+
+def unmap_granularity(limits):
+    """
+    the optimal unmap granularity and its alignment from the Block Limits
+
+    :param limits: a dict with the Block Limits VPD page
+    :return: a (granularity, alignment) tuple of numbers of blocks
+    """
+    granularity = limits.get("opt_unmap_gran", 0) or 1
+    alignment = limits.get("unmap_gran_alignment", 0)
+    if not alignment & _ugavalid:
+        return granularity, 0
+    return granularity, (alignment & ~_ugavalid) % granularity
+
+
+def coalesce(ranges, blocksize=None):
+    """
+    sort ranges and merge the ones that overlap or touch
+
+    Merged byte ranges are converted to the logical blocks they cover
+    completely, the blocks they only cover in part are left out.
+
+    :param ranges: (lba, num_blocks) tuples, or (offset, length) tuples in bytes
+    :param blocksize: the logical block length if the ranges are in bytes,
+                      None for LBA ranges
+    :return: a list of (lba, num_blocks) tuples
+    """
+    result = []
+    for start, length in sorted(r for r in ranges if r[1] > 0):
+        if result and start <= result[-1][0] + result[-1][1]:
+            last, n = result[-1]
+            result[-1] = (last, max(n, start + length - last))
+        else:
+            result.append((start, length))
+    if blocksize is None:
+        return result
+    blocks = []
+    for offset, length in result:
+        first = -(-offset // blocksize)
+        end = (offset + length) // blocksize
+        if first < end:
+            blocks.append((first, end - first))
+    return blocks
+
+
+def plan_unmap(ranges, limits, blocksize=None, align=True):
+    """
+    split ranges into the parameter lists of as few UNMAP commands as possible
+
+    The ranges are coalesced, and with align trimmed to whole granules of
+    the optimal unmap granularity, as a device only deallocates whole
+    granules. Each parameter list stays within the maximum unmap LBA count
+    and block descriptor count of the Block Limits, and with align every
+    range is split at granule boundaries. Without the Block Limits page
+    there are no limits, but a page without UNMAP support raises ValueError.
+
+    :param ranges: (lba, num_blocks) tuples, or (offset, length) tuples in bytes
+    :param limits: a dict with the Block Limits VPD page
+    :param blocksize: the logical block length if the ranges are in bytes,
+                      None for LBA ranges
+    :param align: leave out the parts of ranges that do not fill a granule
+    :return: a list of lists of {"lba", "num_blocks"} dicts
+    """
+    if not unmap_supported(limits):
+        raise ValueError("the device does not implement UNMAP")
+    max_lbas = limits.get("max_unmap_lba_count", 0) or 0xFFFFFFFF
+    max_descriptors = limits.get("max_unmap_bd_count", 0) or 0xFFFFFFFF
+    max_descriptors = min(max_descriptors, _max_descriptors)
+    max_blocks = min(max_lbas, _max_descriptor_blocks)
+    granularity, alignment = unmap_granularity(limits) if align else (1, 0)
+    if max_lbas >= granularity:
+        max_lbas -= max_lbas % granularity
+        max_blocks -= max_blocks % granularity
+
+    plan = []
+    lbas = []
+    total = 0
+    for lba, num_blocks in coalesce(ranges, blocksize):
+        end = lba + num_blocks
+        lba += -(lba - alignment) % granularity
+        end -= (end - alignment) % granularity
+        while lba < end:
+            n = min(end - lba, max_blocks, max_lbas - total)
+            lbas.append({"lba": lba, "num_blocks": n})
+            total += n
+            lba += n
+            if len(lbas) == max_descriptors or total == max_lbas:
+                plan.append(lbas)
+                lbas = []
+                total = 0
+    if lbas:
+        plan.append(lbas)
+    return plan
+
+
+def _execute_all(s, commands, in_flight, progress=None):
+    """
+    execute (command, number of blocks) pairs, up to in_flight at a time
+
+    The commands are run by a Submitter, so only queued and thread safe
+    devices have more than one in flight.
+
+    :param s: a SCSI object
+    :param commands: an iterator of (SCSICommand, number of blocks) tuples
+    :param in_flight: the number of commands in flight
+    :param progress: called with the number of blocks done after every command
+    :return: a (number of commands, number of blocks) tuple
+    """
+    submitter = Submitter(s, in_flight)
+    pending = deque()
+    done = [0, 0]
+
+    def retire():
+        future, n = pending.popleft()
+        submitter.wait(future)
+        done[0] += 1
+        done[1] += n
+        if progress is not None:
+            progress(done[1])
+
+    try:
+        for cmd, n in commands:
+            while len(pending) >= max(in_flight, 1):
+                retire()
+            pending.append((submitter.submit(cmd), n))
+        while pending:
+            retire()
+    finally:
+        # a queued device still owns the commands in flight
+        submitter.close([future for future, _ in pending])
+    return tuple(done)
+
+
+def discard(s, ranges, blocksize=None, align=True, in_flight=1, progress=None):
+    """
+    deallocate ranges of a logical unit with UNMAP
+
+    The UNMAP commands are planned with plan_unmap from the Block Limits VPD
+    page of the device, and up to in_flight of them are executed at a time:
+
+        discard(s, [(0, 1 << 20), (1 << 21, 1 << 20)], in_flight=4)
+
+    :param s: a SCSI object
+    :param ranges: (lba, num_blocks) tuples, or (offset, length) tuples in bytes
+    :param blocksize: the logical block length if the ranges are in bytes,
+                      None for LBA ranges
+    :param align: leave out the parts of ranges that do not fill a granule
+    :param in_flight: the number of UNMAP commands in flight
+    :param progress: called with the number of blocks done after every command
+    :return: a (number of commands, number of blocks) tuple
+    """
+    opcode = s.device.opcodes.UNMAP
+    commands = (
+        (Unmap(opcode, lbas), sum(d["num_blocks"] for d in lbas))
+        for lbas in plan_unmap(ranges, block_limits(s), blocksize, align)
+    )
+    return _execute_all(s, commands, in_flight, progress)
+
+
+def write_same_commands(s, runs, blocksize, unmap=0, ndob=0):
+    """
+    WRITE SAME(16) commands writing zeros to runs within the Block Limits
+
+    :param s: a SCSI object
+    :param runs: (lba, num_blocks) tuples
+    :param blocksize: the logical block length in bytes
+    :param unmap: set the UNMAP bit, the device may deallocate the blocks,
+                  and split the runs at the optimal unmap granularity
+    :param ndob: set the NDOB bit instead of sending a zero block
+    :return: an iterator of (SCSICommand, number of blocks) tuples
+    """
+    opcode = s.device.opcodes.WRITE_SAME_16
+    limits = block_limits(s)
+    max_ws = limits.get("max_ws_len", 0) or _max_write_same_blocks
+    max_ws = min(max_ws, _max_write_same_blocks)
+    granularity, alignment = unmap_granularity(limits) if unmap else (1, 0)
+    if max_ws < granularity:
+        granularity, alignment = 1, 0
+    # split at granule boundaries, so every whole granule can be deallocated
+    max_ws -= max_ws % granularity
+    zero = bytes(blocksize)
+    for lba, num_blocks in runs:
+        while num_blocks:
+            n = min(num_blocks, max_ws - (lba - alignment) % granularity)
+            yield WriteSame16(
+                opcode, blocksize, lba, n, zero, unmap=unmap, ndob=ndob
+            ), n
+            lba += n
+            num_blocks -= n
+
+
+def _write_commands(s, runs, blocksize):
+    """
+    WRITE(16) commands of the optimal transfer length writing zeros to runs
+    """
+    opcode = s.device.opcodes.WRITE_16
+    tl = optimal_transfer_length(block_limits(s), blocksize)
+    zero = memoryview(bytes(tl * blocksize))
+    for lba, num_blocks in runs:
+        while num_blocks:
+            n = min(num_blocks, tl)
+            yield Write16(opcode, blocksize, lba, n, zero[: n * blocksize]), n
+            lba += n
+            num_blocks -= n
+
+
+def zero_range(s, lba, num_blocks, unmap=True, in_flight=4, progress=None):
+    """
+    make a range of a logical unit read as zeros as fast as the device allows
+
+    WRITE SAME(16) is tried with the NDOB bit first, so no data is sent,
+    then with a zero block, and chunks of zeros are written with WRITE(16)
+    if the device rejects both with INVALID COMMAND OPERATION CODE or
+    INVALID FIELD IN CDB. Any other error is raised. With unmap, the UNMAP
+    bit of WRITE SAME(16) is set if the Logical Block Provisioning VPD page
+    reports LBPWS, so a thin provisioned device deallocates the range. A
+    device has to return the written zeros for the blocks it deallocates
+    that way, whatever its LBPRZ bit says. Commands are split at the
+    maximum write same length of the Block Limits, and up to in_flight of
+    them are executed at a time.
+
+    :param s: a SCSI object
+    :param lba: the first LBA to zero
+    :param num_blocks: the number of blocks to zero
+    :param unmap: let the device deallocate the range if it can
+    :param in_flight: the number of commands in flight
+    :param progress: called with the number of blocks done after every command
+    :return: a (number of commands, number of blocks) tuple
+    """
+    blocksize = s.blocksize or s.readcapacity16().result["block_length"]
+    lbp = s.vpd(INQUIRY.VPD.LOGICAL_BLOCK_PROVISIONING)
+    unmap = 1 if unmap and lbp.get("lpbws") else 0
+    runs = [(lba, num_blocks)]
+    candidates = (
+        lambda: write_same_commands(s, runs, blocksize, unmap=unmap, ndob=1),
+        lambda: write_same_commands(s, runs, blocksize, unmap=unmap),
+        lambda: _write_commands(s, runs, blocksize),
+    )
+    for i, candidate in enumerate(candidates):
+        commands = candidate()
+        try:
+            cmd, n = next(commands)
+        except StopIteration:
+            return 0, 0
+        # the first command shows whether the device takes this kind
+        try:
+            s.execute(cmd)
+        except SCSICheckCondition as e:
+            if e.record.key != _illegal_request or e.asc not in _not_implemented:
+                raise
+            if i == len(candidates) - 1:
+                raise
+            continue
+        break
+
+    if progress is not None:
+        progress(n)
+    done = n
+
+    def _progress(blocks):
+        progress(done + blocks)
+
+    count, blocks = _execute_all(
+        s, commands, in_flight, None if progress is None else _progress
+    )
+    return count + 1, blocks + n
+
+
+def wipe(s, unmap=True, in_flight=4, progress=None):
+    """
+    make a whole logical unit read as zeros, see zero_range
+
+    :param s: a SCSI object
+    :param unmap: let the device deallocate the logical unit if it can
+    :param in_flight: the number of commands in flight
+    :param progress: called with the number of blocks done after every command
+    :return: a (number of commands, number of blocks) tuple
+    """
+    r = s.readcapacity16().result
+    return zero_range(s, 0, r["returned_lba"] + 1, unmap, in_flight, progress)
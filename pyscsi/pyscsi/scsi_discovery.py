@@ -0,0 +1,205 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import functools
+import json
+import os
+import tempfile
+import threading
+
+#
+# A cache of what the SCSI class discovers about a device
+#
+
+# changes on every boot, device numbers and inodes may be reused after one
+_boot_id_path = "/proc/sys/kernel/random/boot_id"
+
+
+@functools.lru_cache(maxsize=None)
+def boot_id():
+    """
+    the random id of the running kernel
+
+    :return: a string, empty if the kernel does not provide one
+    """
+    try:
+        with open(_boot_id_path) as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def device_key(device):
+    """
+    the identity of a device used as cache key
+
+    Local devices are identified by the boot id and the path, device number,
+    inode and change time of their node. Device numbers and inodes are
+    reused when a disk is replugged or the system reboots, but the node is
+    created anew then, so a different disk behind the same path gets a new
+    key. iSCSI devices are identified by their url.
+
+    :param device: a SCSIDevice, SCSIQueuedDevice or ISCSIDevice object
+    :return: a string, None if the device can not be identified
+    """
+    name = getattr(device, "_file_name", None)
+    if not isinstance(name, str):
+        return None
+    if name[:5] == "/dev/":
+        st = os.stat(name)
+        return "%s:%s:%d:%d:%d" % (
+            name,
+            boot_id(),
+            st.st_rdev,
+            st.st_ino,
+            st.st_ctime_ns,
+        )
+    return name
+
+
+class DeviceInfo(object):
+    """
+    What is known about a device: the peripheral device type, the blocksize
+    and the raw data of the VPD pages fetched so far
+    """
+
+    def __init__(self, devicetype, blocksize=0, vpd=None):
+        """
+        initialize a new instance
+
+        :param devicetype: the peripheral device type from the standard INQUIRY
+        :param blocksize: the blocksize in bytes, 0 if unknown
+        :param vpd: a dict mapping page codes to the raw page data
+        """
+        self.devicetype = devicetype
+        self.blocksize = blocksize
+        self.vpd = vpd if vpd is not None else {}
+
+    def __eq__(self, other):
+        return isinstance(other, DeviceInfo) and self.to_dict() == other.to_dict()
+
+    # the SCSI class updates a DeviceInfo in place, so it can not be hashed
+    __hash__ = None  # type: ignore[assignment]
+
+    def to_dict(self):
+        return {
+            "devicetype": self.devicetype,
+            "blocksize": self.blocksize,
+            "vpd": {"%02x" % k: bytes(v).hex() for k, v in self.vpd.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            d["devicetype"],
+            d["blocksize"],
+            {int(k, 16): bytes.fromhex(v) for k, v in d["vpd"].items()},
+        )
+
+
+class DeviceCache(object):
+    """
+    A discovery cache for the SCSI class
+
+    Passing a cache to SCSI skips the standard INQUIRY for devices seen before,
+    and VPD pages are only fetched once:
+
+        cache = DeviceCache("~/.cache/pyscsi.json")
+        s = SCSI(init_device("/dev/sg1"), cache=cache)
+
+    Entries are keyed by device_key(). With a path the cache is loaded from a
+    JSON file, and save() writes it back, so it is shared by later processes:
+
+        cache.save()
+
+    Nothing is written until save() is called. Use invalidate() after changing
+    a device in a way the cache can not see, like a firmware update or
+    reformatting to another blocksize.
+    """
+
+    def __init__(self, path=None):
+        """
+        initialize a new instance
+
+        :param path: an optional file to keep the cache in
+        """
+        self._path = os.path.expanduser(path) if path else None
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, device):
+        """
+        look up a device
+
+        :param device: a device object
+        :return: a DeviceInfo object, None if the device is not cached
+        """
+        key = device_key(device)
+        if key is None:
+            return None
+        return self._entries.get(key)
+
+    def put(self, device, info):
+        """
+        add or update the entry of a device
+
+        :param device: a device object
+        :param info: a DeviceInfo object
+        """
+        key = device_key(device)
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = info
+
+    def invalidate(self, device=None):
+        """
+        drop the entry of a device, or of all devices
+
+        :param device: a device object, None to clear the cache
+        """
+        with self._lock:
+            if device is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(device_key(device), None)
+
+    def load(self):
+        """
+        read the cache file, a missing or damaged file gives an empty cache
+        """
+        if self._path is None:
+            return
+        try:
+            with open(self._path) as f:
+                entries = {k: DeviceInfo.from_dict(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            entries = {}
+        with self._lock:
+            self._entries = entries
+
+    def save(self):
+        """
+        write the cache file, replacing it atomically
+        """
+        if self._path is None:
+            return
+        with self._lock:
+            data = {k: v.to_dict() for k, v in self._entries.items()}
+        directory = os.path.dirname(self._path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".pyscsi-cache-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(tmp, self._path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
@@ -6,6 +6,58 @@
 #
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+from pyscsi.pyscsi.scsi_cdb_atapassthrough12 import ATAPassThrough12
+from pyscsi.pyscsi.scsi_cdb_atapassthrough16 import ATAPassThrough16
+from pyscsi.pyscsi.scsi_cdb_exchangemedium import ExchangeMedium
+from pyscsi.pyscsi.scsi_cdb_extended_copy_spc4 import ExtendedCopy as ExtendedCopy4
+from pyscsi.pyscsi.scsi_cdb_extended_copy_spc5 import ExtendedCopy as ExtendedCopy5
+from pyscsi.pyscsi.scsi_cdb_getlbastatus import GetLBAStatus
+from pyscsi.pyscsi.scsi_cdb_initelementstatus import InitializeElementStatus
+from pyscsi.pyscsi.scsi_cdb_initelementstatuswithrange import (
+    InitializeElementStatusWithRange,
+)
+from pyscsi.pyscsi.scsi_cdb_inquiry import Inquiry
+from pyscsi.pyscsi.scsi_cdb_modesense6 import ModeSelect6, ModeSense6
+from pyscsi.pyscsi.scsi_cdb_modesense10 import ModeSelect10, ModeSense10
+from pyscsi.pyscsi.scsi_cdb_movemedium import MoveMedium
+from pyscsi.pyscsi.scsi_cdb_openclose_exportimport_element import (
+    OpenCloseImportExportElement,
+)
+from pyscsi.pyscsi.scsi_cdb_persistentreservein import PersistentReserveIn
+from pyscsi.pyscsi.scsi_cdb_persistentreserveout import PersistentReserveOut
+from pyscsi.pyscsi.scsi_cdb_populate_token import PopulateToken
+from pyscsi.pyscsi.scsi_cdb_positiontoelement import PositionToElement
+from pyscsi.pyscsi.scsi_cdb_preventallow_mediumremoval import PreventAllowMediumRemoval
+from pyscsi.pyscsi.scsi_cdb_read10 import Read10
+from pyscsi.pyscsi.scsi_cdb_read12 import Read12
+from pyscsi.pyscsi.scsi_cdb_read16 import Read16
+from pyscsi.pyscsi.scsi_cdb_readcapacity10 import ReadCapacity10
+from pyscsi.pyscsi.scsi_cdb_readcapacity16 import ReadCapacity16
+from pyscsi.pyscsi.scsi_cdb_readcd import ReadCd
+from pyscsi.pyscsi.scsi_cdb_readdiscinformation import ReadDiscInformation
+from pyscsi.pyscsi.scsi_cdb_readelementstatus import ReadElementStatus
+from pyscsi.pyscsi.scsi_cdb_receive_copy_results import (
+    ReceiveCopyResultsCopyStatus,
+    ReceiveCopyResultsCopyStatusLID4,
+    ReceiveCopyResultsOperatingParameters,
+    ReceiveCopyResultsRODTokenInformation,
+)
+from pyscsi.pyscsi.scsi_cdb_report_luns import ReportLuns
+from pyscsi.pyscsi.scsi_cdb_report_priority import ReportPriority
+from pyscsi.pyscsi.scsi_cdb_report_target_port_groups import ReportTargetPortGroups
+from pyscsi.pyscsi.scsi_cdb_synchronize_cache10 import SynchronizeCache10
+from pyscsi.pyscsi.scsi_cdb_synchronize_cache16 import SynchronizeCache16
+from pyscsi.pyscsi.scsi_cdb_testunitready import TestUnitReady
+from pyscsi.pyscsi.scsi_cdb_unmap import Unmap
+from pyscsi.pyscsi.scsi_cdb_write10 import Write10
+from pyscsi.pyscsi.scsi_cdb_write12 import Write12
+from pyscsi.pyscsi.scsi_cdb_write16 import Write16
+from pyscsi.pyscsi.scsi_cdb_write_using_token import WriteUsingToken
+from pyscsi.pyscsi.scsi_cdb_writesame10 import WriteSame10
+from pyscsi.pyscsi.scsi_cdb_writesame16 import WriteSame16
 from pyscsi.pyscsi.scsi_opcode import OpCode
 from pyscsi.utils.enum import Enum
 
@@ -118,6 +170,35 @@ sa_persistent_reserve_out = {
     "REPLACE_LOST_REGISTRATION": 0x08,
 }
 
+"""
+------------------------------------------------------------------------------
+Extended Copy (Third-party Copy Out) Service Actions
+------------------------------------------------------------------------------
+"""
+sa_extended_copy = {
+    "EXTENDED_COPY_LID1": 0x00,
+    "EXTENDED_COPY_LID4": 0x01,
+    "POPULATE_TOKEN": 0x10,
+    "WRITE_USING_TOKEN": 0x11,
+    "COPY_OPERATION_ABORT": 0x1C,
+}
+
+"""
+------------------------------------------------------------------------------
+Receive Copy Results Service Actions
+------------------------------------------------------------------------------
+"""
+sa_receive_copy_results = {
+    "COPY_STATUS": 0x00,
+    "RECEIVE_DATA": 0x01,
+    "OPERATING_PARAMETERS": 0x03,
+    "FAILED_SEGMENT_DETAILS": 0x04,
+    "COPY_STATUS_LID4": 0x05,
+    "RECEIVE_DATA_LID4": 0x06,
+    "ROD_TOKEN_INFORMATION": 0x07,
+    "REPORT_ALL_ROD_TOKENS": 0x08,
+}
+
 """
 ------------------------------------------------------------------------------
 opcode Dictionaries
@@ -129,7 +210,7 @@ spc_opcodes = {
     "SPC_OPCODE_A3": OpCode("SPC_OPCODE_A3", 0xA3, service_actions),
     "ACCESS_CONTROL_IN": OpCode("ACCESS_CONTROL_IN", 0x86, {}),
     "ACCESS_CONTROL_OUT": OpCode("ACCESS_CONTROL_OUT", 0x87, {}),
-    "EXTENDED_COPY": OpCode("EXTENDED_COPY", 0x83, {}),
+    "EXTENDED_COPY": OpCode("EXTENDED_COPY", 0x83, sa_extended_copy),
     "INQUIRY": OpCode("INQUIRY", 0x12, {}),
     "LOG_SELECT": OpCode("LOG_SELECT", 0x4C, {}),
     "LOG_SENSE": OpCode("LOG_SENSE", 0x4D, {}),
@@ -154,7 +235,9 @@ spc_opcodes = {
             "READ_MEDIA_SERIAL_NUMBER": 0x01,
         },
     ),
-    "RECEIVE_COPY_RESULTS": OpCode("RECEIVE_COPY_RESULTS", 0x84, {}),
+    "RECEIVE_COPY_RESULTS": OpCode(
+        "RECEIVE_COPY_RESULTS", 0x84, sa_receive_copy_results
+    ),
     "RECEIVE_DIAGNOSTIC_RESULTS": OpCode("RECEIVE_DIAGNOSTIC_RESULTS", 0x1C, {}),
     "REPORT_LUNS": OpCode("REPORT_LUNS", 0xA0, {}),
     "REQUEST_SENSE": OpCode("REQUEST_SENSE", 0x03, {}),
@@ -174,7 +257,7 @@ sbc_opcodes = {
     "ATA_PASS_THROUGH_12": OpCode("ATA_PASS_THROUGH_12", 0xA1, {}),
     "ATA_PASS_THROUGH_16": OpCode("ATA_PASS_THROUGH_16", 0x85, {}),
     "COMPARE_AND_WRITE": OpCode("COMPARE_AND_WRITE", 0x89, {}),
-    "EXTENDED_COPY": OpCode("EXTENDED_COPY", 0x83, {}),
+    "EXTENDED_COPY": OpCode("EXTENDED_COPY", 0x83, sa_extended_copy),
     "FORMAT_UNIT": OpCode("FORMAT_UNIT", 0x04, {}),
     "INQUIRY": OpCode("INQUIRY", 0x12, {}),
     "LOG_SELECT": OpCode("LOG_SELECT", 0x4C, {}),
@@ -214,7 +297,9 @@ sbc_opcodes = {
         },
     ),
     "REASSIGN_BLOCKS": OpCode("REASSIGN_BLOCKS", 0x07, {}),
-    "RECEIVE_COPY_RESULTS": OpCode("RECEIVE_COPY_RESULTS", 0x84, {}),
+    "RECEIVE_COPY_RESULTS": OpCode(
+        "RECEIVE_COPY_RESULTS", 0x84, sa_receive_copy_results
+    ),
     "RECEIVE_DIAGNOSTIC_RESULTS": OpCode("RECEIVE_DIAGNOSTIC_RESULTS", 0x1C, {}),
     "REDUNDANCY_GROUP_IN": OpCode("REDUNDANCY_GROUP_IN", 0xBA, {}),
     "REDUNDANCY_GROUP_OUT": OpCode("REDUNDANCY_GROUP_OT", 0xBB, {}),
@@ -276,7 +361,7 @@ ssc_opcodes = {
     "ACCESS_CONTROL_IN": OpCode("ACCESS_CONTROL_IN", 0x86, {}),
     "ACCESS_CONTROL_OUT": OpCode("ACCESS_CONTROL_OUT", 0x87, {}),
     "ERASE_16": OpCode("ERASE_16", 0x93, {}),
-    "EXTENDED_COPY": OpCode("EXTENDED_COPY", 0x83, {}),
+    "EXTENDED_COPY": OpCode("EXTENDED_COPY", 0x83, sa_extended_copy),
     "FORMAT_MEDIUM": OpCode("FORMAT_MEDIUM", 0x04, {}),
     "INQUIRY": OpCode("INQUIRY", 0x12, {}),
     "LOAD_UNLOAD": OpCode("LOAD_UNLOAD", 0x1B, {}),
@@ -301,7 +386,9 @@ ssc_opcodes = {
     "READ_POSITION": OpCode("READ_POSITION", 0x34, {}),
     "READ_REVERSE_6": OpCode("READ_REVERSE_6", 0x0F, {}),
     "READ_REVERSE_16": OpCode("READ_REVERSE_16", 0x81, {}),
-    "RECEIVE_COPY_RESULTS": OpCode("RECEIVE_COPY_RESULTS", 0x84, {}),
+    "RECEIVE_COPY_RESULTS": OpCode(
+        "RECEIVE_COPY_RESULTS", 0x84, sa_receive_copy_results
+    ),
     "RECEIVE_DIAGNOSTIC_RESULTS": OpCode("RECEIVE_DIAGNOSTIC_RESULTS", 0x1C, {}),
     "RECOVER_BUFFERED_DATA": OpCode("RECOVER_BUFFERED_DATA", 0x14, {}),
     "REPORT_ALIAS": OpCode(
@@ -474,6 +561,207 @@ ssc = Enum(ssc_opcodes)
 smc = Enum(smc_opcodes)
 mmc = Enum(mmc_opcodes)
 
+"""
+------------------------------------------------------------------------------
+Dispatch tables
+------------------------------------------------------------------------------
+"""
+
+# the opcodes of each peripheral device type
+device_type_opcodes = MappingProxyType(
+    {
+        0x00: sbc,
+        0x04: sbc,
+        0x07: sbc,
+        0x01: ssc,
+        0x02: ssc,
+        0x09: ssc,
+        0x03: spc,
+        0x08: smc,
+        0x05: mmc,
+    }
+)
+
+# the service actions of the OpCodes sharing the service_actions dict that
+# belong to each opcode value
+_shared_service_actions = {
+    0x1B: ("OPEN_IMPORTEXPORT_ELEMENT", "CLOSE_IMPORTEXPORT_ELEMENT"),
+    0x7F: (
+        "XDREAD_32",
+        "XDWRITE_32",
+        "XPWRITE_32",
+        "XDWRITEREAD_32",
+        "READ_32",
+        "VERIFY_32",
+        "WRITE_32",
+        "WRITE_AND_VERIFY_32",
+        "WRITE_SAME_32",
+        "ORWRITE_32",
+    ),
+    0x9E: ("READ_CAPACITY_16", "GET_LBA_STATUS", "REPORT_REFERRALS"),
+    0xA3: (
+        "REPORT_DEVICE_IDENTIFIER",
+        "REPORT_IDENTIFYING_INFORMATION",
+        "REQUEST_DATA_TRANSFER_ELEMENT_INQUIRY",
+        "REPORT_TARGET_PORT_GROUPS",
+        "REPORT_ALIASES",
+        "REPORT_SUPPORTED_OPERATION_CODES",
+        "REPORT_SUPPORTED_TASK_MANAGEMENT_FUNCTIONS",
+        "REPORT_PRIORITY",
+        "REPORT_TIMESTAMP",
+    ),
+    0xA4: (
+        "SET_DEVICE_IDENTIFIER",
+        "SET_IDENTIFYING_INFORMATION",
+        "SET_TARGET_PORT_GROUPS",
+        "CHANGE_ALIASES",
+        "SET_PRIORITY",
+        "SET_TIMESTAMP",
+    ),
+}
+
+# the command classes, by the name of their opcode or of their service action
+_command_classes = {
+    "ATA_PASS_THROUGH_12": ATAPassThrough12,
+    "ATA_PASS_THROUGH_16": ATAPassThrough16,
+    "CLOSE_IMPORTEXPORT_ELEMENT": OpenCloseImportExportElement,
+    "COPY_STATUS": ReceiveCopyResultsCopyStatus,
+    "COPY_STATUS_LID4": ReceiveCopyResultsCopyStatusLID4,
+    "EXCHANGE_MEDIUM": ExchangeMedium,
+    "EXTENDED_COPY_LID1": ExtendedCopy4,
+    "EXTENDED_COPY_LID4": ExtendedCopy5,
+    "GET_LBA_STATUS": GetLBAStatus,
+    "INITIALIZE_ELEMENT_STATUS": InitializeElementStatus,
+    "INITIALIZE_ELEMENT_STATUS_WITH_RANGE": InitializeElementStatusWithRange,
+    "INQUIRY": Inquiry,
+    "MODE_SELECT_6": ModeSelect6,
+    "MODE_SELECT_10": ModeSelect10,
+    "MODE_SENSE_6": ModeSense6,
+    "MODE_SENSE_10": ModeSense10,
+    "MOVE_MEDIUM": MoveMedium,
+    "OPEN_IMPORTEXPORT_ELEMENT": OpenCloseImportExportElement,
+    "OPERATING_PARAMETERS": ReceiveCopyResultsOperatingParameters,
+    "PERSISTENT_RESERVE_IN": PersistentReserveIn,
+    "PERSISTENT_RESERVE_OUT": PersistentReserveOut,
+    "POPULATE_TOKEN": PopulateToken,
+    "POSITION_TO_ELEMENT": PositionToElement,
+    "PREVENT_ALLOW_MEDIUM_REMOVAL": PreventAllowMediumRemoval,
+    "READ_10": Read10,
+    "READ_12": Read12,
+    "READ_16": Read16,
+    "READ_CAPACITY": ReadCapacity10,
+    "READ_CAPACITY_10": ReadCapacity10,
+    "READ_CAPACITY_16": ReadCapacity16,
+    "READ_CD": ReadCd,
+    "READ_DISC_INFORMATION": ReadDiscInformation,
+    "READ_ELEMENT_STATUS": ReadElementStatus,
+    "REPORT_LUNS": ReportLuns,
+    "REPORT_PRIORITY": ReportPriority,
+    "REPORT_TARGET_PORT_GROUPS": ReportTargetPortGroups,
+    "ROD_TOKEN_INFORMATION": ReceiveCopyResultsRODTokenInformation,
+    "SYNCHRONIZE_CACHE": SynchronizeCache10,
+    "SYNCHRONIZE_CACHE_10": SynchronizeCache10,
+    "SYNCHRONIZE_CACHE_16": SynchronizeCache16,
+    "TEST_UNIT_READY": TestUnitReady,
+    "UNMAP": Unmap,
+    "WRITE_10": Write10,
+    "WRITE_12": Write12,
+    "WRITE_16": Write16,
+    "WRITE_SAME_10": WriteSame10,
+    "WRITE_SAME_16": WriteSame16,
+    "WRITE_USING_TOKEN": WriteUsingToken,
+}
+
+
+class Dispatch(NamedTuple):
+    """
+    What a dispatch table knows about a command
+
+    service_action is None for commands without one, command is the
+    SCSICommand class building the command, or None if there is none yet.
+    """
+
+    opcode: OpCode
+    service_action: Optional[int]
+    command: Optional[type]
+
+
+def _build_dispatch(members):
+    """
+    build the dispatch table of an Enum of opcodes
+
+    :param members: a dict mapping names to OpCode objects
+    :return: a read-only dict mapping (opcode value, service action) tuples
+             and command names to Dispatch tuples
+    """
+    shared = list(service_actions)
+    table = {}
+    for name, opcode in members.items():
+        entry = Dispatch(opcode, None, _command_classes.get(name))
+        table.setdefault((opcode.value, None), entry)
+        table.setdefault(name, entry)
+        sa_names = opcode.serviceaction.keys
+        if sa_names == shared:
+            sa_names = _shared_service_actions.get(opcode.value, ())
+        for sa_name in sa_names:
+            sa = getattr(opcode.serviceaction, sa_name)
+            command = _command_classes.get(sa_name, entry.command)
+            entry_sa = Dispatch(opcode, sa, command)
+            table.setdefault((opcode.value, sa), entry_sa)
+            table.setdefault(sa_name, entry_sa)
+    return MappingProxyType(table)
+
+
+def dispatch_table(opcodes):
+    """
+    the dispatch table of an Enum of opcodes
+
+    The table maps (opcode value, service action) tuples, with None as the
+    service action of commands without one, and the names of opcodes and
+    of service actions to Dispatch tuples. When two OpCodes share a key
+    the first one wins, so the generic opcodes like SBC_OPCODE_A3 come
+    before the commands they share a value with. The table is built once
+    and rebuilt only after the Enum changed.
+
+    :param opcodes: an Enum of OpCode objects, like sbc
+    :return: a read-only dict
+    """
+    return opcodes.derive("dispatch", _build_dispatch)
+
+
+def dispatch(device_type, opcode, service_action=None):
+    """
+    look up a command of a peripheral device type by opcode value
+
+    :param device_type: the peripheral device type
+    :param opcode: the opcode value
+    :param service_action: the service action, None for commands without one
+    :return: a Dispatch tuple, None if the device type has no such command
+    """
+    opcodes = device_type_opcodes.get(device_type)
+    if opcodes is None:
+        return None
+    return dispatch_table(opcodes).get((opcode, service_action))
+
+
+def supports(device_type, command):
+    """
+    whether the opcodes of a peripheral device type include a command
+
+    :param device_type: the peripheral device type
+    :param command: the name of an opcode or a service action, like
+                    "READ_16" or "GET_LBA_STATUS"
+    :return: a bool
+    """
+    opcodes = device_type_opcodes.get(device_type)
+    return opcodes is not None and command in dispatch_table(opcodes)
+
+
+# build the tables at import, so no command pays for it
+for _opcodes in (spc, sbc, ssc, smc, mmc):
+    dispatch_table(_opcodes)
+del _opcodes
+
 """
 ------------------------------------------------------------------------------
 Obsolete Dictionaries and Enums
@@ -20,6 +20,7 @@ __all__ = [
     "DESIGNATOR",
     "NAA",
     "VPD",
+    "THIRD_PARTY_COPY_DESCRIPTOR",
 ]
 #
 # Provisioning type
@@ -200,3 +201,22 @@ _vpds = {
 }
 
 VPD = Enum(_vpds)
+
+#
+# Third-party copy descriptor types of the Third-party Copy VPD page
+#
+
+_third_party_copy_descriptors = {
+    "BLOCK_DEVICE_ROD_TOKEN_LIMITS": 0x0000,
+    "SUPPORTED_COMMANDS": 0x0001,
+    "PARAMETER_DATA": 0x0004,
+    "SUPPORTED_DESCRIPTORS": 0x0008,
+    "SUPPORTED_CSCD_DESCRIPTOR_IDS": 0x000C,
+    "ROD_TOKEN_FEATURES": 0x0106,
+    "SUPPORTED_ROD_TYPES": 0x0108,
+    "GENERAL_COPY_OPERATIONS": 0x8001,
+    "STREAM_COPY_OPERATIONS": 0x9101,
+    "HELD_DATA": 0xC001,
+}
+
+THIRD_PARTY_COPY_DESCRIPTOR = Enum(_third_party_copy_descriptors)
@@ -0,0 +1,38 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+__all__ = [
+    "COPY_MANAGER_STATUS",
+    "COPY_OPERATION_STATUS",
+]
+
+from pyscsi.utils.enum import Enum
+
+#
+# COPY MANAGER STATUS of RECEIVE COPY STATUS(LID1)
+#
+_copy_manager_status = {
+    "IN_PROGRESS": 0x00,
+    "COMPLETED": 0x01,
+    "COMPLETED_WITH_ERRORS": 0x02,
+}
+
+#
+# COPY OPERATION STATUS of RECEIVE COPY STATUS(LID4)
+#
+_copy_operation_status = {
+    "COMPLETED": 0x01,
+    "COMPLETED_WITH_ERRORS": 0x02,
+    "COMPLETED_PARTIAL_ROD_TOKEN_USAGE": 0x03,
+    "COMPLETED_RESIDUAL_DATA": 0x04,
+    "IN_PROGRESS_FOREGROUND": 0x10,
+    "IN_PROGRESS_BACKGROUND": 0x11,
+    "IN_PROGRESS": 0x12,
+    "TERMINATED": 0x60,
+}
+
+COPY_MANAGER_STATUS = Enum(_copy_manager_status)
+COPY_OPERATION_STATUS = Enum(_copy_operation_status)
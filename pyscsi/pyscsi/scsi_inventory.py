@@ -0,0 +1,250 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+from pyscsi.pyscsi import scsi_enum_modesense as MODESENSE6
+from pyscsi.pyscsi.scsi_enum_readelementstatus import ELEMENT_TYPE
+
+#
+# An element inventory of a medium changer, kept up to date incrementally
+#
+
+# the element types in the order of the Element Address Assignment mode page,
+# with the prefix of their fields in the page
+_assignment_fields = (
+    (getattr(ELEMENT_TYPE, "MEDIUM_TRANSPORT"), "medium_transport"),
+    (getattr(ELEMENT_TYPE, "STORAGE"), "storage"),
+    (getattr(ELEMENT_TYPE, "IMPORT_EXPORT"), "import"),
+    (getattr(ELEMENT_TYPE, "DATA_TRANSFER"), "data_transfer"),
+)
+
+
+class ElementInventory(object):
+    """
+    A slot map of a medium changer
+
+    The status of all elements is read with READ ELEMENT STATUS commands of at
+    most alloclen bytes each, and kept in a map keyed by element address.
+    move() and exchange() only re-read the elements the command touched, so
+    the map stays current without rescanning the library:
+
+        inv = ElementInventory(SCSI(init_device("/dev/sg3")))
+        inv.refresh()
+        slot = inv.find(b"VOL001L6")
+        inv.move(slot, inv.elements(ELEMENT_TYPE.DATA_TRANSFER)[0].element_address)
+    """
+
+    def __init__(self, s, alloclen=65536, voltag=1, dvcid=0):
+        """
+        initialize a new instance
+
+        :param s: a SCSI object of a medium changer
+        :param alloclen: the allocation length of each READ ELEMENT STATUS
+        :param voltag: 1 to read the volume tags
+        :param dvcid: 1 to read the device identifiers of data transfer elements
+        """
+        self._scsi = s
+        self._alloclen = alloclen
+        self._voltag = voltag
+        self._dvcid = dvcid
+        self._assignment = None
+        # element address -> ElementDescriptor
+        self._elements = {}
+        # element address -> element type
+        self._types = {}
+        # elements per READ ELEMENT STATUS, learned from the first response
+        self._per_command = 0
+
+    @property
+    def assignment(self):
+        """
+        the address ranges of the element types
+
+        :return: a dict mapping element types to (first address, number of elements)
+        """
+        if self._assignment is None:
+            page = self._scsi.modesense6(
+                page_code=MODESENSE6.PAGE_CODE.ELEMENT_ADDRESS_ASSIGNMENT
+            ).result["mode_pages"][0]
+            self._assignment = {
+                element_type: (
+                    page["first_%s_element_address" % prefix],
+                    page["num_%s_elements" % prefix],
+                )
+                for element_type, prefix in _assignment_fields
+            }
+        return self._assignment
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __contains__(self, address):
+        return address in self._elements
+
+    def __getitem__(self, address):
+        return self._elements[address]
+
+    def __iter__(self):
+        return iter(sorted(self._elements))
+
+    def element_type(self, address):
+        """
+        the type of an element in the map
+
+        :param address: an element address
+        :return: an ELEMENT_TYPE value
+        """
+        return self._types[address]
+
+    def elements(self, element_type=ELEMENT_TYPE.ALL):
+        """
+        the elements in the map, ordered by address
+
+        :param element_type: the type of elements to return, ALL for every element
+        :return: a list of ElementDescriptor records
+        """
+        return [
+            self._elements[address]
+            for address in sorted(self._elements)
+            if element_type == ELEMENT_TYPE.ALL or self._types[address] == element_type
+        ]
+
+    def find(self, volume_tag):
+        """
+        find the element holding a volume
+
+        :param volume_tag: the primary volume tag, trailing blanks are ignored
+        :return: an element address, None if no element holds the volume
+        """
+        volume_tag = bytes(volume_tag).rstrip(b" \0")
+        for address in sorted(self._elements):
+            element = self._elements[address]
+            tag = element.get("primary_volume_tag")
+            if element["full"] and tag and tag[:32].rstrip(b" \0") == volume_tag:
+                return address
+        return None
+
+    def refresh(self, element_type=ELEMENT_TYPE.ALL):
+        """
+        read the status of all elements, or of all elements of a type
+
+        :param element_type: the type of elements to read, ALL for every element
+        :return: a list with the addresses of the elements that changed
+        """
+        changed = []
+        for _type, (first, num) in self.assignment.items():
+            if num and element_type in (ELEMENT_TYPE.ALL, _type):
+                changed += self._read(_type, first, num)
+        return changed
+
+    def update(self, addresses):
+        """
+        re-read the status of some elements
+
+        Consecutive addresses of the same type are read with one command.
+
+        :param addresses: an iterable of element addresses
+        :return: a list with the addresses of the elements that changed
+        """
+        changed = []
+        run = []
+        run_type = None
+        for address in sorted(set(addresses)):
+            _type = self._types.get(address, ELEMENT_TYPE.ALL)
+            if run and (address != run[-1] + 1 or _type != run_type):
+                changed += self._read(run_type, run[0], len(run))
+                run = []
+            run_type = _type
+            run.append(address)
+        if run:
+            changed += self._read(run_type, run[0], len(run))
+        return changed
+
+    def transport(self):
+        """
+        the medium transport element used when none is given
+
+        :return: an element address
+        """
+        return self.assignment[ELEMENT_TYPE.MEDIUM_TRANSPORT][0]
+
+    def move(self, source, dest, xfer=None, invert=0):
+        """
+        move a medium and update the elements involved
+
+        :param source: the source element address
+        :param dest: the destination element address
+        :param xfer: the medium transport element address, None for the first one
+        :param invert: 1 to invert the medium
+        :return: a list with the addresses of the elements that changed
+        """
+        if xfer is None:
+            xfer = self.transport()
+        self._scsi.movemedium(xfer, source, dest, invert=invert)
+        return self.update((xfer, source, dest))
+
+    def exchange(self, source, dest1, dest2, xfer=None, inv1=0, inv2=0):
+        """
+        exchange media and update the elements involved
+
+        The medium in source is moved to dest1, the medium in dest1 to dest2.
+
+        :param source: the source element address
+        :param dest1: the first destination element address
+        :param dest2: the second destination element address
+        :param xfer: the medium transport element address, None for the first one
+        :param inv1: 1 to invert the medium moved to dest1
+        :param inv2: 1 to invert the medium moved to dest2
+        :return: a list with the addresses of the elements that changed
+        """
+        if xfer is None:
+            xfer = self.transport()
+        self._scsi.exchangemedium(xfer, source, dest1, dest2, inv1=inv1, inv2=inv2)
+        return self.update((xfer, source, dest1, dest2))
+
+    def _read(self, element_type, start, num):
+        """
+        read num elements from start, in as many commands as alloclen requires
+
+        A response cut short by the allocation length is continued after the
+        last element it holds, later commands only ask for as many elements as
+        the first response held.
+
+        :param element_type: the type of elements to read
+        :param start: the first element address
+        :param num: the number of elements
+        :return: a list with the addresses of the elements that changed
+        """
+        changed = []
+        while num > 0:
+            count = min(num, self._per_command) if self._per_command else num
+            result = self._scsi.readelementstatus(
+                start,
+                count,
+                element_type=element_type,
+                voltag=self._voltag,
+                dvcid=self._dvcid,
+                alloclen=self._alloclen,
+            ).result
+            got = 0
+            last = start - 1
+            for page in result["element_status_pages"]:
+                for element in page["element_descriptors"]:
+                    address = element["element_address"]
+                    if self._elements.get(address) != element:
+                        changed.append(address)
+                    self._elements[address] = element
+                    self._types[address] = page["element_type"]
+                    last = max(last, address)
+                    got += 1
+            available = result["num_elements"]
+            if not got or (got < count and got >= available):
+                # no more elements in the range
+                break
+            if got < available and not self._per_command:
+                self._per_command = got
+            start = last + 1
+            num -= got
+        return changed
@@ -0,0 +1,599 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import errno
+import itertools
+import time
+import weakref
+from collections import deque
+from typing import Any
+
+from pyscsi.pyscsi.scsi_cdb_inquiry import Inquiry
+from pyscsi.pyscsi.scsi_copy import CopyStats
+from pyscsi.pyscsi.scsi_enum_inquiry import (
+    ASSOCIATION,
+    DESIGNATOR,
+    THIRD_PARTY_COPY_DESCRIPTOR,
+    VPD,
+)
+from pyscsi.pyscsi.scsi_enum_receivecopyresults import COPY_OPERATION_STATUS
+from pyscsi.pyscsi.scsi_sense import SCSICheckCondition
+
+#
+# Copies offloaded to the copy manager of a storage array
+#
+
+# what a copy manager is assumed to handle if nothing better is known, the
+# names follow the fields of the RECEIVE COPY OPERATING PARAMETERS data
+DEFAULT_LIMITS = {
+    "maximum_cscd_descriptor_count": 2,
+    "maximum_segment_descriptor_count": 1,
+    "maximum_descriptor_list_length": 1024,
+    "maximum_segment_length": 0,
+    "maximum_concurrent_copies": 1,
+}
+
+# the designator types usable in an Identification Descriptor CSCD descriptor,
+# most preferred first
+_designator_preference = (
+    getattr(DESIGNATOR, "NAA"),
+    getattr(DESIGNATOR, "EUI_64"),
+    getattr(DESIGNATOR, "MD5_LOGICAL_IDENTIFIER"),
+    getattr(DESIGNATOR, "T10_VENDOR_ID"),
+)
+
+# a CSCD descriptor leaves 20 bytes for the designator
+_max_designator_length = 20
+
+# the length of a CSCD descriptor and of a block to block segment descriptor
+_cscd_length = 32
+_segment_length = 28
+
+# the NUMBER OF BLOCKS field of a block to block segment descriptor is 16 bits
+_max_segment_blocks = 0xFFFF
+
+# list identifiers for EXTENDED COPY(LID4) commands of this process
+_list_identifiers = itertools.count(1)
+
+# device -> CopyCapabilities, see copy_capabilities()
+_capabilities: "weakref.WeakKeyDictionary[Any, CopyCapabilities]" = (
+    weakref.WeakKeyDictionary()
+)
+
+# what a copy manager without a Third-party Copy VPD page is assumed to handle
+# for token copies, the names follow the Block Device ROD Token Limits fields
+DEFAULT_TOKEN_LIMITS = {
+    "maximum_range_descriptors": 8,
+    "maximum_token_transfer_size": 0,
+    "optimal_transfer_count": 0,
+}
+
+# the NUMBER OF LOGICAL BLOCKS field of a block device range descriptor is 32
+# bits, and the descriptor list length of a POPULATE TOKEN command 16 bits
+_max_range_blocks = 0xFFFFFFFF
+_max_range_descriptors = (0xFFFF - 14) // 16
+
+# the power of two of the transfer count units up to exbibytes, the logical
+# block unit is F1h
+_transfer_count_shifts = (0, 10, 20, 30, 40, 50, 60)
+_transfer_count_blocks = 0xF1
+
+# the descriptor type codes extended_copy uses: an Identification Descriptor
+# CSCD descriptor and a block to block segment descriptor
+_required_descriptor_type_codes = (0xE4, 0x02)
+
+
+class CopyCapabilities(object):
+    """
+    What the copy manager of a logical unit can do
+
+    Built from the RECEIVE COPY RESULTS operating parameters. A copy manager
+    that does not report them is assumed to handle DEFAULT_LIMITS only.
+    """
+
+    def __init__(self, parameters=None):
+        """
+        initialize a new instance
+
+        :param parameters: the unmarshalled OPERATING PARAMETERS data, None if
+                           the copy manager does not report them
+        """
+        self.parameters = parameters
+        self.limits = dict(DEFAULT_LIMITS)
+        self.descriptor_type_codes = ()
+        if parameters is not None:
+            self.limits.update(
+                (key, parameters[key]) for key in DEFAULT_LIMITS if key in parameters
+            )
+            self.descriptor_type_codes = tuple(
+                parameters["implemented_descriptor_type_codes"]
+            )
+
+    def __repr__(self):
+        return "CopyCapabilities(%r)" % self.limits
+
+    @property
+    def reported(self):
+        """
+        whether the copy manager reported its operating parameters
+        """
+        return self.parameters is not None
+
+    @property
+    def data_segment_granularity(self):
+        """
+        the granularity of segment lengths in bytes
+        """
+        if self.parameters is None:
+            return 1
+        return 1 << self.parameters["data_segment_granularity"]
+
+    def supports(self, descriptor_type_code):
+        """
+        whether the copy manager implements a CSCD or segment descriptor type
+
+        A copy manager not listing its descriptor types is assumed to
+        implement all of them.
+
+        :param descriptor_type_code: a descriptor type code
+        :return: a bool
+        """
+        codes = self.descriptor_type_codes
+        return not codes or descriptor_type_code in codes
+
+
+def copy_capabilities(s, refresh=False):
+    """
+    the capabilities of the copy manager of a logical unit
+
+    The operating parameters are only fetched once per device.
+
+    :param s: a SCSI object
+    :param refresh: fetch the operating parameters again
+    :return: a CopyCapabilities object
+    """
+    capabilities = _capabilities.get(s.device)
+    if capabilities is not None and not refresh:
+        return capabilities
+    opcode = s.device.opcodes.RECEIVE_COPY_RESULTS
+    try:
+        parameters = s.receivecopyresults(
+            opcode.serviceaction.OPERATING_PARAMETERS
+        ).result
+    except SCSICheckCondition:
+        # no RECEIVE COPY RESULTS, or no OPERATING PARAMETERS
+        parameters = None
+    capabilities = CopyCapabilities(parameters)
+    _capabilities[s.device] = capabilities
+    return capabilities
+
+
+def lun_designator(s):
+    """
+    the designation descriptor identifying a logical unit to a copy manager
+
+    :param s: a SCSI object
+    :return: a dict with code_set, association, designator_type and designator
+    """
+    page = s.vpd(VPD.DEVICE_IDENTIFICATION)
+    candidates = {}
+    for d in page.get("designator_descriptors", []):
+        if d["association"] != ASSOCIATION.ASSOCIATED_WITH_LUN:
+            continue
+        designator = Inquiry.marshall_designator(d["designator_type"], d["designator"])
+        if designator is None or len(designator) > _max_designator_length:
+            continue
+        candidates.setdefault(d["designator_type"], d)
+    for designator_type in _designator_preference:
+        if designator_type in candidates:
+            d = candidates[designator_type]
+            return {
+                "code_set": d["code_set"],
+                "association": d["association"],
+                "designator_type": d["designator_type"],
+                "designator": d["designator"],
+            }
+    raise ValueError("%s has no logical unit designator usable for copies" % s)
+
+
+def block_cscd(designator, blocksize=0):
+    """
+    an Identification Descriptor CSCD descriptor of a block device
+
+    :param designator: a dict as returned by lun_designator
+    :param blocksize: the logical block length, 0 to let the copy manager find it
+    :return: a dict for the cscd_descriptor_list of ExtendedCopy5
+    """
+    return {
+        "descriptor_type_code": 0xE4,
+        "peripheral_device_type": 0x00,
+        "cscd_descriptor_parameters": designator,
+        "device_type_specific_parameters": {"disk_block_length": blocksize},
+    }
+
+
+def _segments(ranges, source_id, destination_id, max_blocks):
+    """
+    block to block segment descriptors for (source lba, destination lba,
+    number of blocks) ranges, of at most max_blocks blocks each
+    """
+    for source_lba, destination_lba, num_blocks in ranges:
+        while num_blocks:
+            n = min(num_blocks, max_blocks)
+            yield {
+                "descriptor_type_code": 0x02,
+                "source_cscd_descriptor_id": source_id,
+                "destination_cscd_descriptor_id": destination_id,
+                "block_device_number_of_blocks": n,
+                "source_block_device_logical_block_address": source_lba,
+                "destination_block_device_logical_block_address": destination_lba,
+            }
+            source_lba += n
+            destination_lba += n
+            num_blocks -= n
+
+
+def _batches(segments, limits, cscd_count):
+    """
+    group segment descriptors into the parameter lists of EXTENDED COPY commands
+
+    :param segments: an iterator of segment descriptor dicts
+    :param limits: a dict with the operating parameters of the copy manager
+    :param cscd_count: the number of CSCD descriptors of each parameter list
+    :return: an iterator of lists of segment descriptor dicts
+    """
+    per_command = limits["maximum_segment_descriptor_count"] or 1
+    list_length = limits["maximum_descriptor_list_length"]
+    if list_length:
+        room = (list_length - cscd_count * _cscd_length) // _segment_length
+        per_command = min(per_command, max(room, 1))
+    # the SEGMENT DESCRIPTOR LIST LENGTH field is 16 bits
+    per_command = min(per_command, 0xFFFF // _segment_length)
+    batch = []
+    for segment in segments:
+        batch.append(segment)
+        if len(batch) == per_command:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def wait_for_copy(
+    s, list_identifier, poll_interval=0.05, timeout=None, service_action=None
+):
+    """
+    poll the status of an EXTENDED COPY(LID4) command until it completes
+
+    The copy manager's estimate of when the status changes next is used as
+    the polling interval when it gives one. POPULATE TOKEN and WRITE USING
+    TOKEN commands are polled the same way.
+
+    :param s: the SCSI object the EXTENDED COPY command was sent to
+    :param list_identifier: the list identifier of the command
+    :param poll_interval: seconds between polls if the copy manager has no estimate
+    :param timeout: seconds to wait at most, None to wait forever
+    :param service_action: the RECEIVE COPY RESULTS service action to poll
+                           with, None for RECEIVE COPY STATUS(LID4)
+    :return: the unmarshalled RECEIVE COPY RESULTS data
+    """
+    opcode = s.device.opcodes.RECEIVE_COPY_RESULTS
+    if service_action is None:
+        service_action = opcode.serviceaction.COPY_STATUS_LID4
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        r = s.receivecopyresults(service_action, list_identifier).result
+        status = r["copy_operation_status"]
+        if not (
+            COPY_OPERATION_STATUS.IN_PROGRESS_FOREGROUND
+            <= status
+            <= COPY_OPERATION_STATUS.IN_PROGRESS
+        ):
+            break
+        delay = r["estimated_status_update_delay"] / 1000.0 or poll_interval
+        if deadline is not None:
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(
+                    "copy %d still in progress after %s seconds"
+                    % (list_identifier, timeout)
+                )
+        time.sleep(delay)
+
+    if status in (
+        COPY_OPERATION_STATUS.COMPLETED_WITH_ERRORS,
+        COPY_OPERATION_STATUS.TERMINATED,
+    ):
+        if r["sense"]:
+            raise SCSICheckCondition(r["sense"])
+        raise OSError(
+            errno.EIO,
+            "copy %d failed after %d segments"
+            % (list_identifier, r["segments_processed"]),
+        )
+    return r
+
+
+def extended_copy(
+    s,
+    source,
+    destination,
+    ranges,
+    blocksize=0,
+    limits=None,
+    poll_interval=0.05,
+    timeout=None,
+    progress=None,
+):
+    """
+    copy block ranges between logical units with EXTENDED COPY
+
+    The data moves inside the storage array, the host only sends the
+    parameter lists. Ranges are split into block to block segment
+    descriptors, and the segments are batched into as few EXTENDED
+    COPY(LID4) commands as the operating parameters the copy manager reports
+    with RECEIVE COPY RESULTS allow. Commands are
+    sent with the IMMED bit, up to maximum_concurrent_copies at a time, and
+    their progress is polled with RECEIVE COPY STATUS(LID4):
+
+        s = SCSI(init_device("/dev/sg3"))
+        extended_copy(s, s, SCSI(init_device("/dev/sg4")), [(0, 0, 1 << 21)])
+
+    :param s: the SCSI object of the logical unit receiving the commands,
+              usually the source or the destination
+    :param source: a SCSI object or a designator dict of the source
+    :param destination: a SCSI object or a designator dict of the destination
+    :param ranges: (source lba, destination lba, number of blocks) tuples
+    :param blocksize: the logical block length, 0 to read it from s
+    :param limits: a dict overriding the limits of the copy manager, see
+                   copy_capabilities
+    :param poll_interval: seconds between polls if the copy manager has no estimate
+    :param timeout: seconds to wait for each command at most, None for no limit
+    :param progress: called with the CopyStats after every completed command
+    :return: a CopyStats object
+    """
+    capabilities = copy_capabilities(s)
+    for code in _required_descriptor_type_codes:
+        if not capabilities.supports(code):
+            raise ValueError("the copy manager lacks %02xh descriptors" % code)
+    _limits = dict(capabilities.limits)
+    _limits.update(limits or {})
+    if not blocksize:
+        blocksize = s.readcapacity16().result["block_length"]
+
+    designators = []
+    for lun in (source, destination):
+        designator = lun if isinstance(lun, dict) else lun_designator(lun)
+        if designator not in designators:
+            designators.append(designator)
+    cscds = [block_cscd(designator, blocksize) for designator in designators]
+    if len(cscds) > _limits["maximum_cscd_descriptor_count"]:
+        raise ValueError("the copy manager cannot copy between logical units")
+    source_id = 0
+    destination_id = len(cscds) - 1
+
+    max_blocks = _max_segment_blocks
+    if _limits["maximum_segment_length"]:
+        max_blocks = min(max_blocks, _limits["maximum_segment_length"] // blocksize)
+    granularity = capabilities.data_segment_granularity
+    if granularity > blocksize:
+        max_blocks -= max_blocks % (granularity // blocksize)
+    if not max_blocks:
+        raise ValueError("the copy manager cannot copy a single block per segment")
+
+    stats = CopyStats(blocksize)
+    concurrent = max(_limits["maximum_concurrent_copies"], 1)
+    pending = deque()
+
+    def retire():
+        list_identifier, n = pending.popleft()
+        wait_for_copy(s, list_identifier, poll_interval, timeout)
+        stats.blocks_copied += n
+        stats.elapsed = time.monotonic() - stats.started
+        if progress is not None:
+            progress(stats)
+
+    segments = _segments(ranges, source_id, destination_id, max_blocks)
+    for batch in _batches(segments, _limits, len(cscds)):
+        while len(pending) >= concurrent:
+            retire()
+        list_identifier = next(_list_identifiers) & 0xFFFFFFFF
+        s.extendedcopy5(
+            immed=1,
+            list_identifier=list_identifier,
+            cscd_descriptor_list=cscds,
+            segment_descriptor_list=batch,
+        )
+        stats.commands += 1
+        pending.append(
+            (list_identifier, sum(d["block_device_number_of_blocks"] for d in batch))
+        )
+    while pending:
+        retire()
+    stats.elapsed = time.monotonic() - stats.started
+    return stats
+
+
+def token_limits(s):
+    """
+    the Block Device ROD Token Limits of the copy manager of a logical unit
+
+    :param s: a SCSI object
+    :return: a dict, DEFAULT_TOKEN_LIMITS if the device does not report them
+    """
+    page = s.vpd(VPD.THIRD_PARTY_COPY)
+    for d in page.get("third_party_copy_descriptors", []):
+        if (
+            d["descriptor_type"]
+            == THIRD_PARTY_COPY_DESCRIPTOR.BLOCK_DEVICE_ROD_TOKEN_LIMITS
+        ):
+            return {key: d[key] for key in DEFAULT_TOKEN_LIMITS}
+    return dict(DEFAULT_TOKEN_LIMITS)
+
+
+def _transferred_blocks(r, blocksize):
+    """
+    the TRANSFER COUNT of RECEIVE COPY RESULTS data in logical blocks
+    """
+    units = r["transfer_count_units"]
+    if units == _transfer_count_blocks:
+        return r["transfer_count"]
+    if units < len(_transfer_count_shifts):
+        return (r["transfer_count"] << _transfer_count_shifts[units]) // blocksize
+    raise ValueError("unknown transfer count units %02xh" % units)
+
+
+def _token_batch(work, max_descriptors, max_blocks):
+    """
+    take the ranges of one token off the front of the work deque
+
+    :param work: a deque of (source lba, destination lba, number of blocks)
+    :param max_descriptors: the number of range descriptors of a token
+    :param max_blocks: the number of blocks of a token, 0 for no limit
+    :return: a list of (source lba, destination lba, number of blocks) tuples
+    """
+    batch = []
+    total = 0
+    while work and len(batch) < max_descriptors:
+        source_lba, destination_lba, num_blocks = work.popleft()
+        n = min(num_blocks, _max_range_blocks)
+        if max_blocks:
+            n = min(n, max_blocks - total)
+        if n < num_blocks:
+            work.appendleft((source_lba + n, destination_lba + n, num_blocks - n))
+        batch.append((source_lba, destination_lba, n))
+        total += n
+        if total == max_blocks:
+            break
+    return batch
+
+
+def _untransferred(batch, transferred):
+    """
+    the ranges of a batch after its first transferred blocks
+    """
+    rest = []
+    for source_lba, destination_lba, num_blocks in batch:
+        if transferred >= num_blocks:
+            transferred -= num_blocks
+            continue
+        rest.append(
+            (
+                source_lba + transferred,
+                destination_lba + transferred,
+                num_blocks - transferred,
+            )
+        )
+        transferred = 0
+    return rest
+
+
+def token_copy(
+    source,
+    destination,
+    ranges,
+    blocksize=0,
+    limits=None,
+    inactivity_timeout=0,
+    poll_interval=0.05,
+    timeout=None,
+    progress=None,
+):
+    """
+    copy block ranges between logical units with ROD tokens
+
+    POPULATE TOKEN makes the copy manager of the source create a token
+    representing source ranges, and WRITE USING TOKEN makes the copy
+    manager of the destination write the data of the token, so the data
+    never passes through the host. The ranges are batched into tokens of
+    as many range descriptors and blocks as the Block Device ROD Token
+    Limits of both logical units allow. Both commands are sent with the
+    IMMED bit and polled, the token is deleted once it has been written.
+    Data a WRITE USING TOKEN command leaves unwritten goes into a new token.
+
+        src = SCSI(init_device("/dev/sg3"))
+        token_copy(src, SCSI(init_device("/dev/sg4")), [(0, 0, 1 << 21)])
+
+    :param source: a SCSI object of the logical unit to copy from
+    :param destination: a SCSI object of the logical unit to copy to
+    :param ranges: (source lba, destination lba, number of blocks) tuples
+    :param blocksize: the logical block length, 0 to read it from the source
+    :param limits: a dict overriding the token limits, see token_limits
+    :param inactivity_timeout: seconds an unused token stays valid, 0 for the
+                               default of the copy manager
+    :param poll_interval: seconds between polls if the copy manager has no estimate
+    :param timeout: seconds to wait for each command at most, None for no limit
+    :param progress: called with the CopyStats after every written token
+    :return: a CopyStats object
+    """
+    _limits = token_limits(source)
+    for key, value in token_limits(destination).items():
+        if value and (not _limits[key] or value < _limits[key]):
+            _limits[key] = value
+    _limits.update(limits or {})
+    if not blocksize:
+        blocksize = source.readcapacity16().result["block_length"]
+
+    max_descriptors = min(
+        _limits["maximum_range_descriptors"] or _max_range_descriptors,
+        _max_range_descriptors,
+    )
+    # a token of the optimal size, if the copy managers have one
+    max_blocks = _limits["maximum_token_transfer_size"]
+    optimal = _limits["optimal_transfer_count"]
+    if optimal:
+        max_blocks = min(max_blocks or optimal, optimal)
+
+    opcode = source.device.opcodes.RECEIVE_COPY_RESULTS
+    stats = CopyStats(blocksize)
+    work = deque(ranges)
+    while work:
+        batch = _token_batch(work, max_descriptors, max_blocks)
+        blocks = sum(n for _, _, n in batch)
+
+        list_identifier = next(_list_identifiers) & 0xFFFFFFFF
+        source.populatetoken(
+            list_identifier,
+            [{"lba": lba, "num_blocks": n} for lba, _, n in batch],
+            immed=1,
+            inactivity_timeout=inactivity_timeout,
+        )
+        r = wait_for_copy(
+            source,
+            list_identifier,
+            poll_interval,
+            timeout,
+            opcode.serviceaction.ROD_TOKEN_INFORMATION,
+        )
+        if r["rod_token"] is None:
+            raise OSError(
+                errno.EIO, "POPULATE TOKEN %d made no token" % list_identifier
+            )
+
+        list_identifier = next(_list_identifiers) & 0xFFFFFFFF
+        destination.writeusingtoken(
+            list_identifier,
+            r["rod_token"],
+            [{"lba": lba, "num_blocks": n} for _, lba, n in batch],
+            immed=1,
+            del_tkn=1,
+        )
+        r = wait_for_copy(destination, list_identifier, poll_interval, timeout)
+        stats.commands += 2
+
+        transferred = blocks
+        if r["copy_operation_status"] != COPY_OPERATION_STATUS.COMPLETED:
+            transferred = min(_transferred_blocks(r, blocksize), blocks)
+            if not transferred:
+                raise OSError(
+                    errno.EIO, "WRITE USING TOKEN %d wrote nothing" % list_identifier
+                )
+            work.extendleft(reversed(_untransferred(batch, transferred)))
+        stats.blocks_copied += transferred
+        stats.elapsed = time.monotonic() - stats.started
+        if progress is not None:
+            progress(stats)
+    stats.elapsed = time.monotonic() - stats.started
+    return stats
@@ -0,0 +1,188 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import errno
+from array import array
+from bisect import bisect_right
+
+from pyscsi.pyscsi.scsi_cdb_getlbastatus import GetLBAStatus
+from pyscsi.pyscsi.scsi_enum_command import dispatch_table
+from pyscsi.pyscsi.scsi_enum_getlbastatus import P_STATUS
+from pyscsi.pyscsi.scsi_submit import Submitter, concurrent
+
+#
+# A map of the provisioning status of a whole logical unit
+#
+
+
+class ProvisioningMap(object):
+    """
+    A run-length map of the provisioning status of an LBA range
+
+    Each run is an (lba, num_blocks, p_status) tuple, adjacent runs always
+    have a different status:
+
+        for lba, num_blocks, p_status in scan_provisioning(s):
+            if p_status == P_STATUS.MAPPED:
+                ...
+    """
+
+    def __init__(self, runs=()):
+        """
+        initialize a new instance
+
+        :param runs: (lba, num_blocks, p_status) tuples ordered by lba, adjacent
+                     runs of the same status are merged
+        """
+        self.lba = array("Q")
+        self.num_blocks = array("Q")
+        self.p_status = array("B")
+        for lba, num_blocks, p_status in runs:
+            self.append(lba, num_blocks, p_status)
+
+    def append(self, lba, num_blocks, p_status):
+        """
+        add a run after the last one
+
+        :param lba: the first LBA of the run
+        :param num_blocks: the number of blocks
+        :param p_status: a P_STATUS value
+        """
+        if not num_blocks:
+            return
+        if (
+            self.lba
+            and self.p_status[-1] == p_status
+            and self.lba[-1] + self.num_blocks[-1] == lba
+        ):
+            self.num_blocks[-1] += num_blocks
+            return
+        self.lba.append(lba)
+        self.num_blocks.append(num_blocks)
+        self.p_status.append(p_status)
+
+    def __len__(self):
+        return len(self.lba)
+
+    def __iter__(self):
+        return zip(self.lba, self.num_blocks, self.p_status)
+
+    def __eq__(self, other):
+        return isinstance(other, ProvisioningMap) and list(self) == list(other)
+
+    def runs(self, p_status=None):
+        """
+        the runs of a status
+
+        :param p_status: a P_STATUS value, None for all runs
+        :return: a list of (lba, num_blocks, p_status) tuples
+        """
+        return [r for r in self if p_status is None or r[2] == p_status]
+
+    def blocks(self, p_status):
+        """
+        the number of blocks of a status
+
+        :param p_status: a P_STATUS value
+        :return: an integer
+        """
+        return sum(r[1] for r in self if r[2] == p_status)
+
+    def status(self, lba):
+        """
+        the provisioning status of a block
+
+        :param lba: a logical block address
+        :return: a P_STATUS value, None if the block is not in the map
+        """
+        i = bisect_right(self.lba, lba) - 1
+        if i < 0 or lba >= self.lba[i] + self.num_blocks[i]:
+            return None
+        return self.p_status[i]
+
+
+def scan_provisioning(s, start=0, end=None, workers=None, alloclen=16384):
+    """
+    map the provisioning status of a logical unit with GET LBA STATUS
+
+    The LBA range is split into workers parts that are scanned concurrently,
+    each advancing by the extents the previous response returned. The
+    commands are run by a Submitter, so only queued and thread safe devices
+    have more than one in flight. A logical unit without logical block
+    provisioning is reported as mapped.
+
+    :param s: a SCSI object
+    :param start: the first LBA to map
+    :param end: the LBA after the last one to map, None for the end of the unit
+    :param workers: the number of parts scanned concurrently, None for 4 if
+                    the device can have several commands in flight, else 1
+    :param alloclen: the allocation length of each GET LBA STATUS command
+    :return: a ProvisioningMap
+    """
+    r = s.readcapacity16().result
+    capacity = r["returned_lba"] + 1
+    end = capacity if end is None else min(end, capacity)
+    if start >= end:
+        return ProvisioningMap()
+    if not r["lbpme"]:
+        return ProvisioningMap([(start, end - start, P_STATUS.MAPPED)])
+
+    opcode = dispatch_table(s.device.opcodes)["GET_LBA_STATUS"].opcode
+    if workers is None:
+        workers = 4 if concurrent(s.device) else 1
+    submitter = Submitter(s, workers)
+
+    def submit(lba):
+        return submitter.submit(GetLBAStatus(opcode, lba, alloclen=alloclen))
+
+    step = -(-(end - start) // max(workers, 1))
+    parts = [[lba, min(lba + step, end), []] for lba in range(start, end, step)]
+    pending = {}
+    try:
+        for i, part in enumerate(parts):
+            pending[submit(part[0])] = i
+        while pending:
+            for future in submitter.completed(list(pending)):
+                i = pending.pop(future)
+                cursor = _add_extents(parts[i], future.result().datain)
+                if cursor < parts[i][1]:
+                    pending[submit(cursor)] = i
+    finally:
+        submitter.close(pending)
+
+    result = ProvisioningMap()
+    for part in parts:
+        for lba, num_blocks, p_status in part[2]:
+            result.append(lba, num_blocks, p_status)
+    return result
+
+
+def _add_extents(part, data):
+    """
+    add the extents of a GET LBA STATUS response to a part of the scan
+
+    :param part: a list with the next LBA to scan, the end of the part and a
+                 list of the runs found so far
+    :param data: the datain of the command
+    :return: the next LBA to scan
+    """
+    cursor, end, runs = part
+    table = GetLBAStatus.unmarshall_extents(data)
+    columns = (table["lba"], table["num_blocks"], table["p_status"])
+    for lba, num_blocks, p_status in zip(*(c.tolist() for c in columns)):
+        if lba > cursor:
+            # not contiguous, continue with another command from the cursor
+            break
+        last = min(lba + num_blocks, end)
+        if last > cursor:
+            runs.append((cursor, last - cursor, p_status))
+            cursor = last
+        if cursor >= end:
+            break
+    if cursor == part[0]:
+        raise OSError(errno.EIO, "no LBA status returned for LBA %d" % cursor)
+    part[0] = cursor
+    return cursor
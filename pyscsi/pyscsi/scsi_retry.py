@@ -0,0 +1,327 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+
+from pyscsi.pyscsi.scsi_enum_command import SCSI_STATUS
+from pyscsi.pyscsi.scsi_sense import SCSICheckCondition
+
+#
+# Retrying commands that fail with a CHECK CONDITION or a transient status
+#
+
+# what to do when a rule matches
+FAIL = "fail"
+RETRY = "retry"
+BACKOFF = "backoff"
+POLL = "poll"
+
+# the exceptions the device classes raise for a status, by class name, as
+# every device class gets its own exception classes from SCSIDeviceExceptionMeta
+_status_exceptions = {
+    "ConditionsMet": getattr(SCSI_STATUS, "CONDITIONS_MET"),
+    "BusyStatus": getattr(SCSI_STATUS, "BUSY"),
+    "ReservationConflict": getattr(SCSI_STATUS, "RESERVATION_CONFLICT"),
+    "TaskSetFull": getattr(SCSI_STATUS, "TASK_SET_FULL"),
+    "ACAActive": getattr(SCSI_STATUS, "ACA_ACTIVE"),
+    "TaskAborted": getattr(SCSI_STATUS, "TASK_ABORTED"),
+}
+
+
+class RetryRule(object):
+    """
+    How a policy handles a failure
+
+    RETRY executes the command again at once, BACKOFF after a delay that
+    doubles with every attempt up to max_delay, with full jitter, POLL after
+    a fixed delay, and FAIL raises the exception.
+    """
+
+    __slots__ = ("action", "retries", "delay", "max_delay")
+
+    def __init__(self, action, retries=0, delay=0.0, max_delay=None):
+        """
+        initialize a new instance
+
+        :param action: FAIL, RETRY, BACKOFF or POLL
+        :param retries: the number of times the command is executed again
+        :param delay: seconds to wait before the first retry
+        :param max_delay: the longest backoff in seconds, default delay * 2 ** retries
+        """
+        if action not in (FAIL, RETRY, BACKOFF, POLL):
+            raise ValueError("unknown action %r" % action)
+        self.action = action
+        self.retries = retries if action != FAIL else 0
+        self.delay = delay
+        self.max_delay = max_delay
+
+    def __repr__(self):
+        return "RetryRule(%r, retries=%d, delay=%r, max_delay=%r)" % (
+            self.action,
+            self.retries,
+            self.delay,
+            self.max_delay,
+        )
+
+    def wait(self, attempt, rng=random.random):
+        """
+        the seconds to wait before a retry
+
+        :param attempt: the number of retries done so far
+        :param rng: returns a random float in [0, 1)
+        :return: a float
+        """
+        if self.action == POLL:
+            return self.delay
+        if self.action != BACKOFF:
+            return 0.0
+        delay = self.delay * (1 << attempt)
+        if self.max_delay is not None:
+            delay = min(delay, self.max_delay)
+        return delay * rng()
+
+
+# The default rules, keyed on (sense key, ASC << 8 | ASCQ) for CHECK CONDITION,
+# with None as the ASC+Q matching any, and on the SCSI_STATUS value for the
+# other statuses. Anything without a rule fails.
+default_rules = {
+    # a logical unit can queue several unit attention conditions
+    (0x06, None): RetryRule(RETRY, retries=4),
+    # CAUSE NOT REPORTABLE, BECOMING READY, OPERATION IN PROGRESS and
+    # ASYMMETRIC ACCESS STATE TRANSITION go away by themselves
+    (0x02, 0x0400): RetryRule(POLL, retries=60, delay=0.5),
+    (0x02, 0x0401): RetryRule(POLL, retries=60, delay=0.5),
+    (0x02, 0x0407): RetryRule(POLL, retries=60, delay=0.5),
+    (0x02, 0x040A): RetryRule(POLL, retries=60, delay=0.5),
+    (0x02, None): RetryRule(FAIL),
+    (0x03, None): RetryRule(FAIL),
+    (0x04, None): RetryRule(FAIL),
+    (0x0B, None): RetryRule(BACKOFF, retries=3, delay=0.01, max_delay=0.1),
+    getattr(SCSI_STATUS, "BUSY"): RetryRule(
+        BACKOFF, retries=8, delay=0.001, max_delay=0.5
+    ),
+    getattr(SCSI_STATUS, "TASK_SET_FULL"): RetryRule(
+        BACKOFF, retries=8, delay=0.001, max_delay=0.5
+    ),
+}
+
+
+def failure_key(exception):
+    """
+    the rule table key of the failure an exception reports
+
+    :param exception: an exception raised by the execute method of a device
+    :return: a (sense key, ASC+Q) tuple, a SCSI_STATUS value or None
+    """
+    if isinstance(exception, SCSICheckCondition):
+        record = exception.record
+        return record.key, (record.asc << 8) | record.ascq
+    return _status_exceptions.get(type(exception).__name__)
+
+
+class RetryStats(object):
+    """
+    What a policy did for one device
+
+    The retry budget is a token bucket: every command that completes adds
+    ratio tokens, up to minimum + ratio * 100, and every retry takes one.
+    Once the bucket is empty failures are raised, so a sick device cannot
+    make every command retry up to the limit of its rule.
+    """
+
+    def __init__(self, ratio, minimum):
+        """
+        initialize a new instance
+
+        :param ratio: the tokens a completed command adds to the budget
+        :param minimum: the tokens in the budget at the start
+        """
+        self.commands = 0
+        self.retries = 0
+        self.failures = 0
+        self.exhausted = 0
+        self.slept = 0.0
+        self.by_key = {}
+        self._ratio = ratio
+        self._capacity = minimum + ratio * 100
+        self.budget = float(minimum)
+
+    def __repr__(self):
+        return (
+            "RetryStats(commands=%d, retries=%d, failures=%d, exhausted=%d, "
+            "slept=%.3f, budget=%.1f)"
+            % (
+                self.commands,
+                self.retries,
+                self.failures,
+                self.exhausted,
+                self.slept,
+                self.budget,
+            )
+        )
+
+
+class RetryPolicy(object):
+    """
+    Execute commands on devices, retrying failures as a rule table says
+
+    The table maps (sense key, ASC << 8 | ASCQ) tuples and SCSI_STATUS
+    values to RetryRules. A CHECK CONDITION is looked up by its sense key
+    and ASC+Q first, then by its sense key with None. A policy can be shared
+    by several devices, each gets its own retry budget and RetryStats:
+
+        policy = RetryPolicy({**default_rules, (0x03, None): RetryRule(RETRY, 1)})
+        s = SCSI(dev, retry=policy)
+        s.read16(0, 8)
+        print(policy.stats(dev))
+
+    AsyncSCSI takes a policy too. Devices with an execute_async coroutine
+    wait for their retries with asyncio.sleep instead of the sleep function.
+    """
+
+    def __init__(
+        self,
+        rules=None,
+        budget_ratio=0.1,
+        budget_minimum=10,
+        sleep=time.sleep,
+        rng=random.random,
+    ):
+        """
+        initialize a new instance
+
+        :param rules: a dict mapping failure keys to RetryRules, default_rules
+                      if None
+        :param budget_ratio: the retries each completed command earns a device
+        :param budget_minimum: the retries a device starts with
+        :param sleep: called with the seconds to wait before a retry
+        :param rng: returns a random float in [0, 1) for the backoff jitter
+        """
+        self.rules = dict(default_rules if rules is None else rules)
+        self._budget_ratio = budget_ratio
+        self._budget_minimum = budget_minimum
+        self._sleep = sleep
+        self._rng = rng
+        self._lock = threading.Lock()
+        self._stats = weakref.WeakKeyDictionary()
+
+    def rule(self, key):
+        """
+        the rule for a failure
+
+        :param key: a failure key, see failure_key
+        :return: a RetryRule, None if the failure has no rule
+        """
+        if key is None:
+            return None
+        rule = self.rules.get(key)
+        if rule is None and isinstance(key, tuple):
+            rule = self.rules.get((key[0], None))
+        return rule
+
+    def stats(self, device):
+        """
+        the RetryStats of a device
+
+        :param device: a SCSIDevice or ISCSIDevice object
+        :return: a RetryStats object
+        """
+        with self._lock:
+            stats = self._stats.get(device)
+            if stats is None:
+                stats = RetryStats(self._budget_ratio, self._budget_minimum)
+                self._stats[device] = stats
+            return stats
+
+    def execute(self, device, cmd, en_raw_sense=False):
+        """
+        execute a command, and execute it again while the rules allow
+
+        :param device: a SCSIDevice or ISCSIDevice object
+        :param cmd: a SCSICommand object
+        :param en_raw_sense: keep the raw sense data in the command
+        """
+        stats = self.stats(device)
+        attempts = {}
+        while True:
+            try:
+                device.execute(cmd, en_raw_sense=en_raw_sense)
+            except Exception as e:
+                delay = self._failed(stats, attempts, e)
+                if delay is None:
+                    raise
+                if delay > 0:
+                    self._sleep(delay)
+                    self._slept(stats, delay)
+                continue
+            self._completed(stats)
+            return
+
+    async def execute_async(self, device, cmd, en_raw_sense=False):
+        """
+        execute a command with the execute_async coroutine of a device, and
+        execute it again while the rules allow, waiting with asyncio.sleep
+
+        :param device: a device with an execute_async coroutine
+        :param cmd: a SCSICommand object
+        :param en_raw_sense: keep the raw sense data in the command
+        """
+        stats = self.stats(device)
+        attempts = {}
+        while True:
+            try:
+                await device.execute_async(cmd, en_raw_sense=en_raw_sense)
+            except Exception as e:
+                delay = self._failed(stats, attempts, e)
+                if delay is None:
+                    raise
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    self._slept(stats, delay)
+                continue
+            self._completed(stats)
+            return
+
+    def _failed(self, stats, attempts, exception):
+        """
+        account for a failed attempt
+
+        :param stats: the RetryStats of the device
+        :param attempts: a dict counting the retries of the command by failure key
+        :param exception: the exception the attempt raised
+        :return: the seconds to wait before the retry, None to raise the exception
+        """
+        key = failure_key(exception)
+        rule = self.rule(key)
+        attempt = attempts.get(key, 0)
+        with self._lock:
+            if rule is None or attempt >= rule.retries:
+                stats.commands += 1
+                stats.failures += 1
+                return None
+            if stats.budget < 1.0:
+                stats.commands += 1
+                stats.failures += 1
+                stats.exhausted += 1
+                return None
+            stats.budget -= 1.0
+            stats.retries += 1
+            stats.by_key[key] = stats.by_key.get(key, 0) + 1
+        attempts[key] = attempt + 1
+        return rule.wait(attempt, self._rng)
+
+    def _slept(self, stats, delay):
+        with self._lock:
+            stats.slept += delay
+
+    def _completed(self, stats):
+        with self._lock:
+            stats.commands += 1
+            stats.budget = min(stats._capacity, stats.budget + stats._ratio)
@@ -6,7 +6,9 @@
 #
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
-from pyscsi.utils.converter import decode_bits
+from typing import NamedTuple, Optional
+
+from pyscsi.utils.converter import compile_bits, decode_bits
 
 #
 # SPC4 4.5 Sense Data
@@ -35,6 +37,79 @@ sense_key_dict = {
     0x0F: "Completed",
 }
 
+# sense keys whose sense key specific information is a progress indication
+_progress_sense_keys = (0x00, 0x02)
+
+
+class SenseRecord(NamedTuple):
+    """
+    The fields of sense data a retry decision needs
+
+    info is the INFORMATION field and progress the PROGRESS INDICATION, out
+    of 0x10000, or None if the sense data does not report them.
+    """
+
+    key: int
+    asc: int
+    ascq: int
+    info: Optional[int] = None
+    progress: Optional[int] = None
+
+
+def parse_sense(sense):
+    """
+    build a SenseRecord from fixed or descriptor format sense data
+
+    Only the bytes of the fields of the record are read, so this is cheap
+    enough to run on every CHECK CONDITION. Sense data of an unknown format
+    returns a record with all fields 0.
+
+    :param sense: a buffer with the sense data
+    :return: a SenseRecord
+    """
+    size = len(sense)
+    response_code = sense[0] & 0x7F if size else 0
+    if response_code in (SENSE_FORMAT_CURRENT_FIXED, SENSE_FORMAT_DEFERRED_FIXED):
+        if size < 14:
+            return SenseRecord(sense[2] & 0x0F if size > 2 else 0, 0, 0)
+        key = sense[2] & 0x0F
+        info = None
+        if sense[0] & 0x80:
+            info = int.from_bytes(sense[3:7], "big")
+        progress = None
+        if size >= 18 and sense[15] & 0x80 and key in _progress_sense_keys:
+            progress = int.from_bytes(sense[16:18], "big")
+        return SenseRecord(key, sense[12], sense[13], info, progress)
+    if response_code not in (
+        SENSE_FORMAT_CURRENT_DESCRIPTOR,
+        SENSE_FORMAT_DEFERRED_DESCRIPTOR,
+    ):
+        return SenseRecord(0, 0, 0)
+    if size < 4:
+        return SenseRecord(sense[1] & 0x0F if size > 1 else 0, 0, 0)
+    key = sense[1] & 0x0F
+    info = None
+    progress = None
+    end = min(size, 8 + sense[7]) if size >= 8 else size
+    pos = 8
+    while pos + 2 <= end:
+        desc_type = sense[pos]
+        desc_end = pos + 2 + sense[pos + 1]
+        if desc_end > end:
+            break
+        if desc_type == 0x00 and desc_end >= pos + 12 and sense[pos + 2] & 0x80:
+            info = int.from_bytes(sense[pos + 4 : pos + 12], "big")
+        elif (
+            desc_type == 0x02
+            and desc_end >= pos + 7
+            and sense[pos + 4] & 0x80
+            and key in _progress_sense_keys
+        ):
+            progress = int.from_bytes(sense[pos + 5 : pos + 7], "big")
+        pos = desc_end
+    return SenseRecord(key, sense[2], sense[3], info, progress)
+
+
 vendor_specific_sense_asc = vendor_specific_sense_ascq = range(0x80, 0xFF + 1)
 
 # dict with additional sense data
@@ -1005,20 +1080,98 @@ class SCSICheckCondition(Exception):
         0x80: _vendor_sdata_desc_bits,
     }
 
+    # the layout of the sense key specific information for each sense key
+    _skey_specific_dict = {
+        0x00: _progress_skey_sdata_desc_bits,
+        0x01: _retry_count_skey_sdata_desc_bits,
+        0x02: _progress_skey_sdata_desc_bits,
+        0x03: _retry_count_skey_sdata_desc_bits,
+        0x04: _retry_count_skey_sdata_desc_bits,
+        0x05: _fptr_skey_sdata_desc_bits,
+        0x06: _uacqo_skey_sdata_desc_bits,
+        0x0A: _segptr_skey_sdata_desc_bits,
+    }
+
+    for _bits in (
+        _fixed_format_sdata_bits,
+        _desc_format_sdata_bits,
+        _sdata_desc_bits,
+        *_descriptor_type_dict.values(),
+        *_skey_specific_dict.values(),
+    ):
+        compile_bits(_bits)
+    del _bits
+
     def __init__(self, sense, print_data=False):
+        """
+        initialize a new instance
+
+        Only the SenseRecord is built here, the data dict and the descriptors
+        are decoded when they are first accessed.
+
+        :param sense: a buffer with fixed or descriptor format sense data
+        :param print_data: print the decoded sense data in __str__
+        """
+        self.sense = sense
         self.valid = sense[0] & 0x80
         self.response_code = sense[0] & 0x7F
-        self.data = {}
         self.show_data = print_data
+        self.record = parse_sense(sense)
+        self.asc = self.record.asc
+        self.ascq = self.record.ascq
+        self._data = None
+        self._descriptors = None
+
+    @property
+    def data(self):
+        """
+        the sense data decoded into a dict, empty for an unknown format
+        """
+        if self._data is None:
+            if self.response_code in (
+                SENSE_FORMAT_CURRENT_FIXED,
+                SENSE_FORMAT_DEFERRED_FIXED,
+            ):
+                self._data = self.unmarshall_fixed_format_sense_data(self.sense)
+            elif self.response_code in (
+                SENSE_FORMAT_CURRENT_DESCRIPTOR,
+                SENSE_FORMAT_DEFERRED_DESCRIPTOR,
+            ):
+                self._data = self.unmarshall_desc_format_sense_data(self.sense)
+            else:
+                self._data = {}
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def descriptors(self):
+        """
+        the sense data descriptors of descriptor format sense data
 
-        if self.response_code == SENSE_FORMAT_CURRENT_FIXED:
-            self.data = self.unmarshall_fixed_format_sense_data(sense)
-            self.asc = self.data["additional_sense_code"]
-            self.ascq = self.data["additional_sense_code_qualifier"]
-        elif self.response_code == SENSE_FORMAT_CURRENT_DESCRIPTOR:
-            self.data = self.unmarshall_desc_format_sense_data(sense)
-            self.asc = self.data["additional_sense_code"]
-            self.ascq = self.data["additional_sense_code_qualifier"]
+        Every descriptor is decoded with the check dict of its type in
+        _descriptor_type_dict, and the sense key specific information is
+        split into its fields with the check dict matching the sense key.
+
+        :return: a list of dicts, empty for fixed format sense data
+        """
+        if self._descriptors is None:
+            self._descriptors = self.unmarshall_sense_data_descriptors(self.sense)
+        return self._descriptors
+
+    def descriptor(self, desc_type):
+        """
+        the first sense data descriptor of a type
+
+        :param desc_type: the descriptor type
+        :return: a dict, or None if the sense data has no such descriptor
+        """
+        for d in self.descriptors:
+            if d["desc_type"] == desc_type:
+                return d
+        return None
 
     def _ascq(self):
         return (self.asc << 8) + self.ascq
@@ -1051,6 +1204,41 @@ class SCSICheckCondition(Exception):
         decode_bits(data, SCSICheckCondition._fixed_format_sdata_bits, result)
         return result
 
+    @staticmethod
+    def unmarshall_sense_data_descriptors(data):
+        """
+        Unmarshall the sense data descriptors of descriptor format sense data.
+
+        :param data: a byte array with the sense data
+        :return: a list of dicts
+        """
+        result = []
+        if len(data) < 8 or data[0] & 0x7F not in (
+            SENSE_FORMAT_CURRENT_DESCRIPTOR,
+            SENSE_FORMAT_DEFERRED_DESCRIPTOR,
+        ):
+            return result
+        key = data[1] & 0x0F
+        end = min(len(data), 8 + data[7])
+        pos = 8
+        while pos + 2 <= end:
+            desc_end = pos + 2 + data[pos + 1]
+            if desc_end > end:
+                break
+            desc = bytes(data[pos:desc_end])
+            check_dict = SCSICheckCondition._descriptor_type_dict.get(
+                desc[0], SCSICheckCondition._sdata_desc_bits
+            )
+            d = {}
+            decode_bits(desc, check_dict, d)
+            if desc[0] == 0x02 and len(desc) >= 7:
+                skey_bits = SCSICheckCondition._skey_specific_dict.get(key)
+                if skey_bits is not None:
+                    decode_bits(desc[4:7], skey_bits, d)
+            result.append(d)
+            pos = desc_end
+        return result
+
     @staticmethod
     def unmarshall_desc_format_sense_data(data):
         result = {}
@@ -0,0 +1,319 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import errno
+import io
+from collections import deque
+
+from pyscsi.pyscsi import scsi_enum_inquiry as INQUIRY
+from pyscsi.pyscsi.scsi_cdb_read16 import Read16
+from pyscsi.pyscsi.scsi_cdb_write16 import Write16
+from pyscsi.pyscsi.scsi_submit import Submitter
+
+#
+# A file-like stream of logical blocks on top of the SCSI class
+#
+
+# transfer size used when the device reports no optimal transfer length
+DEFAULT_TRANSFER_SIZE = 1024 * 1024
+
+
+def block_limits(s):
+    """
+    fetch the Block Limits VPD page of a device
+
+    :param s: a SCSI object
+    :return: a dict with the decoded page, empty if the page is not supported
+    """
+    return s.vpd(INQUIRY.VPD.BLOCK_LIMITS)
+
+
+def optimal_transfer_length(limits, blocksize):
+    """
+    pick the number of blocks per READ(16)/WRITE(16) command
+
+    The optimal transfer length is used if the device reports one, otherwise
+    DEFAULT_TRANSFER_SIZE. The result is capped at the maximum transfer length
+    and rounded down to a multiple of the optimal transfer length granularity.
+
+    :param limits: a dict with the Block Limits VPD page
+    :param blocksize: the logical block length in bytes
+    :return: a number of blocks
+    """
+    tl = limits.get("opt_xfer_len", 0) or max(DEFAULT_TRANSFER_SIZE // blocksize, 1)
+    if limits.get("max_xfer_len", 0):
+        tl = min(tl, limits["max_xfer_len"])
+    tl = min(tl, 0xFFFFFFFF)
+    gran = limits.get("opt_xfer_len_gran", 0)
+    if gran and tl >= gran:
+        tl -= tl % gran
+    return tl
+
+
+class BlockStream(io.RawIOBase):
+    """
+    A file-like object to read and write a block device at arbitrary byte offsets
+
+    Byte ranges are split into READ(16)/WRITE(16) commands on a grid of
+    transfer_length blocks, sized from the Block Limits VPD page, so commands
+    are aligned to the optimal transfer length granularity of the device.
+
+    Sequential reads fetch the next read_ahead transfers in the background and
+    write() returns once up to write_behind transfers are queued, so the device
+    sees back-to-back commands. The commands go through a Submitter, so
+    devices with a submit method, like SCSIQueuedDevice, get them queued
+    directly, thread safe devices execute them on worker threads and any
+    other device executes each one as it is submitted. Errors of write-behind
+    commands are raised by the next write, flush or close.
+
+        with BlockStream(SCSI(dev)) as f:
+            f.seek(4096 * 1000 + 17)
+            data = f.read(100000)
+    """
+
+    def __init__(self, s, read_ahead=2, write_behind=4, transfer_length=0):
+        """
+        initialize a new instance
+
+        :param s: a SCSI object
+        :param read_ahead: the number of transfers to read ahead of sequential reads
+        :param write_behind: the number of transfers write() may leave in flight
+        :param transfer_length: blocks per command, 0 to use the Block Limits VPD page
+        """
+        io.RawIOBase.__init__(self)
+        self._scsi = s
+        self._read_ahead = read_ahead
+        self._write_behind = write_behind
+        self._pos = 0
+        self._next_read = 0
+        # transfer index -> (future, buffer) of reads kept for later readinto calls
+        self._chunks = {}
+        # (first lba, end lba, future) of queued writes, oldest first
+        self._writes = deque()
+
+        cmd = s.readcapacity16()
+        self._blocksize = s.blocksize or cmd.result["block_length"]
+        self._size = (cmd.result["returned_lba"] + 1) * self._blocksize
+        if not transfer_length:
+            transfer_length = optimal_transfer_length(block_limits(s), self._blocksize)
+        self._transfer_length = transfer_length
+        self._submitter = Submitter(s, 1 + max(read_ahead, write_behind))
+
+    @property
+    def blocksize(self):
+        return self._blocksize
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def transfer_length(self):
+        return self._transfer_length
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """
+        change the stream position
+
+        :param offset: the offset in bytes
+        :param whence: io.SEEK_SET, io.SEEK_CUR or io.SEEK_END
+        :return: the new position
+        """
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        elif whence != io.SEEK_SET:
+            raise ValueError("invalid whence (%r)" % whence)
+        if offset < 0:
+            raise ValueError("negative seek position %d" % offset)
+        self._pos = offset
+        return offset
+
+    def _read(self, lba, buf):
+        opcode = self._scsi.device.opcodes.READ_16
+        tl = len(buf) // self._blocksize
+        return self._submitter.submit(Read16(opcode, self._blocksize, lba, tl, buf=buf))
+
+    def _write(self, lba, data):
+        # a queued device may reorder overlapping writes, wait for those first
+        end = lba + len(data) // self._blocksize
+        for first, last, future in list(self._writes):
+            if first < end and lba < last:
+                self._submitter.wait(future)
+        opcode = self._scsi.device.opcodes.WRITE_16
+        tl = len(data) // self._blocksize
+        future = self._submitter.submit(Write16(opcode, self._blocksize, lba, tl, data))
+        self._writes.append((lba, end, future))
+        while len(self._writes) > self._write_behind:
+            self._submitter.wait(self._writes.popleft()[2])
+
+    def _drop_chunks(self, keep=None):
+        for idx in list(self._chunks):
+            if keep is None or idx not in keep:
+                future, _ = self._chunks.pop(idx)
+                # the buffer must not be reused while the device still writes to it
+                self._submitter.settle(future)
+
+    def readinto(self, b):
+        """
+        read up to len(b) bytes at the current position into b
+
+        :param b: a writable buffer
+        :return: the number of bytes read, 0 at the end of the device
+        """
+        view = memoryview(b).cast("B")
+        pos = self._pos
+        n = min(len(view), self._size - pos)
+        if n <= 0:
+            return 0
+        self.flush()
+        end = pos + n
+        span = self._transfer_length * self._blocksize
+        first = pos // span
+        last = (end - 1) // span
+        stop = last + 1
+        if pos == self._next_read:
+            stop = min(stop + self._read_ahead, -(-self._size // span))
+
+        # transfers that are completely inside b are read straight into it
+        direct = {}
+        for idx in range(first, stop):
+            if idx in self._chunks:
+                continue
+            start = idx * span
+            chunk_end = min(start + span, self._size)
+            if pos <= start and chunk_end <= end:
+                direct[idx] = self._read(
+                    idx * self._transfer_length, view[start - pos : chunk_end - pos]
+                )
+            else:
+                buf = bytearray(chunk_end - start)
+                self._chunks[idx] = (self._read(idx * self._transfer_length, buf), buf)
+
+        try:
+            for idx in range(first, last + 1):
+                if idx in direct:
+                    self._submitter.wait(direct.pop(idx))
+                    continue
+                future, buf = self._chunks[idx]
+                self._submitter.wait(future)
+                start = idx * span
+                lo = max(pos, start)
+                hi = min(end, start + len(buf))
+                view[lo - pos : hi - pos] = buf[lo - start : hi - start]
+        except Exception:
+            for future in direct.values():
+                self._submitter.settle(future)
+            self._drop_chunks()
+            raise
+
+        # keep the read-ahead and a partly consumed last transfer
+        keep = range(last if end % span else last + 1, stop)
+        self._drop_chunks(keep)
+        self._pos = self._next_read = end
+        return n
+
+    def write(self, b):
+        """
+        write b at the current position
+
+        Partial blocks at either end are read, modified and written back.
+
+        :param b: a buffer with the data to write
+        :return: the number of bytes written, less than len(b) at the end of the device
+        """
+        view = memoryview(b).cast("B")
+        pos = self._pos
+        n = min(len(view), self._size - pos)
+        if n <= 0:
+            if len(view):
+                raise OSError(errno.ENOSPC, "No space left on device")
+            return 0
+        end = pos + n
+        bs = self._blocksize
+        self._drop_chunks()
+        self._next_read = -1
+
+        lba = pos // bs
+        end_lba = -(-end // bs)
+        head = pos % bs
+        tail = end % bs
+        if head or tail:
+            # writes are queued in order, the read must see the ones before it
+            self.flush()
+        if head or (tail and end_lba - lba == 1):
+            block = self._read_block(lba)
+            block[head : head + min(n, bs - head)] = view[: min(n, bs - head)]
+            self._write(lba, block)
+            if end_lba - lba == 1:
+                self._pos = end
+                return n
+            lba += 1
+        if tail:
+            end_lba -= 1
+            block = self._read_block(end_lba)
+            block[:tail] = view[n - tail : n]
+            self._write(end_lba, block)
+
+        span = self._transfer_length
+        offset = lba * bs - pos
+        while lba < end_lba:
+            count = min((lba // span + 1) * span, end_lba) - lba
+            data = view[offset : offset + count * bs]
+            # write-behind keeps the data until the command completes
+            self._write(lba, bytes(data) if self._write_behind else data)
+            lba += count
+            offset += count * bs
+        if not self._write_behind:
+            self.flush()
+        self._pos = end
+        return n
+
+    def _read_block(self, lba):
+        block = bytearray(self._blocksize)
+        self._submitter.wait(self._read(lba, block))
+        return block
+
+    def flush(self):
+        """
+        wait for all queued writes and raise the first error
+        """
+        error = None
+        while self._writes:
+            future = self._writes.popleft()[2]
+            try:
+                self._submitter.wait(future)
+            except Exception as e:
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
+
+    def close(self):
+        """
+        flush the queued writes and stop the worker threads, the device stays open
+        """
+        if self.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._drop_chunks()
+            self._submitter.close()
+            io.RawIOBase.close(self)
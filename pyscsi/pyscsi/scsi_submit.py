@@ -0,0 +1,127 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+#
+# Running the commands of a SCSI object in the background
+#
+
+
+def concurrent(device):
+    """
+    whether a device can have several commands in flight
+
+    :param device: a device object
+    :return: True for devices with a submit method or thread_safe set
+    """
+    return hasattr(device, "submit") or getattr(device, "thread_safe", False)
+
+
+class Submitter(object):
+    """
+    Runs the commands of one SCSI object in the background
+
+    Devices with a submit method, like SCSIQueuedDevice, get the commands
+    queued directly. Devices with thread_safe set, like SCSIEmulatedDevice,
+    execute them on a pool of worker threads. Any other device executes each
+    command as it is submitted: a SCSIDevice may reopen its device node and
+    libiscsi contexts can not be shared between threads.
+
+        submitter = Submitter(s, 8)
+        try:
+            future = submitter.submit(cmd)
+            ...
+            cmd = submitter.wait(future)
+        finally:
+            submitter.close()
+    """
+
+    def __init__(self, s, workers=1):
+        """
+        initialize a new instance
+
+        :param s: a SCSI object
+        :param workers: the number of worker threads for a thread safe device
+        """
+        self._scsi = s
+        self._submit = getattr(s.device, "submit", None)
+        self._reap = getattr(s.device, "reap", None)
+        self._executor = None
+        if self._submit is None and concurrent(s.device) and workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def _run(self, cmd):
+        self._scsi.execute(cmd)
+        return cmd
+
+    def submit(self, cmd):
+        """
+        start a command
+
+        :param cmd: a SCSICommand object
+        :return: a Future resolving to the command
+        """
+        if self._submit is not None:
+            return self._submit(cmd)
+        if self._executor is not None:
+            return self._executor.submit(self._run, cmd)
+        future = Future()
+        try:
+            future.set_result(self._run(cmd))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def settle(self, future):
+        """
+        wait for a command to complete
+
+        :param future: a Future returned by submit
+        :return: the exception the command raised, None if it succeeded
+        """
+        while self._reap is not None and not future.done():
+            self._reap()
+        return future.exception()
+
+    def wait(self, future):
+        """
+        wait for a command to complete and raise its exception
+
+        :param future: a Future returned by submit
+        :return: the command
+        """
+        self.settle(future)
+        return future.result()
+
+    def completed(self, futures):
+        """
+        wait until at least one of some commands has completed
+
+        :param futures: Futures returned by submit
+        :return: a list of the Futures that are done
+        """
+        if self._reap is not None:
+            while not any(f.done() for f in futures):
+                self._reap()
+            return [f for f in futures if f.done()]
+        return list(wait(futures, return_when=FIRST_COMPLETED).done)
+
+    def close(self, futures=()):
+        """
+        wait for the commands still in flight and stop the worker threads
+
+        A queued device owns the buffers of its commands until they are reaped,
+        so the Futures of commands that were abandoned on an error should be
+        passed in.
+
+        :param futures: Futures returned by submit
+        """
+        for future in futures:
+            self.settle(future)
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
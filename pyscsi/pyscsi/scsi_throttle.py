@@ -0,0 +1,113 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import threading
+
+#
+# Adapting the number of commands in flight to the queue of the target
+#
+
+
+class QueueDepthController(object):
+    """
+    An AIMD window of outstanding commands for one I_T nexus
+
+    TASK SET FULL and BUSY mean the commands in flight overran the queue
+    the target has for us. The window is multiplied by decrease when one of
+    them is reported, and grows by increase once a whole window of commands
+    has completed without one. Only the first congestion of the commands
+    sent before a decrease shrinks the window, the others report the same
+    overrun.
+
+    The LUNs behind one target port share its queue, so one controller can
+    be passed to the devices of all of them. The controller is thread safe.
+    """
+
+    def __init__(self, initial=32, minimum=1, maximum=256, increase=1, decrease=0.5):
+        """
+        initialize a new instance
+
+        :param initial: the window to start with
+        :param minimum: the smallest window
+        :param maximum: the largest window
+        :param increase: the commands added to the window after a window of
+                         commands completed
+        :param decrease: the factor the window is multiplied with on congestion
+        """
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError("need 1 <= minimum <= initial <= maximum")
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.outstanding = 0
+        self.congestions = 0
+        self.decreases = 0
+        self.increases = 0
+        self._window = initial
+        self._completed = 0
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "QueueDepthController(window=%d, outstanding=%d, congestions=%d)" % (
+            self._window,
+            self.outstanding,
+            self.congestions,
+        )
+
+    @property
+    def window(self):
+        """
+        the number of commands that may be outstanding
+        """
+        return self._window
+
+    def available(self):
+        """
+        whether another command fits in the window
+
+        :return: a bool
+        """
+        return self.outstanding < self._window
+
+    def acquire(self):
+        """
+        account for a command that is sent
+
+        :return: a token to pass to release
+        """
+        with self._lock:
+            self.outstanding += 1
+            return self._epoch
+
+    def release(self, token, congested=False):
+        """
+        account for a command that completed
+
+        :param token: what acquire returned for the command
+        :param congested: the command completed with TASK SET FULL or BUSY
+        """
+        with self._lock:
+            self.outstanding -= 1
+            if congested:
+                self.congestions += 1
+                if token != self._epoch:
+                    return
+                self._epoch += 1
+                self._completed = 0
+                window = max(self.minimum, int(self._window * self.decrease))
+                if window < self._window:
+                    self._window = window
+                    self.decreases += 1
+                return
+            self._completed += 1
+            if self._completed >= self._window and self._window < self.maximum:
+                self._completed = 0
+                self._window = min(self.maximum, self._window + self.increase)
+                self.increases += 1
@@ -12,8 +12,13 @@ def init_device(
     dev,
     read_write=False,
     initiator_name=f"iqn.2018-01.org.pyscsi:{socket.gethostname()}",
+    queue_depth=0,
 ):
-    if dev[:5] == "/dev/":
+    if dev[:5] == "/dev/" and queue_depth:
+        from pyscsi.pyscsi.scsi_device_queued import SCSIQueuedDevice
+
+        device = SCSIQueuedDevice(dev, queue_depth=queue_depth)
+    elif dev[:5] == "/dev/":
         from pyscsi.pyscsi.scsi_device import SCSIDevice
 
         device = SCSIDevice(dev, read_write)
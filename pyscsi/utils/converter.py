@@ -6,7 +6,7 @@
 #
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
-from typing import Mapping, Sequence, Tuple, Union
+from typing import Dict, Mapping, Sequence, Tuple, Union
 
 CheckDict = Mapping[str, Union[Sequence[int], Tuple[int, int], Tuple[str, int, int]]]
 
@@ -27,7 +27,8 @@ def scsi_int_to_ba(to_convert=0, array_size=4):
     :param array_size: a integer defining the size of the byte array
     :return: a byte array
     """
-    return bytearray((to_convert >> i * 8) & 0xFF for i in reversed(range(array_size)))
+    mask = (1 << (array_size * 8)) - 1
+    return bytearray((to_convert & mask).to_bytes(array_size, "big"))
 
 
 def scsi_ba_to_int(ba):
@@ -38,7 +39,180 @@ def scsi_ba_to_int(ba):
     :param ba: a bytearray
     :return: an integer
     """
-    return sum(ba[i] << ((len(ba) - 1 - i) * 8) for i in range(len(ba)))
+    return int.from_bytes(ba, "big")
+
+
+class BitCodec(object):
+    """
+    A compiled form of a check dict.
+
+    The notation tuples of a check dict are interpreted once, when the codec is
+    built: the byte width, shift and mask of every bitmask field and the slice
+    bounds of every blob field are precomputed, so decoding and encoding only
+    have to slice the buffer and convert with int.from_bytes/int.to_bytes.
+
+    Codecs are normally not built directly but via compile_bits(), which keeps
+    one codec per check dict. Check dicts are treated as immutable once they
+    have been compiled.
+    """
+
+    __slots__ = ("source", "_fields", "_by_key")
+
+    def __init__(self, check_dict):
+        """
+        initialize a new instance
+
+        :param check_dict: a dict mapping field-names to notation tuples.
+        """
+        self.source = check_dict
+        fields = []
+        for key, val in check_dict.items():
+            if len(val) == 2:
+                bitmask, byte_pos = val
+                if bitmask <= 0:
+                    raise ValueError("invalid bitmask 0x%X for %s" % (bitmask, key))
+                width = max(1, (bitmask.bit_length() + 7) // 8)
+                shift = (bitmask & -bitmask).bit_length() - 1
+                fields.append(
+                    (
+                        key,
+                        byte_pos,
+                        byte_pos + width,
+                        width,
+                        shift,
+                        bitmask >> shift,
+                    )
+                )
+            elif val[0] in _blob_widths:
+                offset, length = val[1:]
+                end = offset + length * _blob_widths[val[0]]
+                fields.append((key, offset, end, 0, 0, None))
+            else:
+                raise ValueError("unknown notation %r for %s" % (val, key))
+        self._fields = tuple(fields)
+        self._by_key = {field[0]: field for field in fields}
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __contains__(self, key):
+        return key in self._by_key
+
+    def keys(self):
+        """
+        the field names in the order values() returns them
+
+        :return: a tuple of strings
+        """
+        return tuple(field[0] for field in self._fields)
+
+    def values(self, data, offset=0):
+        """
+        decode all fields of the check dict from a buffer at an offset
+
+        Unlike decode() this needs no dict and no slice of the buffer, so a
+        record at any offset of a large memoryview is decoded without copying.
+        Blob fields are returned as bytes.
+
+        :param data: a buffer containing the bits to decode
+        :param offset: the position of the first byte of the record in data
+        :return: a tuple with the field values in the order of keys()
+        """
+        from_bytes = int.from_bytes
+        size = len(data)
+        values = []
+        for _, start, end, width, shift, mask in self._fields:
+            start += offset
+            end += offset
+            if mask is None:
+                values.append(bytes(data[start:end]))
+            elif width == 1 and start < size:
+                values.append((data[start] >> shift) & mask)
+            else:
+                values.append((from_bytes(data[start:end], "big") >> shift) & mask)
+        return tuple(values)
+
+    def decode(self, data, result):
+        """
+        decode all fields of the check dict from a buffer
+
+        :param data: a buffer containing the bits to decode
+        :param result: a dict the decoded field values are stored in
+        """
+        from_bytes = int.from_bytes
+        size = len(data)
+        for key, start, end, width, shift, mask in self._fields:
+            if mask is None:
+                result[key] = data[start:end]
+            elif width == 1 and start < size:
+                result[key] = (data[start] >> shift) & mask
+            else:
+                result[key] = (from_bytes(data[start:end], "big") >> shift) & mask
+        return result
+
+    def encode(self, data_dict, result):
+        """
+        encode the fields present in data_dict into a buffer
+
+        bitmask fields are xor'ed into the buffer, blob fields are copied.
+
+        :param data_dict: a dict mapping field-names to values
+        :param result: a buffer the bits are encoded into
+        """
+        by_key = self._by_key
+        for key, value in data_dict.items():
+            field = by_key.get(key)
+            if field is None:
+                continue
+            _, start, end, width, shift, mask = field
+            if mask is None:
+                result[start:end] = value
+                continue
+            value = (value << shift) & ((1 << (width * 8)) - 1)
+            if width == 1:
+                result[start] ^= value
+                continue
+            if end > len(result):
+                raise IndexError("bytearray index out of range")
+            current = int.from_bytes(result[start:end], "big")
+            result[start:end] = (current ^ value).to_bytes(width, "big")
+        return result
+
+
+# number of bytes per element of the blob notations
+_blob_widths = {
+    "b": 1,
+    "w": 2,
+    "dw": 4,
+}
+
+# compiled codecs, keyed by the id of the check dict they were built from. The
+# check dict itself is kept alive by the codec, so its id cannot be reused.
+_codecs: Dict[int, BitCodec] = {}
+_CODEC_CACHE_SIZE = 4096
+
+
+def compile_bits(check_dict):
+    """
+    Return the compiled BitCodec for a check dict.
+
+    The codec is built on first use and then reused for every later call with
+    the same check dict. Passing a BitCodec returns it unchanged.
+
+    :param check_dict: a dict mapping field-names to notation tuples.
+    :return: a BitCodec
+    """
+    if isinstance(check_dict, BitCodec):
+        return check_dict
+    codec = _codecs.get(id(check_dict))
+    if codec is not None and codec.source is check_dict:
+        return codec
+    codec = BitCodec(check_dict)
+    if len(_codecs) >= _CODEC_CACHE_SIZE:
+        # check dicts built on the fly should not grow the cache forever
+        _codecs.clear()
+    _codecs[id(check_dict)] = codec
+    return codec
 
 
 def decode_bits(data, check_dict, result_dict):
@@ -51,49 +225,28 @@ def decode_bits(data, check_dict, result_dict):
 
     for now we assume he have to right shift only
 
+    The check dict is compiled into a BitCodec on first use, see compile_bits.
+
     :param data: a buffer containing the bits to decode
     :param check_dict: a dict mapping field-names to notation tuples.
     :param result_dict: a dict mapping field-names to notation tuples.
     """
-    for key in check_dict.keys():
-        # Notation format:
-        #
-        # If the length is 2 we have the legacy notation [bitmask, offset]
-        # Example: 'sync': [0x10, 7],
-        #
-        # >2-tuples is the new style of notation.
-        # These tuples always consist of at least three elements, where the
-        # first element is a string that describes the type of value.
-        #
-        # 'b': Byte array blobs
-        # ----------------
-        # ('b', offset, length)
-        # Example: 't10_vendor_identification': ('b', 8, 8),
-        #
-
-        val = check_dict[key]
-        if len(val) == 2:
-            bitmask, byte_pos = val
-            _num = 1
-            _bm = bitmask
-            while _bm > 0xFF:
-                _bm >>= 8
-                _num += 1
-            value = scsi_ba_to_int(data[byte_pos : byte_pos + _num])
-            while not bitmask & 0x01:
-                bitmask >>= 1
-                value >>= 1
-            value &= bitmask
-        elif val[0] == "b":
-            offset, length = val[1:]
-            value = data[offset : offset + length]
-        elif val[0] == "w":
-            offset, length = val[1:]
-            value = data[offset : offset + length * 2]
-        elif val[0] == "dw":
-            offset, length = val[1:]
-            value = data[offset : offset + length * 4]
-        result_dict.update({key: value})
+    # Notation format:
+    #
+    # If the length is 2 we have the legacy notation [bitmask, offset]
+    # Example: 'sync': [0x10, 7],
+    #
+    # >2-tuples is the new style of notation.
+    # These tuples always consist of at least three elements, where the
+    # first element is a string that describes the type of value.
+    #
+    # 'b': Byte array blobs
+    # ----------------
+    # ('b', offset, length)
+    # Example: 't10_vendor_identification': ('b', 8, 8),
+    #
+    # 'w' and 'dw' work like 'b' with a length in words and double words.
+    compile_bits(check_dict).decode(data, result_dict)
 
 
 def encode_dict(data_dict, check_dict, result):
@@ -106,42 +259,13 @@ def encode_dict(data_dict, check_dict, result):
 
     for now we assume he have to right shift only
 
+    The check dict is compiled into a BitCodec on first use, see compile_bits.
+
     :param data_dict:  a dict mapping field-names to notation tuples.
     :param check_dict: a dict mapping field-names to notation tuples.
     :param result: a buffer containing the bits encoded
     """
-    for key in data_dict.keys():
-        if key not in check_dict:
-            continue
-        value = data_dict[key]
-
-        val = check_dict[key]
-        if len(val) == 2:
-            bitmask, bytepos = val
-
-            _num = 1
-            _bm = bitmask
-            while _bm > 0xFF:
-                _bm >>= 8
-                _num += 1
-
-            _bm = bitmask
-            while not _bm & 0x01:
-                _bm >>= 1
-                value <<= 1
-
-            v = scsi_int_to_ba(value, _num)
-            for i in range(len(v)):
-                result[bytepos + i] ^= v[i]
-        elif val[0] == "b":
-            offset, length = val[1:]
-            result[offset : offset + length] = value
-        elif val[0] == "w":
-            offset, length = val[1:]
-            result[offset : offset + length * 2] = value
-        elif val[0] == "dw":
-            offset, length = val[1:]
-            result[offset : offset + length * 4] = value
+    compile_bits(check_dict).encode(data_dict, result)
 
 
 def print_data(data_dict):
@@ -167,15 +291,33 @@ def print_data(data_dict):
                 print("%s -> 0x%02X" % (k, v))
 
 
+def _opcode_index(members):
+    """
+    index the generic OpCodes of an Enum, the ones named after their value
+    like SBC_OPCODE_9E, by their value
+
+    :param members: a dict mapping names to OpCode objects
+    :return: a dict mapping opcode values to lists of OpCode objects
+    """
+    index = {}
+    for key, val in members.items():
+        code = getattr(val, "value", None)
+        if isinstance(code, int) and key[-2:] == "%02X" % code:
+            index.setdefault(code, []).append(val)
+    return index
+
+
 def get_opcode(enum, part):
     """
     A generator that returns an OpCode object from a given
     Enum object.
 
+    The OpCodes are looked up by value in an index the Enum keeps until its
+    members change.
+
     :param enum: the Enum of opcodes
-    :param part: a string to lookup in the enum keys
+    :param part: the opcode value, or a string with its two hex digits
     :return: an OpCode object
     """
-    for val in enum.keys:
-        if val[len(val) - 2 :] == part:
-            yield getattr(enum, val)
+    code = int(part, 16) if isinstance(part, str) else part
+    yield from enum.derive("opcodes", _opcode_index).get(code, ())
@@ -10,7 +10,7 @@
 # pylint: disable=not-an-iterable
 # pylint: disable=unsupported-membership-test
 
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List
 
 from pyscsi.utils.exception import NotSupportedArgumentError
 
@@ -37,6 +37,11 @@ class Enum(type):
       - adding check if value exists
     """
 
+    # set on every Enum by __new__
+    __enum_members__: Dict[str, Any]
+    __enum_names__: Dict[Any, str]
+    __enum_derived__: Dict[str, Any]
+
     def __new__(cls, *args: Any, **kwargs: Any):
         """
         Building a new Enum object with a dict or keyword arguments
@@ -50,22 +55,63 @@ class Enum(type):
             raise NotSupportedArgumentError(
                 "use either as dict or provide keyword arguments"
             )
-        return super().__new__(cls, cls.__name__, (), tmp)
+        enum = super().__new__(cls, cls.__name__, (), tmp)
+        # the members by name, and the first name of every hashable value
+        members = {key: val for key, val in tmp.items() if _is_member(key, val)}
+        type.__setattr__(enum, "__enum_members__", members)
+        type.__setattr__(enum, "__enum_names__", _names(members))
+        type.__setattr__(enum, "__enum_derived__", {})
+        return enum
 
     def __init__(cls, *args: Any, **kwargs: Any) -> None:
         super().__init__(cls.__name__, args, kwargs)
 
-    def __getitem__(cls, value: str) -> str:
-        for key in cls.keys:
-            if getattr(cls, key) == value:
-                return key
-        return ""
+    def __getitem__(cls, value: Any) -> str:
+        try:
+            return cls.__enum_names__.get(value, "")
+        except TypeError:
+            # unhashable values are not in the index
+            for key, val in cls.__enum_members__.items():
+                if val == value:
+                    return key
+            return ""
+
+    def __setattr__(cls, key: str, value: Any) -> None:
+        type.__setattr__(cls, key, value)
+        members = cls.__enum_members__
+        if not _is_member(key, value):
+            if key in members:
+                del members[key]
+                cls._reindex()
+            return
+        replaced = key in members
+        members[key] = value
+        if replaced:
+            cls._reindex()
+            return
+        try:
+            cls.__enum_names__.setdefault(value, key)
+        except TypeError:
+            pass
+        cls.__enum_derived__.clear()
+
+    def __delattr__(cls, key: str) -> None:
+        type.__delattr__(cls, key)
+        if cls.__enum_members__.pop(key, _missing) is not _missing:
+            cls._reindex()
+
+    def _reindex(cls) -> None:
+        """
+        rebuild the value to name index after a member changed or was removed
+        """
+        type.__setattr__(cls, "__enum_names__", _names(cls.__enum_members__))
+        cls.__enum_derived__.clear()
 
     def add(cls, key: str, value: Any) -> None:
         """
         method to add key to the Enum
         """
-        if key in cls.keys:
+        if key in cls.__enum_members__:
             raise KeyError(f"key {key} already exist")
         setattr(cls, key, value)
 
@@ -78,16 +124,48 @@ class Enum(type):
         except (AttributeError, KeyError) as ex:
             raise KeyError(f"Key {ex} not found") from ex
 
+    def derive(cls, name: str, build: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        A value computed from the members, like an index of them.
+
+        build is called with the dict of members the first time name is
+        asked for, and again after a member was added or removed.
+        """
+        derived = cls.__enum_derived__
+        if name not in derived:
+            derived[name] = build(dict(cls.__enum_members__))
+        return derived[name]
+
     @property
     def keys(cls) -> List[str]:
         """
         Property to return a list of Keys in the Enum.
         """
-        result: List[str] = [
-            key
-            for key, val in vars(cls).items()
-            if not callable(val)
-            and not key.startswith("__")
-            or not type(val).__name__ != "method"
-        ]
-        return result
+        return list(cls.__enum_members__)
+
+
+_missing = object()
+
+
+def _is_member(key: str, val: Any) -> bool:
+    """
+    whether an attribute of an Enum is one of its keys
+    """
+    return (
+        not callable(val)
+        and not key.startswith("__")
+        or not type(val).__name__ != "method"
+    )
+
+
+def _names(members: Dict[str, Any]) -> Dict[Any, str]:
+    """
+    map every hashable value to the first key it has
+    """
+    names: Dict[Any, str] = {}
+    for key, val in members.items():
+        try:
+            names.setdefault(val, key)
+        except TypeError:
+            pass
+    return names
@@ -5,7 +5,13 @@
 #
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
+import ctypes
+import os
+
 from pyscsi.pyscsi.scsi import SCSI
+from pyscsi.pyscsi.scsi_device_queued import SCSIQueuedDevice, SGIOHeader
+from pyscsi.pyscsi.scsi_enum_command import sbc
+from pyscsi.utils.converter import scsi_ba_to_int
 
 
 class MockSCSI(SCSI):
@@ -35,3 +41,104 @@ class MockDevice:
 
     def close(self):
         pass
+
+
+class MockQueuedDevice(SCSIQueuedDevice):
+    """
+    Stands in for the sg driver: requests complete as soon as they are written
+    and are read back newest first, so completions arrive out of order. A pipe
+    signals completions, so the device can be registered with an event loop.
+    """
+
+    def __init__(self, queue_depth, throttle=None):
+        self.max_in_flight = 0
+        self.written = []
+        SCSIQueuedDevice.__init__(
+            self, "/dev/sg-mock", queue_depth=queue_depth, throttle=throttle
+        )
+
+    def open(self):
+        self._completed = []
+        self._fd, self._wfd = os.pipe()
+        os.set_blocking(self._fd, False)
+
+    def close(self):
+        self.drain()
+        os.close(self._fd)
+        os.close(self._wfd)
+
+    def _write_header(self, hdr):
+        self.max_in_flight = max(self.max_in_flight, len(self._pending) + 1)
+        cdb = ctypes.string_at(hdr.cmdp, hdr.cmd_len)
+        self.written.append((cdb[0], hdr.dxfer_direction, hdr.dxfer_len))
+        reply = SGIOHeader.from_buffer_copy(hdr)
+        if cdb[0] == sbc.READ_16.value:
+            lba = scsi_ba_to_int(cdb[2:10])
+            ctypes.memset(hdr.dxferp, lba & 0xFF, hdr.dxfer_len)
+        if cdb[0] == sbc.TEST_UNIT_READY.value:
+            sense = bytes([0x70, 0, 0x02, 0, 0, 0, 0, 10, 0, 0, 0, 0, 0x04, 0x01])
+            ctypes.memmove(hdr.sbp, sense, len(sense))
+            reply.status = 0x02
+            reply.sb_len_wr = len(sense)
+        self._completed.append(reply)
+        os.write(self._wfd, b"x")
+
+    def _read_header(self, hdr, block):
+        if not self._completed:
+            return False
+        os.read(self._fd, 1)
+        reply = self._completed.pop()
+        ctypes.memmove(
+            ctypes.addressof(hdr), ctypes.addressof(reply), ctypes.sizeof(hdr)
+        )
+        return True
+
+
+class MockBlockDevice(MockDevice):
+    """
+    An in-memory disk answering INQUIRY, READ CAPACITY(16), READ(16) and WRITE(16)
+    """
+
+    def __init__(self, blocks=1024, blocksize=512, block_limits=None):
+        MockDevice.__init__(self, sbc)
+        self.blocksize = blocksize
+        self.data = bytearray(blocks * blocksize)
+        self.block_limits = block_limits
+        self.commands = []
+
+    def execute(self, cmd, en_raw_sense=False):
+        opcode = cmd.cdb[0]
+        if opcode == 0x12:
+            if not cmd.cdb[1] & 0x01:
+                return
+            page = cmd.cdb[2]
+            cmd.datain[1] = page
+            if page == 0x00:
+                pages = [0x00] + ([0xB0] if self.block_limits is not None else [])
+                cmd.datain[3] = len(pages)
+                cmd.datain[4 : 4 + len(pages)] = bytes(pages)
+            elif page == 0xB0:
+                cmd.datain[3] = 0x3C
+                for key, offset, length in (
+                    ("opt_xfer_len_gran", 6, 2),
+                    ("max_xfer_len", 8, 4),
+                    ("opt_xfer_len", 12, 4),
+                    ("max_ws_len", 36, 8),
+                ):
+                    value = self.block_limits.get(key, 0)
+                    cmd.datain[offset : offset + length] = value.to_bytes(length, "big")
+            return
+        if opcode == 0x9E:  # READ CAPACITY(16)
+            blocks = len(self.data) // self.blocksize
+            cmd.datain[0:8] = (blocks - 1).to_bytes(8, "big")
+            cmd.datain[8:12] = self.blocksize.to_bytes(4, "big")
+            return
+        lba = scsi_ba_to_int(cmd.cdb[2:10])
+        tl = scsi_ba_to_int(cmd.cdb[10:14])
+        self.commands.append((opcode, lba, tl))
+        start = lba * self.blocksize
+        end = start + tl * self.blocksize
+        if opcode == sbc.READ_16.value:
+            cmd.datain[:] = self.data[start:end]
+        elif opcode == sbc.WRITE_16.value:
+            self.data[start:end] = cmd.dataout
@@ -0,0 +1,35 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import unittest
+
+from benchmarks import harness
+from benchmarks.__main__ import main
+
+
+class BenchmarksTest(unittest.TestCase):
+    def test_cases(self):
+        # every case sets up and runs once
+        self.assertTrue(harness.cases())
+        for name, setup in harness.cases():
+            setup()()
+
+    def test_duplicate(self):
+        name = harness.cases()[0][0]
+        with self.assertRaises(ValueError):
+            harness.benchmark(name)
+
+    def test_compare(self):
+        r = {"ops": 1000.0, "peak_bytes": 1000}
+        self.assertEqual(harness.compare({"a": r}, {"a": r}), [])
+        slower = {"ops": 800.0, "peak_bytes": 1000}
+        self.assertEqual(len(harness.compare({"a": slower}, {"a": r})), 1)
+        larger = {"ops": 1000.0, "peak_bytes": 2000}
+        self.assertEqual(len(harness.compare({"a": larger}, {"a": r})), 1)
+        self.assertEqual(harness.compare({"b": slower}, {"a": r}), [])
+
+    def test_list(self):
+        self.assertEqual(main(["--list", "-k", "sense"]), 0)
@@ -0,0 +1,57 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import unittest
+
+from pyscsi.pyscsi.scsi_cdb_populate_token import PopulateToken
+from pyscsi.pyscsi.scsi_enum_command import sbc
+from pyscsi.utils.converter import scsi_ba_to_int
+from tests.mock_device import MockDevice, MockSCSI
+
+
+class CdbPopulateTokenTest(unittest.TestCase):
+    def test_main(self):
+        with MockSCSI(MockDevice(sbc)) as s:
+            ranges = [
+                {"lba": 0x0102030405060708, "num_blocks": 0x090A0B0C},
+                {"lba": 0x1000, "num_blocks": 8},
+            ]
+            p = s.populatetoken(0x12345678, ranges, immed=1, group=0x11)
+            cdb = p.cdb
+            opcode = s.device.opcodes.EXTENDED_COPY
+            self.assertEqual(cdb[0], opcode.value)
+            self.assertEqual(cdb[1], opcode.serviceaction.POPULATE_TOKEN)
+            self.assertEqual(scsi_ba_to_int(cdb[6:10]), 0x12345678)
+            self.assertEqual(scsi_ba_to_int(cdb[10:14]), 16 + 2 * 16)
+            self.assertEqual(cdb[14], 0x11)
+            self.assertEqual(len(cdb), 16)
+            cdb = p.unmarshall_cdb(cdb)
+            self.assertEqual(cdb["service_action"], opcode.serviceaction.POPULATE_TOKEN)
+            self.assertEqual(cdb["list_identifier"], 0x12345678)
+            self.assertEqual(cdb["parameter_list_length"], 48)
+            self.assertEqual(cdb["group"], 0x11)
+
+            d = PopulateToken.unmarshall_cdb(PopulateToken.marshall_cdb(cdb))
+            self.assertEqual(d, cdb)
+
+            data = p.dataout
+            self.assertEqual(scsi_ba_to_int(data[0:2]), 46)
+            self.assertEqual(data[2], 0x01)  # immed
+            self.assertEqual(scsi_ba_to_int(data[14:16]), 32)
+            self.assertEqual(data[16:24], bytes(range(1, 9)))
+            self.assertEqual(data[24:28], bytes(range(9, 13)))
+            d = PopulateToken.unmarshall_dataout(data)
+            self.assertEqual(d["ranges"], ranges)
+            self.assertEqual(d["immed"], 1)
+            self.assertEqual(d["rtv"], 0)
+
+            p = s.populatetoken(1, ranges[:1], inactivity_timeout=60, rod_type=0x800000)
+            d = PopulateToken.unmarshall_dataout(p.dataout)
+            self.assertEqual(d["rtv"], 1)
+            self.assertEqual(d["immed"], 0)
+            self.assertEqual(d["inactivity_timeout"], 60)
+            self.assertEqual(d["rod_type"], 0x800000)
+            self.assertEqual(d["ranges"], ranges[:1])
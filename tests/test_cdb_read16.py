@@ -60,3 +60,17 @@ class CdbRead16Test(unittest.TestCase):
 
             d = Read16.unmarshall_cdb(Read16.marshall_cdb(cdb))
             self.assertEqual(d, cdb)
+
+    def test_buffer(self):
+        buf = bytearray(4096)
+        r = Read16(sbc.READ_16, 512, 1024, 2, buf=memoryview(buf)[1024:])
+        self.assertEqual(len(r.datain), 1024)
+        self.assertIs(r.datain.obj, buf)
+        r.datain[:] = b"\x01" * 1024
+        self.assertEqual(buf[1024:2048], b"\x01" * 1024)
+        self.assertEqual(buf.count(0), 3072)
+
+        with self.assertRaises(ValueError):
+            Read16(sbc.READ_16, 512, 0, 9, buf=buf)
+        with self.assertRaises(ValueError):
+            Read16(sbc.READ_16, 512, 0, 1, buf=bytes(512))
@@ -0,0 +1,142 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import unittest
+
+from pyscsi.pyscsi.scsi_cdb_receive_copy_results import (
+    ReceiveCopyResultsCopyStatus,
+    ReceiveCopyResultsCopyStatusLID4,
+    ReceiveCopyResultsOperatingParameters,
+    ReceiveCopyResultsRODTokenInformation,
+)
+from pyscsi.pyscsi.scsi_enum_command import spc
+from pyscsi.utils.converter import scsi_ba_to_int
+from tests.mock_device import MockDevice, MockSCSI
+
+
+class CdbReceiveCopyResultsTest(unittest.TestCase):
+    def test_main(self):
+        with MockSCSI(MockDevice(spc)) as s:
+            opcode = s.device.opcodes.RECEIVE_COPY_RESULTS
+            r = s.receivecopyresults(opcode.serviceaction.COPY_STATUS, 0x34)
+            self.assertIsInstance(r, ReceiveCopyResultsCopyStatus)
+            cdb = r.cdb
+            self.assertEqual(cdb[0], opcode.value)
+            self.assertEqual(cdb[1], opcode.serviceaction.COPY_STATUS)
+            self.assertEqual(cdb[2], 0x34)
+            self.assertEqual(cdb[3:10], bytearray(7))
+            self.assertEqual(scsi_ba_to_int(cdb[10:14]), 1024)
+            self.assertEqual(len(cdb), 16)
+
+            r = s.receivecopyresults(
+                opcode.serviceaction.COPY_STATUS_LID4, 0x12345678, alloclen=96
+            )
+            self.assertIsInstance(r, ReceiveCopyResultsCopyStatusLID4)
+            cdb = r.cdb
+            self.assertEqual(cdb[1], opcode.serviceaction.COPY_STATUS_LID4)
+            self.assertEqual(scsi_ba_to_int(cdb[2:6]), 0x12345678)
+            self.assertEqual(scsi_ba_to_int(cdb[10:14]), 96)
+            cdb = r.unmarshall_cdb(cdb)
+            self.assertEqual(cdb["list_identifier"], 0x12345678)
+            self.assertEqual(cdb["alloc_len"], 96)
+
+            r = s.receivecopyresults(opcode.serviceaction.OPERATING_PARAMETERS)
+            self.assertIsInstance(r, ReceiveCopyResultsOperatingParameters)
+            self.assertEqual(r.cdb[1], opcode.serviceaction.OPERATING_PARAMETERS)
+
+            r = s.receivecopyresults(
+                opcode.serviceaction.ROD_TOKEN_INFORMATION, 0x01020304
+            )
+            self.assertIsInstance(r, ReceiveCopyResultsRODTokenInformation)
+            self.assertEqual(r.cdb[1], opcode.serviceaction.ROD_TOKEN_INFORMATION)
+            self.assertEqual(scsi_ba_to_int(r.cdb[2:6]), 0x01020304)
+
+            with self.assertRaises(ValueError):
+                s.receivecopyresults(opcode.serviceaction.REPORT_ALL_ROD_TOKENS)
+
+    def test_copy_status(self):
+        data = {
+            "copy_manager_status": 1,
+            "segments_processed": 7,
+            "transfer_count_units": 0xF1,
+            "transfer_count": 4096,
+        }
+        d = ReceiveCopyResultsCopyStatus.unmarshall_datain(
+            ReceiveCopyResultsCopyStatus.marshall_datain(data)
+        )
+        self.assertEqual(d["available_data"], 8)
+        for key in data:
+            self.assertEqual(d[key], data[key])
+
+        sense = bytes([0x70, 0, 0x05, 0, 0, 0, 0, 10] + [0] * 4 + [0x26, 0] + [0] * 4)
+        data = {
+            "response_to_service_action": 0x05,
+            "copy_operation_status": 0x02,
+            "operation_counter": 3,
+            "estimated_status_update_delay": 100,
+            "extended_copy_completion_status": 0x02,
+            "transfer_count_units": 0xF1,
+            "transfer_count": 1 << 40,
+            "segments_processed": 12,
+            "sense": sense,
+        }
+        d = ReceiveCopyResultsCopyStatusLID4.unmarshall_datain(
+            ReceiveCopyResultsCopyStatusLID4.marshall_datain(data)
+        )
+        self.assertEqual(d["available_data"], 28 + len(sense))
+        self.assertEqual(d["sense_data_length"], len(sense))
+        for key in data:
+            self.assertEqual(d[key], data[key])
+
+    def test_operating_parameters(self):
+        data = {
+            "snlid": 1,
+            "maximum_cscd_descriptor_count": 2,
+            "maximum_segment_descriptor_count": 256,
+            "maximum_descriptor_list_length": 65536,
+            "maximum_segment_length": 1 << 24,
+            "maximum_inline_data_length": 0,
+            "held_data_limit": 1 << 20,
+            "maximum_stream_device_transfer_size": 0,
+            "total_concurrent_copies": 64,
+            "maximum_concurrent_copies": 8,
+            "data_segment_granularity": 9,
+            "inline_data_granularity": 0,
+            "held_data_granularity": 9,
+            "implemented_descriptor_type_codes": [0x02, 0x0A, 0xE4],
+        }
+        d = ReceiveCopyResultsOperatingParameters.unmarshall_datain(
+            ReceiveCopyResultsOperatingParameters.marshall_datain(data)
+        )
+        self.assertEqual(d["available_data"], 43)
+        self.assertEqual(d["implemented_descriptor_list_length"], 3)
+        for key in data:
+            self.assertEqual(d[key], data[key])
+
+    def test_rod_token_information(self):
+        token = bytes(range(256)) * 2
+        data = {
+            "response_to_service_action": 0x10,
+            "copy_operation_status": 0x01,
+            "transfer_count_units": 0xF1,
+            "transfer_count": 2048,
+            "rod_token": token,
+        }
+        d = ReceiveCopyResultsRODTokenInformation.unmarshall_datain(
+            ReceiveCopyResultsRODTokenInformation.marshall_datain(data)
+        )
+        self.assertEqual(d["available_data"], 28 + 4 + 2 + 512)
+        self.assertEqual(d["sense"], b"")
+        for key in data:
+            self.assertEqual(d[key], data[key])
+
+        # the token follows the sense data, and a failed command has none
+        data.update(copy_operation_status=0x02, rod_token=None, sense=bytes(18))
+        d = ReceiveCopyResultsRODTokenInformation.unmarshall_datain(
+            ReceiveCopyResultsRODTokenInformation.marshall_datain(data)
+        )
+        self.assertEqual(d["sense"], bytes(18))
+        self.assertIsNone(d["rod_token"])
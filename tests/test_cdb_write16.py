@@ -7,6 +7,7 @@
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
 import unittest
+from array import array
 
 from pyscsi.pyscsi.scsi_cdb_write16 import Write16
 from pyscsi.pyscsi.scsi_enum_command import sbc
@@ -60,3 +61,13 @@ class CdbWrite16Test(unittest.TestCase):
 
             d = Write16.unmarshall_cdb(Write16.marshall_cdb(cdb))
             self.assertEqual(d, cdb)
+
+    def test_buffer(self):
+        data = array("I", bytes(1024))
+        w = Write16(sbc.WRITE_16, 512, 0, 2, data)
+        self.assertEqual(w.dataout.format, "B")
+        self.assertEqual(len(w.dataout), 1024)
+        self.assertIs(w.dataout.obj, data)
+
+        with self.assertRaises(ValueError):
+            Write16(sbc.WRITE_16, 512, 0, 4, bytes(512))
@@ -0,0 +1,49 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import unittest
+
+from pyscsi.pyscsi.scsi_cdb_write_using_token import WriteUsingToken
+from pyscsi.pyscsi.scsi_enum_command import sbc
+from pyscsi.utils.converter import scsi_ba_to_int
+from tests.mock_device import MockDevice, MockSCSI
+
+
+class CdbWriteUsingTokenTest(unittest.TestCase):
+    def test_main(self):
+        with MockSCSI(MockDevice(sbc)) as s:
+            token = bytes(range(256)) * 2
+            ranges = [{"lba": 0x2000, "num_blocks": 0x800}]
+            w = s.writeusingtoken(
+                0x0A0B0C0D, token, ranges, offset_into_rod=16, immed=1, del_tkn=1
+            )
+            cdb = w.cdb
+            opcode = s.device.opcodes.EXTENDED_COPY
+            self.assertEqual(cdb[0], opcode.value)
+            self.assertEqual(cdb[1], opcode.serviceaction.WRITE_USING_TOKEN)
+            self.assertEqual(scsi_ba_to_int(cdb[6:10]), 0x0A0B0C0D)
+            self.assertEqual(scsi_ba_to_int(cdb[10:14]), 536 + 16)
+            self.assertEqual(cdb[14], 0)
+            cdb = w.unmarshall_cdb(cdb)
+            self.assertEqual(cdb["list_identifier"], 0x0A0B0C0D)
+            self.assertEqual(cdb["parameter_list_length"], 552)
+
+            d = WriteUsingToken.unmarshall_cdb(WriteUsingToken.marshall_cdb(cdb))
+            self.assertEqual(d, cdb)
+
+            data = w.dataout
+            self.assertEqual(scsi_ba_to_int(data[0:2]), 550)
+            self.assertEqual(data[2], 0x03)  # del_tkn, immed
+            self.assertEqual(scsi_ba_to_int(data[8:16]), 16)
+            self.assertEqual(data[16:528], token)
+            self.assertEqual(scsi_ba_to_int(data[534:536]), 16)
+            d = WriteUsingToken.unmarshall_dataout(data)
+            self.assertEqual(d["rod_token"], token)
+            self.assertEqual(d["ranges"], ranges)
+            self.assertEqual(d["offset_into_rod"], 16)
+
+            with self.assertRaises(ValueError):
+                s.writeusingtoken(1, token[:16], ranges)
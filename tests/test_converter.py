@@ -0,0 +1,101 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import unittest
+
+from pyscsi.pyscsi.scsi_cdb_read16 import Read16
+from pyscsi.utils.converter import (
+    BitCodec,
+    compile_bits,
+    decode_bits,
+    encode_dict,
+    scsi_ba_to_int,
+    scsi_int_to_ba,
+)
+
+check_dict = {
+    "opcode": [0xFF, 0],
+    "rdprotect": [0xE0, 1],
+    "fua": [0x08, 1],
+    "ieee_company_id": [0x0FFFFFF0, 2],
+    "lba": [0xFFFFFFFFFFFFFFFF, 6],
+    "vendor": ("b", 14, 4),
+    "serial": ("w", 18, 2),
+}
+
+
+class ConverterTest(unittest.TestCase):
+    def test_int_conversion(self):
+        self.assertEqual(scsi_int_to_ba(34, 4), bytearray(b'\x00\x00\x00"'))
+        self.assertEqual(scsi_int_to_ba(-1, 2), bytearray(b"\xff\xff"))
+        self.assertEqual(scsi_int_to_ba(0x12345, 2), bytearray(b"\x23\x45"))
+        self.assertEqual(scsi_ba_to_int(bytearray(b"\x01\x00")), 256)
+        self.assertEqual(scsi_ba_to_int(bytearray()), 0)
+
+    def test_compile_bits(self):
+        codec = compile_bits(check_dict)
+        self.assertIsInstance(codec, BitCodec)
+        self.assertIs(compile_bits(check_dict), codec)
+        self.assertIs(compile_bits(codec), codec)
+        self.assertIs(codec.source, check_dict)
+        self.assertEqual(len(codec), len(check_dict))
+        self.assertIn("lba", codec)
+        self.assertNotIn("tl", codec)
+        # command classes compile their check dicts at class creation time
+        self.assertIs(compile_bits(Read16._cdb_bits).source, Read16._cdb_bits)
+        with self.assertRaises(ValueError):
+            BitCodec({"broken": [0x00, 0]})
+        with self.assertRaises(ValueError):
+            BitCodec({"broken": ("q", 0, 1)})
+
+    def test_roundtrip(self):
+        data = {
+            "opcode": 0x88,
+            "rdprotect": 5,
+            "fua": 1,
+            "ieee_company_id": 0xABCDEF,
+            "lba": 0x0102030405060708,
+            "vendor": bytearray(b"ABCD"),
+            "serial": bytearray(b"WXYZ"),
+            "unknown": 17,
+        }
+        buf = bytearray(22)
+        encode_dict(data, check_dict, buf)
+        self.assertEqual(buf[0], 0x88)
+        self.assertEqual(buf[1], 0xA8)
+        self.assertEqual(buf[2:6], bytearray(b"\x0a\xbc\xde\xf0"))
+        self.assertEqual(scsi_ba_to_int(buf[6:14]), 0x0102030405060708)
+        self.assertEqual(buf[14:22], bytearray(b"ABCDWXYZ"))
+
+        result = {}
+        decode_bits(buf, check_dict, result)
+        del data["unknown"]
+        self.assertEqual(result, data)
+        self.assertEqual(list(result.keys()), list(check_dict.keys()))
+
+    def test_short_buffer(self):
+        result = {}
+        decode_bits(bytearray(b"\x12\xff\x00"), check_dict, result)
+        self.assertEqual(result["opcode"], 0x12)
+        self.assertEqual(result["rdprotect"], 7)
+        self.assertEqual(result["ieee_company_id"], 0)
+        self.assertEqual(result["lba"], 0)
+        self.assertEqual(result["vendor"], bytearray())
+        with self.assertRaises(IndexError):
+            encode_dict({"lba": 1}, check_dict, bytearray(8))
+
+    def test_values(self):
+        buf = bytearray(22)
+        data = {"opcode": 0x88, "lba": 1 << 40, "vendor": b"ABCD"}
+        encode_dict(data, check_dict, buf)
+        result = {}
+        decode_bits(buf, check_dict, result)
+
+        codec = compile_bits(check_dict)
+        self.assertEqual(codec.keys(), tuple(check_dict))
+        values = codec.values(memoryview(bytes(5) + buf), 5)
+        self.assertEqual(dict(zip(codec.keys(), values)), result)
+        self.assertIs(type(values[codec.keys().index("vendor")]), bytes)
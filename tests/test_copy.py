@@ -0,0 +1,100 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import threading
+import unittest
+
+from pyscsi.pyscsi.scsi import SCSI
+from pyscsi.pyscsi.scsi_copy import copy_lun
+from pyscsi.pyscsi.scsi_device_emulated import SCSIEmulatedDevice
+
+
+class MockSerialDevice(SCSIEmulatedDevice):
+    """
+    An emulated device that does not declare itself thread safe
+    """
+
+    thread_safe = False
+
+    def execute(self, cmd, en_raw_sense=False):
+        self.threads.add(threading.get_ident())
+        SCSIEmulatedDevice.execute(self, cmd, en_raw_sense)
+
+
+class CopyTest(unittest.TestCase):
+    def setUp(self):
+        self.src = SCSI(
+            SCSIEmulatedDevice(blocks=1 << 14, block_limits={"opt_unmap_gran": 8}),
+            512,
+        )
+        # every fourth granule of the first half holds data
+        self.written = {}
+        for lba in range(0, 1 << 13, 32):
+            data = bytes([lba // 32 % 251 + 1]) * (8 * 512)
+            self.src.write16(lba, 8, data)
+            self.written[lba] = data
+
+    def check(self, dst, offset=0):
+        for lba, data in self.written.items():
+            self.assertEqual(dst.read16(lba + offset, 8).datain, data)
+            self.assertEqual(dst.read16(lba + offset + 8, 8).datain, bytes(8 * 512))
+
+    def test_thin(self):
+        dev = SCSIEmulatedDevice(blocks=1 << 14, block_limits={"opt_unmap_gran": 8})
+        dst = SCSI(dev, 512)
+        # stale data in a range the source has deallocated
+        dst.write16(4096 + 16, 8, b"\xff" * 8 * 512)
+
+        progress = []
+        stats = copy_lun(
+            self.src, dst, transfer_length=4, in_flight=3, progress=progress.append
+        )
+        self.check(dst)
+        self.assertEqual(stats.blocks_copied, 8 * len(self.written))
+        self.assertEqual(stats.blocks_deallocated, (1 << 14) - stats.blocks_copied)
+        self.assertEqual(stats.bytes_copied, stats.blocks_copied * 512)
+        self.assertEqual(len(progress), 2 * len(self.written))
+        # the destination is as sparse as the source
+        self.assertEqual(dev.mapped_blocks(), self.src.device.mapped_blocks())
+
+    def test_thick(self):
+        dev = SCSIEmulatedDevice(
+            blocks=1 << 15, thin=False, block_limits={"max_ws_len": 1000}
+        )
+        dst = SCSI(dev, 512)
+        dst.write16(4096 + 16 + 100, 8, b"\xff" * 8 * 512)
+
+        stats = copy_lun(self.src, dst, dest_lba=100)
+        self.check(dst, offset=100)
+        self.assertEqual(stats.blocks_deallocated, (1 << 14) - stats.blocks_copied)
+        self.assertGreater(stats.throughput, 0)
+        # blocks outside the copied range are left alone
+        self.assertEqual(dst.read16(99, 1).datain, bytes(512))
+
+    def test_range(self):
+        dst = SCSI(SCSIEmulatedDevice(blocks=1 << 14), 512)
+        stats = copy_lun(self.src, dst, start=4, end=36, zero_unmapped=False)
+        self.assertEqual(stats.blocks_copied, 8)
+        self.assertEqual(stats.blocks_deallocated, 0)
+        self.assertEqual(dst.read16(0, 4).datain, bytes(4 * 512))
+        self.assertEqual(dst.read16(4, 4).datain, self.written[0][: 4 * 512])
+        self.assertEqual(dst.read16(32, 4).datain, self.written[32][: 4 * 512])
+
+    def test_invalid(self):
+        small = SCSI(SCSIEmulatedDevice(blocks=1 << 13), 512)
+        with self.assertRaises(ValueError):
+            copy_lun(self.src, small)
+        other = SCSI(SCSIEmulatedDevice(blocks=1 << 14, blocksize=4096), 4096)
+        with self.assertRaises(ValueError):
+            copy_lun(self.src, other)
+
+    def test_not_thread_safe(self):
+        dev = MockSerialDevice(blocks=1 << 14, block_limits={"opt_unmap_gran": 8})
+        dev.threads = set()
+        dst = SCSI(dev, 512)
+        copy_lun(self.src, dst, transfer_length=4, in_flight=8)
+        self.check(dst)
+        self.assertEqual(dev.threads, {threading.get_ident()})
@@ -0,0 +1,168 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import errno
+import unittest
+from unittest import mock
+
+from pyscsi.pyiscsi import iscsi_device
+from pyscsi.pyscsi import scsi_device
+from pyscsi.pyscsi.scsi_cdb_testunitready import TestUnitReady as TUR
+from pyscsi.pyscsi.scsi_device_emulated import fixed_sense
+from pyscsi.pyscsi.scsi_enum_command import SCSI_STATUS, sbc
+from pyscsi.pyscsi.scsi_retry import RetryPolicy
+
+
+class FakeSgio:
+    class CheckConditionError(Exception):
+        def __init__(self, sense):
+            Exception.__init__(self)
+            self.sense = sense
+
+    def __init__(self):
+        self.files = []
+        self.fail = False
+        self.sense = []
+
+    def execute(self, file, cdb, dataout, datain):
+        self.files.append(file)
+        if self.fail and file.closed:
+            raise OSError(errno.ENODEV, "No such device")
+        if self.sense:
+            raise self.CheckConditionError(self.sense.pop(0))
+
+
+class FakeIscsi:
+    class scsi_xfer_dir:
+        SCSI_XFER_NONE = 0
+        SCSI_XFER_READ = 1
+        SCSI_XFER_WRITE = 2
+
+    class Task:
+        def __init__(self, cdb, dir, xferlen):
+            self.status = getattr(SCSI_STATUS, "GOOD")
+            self.raw_sense = bytearray()
+
+
+class FakeContext:
+    def __init__(self):
+        self.sense = []
+
+    def command(self, lun, task, dataout, datain):
+        if self.sense:
+            task.status = getattr(SCSI_STATUS, "CHECK_CONDITION")
+            task.raw_sense = self.sense.pop(0)
+
+
+class ReplugTest(unittest.TestCase):
+    def setUp(self):
+        self.sgio = FakeSgio()
+        self.ino = 1
+        self.stats = 0
+        self.now = 100.0
+        for patcher in (
+            mock.patch.object(scsi_device, "sgio", self.sgio, create=True),
+            mock.patch.object(scsi_device, "_has_sgio", True),
+            mock.patch.object(scsi_device, "get_inode", self.get_inode),
+            mock.patch("time.monotonic", lambda: self.now),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_inode(self, file):
+        self.stats += 1
+        return self.ino
+
+    def test_interval(self):
+        with scsi_device.SCSIDevice("/dev/null", replug_interval=1.0) as dev:
+            self.stats = 0
+            for i in range(100):
+                dev.execute(TUR(sbc.TEST_UNIT_READY))
+            self.assertEqual(self.stats, 0)
+
+            # replugged, picked up once the interval has passed
+            first = dev._file
+            self.ino = 2
+            self.now += 1.0
+            dev.execute(TUR(sbc.TEST_UNIT_READY))
+            self.assertTrue(first.closed)
+            self.assertIs(self.sgio.files[-1], dev._file)
+            self.assertEqual(self.stats, 2)
+
+    def test_every_command(self):
+        with scsi_device.SCSIDevice("/dev/null", replug_interval=0) as dev:
+            self.stats = 0
+            for i in range(10):
+                dev.execute(TUR(sbc.TEST_UNIT_READY))
+            self.assertEqual(self.stats, 10)
+
+    def test_error_triggers_check(self):
+        with scsi_device.SCSIDevice("/dev/null", replug_interval=60) as dev:
+            # the old file descriptor now fails with ENODEV
+            first = dev._file
+            first.close()
+            self.sgio.fail = True
+            self.ino = 2
+            dev.execute(TUR(sbc.TEST_UNIT_READY))
+            self.assertEqual(self.sgio.files, [first, dev._file])
+            self.assertIsNot(dev._file, first)
+
+            # not replugged, the error is passed on
+            dev._file.close()
+            with self.assertRaises(OSError):
+                dev.execute(TUR(sbc.TEST_UNIT_READY))
+
+    def test_disabled(self):
+        with scsi_device.SCSIDevice("/dev/null", detect_replugged=False) as dev:
+            self.stats = 0
+            self.ino = 2
+            self.now += 10
+            dev.execute(TUR(sbc.TEST_UNIT_READY))
+            self.assertEqual(self.stats, 0)
+
+    def test_check_condition(self):
+        with scsi_device.SCSIDevice("/dev/null") as dev:
+            self.sgio.sense = [fixed_sense(0x05, 0x20, 0x00)]
+            with self.assertRaises(dev.CheckCondition) as cm:
+                dev.execute(TUR(sbc.TEST_UNIT_READY))
+            self.assertEqual(cm.exception.record.key, 0x05)
+            self.assertEqual(cm.exception.asc, 0x20)
+
+            # ATA PASS-THROUGH results come back in the sense data
+            cmd = TUR(sbc.TEST_UNIT_READY)
+            self.sgio.sense = [fixed_sense(0x01, 0x00, 0x1D)]
+            dev.execute(cmd, en_raw_sense=True)
+            self.assertEqual(cmd.raw_sense_data, fixed_sense(0x01, 0x00, 0x1D))
+
+    def test_retry(self):
+        policy = RetryPolicy(sleep=self.fail)
+        with scsi_device.SCSIDevice("/dev/null") as dev:
+            # POWER ON OCCURRED is retried at once
+            self.sgio.sense = [fixed_sense(0x06, 0x29, 0x00)]
+            policy.execute(dev, TUR(sbc.TEST_UNIT_READY))
+            self.assertEqual(len(self.sgio.files), 2)
+            self.assertEqual(policy.stats(dev).by_key, {(0x06, 0x2900): 1})
+
+
+class ISCSIDeviceTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(iscsi_device, "iscsi", FakeIscsi, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.dev = iscsi_device.ISCSIDevice.__new__(iscsi_device.ISCSIDevice)
+        self.dev._iscsi = FakeContext()
+        self.dev._iscsi_url = mock.Mock(lun=0)
+
+    def test_check_condition(self):
+        self.dev._iscsi.sense = [fixed_sense(0x05, 0x20, 0x00)]
+        with self.assertRaises(self.dev.CheckCondition) as cm:
+            self.dev.execute(TUR(sbc.TEST_UNIT_READY))
+        self.assertEqual(cm.exception.asc, 0x20)
+
+        cmd = TUR(sbc.TEST_UNIT_READY)
+        self.dev._iscsi.sense = [fixed_sense(0x01, 0x00, 0x1D)]
+        self.dev.execute(cmd, en_raw_sense=True)
+        self.assertEqual(cmd.raw_sense_data, fixed_sense(0x01, 0x00, 0x1D))
@@ -0,0 +1,99 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import os
+import tempfile
+import unittest
+
+from pyscsi.pyscsi.scsi import SCSI
+from pyscsi.pyscsi.scsi_cdb_read16 import Read16
+from pyscsi.pyscsi.scsi_cdb_readcd import ReadCd
+from pyscsi.pyscsi.scsi_device_emulated import SCSIEmulatedDevice
+from pyscsi.pyscsi.scsi_enum_command import mmc, sbc
+from pyscsi.pyscsi.scsi_enum_inquiry import VPD
+
+
+class EmulatedDeviceTest(unittest.TestCase):
+    def setUp(self):
+        self.dev = SCSIEmulatedDevice(
+            blocks=4096, block_limits={"opt_unmap_gran": 64, "max_xfer_len": 1024}
+        )
+        self.s = SCSI(self.dev)
+        self.s.blocksize = 512
+
+    def test_discovery(self):
+        self.assertIs(self.dev.opcodes, sbc)
+        r = self.s.readcapacity16().result
+        self.assertEqual(r["returned_lba"], 4095)
+        self.assertEqual(r["block_length"], 512)
+        self.assertEqual(r["lbpme"], 1)
+        self.assertEqual(self.s.readcapacity10().result["returned_lba"], 4095)
+        self.assertEqual(self.s.vpd(VPD.BLOCK_LIMITS)["opt_unmap_gran"], 64)
+        self.assertEqual(self.s.vpd(VPD.LOGICAL_BLOCK_PROVISIONING)["lbpu"], 1)
+        self.s.testunitready()
+
+    def test_read_write(self):
+        data = os.urandom(8 * 512)
+        self.s.write16(100, 8, data)
+        self.s.write10(200, 8, data)
+        self.assertEqual(self.s.read16(100, 8).datain, data)
+        self.assertEqual(self.s.read12(200, 8).datain, data)
+        self.assertEqual(self.s.read10(99, 1).datain, bytes(512))
+        buf = bytearray(4096)
+        self.s.read16(100, 8, buf=buf)
+        self.assertEqual(buf, data)
+
+    def test_provisioning(self):
+        self.assertEqual(self.dev.mapped_blocks(), 0)
+        self.s.write16(70, 1, b"x" * 512)
+        self.s.writesame16(1000, 200, b"y" * 512)
+        self.assertEqual(self.dev.mapped_blocks(), 64 + 4 * 64)
+        lbas = self.s.getlbastatus(0).result["lbas"]
+        self.assertEqual(
+            [(d["lba"], d["num_blocks"], d["p_status"]) for d in lbas],
+            [(0, 64, 1), (64, 64, 0), (128, 832, 1), (960, 256, 0), (1216, 2880, 1)],
+        )
+
+        # only whole granules are deallocated, the rest is zeroed
+        self.s.unmap([{"lba": 1000, "num_blocks": 150}])
+        self.assertEqual(self.dev.mapped_blocks(), 64 + 3 * 64)
+        self.assertEqual(self.s.read16(1000, 1).datain, bytes(512))
+        self.assertEqual(self.s.read16(1150, 1).datain, b"y" * 512)
+        self.s.writesame16(0, 0, bytes(512), unmap=1)
+        self.assertEqual(self.dev.mapped_blocks(), 0)
+        self.assertEqual(self.s.read16(1150, 1).datain, bytes(512))
+
+    def test_sense(self):
+        with self.assertRaises(self.dev.CheckCondition) as cm:
+            self.s.read16(4095, 2)
+        self.assertEqual(cm.exception.asc, 0x21)
+        cmd = Read16(sbc.READ_16, 512, 0, 2048)
+        with self.assertRaises(self.dev.CheckCondition) as cm:
+            self.dev.execute(cmd, en_raw_sense=True)
+        self.assertEqual(cm.exception.asc, 0x24)
+        self.assertEqual(cmd.raw_sense_data[2], 0x05)
+        with self.assertRaises(self.dev.CheckCondition) as cm:
+            self.s.inquiry(evpd=1, page_code=VPD.REFERRALS)
+        with self.assertRaises(self.dev.CheckCondition) as cm:
+            self.dev.execute(ReadCd(mmc.READ_CD, 0, 1))
+        self.assertEqual(cm.exception.asc, 0x20)
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "disk.img")
+            with SCSIEmulatedDevice(blocks=1024, path=path) as dev:
+                s = SCSI(dev)
+                s.blocksize = 512
+                s.write16(10, 2, b"z" * 1024)
+                s.synchronizecache16(0, 0)
+                self.assertEqual(os.path.getsize(path), 1024 * 512)
+            with SCSIEmulatedDevice(blocks=1024, path=path, thin=False) as dev:
+                s = SCSI(dev)
+                s.blocksize = 512
+                self.assertEqual(s.read16(10, 2).datain, b"z" * 1024)
+                self.assertEqual(dev.mapped_blocks(), 1024)
+                with self.assertRaises(dev.CheckCondition):
+                    s.unmap([{"lba": 0, "num_blocks": 1}])
@@ -0,0 +1,102 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import mmap
+import os
+import unittest
+
+from pyscsi.pyscsi.scsi_cdb_read16 import Read16
+from pyscsi.pyscsi.scsi_cdb_testunitready import TestUnitReady as TUR
+from pyscsi.pyscsi.scsi_cdb_write16 import Write16
+from pyscsi.pyscsi.scsi_device_queued import (
+    SG_DXFER_FROM_DEV,
+    SG_DXFER_NONE,
+    SG_DXFER_TO_DEV,
+    SGIOHeader,
+)
+from pyscsi.pyscsi.scsi_enum_command import sbc
+from tests.mock_device import MockQueuedDevice, MockSCSI
+
+
+class QueuedDeviceTest(unittest.TestCase):
+    def test_queue_depth(self):
+        dev = MockQueuedDevice(queue_depth=8)
+        done = []
+        futures = []
+        for lba in range(100):
+            cmd = Read16(sbc.READ_16, 512, lba, 2)
+            futures.append(dev.submit(cmd, callback=done.append))
+            self.assertLessEqual(dev.in_flight, 8)
+        dev.drain()
+        self.assertEqual(dev.in_flight, 0)
+        self.assertEqual(dev.max_in_flight, 8)
+        self.assertEqual(len(done), 100)
+        for lba, future in enumerate(futures):
+            cmd = future.result()
+            self.assertEqual(cmd.datain, bytearray([lba & 0xFF]) * 1024)
+
+        with self.assertRaises(ValueError):
+            dev.queue_depth = 0
+
+    def test_directions(self):
+        dev = MockQueuedDevice(queue_depth=4)
+        dev.execute(Write16(sbc.WRITE_16, 512, 0, 1, bytes(512)))
+        dev.execute(Read16(sbc.READ_16, 512, 0, 4))
+        self.assertEqual(
+            dev.written,
+            [
+                (sbc.WRITE_16.value, SG_DXFER_TO_DEV, 512),
+                (sbc.READ_16.value, SG_DXFER_FROM_DEV, 2048),
+            ],
+        )
+        with self.assertRaises(dev.CheckCondition):
+            dev.execute(TUR(sbc.TEST_UNIT_READY))
+        self.assertEqual(dev.written[-1], (0x00, SG_DXFER_NONE, 0))
+
+    def test_check_condition(self):
+        dev = MockQueuedDevice(queue_depth=4)
+        cmd = TUR(sbc.TEST_UNIT_READY)
+        future = dev.submit(cmd, en_raw_sense=True)
+        dev.drain()
+        with self.assertRaises(dev.CheckCondition) as cm:
+            future.result()
+        self.assertEqual(cm.exception.data["sense_key"], 0x02)
+        self.assertEqual(cm.exception.asc, 0x04)
+        self.assertEqual(cm.exception.ascq, 0x01)
+        self.assertEqual(cmd.raw_sense_data, cmd.sense)
+
+    def test_scsi(self):
+        dev = MockQueuedDevice(queue_depth=4)
+        dev.opcodes = sbc
+        with MockSCSI(dev) as s:
+            s.blocksize = 512
+            r = s.read16(7, 1)
+            self.assertEqual(r.datain, bytearray([7]) * 512)
+
+    def test_buffer(self):
+        dev = MockQueuedDevice(queue_depth=4)
+        buf = mmap.mmap(-1, 4096)
+        view = memoryview(buf)
+        for lba in range(8):
+            cmd = Read16(sbc.READ_16, 512, lba, 1, buf=view[lba * 512 :])
+            dev.execute(cmd)
+        for lba in range(8):
+            self.assertEqual(buf[lba * 512 : (lba + 1) * 512], bytes([lba]) * 512)
+        dev.execute(Write16(sbc.WRITE_16, 512, 0, 8, view))
+        self.assertEqual(dev.written[-1], (sbc.WRITE_16.value, SG_DXFER_TO_DEV, 4096))
+
+    def test_stale_completion(self):
+        dev = MockQueuedDevice(queue_depth=4)
+        future = dev.submit(Read16(sbc.READ_16, 512, 3, 1))
+        # a completion left in the driver from before the device was reopened
+        stale = SGIOHeader()
+        stale.pack_id = 0x12345
+        dev._completed.append(stale)
+        os.write(dev._wfd, b"x")
+        self.assertEqual(dev.reap(), 0)
+        self.assertFalse(future.done())
+        self.assertEqual(dev.reap(), 1)
+        self.assertEqual(future.result().datain, bytearray([3]) * 512)
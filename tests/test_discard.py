@@ -0,0 +1,165 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import unittest
+
+from pyscsi.pyscsi.scsi import SCSI
+from pyscsi.pyscsi.scsi_device_emulated import SCSIEmulatedDevice, fixed_sense
+from pyscsi.pyscsi.scsi_discard import (
+    coalesce,
+    discard,
+    plan_unmap,
+    unmap_granularity,
+    wipe,
+    write_same_commands,
+    zero_range,
+)
+from pyscsi.pyscsi.scsi_enum_command import sbc
+from tests.mock_device import MockBlockDevice, MockSCSI
+
+
+class MockOldDisk(SCSIEmulatedDevice):
+    """
+    An emulated disk without NDOB, or without WRITE SAME(16) at all
+    """
+
+    def __init__(self, blocks, write_same=True, **kwargs):
+        SCSIEmulatedDevice.__init__(self, blocks, **kwargs)
+        self.write_same = write_same
+        self.commands = []
+
+    def execute(self, cmd, en_raw_sense=False):
+        self.commands.append(cmd.cdb[0])
+        if cmd.cdb[0] == sbc.WRITE_SAME_16.value:
+            if not self.write_same:
+                cmd.sense = fixed_sense(0x05, 0x20, 0x00)
+                raise self.CheckCondition(cmd.sense)
+            if cmd.cdb[1] & 0x01:
+                cmd.sense = fixed_sense(0x05, 0x24, 0x00)
+                raise self.CheckCondition(cmd.sense)
+        SCSIEmulatedDevice.execute(self, cmd, en_raw_sense)
+
+
+class DiscardTest(unittest.TestCase):
+    def test_coalesce(self):
+        ranges = [(100, 10), (0, 8), (8, 4), (105, 20), (50, 0)]
+        self.assertEqual(coalesce(ranges), [(0, 12), (100, 25)])
+        # byte ranges only cover the blocks inside them
+        ranges = [(100, 1000), (1100, 512), (4096, 511)]
+        self.assertEqual(coalesce(ranges, 512), [(1, 2)])
+
+    def test_granularity(self):
+        self.assertEqual(unmap_granularity({}), (1, 0))
+        limits = {"opt_unmap_gran": 8, "unmap_gran_alignment": 3}
+        # the alignment is only valid with UGAVALID
+        self.assertEqual(unmap_granularity(limits), (8, 0))
+        limits["unmap_gran_alignment"] |= 0x80000000
+        self.assertEqual(unmap_granularity(limits), (8, 3))
+
+    def test_plan(self):
+        limits = {
+            "max_unmap_lba_count": 100,
+            "max_unmap_bd_count": 2,
+            "opt_unmap_gran": 8,
+            "unmap_gran_alignment": 0x80000003,
+        }
+        plan = plan_unmap([(0, 30), (40, 2), (50, 250)], limits)
+        self.assertEqual(
+            plan,
+            [
+                [{"lba": 3, "num_blocks": 24}, {"lba": 51, "num_blocks": 72}],
+                [{"lba": 123, "num_blocks": 96}],
+                [{"lba": 219, "num_blocks": 80}],
+            ],
+        )
+        # every command is within the limits, and packed as far as they allow
+        for lbas in plan:
+            self.assertLessEqual(len(lbas), 2)
+            self.assertLessEqual(sum(d["num_blocks"] for d in lbas), 100)
+
+        plan = plan_unmap([(0, 30), (40, 2)], limits, align=False)
+        self.assertEqual(
+            plan, [[{"lba": 0, "num_blocks": 30}, {"lba": 40, "num_blocks": 2}]]
+        )
+        self.assertEqual(plan_unmap([(0, 1 << 33)], {})[1][0]["lba"], 0xFFFFFFFF)
+
+        # a zero maximum unmap LBA count means UNMAP is not implemented
+        limits["max_unmap_lba_count"] = 0
+        with self.assertRaises(ValueError):
+            plan_unmap([(0, 30)], limits)
+
+    def test_discard(self):
+        dev = SCSIEmulatedDevice(
+            blocks=1 << 16,
+            block_limits={
+                "opt_unmap_gran": 8,
+                "max_unmap_lba_count": 1024,
+                "max_unmap_bd_count": 4,
+            },
+        )
+        s = SCSI(dev, 512)
+        s.writesame16(0, 1 << 16, b"\xff" * 512)
+        ranges = [(lba * 512, 20 * 512 + 100) for lba in range(0, 1 << 15, 64)]
+        progress = []
+        commands, blocks = discard(
+            s, ranges, blocksize=512, in_flight=4, progress=progress.append
+        )
+        self.assertEqual(blocks, 512 * 16)
+        self.assertEqual(commands, 128)
+        self.assertEqual(progress[-1], blocks)
+        self.assertEqual(dev.mapped_blocks(), (1 << 16) - blocks)
+        # the tail of a range not filling a granule is left alone
+        self.assertEqual(s.read16(16, 8).datain, b"\xff" * 4096)
+        self.assertEqual(s.read16(8, 8).datain, bytes(4096))
+
+    def test_zero(self):
+        dev = SCSIEmulatedDevice(blocks=1 << 16, block_limits={"max_ws_len": 1000})
+        s = SCSI(dev, 512)
+        for lba in range(0, 1 << 16, 1 << 10):
+            s.write16(lba, 1 << 10, b"\xff" * (1 << 19))
+        progress = []
+        commands, blocks = zero_range(s, 100, 4000, progress=progress.append)
+        # split at granules of 128 blocks
+        self.assertEqual((commands, blocks), (5, 4000))
+        self.assertEqual(progress, [796, 1692, 2588, 3484, 4000])
+        self.assertEqual(s.read16(99, 1).datain, b"\xff" * 512)
+        self.assertEqual(s.read16(100, 8).datain, bytes(4096))
+        self.assertEqual(s.read16(4100, 1).datain, b"\xff" * 512)
+        # the thin device deallocated the whole granules of the range
+        self.assertEqual(dev.mapped_blocks(), (1 << 16) - 31 * 128)
+
+        commands, blocks = wipe(s, unmap=False, in_flight=8)
+        self.assertEqual(blocks, 1 << 16)
+        self.assertEqual(commands, 66)
+        self.assertEqual(dev.mapped_blocks(), 1 << 16)
+        self.assertEqual(s.read16(0, 8).datain, bytes(4096))
+
+    def test_max_ws_len(self):
+        # MAXIMUM WRITE SAME LENGTH is the 8 byte field at offset 36 of the page
+        dev = MockBlockDevice(blocks=1 << 18, block_limits={"max_ws_len": 65535})
+        s = MockSCSI(dev)
+        s.blocksize = 512
+        commands = list(write_same_commands(s, [(0, 1 << 17)], 512))
+        self.assertEqual([n for _, n in commands], [65535, 65535, 2])
+        self.assertEqual(commands[1][0].cdb[2:10], (65535).to_bytes(8, "big"))
+
+    def test_fallback(self):
+        dev = MockOldDisk(1 << 14, thin=False)
+        s = SCSI(dev, 512)
+        s.write16(0, 8, b"\xff" * 4096)
+        self.assertEqual(zero_range(s, 0, 1 << 14), (1, 1 << 14))
+        # NDOB was rejected, then a zero block was sent
+        self.assertEqual(dev.commands[-2:], [sbc.WRITE_SAME_16.value] * 2)
+        self.assertEqual(s.read16(0, 8).datain, bytes(4096))
+
+        dev = MockOldDisk(1 << 14, write_same=False, thin=False)
+        s = SCSI(dev, 512)
+        s.write16(100, 8, b"\xff" * 4096)
+        commands, blocks = wipe(s)
+        # two WRITE SAME(16) commands rejected, then 1 MiB writes
+        self.assertEqual((commands, blocks), (8, 1 << 14))
+        self.assertEqual(dev.commands.count(sbc.WRITE_16.value), 9)
+        self.assertEqual(s.read16(100, 8).datain, bytes(4096))
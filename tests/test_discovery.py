@@ -0,0 +1,116 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pyscsi.pyscsi import scsi_discovery
+from pyscsi.pyscsi.scsi import SCSI
+from pyscsi.pyscsi.scsi_discovery import DeviceCache, DeviceInfo, boot_id, device_key
+from pyscsi.pyscsi.scsi_enum_command import sbc, spc
+from pyscsi.pyscsi.scsi_enum_inquiry import VPD
+from tests.mock_device import MockBlockDevice
+
+
+class MockNodeDevice(MockBlockDevice):
+    _file_name = "/dev/null"
+
+    def __init__(self):
+        MockBlockDevice.__init__(self, blocks=64, block_limits={"max_xfer_len": 128})
+        self.opcodes = spc
+        self.inquiries = 0
+
+    def execute(self, cmd, en_raw_sense=False):
+        if cmd.cdb[0] == 0x12:
+            self.inquiries += 1
+        MockBlockDevice.execute(self, cmd, en_raw_sense)
+
+
+class DeviceCacheTest(unittest.TestCase):
+    def test_key(self):
+        st = os.stat("/dev/null")
+        key = "/dev/null:%s:%d:%d:%d" % (
+            boot_id(),
+            st.st_rdev,
+            st.st_ino,
+            st.st_ctime_ns,
+        )
+        self.assertEqual(device_key(MockNodeDevice()), key)
+        self.assertIsNone(device_key(object()))
+
+    def test_scsi(self):
+        cache = DeviceCache()
+        dev = MockNodeDevice()
+        s = SCSI(dev, cache=cache)
+        self.assertIs(dev.opcodes, sbc)
+        self.assertEqual(dev.inquiries, 1)
+        s.blocksize = 4096
+        self.assertEqual(s.vpd(VPD.BLOCK_LIMITS)["max_xfer_len"], 128)
+        self.assertEqual(dev.inquiries, 3)
+
+        dev = MockNodeDevice()
+        s = SCSI(dev, cache=cache)
+        self.assertIs(dev.opcodes, sbc)
+        self.assertEqual(s.blocksize, 4096)
+        self.assertEqual(s.vpd(VPD.BLOCK_LIMITS)["max_xfer_len"], 128)
+        self.assertEqual(s.vpd(VPD.BLOCK_DEVICE_CHARACTERISTICS), {})
+        self.assertEqual(dev.inquiries, 0)
+
+        cache.invalidate(dev)
+        SCSI(dev, cache=cache)
+        self.assertEqual(dev.inquiries, 1)
+        cache.invalidate()
+        self.assertEqual(len(cache), 0)
+
+    def test_persistent(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache", "devices.json")
+            s = SCSI(MockNodeDevice(), blocksize=512, cache=DeviceCache(path))
+            s.vpd(VPD.BLOCK_LIMITS)
+            s.blocksize = 4096
+            self.assertFalse(os.path.exists(path))
+            s._cache.save()
+            self.assertTrue(os.path.exists(path))
+
+            cache = DeviceCache(path)
+            info = cache.get(MockNodeDevice())
+            self.assertEqual(info, s._info)
+            self.assertEqual(info.blocksize, 4096)
+            self.assertEqual(
+                sorted(info.vpd), [VPD.SUPPORTED_VPD_PAGES, VPD.BLOCK_LIMITS]
+            )
+
+            with open(path, "w") as f:
+                f.write("{broken")
+            self.assertEqual(len(DeviceCache(path)), 0)
+
+    def test_recreated_node(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "devices.json")
+            s = SCSI(MockNodeDevice(), blocksize=512, cache=DeviceCache(path))
+            s._cache.save()
+            self.assertIsNotNone(DeviceCache(path).get(MockNodeDevice()))
+
+            # same path, device number and inode, but a new node
+            st = os.stat("/dev/null")
+            node = mock.Mock(
+                st_rdev=st.st_rdev, st_ino=st.st_ino, st_ctime_ns=st.st_ctime_ns + 1
+            )
+            with mock.patch.object(scsi_discovery.os, "stat", return_value=node):
+                self.assertIsNone(DeviceCache(path).get(MockNodeDevice()))
+
+            # the same node after a reboot
+            with mock.patch.object(scsi_discovery, "boot_id", return_value="x"):
+                self.assertIsNone(DeviceCache(path).get(MockNodeDevice()))
+
+    def test_info(self):
+        info = DeviceInfo(8, 0, {0xB0: b"\x00\xb0\x00\x01\xff"})
+        self.assertEqual(DeviceInfo.from_dict(info.to_dict()), info)
+        self.assertNotEqual(DeviceInfo(0), info)
+        with self.assertRaises(TypeError):
+            hash(info)
@@ -8,7 +8,9 @@
 
 import unittest
 
-from pyscsi.pyscsi.scsi_enum_command import smc
+from pyscsi.pyscsi.scsi_enum_command import mmc, sbc, smc
+from pyscsi.pyscsi.scsi_opcode import OpCode
+from pyscsi.utils.converter import get_opcode
 from pyscsi.utils.enum import Enum
 from pyscsi.utils.exception import NotSupportedArgumentError
 
@@ -61,3 +63,37 @@ class EnumTest(unittest.TestCase):
         self.assertEqual(a[4], "")
         self.assertEqual(smc.WRITE_BUFFER.value, 0x3B)
         self.assertEqual(smc.WRITE_BUFFER.name, "WRITE_BUFFER")
+
+    def test_add_remove(self):
+        i = Enum(enum_dict)
+        i.add("D", 4)
+        i.add("E", 1)
+        self.assertEqual(i.keys, ["A", "B", "C", "D", "E"])
+        self.assertEqual(i[4], "D")
+        self.assertEqual(i[1], "A")
+        i.remove("A")
+        self.assertEqual(i[1], "E")
+        self.assertEqual(i.keys, ["B", "C", "D", "E"])
+        i.B = 5
+        self.assertEqual(i[2], "")
+        self.assertEqual(i[5], "B")
+        with self.assertRaises(KeyError):
+            i.remove("A")
+
+        # unhashable values are found too
+        j = Enum(A={"x": 1}, B=2)
+        self.assertEqual(j[{"x": 1}], "A")
+        self.assertEqual(j[[]], "")
+
+    def test_get_opcode(self):
+        self.assertEqual(next(get_opcode(sbc, "9E")).name, "SBC_OPCODE_9E")
+        self.assertEqual(next(get_opcode(sbc, 0xA3)).name, "SBC_OPCODE_A3")
+        # SEND KEY shares the value, but is not a generic opcode
+        self.assertEqual(list(get_opcode(mmc, "A3")), [])
+
+        i = Enum(A=OpCode("A", 0x01, {}))
+        self.assertEqual(list(get_opcode(i, "9E")), [])
+        i.add("OPCODE_9E", OpCode("OPCODE_9E", 0x9E, {}))
+        self.assertEqual(next(get_opcode(i, "9E")).value, 0x9E)
+        i.remove("OPCODE_9E")
+        self.assertEqual(list(get_opcode(i, "9E")), [])
@@ -0,0 +1,155 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import unittest
+
+from pyscsi.pyscsi import scsi_enum_modesense as MODESENSE6
+from pyscsi.pyscsi.scsi_cdb_exchangemedium import ExchangeMedium
+from pyscsi.pyscsi.scsi_cdb_modesense6 import ModeSense6
+from pyscsi.pyscsi.scsi_cdb_movemedium import MoveMedium
+from pyscsi.pyscsi.scsi_cdb_readelementstatus import ReadElementStatus
+from pyscsi.pyscsi.scsi_enum_command import smc
+from pyscsi.pyscsi.scsi_enum_readelementstatus import ELEMENT_TYPE
+from pyscsi.pyscsi.scsi_inventory import ElementInventory
+from pyscsi.utils.converter import scsi_int_to_ba
+from tests.mock_device import MockDevice, MockSCSI
+
+
+class MockChanger(MockDevice):
+    """
+    A library with one picker, two drives and a number of slots, the slots
+    hold volumes SLOTnnnn
+    """
+
+    def __init__(self, slots):
+        MockDevice.__init__(self, smc)
+        self.elements = {1: (ELEMENT_TYPE.MEDIUM_TRANSPORT, None)}
+        for i in range(2):
+            self.elements[100 + i] = (ELEMENT_TYPE.DATA_TRANSFER, None)
+        for i in range(slots):
+            self.elements[1000 + i] = (ELEMENT_TYPE.STORAGE, b"SLOT%04d" % i)
+        self.slots = slots
+        self.reads = []
+
+    def execute(self, cmd, en_raw_sense: bool = False):
+        opcode = cmd.cdb[0]
+        if opcode == getattr(smc, "MODE_SENSE_6").value:
+            page = {
+                "page_code": getattr(
+                    MODESENSE6.PAGE_CODE, "ELEMENT_ADDRESS_ASSIGNMENT"
+                ),
+                "spf": 0,
+                "first_medium_transport_element_address": 1,
+                "num_medium_transport_elements": 1,
+                "first_storage_element_address": 1000,
+                "num_storage_elements": self.slots,
+                "first_import_element_address": 0,
+                "num_import_elements": 0,
+                "first_data_transfer_element_address": 100,
+                "num_data_transfer_elements": 2,
+            }
+            data = ModeSense6.marshall_datain({"mode_pages": [page]})
+            cmd.datain[: len(data)] = data
+        elif opcode == getattr(smc, "READ_ELEMENT_STATUS").value:
+            cdb = ReadElementStatus.unmarshall_cdb(cmd.cdb)
+            self.reads.append((cdb["starting_element_address"], cdb["num_elements"]))
+            data = self.element_status(cdb)
+            # a short allocation length truncates the data
+            cmd.datain[: len(data)] = data[: len(cmd.datain)]
+        elif opcode == getattr(smc, "MOVE_MEDIUM").value:
+            cdb = MoveMedium.unmarshall_cdb(cmd.cdb)
+            self.move(cdb["source_address"], cdb["destination_address"])
+        elif opcode == getattr(smc, "EXCHANGE_MEDIUM").value:
+            cdb = ExchangeMedium.unmarshall_cdb(cmd.cdb)
+            # source goes to the first, the first to the second destination
+            held = self.elements[cdb["first_destination_address"]][1]
+            self.move(cdb["source_address"], cdb["first_destination_address"], True)
+            t = self.elements[cdb["second_destination_address"]][0]
+            self.elements[cdb["second_destination_address"]] = (t, held)
+
+    def move(self, source, dest, force=False):
+        t, volume = self.elements[source]
+        self.elements[source] = (t, None)
+        t, held = self.elements[dest]
+        assert force or held is None
+        self.elements[dest] = (t, volume)
+
+    def element_status(self, cdb):
+        addresses = [
+            a
+            for a in sorted(self.elements)
+            if a >= cdb["starting_element_address"]
+            and cdb["element_type"] in (ELEMENT_TYPE.ALL, self.elements[a][0])
+        ][: cdb["num_elements"]]
+
+        data = bytearray(8)
+        data[0:2] = scsi_int_to_ba(addresses[0] if addresses else 0, 2)
+        data[2:4] = scsi_int_to_ba(len(addresses), 2)
+        edl = 12 + 36 * cdb["voltag"] + 4
+        page = None
+        for a in addresses:
+            t, volume = self.elements[a]
+            if page is None or page[0] != t:
+                page = bytearray(8)
+                page[0] = t
+                page[1] = 0x80 * cdb["voltag"]
+                page[2:4] = scsi_int_to_ba(edl, 2)
+                data += page
+                start = len(data)
+            d = bytearray(edl)
+            d[0:2] = scsi_int_to_ba(a, 2)
+            d[2] = 0x08 | (volume is not None)
+            if cdb["voltag"] and volume is not None:
+                d[12:48] = volume.ljust(36)
+            data += d
+            data[start - 3 : start] = scsi_int_to_ba(len(data) - start, 3)
+        data[5:8] = scsi_int_to_ba(len(data) - 8, 3)
+        return data
+
+
+class InventoryTest(unittest.TestCase):
+    def test_refresh(self):
+        dev = MockChanger(5000)
+        inv = ElementInventory(MockSCSI(dev), alloclen=16384)
+        changed = inv.refresh()
+        self.assertEqual(len(changed), 5003)
+        self.assertEqual(len(inv), 5003)
+        self.assertEqual(len(inv.elements(ELEMENT_TYPE.STORAGE)), 5000)
+        self.assertEqual(inv.element_type(100), ELEMENT_TYPE.DATA_TRANSFER)
+        self.assertEqual(inv[1000 + 4321]["primary_volume_tag"][:8], b"SLOT4321")
+        self.assertEqual(inv.find(b"SLOT4321"), 5321)
+        self.assertIsNone(inv.find(b"NOSUCHVOL"))
+
+        # the slots are read in pages of what fits in 16 KiB
+        per_command = (16384 - 16) // 52
+        storage = [r for r in dev.reads if r[0] >= 1000]
+        self.assertEqual(storage[0], (1000, 5000))
+        self.assertEqual(storage[1], (1000 + per_command, per_command))
+        self.assertEqual(len(storage), -(-5000 // per_command))
+
+        # nothing changed
+        self.assertEqual(inv.refresh(ELEMENT_TYPE.DATA_TRANSFER), [])
+
+    def test_move(self):
+        dev = MockChanger(5000)
+        inv = ElementInventory(MockSCSI(dev))
+        inv.refresh()
+        dev.reads = []
+
+        changed = inv.move(inv.find(b"SLOT0007"), 101)
+        self.assertEqual(sorted(changed), [101, 1007])
+        self.assertEqual(inv.find(b"SLOT0007"), 101)
+        self.assertEqual(inv[1007]["full"], 0)
+        # only the picker, the drive and the slot are read
+        self.assertEqual(sorted(dev.reads), [(1, 1), (101, 1), (1007, 1)])
+
+        dev.reads = []
+        changed = inv.exchange(101, 1009, 1007)
+        self.assertEqual(sorted(changed), [101, 1007, 1009])
+        self.assertEqual(inv.find(b"SLOT0007"), 1009)
+        self.assertEqual(inv.find(b"SLOT0009"), 1007)
+        self.assertEqual(inv[101]["full"], 0)
+        self.assertEqual(sorted(dev.reads), [(1, 1), (101, 1), (1007, 1), (1009, 1)])
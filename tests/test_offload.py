@@ -0,0 +1,343 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import itertools
+import unittest
+
+from pyscsi.pyscsi.scsi import SCSI
+from pyscsi.pyscsi.scsi_cdb_inquiry import Inquiry
+from pyscsi.pyscsi.scsi_cdb_populate_token import PopulateToken
+from pyscsi.pyscsi.scsi_cdb_read16 import Read16
+from pyscsi.pyscsi.scsi_cdb_receive_copy_results import (
+    ReceiveCopyResultsCopyStatusLID4,
+    ReceiveCopyResultsOperatingParameters,
+    ReceiveCopyResultsRODTokenInformation,
+)
+from pyscsi.pyscsi.scsi_cdb_write16 import Write16
+from pyscsi.pyscsi.scsi_cdb_write_using_token import WriteUsingToken
+from pyscsi.pyscsi.scsi_device_emulated import SCSIEmulatedDevice, fixed_sense
+from pyscsi.pyscsi.scsi_enum_command import sbc, spc
+from pyscsi.pyscsi.scsi_enum_inquiry import THIRD_PARTY_COPY_DESCRIPTOR, VPD
+from pyscsi.pyscsi.scsi_offload import (
+    copy_capabilities,
+    extended_copy,
+    lun_designator,
+    token_copy,
+    token_limits,
+)
+from pyscsi.pyscsi.scsi_sense import SCSICheckCondition
+from pyscsi.utils.converter import scsi_ba_to_int
+
+
+class MockCopyManager(SCSIEmulatedDevice):
+    """
+    An emulated disk that also runs EXTENDED COPY(LID4) commands between the
+    logical units it knows. A copy stays in progress for polls status polls.
+    The operating parameters are only reported if parameters is set.
+    """
+
+    def __init__(self, blocks, serial, polls=0):
+        SCSIEmulatedDevice.__init__(self, blocks, serial=serial)
+        self.luns = {}
+        self.polls = polls
+        self.copies = {}
+        self.segments = []
+        self.max_concurrent = 0
+        self.fail = False
+        self.parameters = None
+        self.parameter_requests = 0
+
+    def add_lun(self, s):
+        d = s.vpd(0x83)["designator_descriptors"][0]
+        self.luns[d["designator"]["locally_administered_value"]] = s
+
+    def execute(self, cmd, en_raw_sense=False):
+        if cmd.cdb[0] == spc.EXTENDED_COPY.value:
+            self.extended_copy(cmd.dataout)
+        elif cmd.cdb[0] == spc.RECEIVE_COPY_RESULTS.value and cmd.cdb[1] == 0x03:
+            self.parameter_requests += 1
+            if self.parameters is None:
+                cmd.sense = fixed_sense(0x05, 0x24, 0x00)
+                raise self.CheckCondition(cmd.sense)
+            data = ReceiveCopyResultsOperatingParameters.marshall_datain(
+                self.parameters
+            )
+            cmd.datain[: len(data)] = data
+        elif cmd.cdb[0] == spc.RECEIVE_COPY_RESULTS.value:
+            list_identifier = scsi_ba_to_int(cmd.cdb[2:6])
+            remaining, segments = self.copies[list_identifier]
+            data = {"copy_operation_status": 0x01, "segments_processed": segments}
+            if remaining:
+                self.copies[list_identifier] = (remaining - 1, segments)
+                data.update(copy_operation_status=0x10)
+                data.update(estimated_status_update_delay=1)
+            elif self.fail:
+                data.update(copy_operation_status=0x02, segments_processed=0)
+                data["sense"] = bytes([0x70, 0, 0x05, 0, 0, 0, 0, 10] + [0] * 10)
+            else:
+                del self.copies[list_identifier]
+            data = ReceiveCopyResultsCopyStatusLID4.marshall_datain(data)
+            cmd.datain[: len(data)] = data
+        else:
+            SCSIEmulatedDevice.execute(self, cmd, en_raw_sense)
+
+    def extended_copy(self, data):
+        assert data[0] == 1 and data[15] & 0x01  # LID4, IMMED
+        list_identifier = scsi_ba_to_int(data[20:24])
+        cscd_length = scsi_ba_to_int(data[42:44])
+        segment_length = scsi_ba_to_int(data[44:46])
+        luns = []
+        for pos in range(48, 48 + cscd_length, 32):
+            designator = data[pos + 8 : pos + 8 + data[pos + 7]]
+            luns.append(self.luns[scsi_ba_to_int(designator) & 0x0FFFFFFFFFFFFFFF])
+        segments = []
+        for pos in range(48 + cscd_length, 48 + cscd_length + segment_length, 28):
+            seg = data[pos : pos + 28]
+            n = scsi_ba_to_int(seg[10:12])
+            src, dst = luns[scsi_ba_to_int(seg[4:6])], luns[scsi_ba_to_int(seg[6:8])]
+            block = src.read16(scsi_ba_to_int(seg[12:20]), n).datain
+            dst.write16(scsi_ba_to_int(seg[20:28]), n, block)
+            segments.append(n)
+        self.segments.append(segments)
+        self.copies[list_identifier] = (self.polls, len(segments))
+        self.max_concurrent = max(self.max_concurrent, len(self.copies))
+
+
+class MockTokenManager(SCSIEmulatedDevice):
+    """
+    An emulated disk that also runs POPULATE TOKEN and WRITE USING TOKEN
+    commands. Managers sharing a tokens dict can write each other's tokens.
+    The Third-party Copy VPD page is only reported if limits is set, and a
+    WRITE USING TOKEN command writes at most partial blocks if that is set.
+    """
+
+    _tokens = itertools.count(1)
+
+    def __init__(self, blocks, tokens, limits=None):
+        SCSIEmulatedDevice.__init__(self, blocks)
+        self.tokens = tokens
+        self.limits = limits
+        self.partial = 0
+        self.status = {}
+        self.commands = []
+
+    def execute(self, cmd, en_raw_sense=False):
+        if cmd.cdb[0] == spc.INQUIRY.value and cmd.cdb[1] & 0x01 and self.limits:
+            self.inquiry(cmd)
+        elif cmd.cdb[0] == spc.EXTENDED_COPY.value and cmd.cdb[1] == 0x10:
+            self.populate_token(cmd)
+        elif cmd.cdb[0] == spc.EXTENDED_COPY.value and cmd.cdb[1] == 0x11:
+            self.write_using_token(cmd)
+        elif cmd.cdb[0] == spc.RECEIVE_COPY_RESULTS.value:
+            data = dict(self.status[scsi_ba_to_int(cmd.cdb[2:6])])
+            data["response_to_service_action"] = cmd.cdb[1]
+            data = ReceiveCopyResultsRODTokenInformation.marshall_datain(data)
+            cmd.datain[: len(data)] = data
+        else:
+            SCSIEmulatedDevice.execute(self, cmd, en_raw_sense)
+
+    def inquiry(self, cmd):
+        page = {"page_code": cmd.cdb[2]}
+        if cmd.cdb[2] == VPD.SUPPORTED_VPD_PAGES:
+            page["vpd_pages"] = [VPD.SUPPORTED_VPD_PAGES, VPD.THIRD_PARTY_COPY]
+        elif cmd.cdb[2] == VPD.THIRD_PARTY_COPY:
+            d = {
+                "descriptor_type": (
+                    THIRD_PARTY_COPY_DESCRIPTOR.BLOCK_DEVICE_ROD_TOKEN_LIMITS
+                )
+            }
+            d.update(self.limits)
+            page["third_party_copy_descriptors"] = [d]
+        else:
+            SCSIEmulatedDevice.execute(self, cmd)
+            return
+        data = Inquiry.marshall_datain(page)
+        cmd.datain[: len(data)] = data
+
+    def populate_token(self, cmd):
+        d = PopulateToken.unmarshall_dataout(cmd.dataout)
+        self.commands.append(("populate", d["ranges"]))
+        data = bytearray()
+        for r in d["ranges"]:
+            read = Read16(sbc.READ_16, 512, r["lba"], r["num_blocks"])
+            SCSIEmulatedDevice.execute(self, read)
+            data += read.datain
+        token = next(self._tokens).to_bytes(512, "big")
+        self.tokens[token] = data
+        self.status[scsi_ba_to_int(cmd.cdb[6:10])] = {
+            "copy_operation_status": 0x01,
+            "rod_token": token,
+        }
+
+    def write_using_token(self, cmd):
+        d = WriteUsingToken.unmarshall_dataout(cmd.dataout)
+        self.commands.append(("write", d["ranges"]))
+        data = self.tokens[d["rod_token"]]
+        if d["del_tkn"]:
+            del self.tokens[d["rod_token"]]
+        pos = d["offset_into_rod"] * 512
+        total = sum(r["num_blocks"] for r in d["ranges"])
+        left = min(total, self.partial or total)
+        for r in d["ranges"]:
+            n = min(r["num_blocks"], left)
+            if n:
+                block = data[pos : pos + n * 512]
+                write = Write16(sbc.WRITE_16, 512, r["lba"], n, block)
+                SCSIEmulatedDevice.execute(self, write)
+            pos += n * 512
+            left -= n
+        written = min(total, self.partial or total)
+        self.status[scsi_ba_to_int(cmd.cdb[6:10])] = {
+            "copy_operation_status": 0x01 if written == total else 0x04,
+            "transfer_count_units": 0xF1,
+            "transfer_count": written,
+        }
+
+
+class ExtendedCopyTest(unittest.TestCase):
+    def setUp(self):
+        self.dev = MockCopyManager(1 << 16, "SOURCE", polls=2)
+        self.src = SCSI(self.dev, 512)
+        self.dst = SCSI(SCSIEmulatedDevice(1 << 16, serial="DEST"), 512)
+        self.dev.add_lun(self.src)
+        self.dev.add_lun(self.dst)
+        for lba in range(0, 1 << 16, 4096):
+            self.src.write16(lba, 8, bytes([lba >> 12]) * 4096)
+
+    def test_designator(self):
+        d = lun_designator(self.dst)
+        self.assertEqual(d["designator_type"], 3)
+        self.assertNotIn("piv", d)
+        self.assertNotEqual(d, lun_designator(self.src))
+
+    def test_copy(self):
+        # the default limits issue one segment per command
+        stats = extended_copy(self.src, self.src, self.dst, [(4096, 0, 8)])
+        self.assertEqual(stats.blocks_copied, 8)
+        self.assertEqual(stats.commands, 1)
+        self.assertEqual(self.dst.read16(0, 8).datain, bytes([1]) * 4096)
+
+        limits = {
+            "maximum_segment_descriptor_count": 64,
+            "maximum_descriptor_list_length": 64 + 28 * 10,
+            "maximum_segment_length": 1 << 20,
+            "maximum_concurrent_copies": 3,
+        }
+        progress = []
+        stats = extended_copy(
+            self.src,
+            self.src,
+            self.dst,
+            [(0, 0, 1 << 15), (1 << 15, 1 << 15, 1 << 15)],
+            limits=limits,
+            progress=progress.append,
+        )
+        self.assertEqual(stats.blocks_copied, 1 << 16)
+        # 1 MiB segments, ten of them fit the descriptor list
+        self.assertEqual(self.dev.segments[1], [2048] * 10)
+        self.assertEqual(sum(map(len, self.dev.segments[1:])), 32)
+        self.assertEqual(stats.commands, 4)
+        self.assertEqual(len(progress), 4)
+        self.assertEqual(self.dev.max_concurrent, 3)
+        self.assertEqual(self.dst.read16(1 << 15, 8).datain, bytes([8]) * 4096)
+
+    def test_failure(self):
+        self.dev.fail = True
+        with self.assertRaises(SCSICheckCondition):
+            extended_copy(self.src, self.src, self.dst, [(0, 0, 8)])
+
+    def test_timeout(self):
+        self.dev.polls = 1000
+        with self.assertRaises(TimeoutError):
+            extended_copy(self.src, self.src, self.dst, [(0, 0, 8)], timeout=0.01)
+
+    def test_capabilities(self):
+        self.dev.parameters = {
+            "maximum_cscd_descriptor_count": 2,
+            "maximum_segment_descriptor_count": 16,
+            "maximum_descriptor_list_length": 4096,
+            "maximum_segment_length": 1000 * 512,
+            "maximum_concurrent_copies": 2,
+            "data_segment_granularity": 12,
+            "implemented_descriptor_type_codes": [0x02, 0xE4],
+        }
+        caps = copy_capabilities(self.src)
+        self.assertTrue(caps.reported)
+        self.assertTrue(caps.supports(0xE4))
+        self.assertFalse(caps.supports(0x0A))
+        self.assertEqual(caps.limits["maximum_segment_descriptor_count"], 16)
+        self.assertEqual(caps.data_segment_granularity, 4096)
+
+        stats = extended_copy(self.src, self.src, self.dst, [(0, 0, 1 << 15)])
+        self.assertEqual(stats.blocks_copied, 1 << 15)
+        # 1000 blocks rounded down to the granularity of 8 blocks
+        self.assertEqual(self.dev.segments[0], [1000 - 1000 % 8] * 16)
+        self.assertEqual(self.dev.max_concurrent, 2)
+        extended_copy(self.src, self.src, self.dst, [(0, 0, 8)])
+        self.assertEqual(self.dev.parameter_requests, 1)
+
+        self.dev.parameters["implemented_descriptor_type_codes"] = [0x02]
+        copy_capabilities(self.src, refresh=True)
+        with self.assertRaises(ValueError):
+            extended_copy(self.src, self.src, self.dst, [(0, 0, 8)])
+
+    def test_no_capabilities(self):
+        caps = copy_capabilities(self.src)
+        self.assertFalse(caps.reported)
+        self.assertTrue(caps.supports(0x02))
+        self.assertEqual(caps.limits["maximum_segment_descriptor_count"], 1)
+
+
+class TokenCopyTest(unittest.TestCase):
+    def setUp(self):
+        tokens = {}
+        self.limits = {
+            "maximum_range_descriptors": 4,
+            "maximum_token_transfer_size": 1 << 14,
+            "optimal_transfer_count": 0,
+        }
+        self.src_dev = MockTokenManager(1 << 16, tokens, self.limits)
+        self.dst_dev = MockTokenManager(1 << 16, tokens)
+        self.src = SCSI(self.src_dev, 512)
+        self.dst = SCSI(self.dst_dev, 512)
+        for lba in range(0, 1 << 16, 4096):
+            self.src.write16(lba, 8, bytes([lba >> 12]) * 4096)
+
+    def test_limits(self):
+        self.assertEqual(token_limits(self.src), self.limits)
+        self.assertEqual(token_limits(self.dst)["maximum_range_descriptors"], 8)
+
+    def test_copy(self):
+        ranges = [(lba, lba + 8, 8) for lba in range(0, 1 << 15, 4096)]
+        ranges.append((1 << 15, 1 << 15, 1 << 15))
+        progress = []
+        stats = token_copy(self.src, self.dst, ranges, progress=progress.append)
+        self.assertEqual(stats.blocks_copied, 8 * 8 + (1 << 15))
+        # 4 range descriptors per token, and at most 1 << 14 blocks
+        populates = [c[1] for c in self.src_dev.commands]
+        self.assertEqual([len(p) for p in populates], [4, 4, 1, 1])
+        self.assertEqual(populates[-1], [{"lba": 0xC000, "num_blocks": 1 << 14}])
+        self.assertEqual(stats.commands, 8)
+        self.assertEqual(len(progress), 4)
+        self.assertEqual(self.dst.read16(4096 + 8, 8).datain, bytes([1]) * 4096)
+        self.assertEqual(self.dst.read16(4096, 8).datain, bytes(4096))
+        data = self.dst.read16(0x9000, 8).datain
+        self.assertEqual(data, bytes([9]) * 4096)
+        # the tokens were deleted once written
+        self.assertEqual(self.dst_dev.tokens, {})
+
+    def test_partial(self):
+        self.dst_dev.partial = 5
+        stats = token_copy(self.src, self.dst, [(0, 0, 8), (4096, 100, 8)])
+        self.assertEqual(stats.blocks_copied, 16)
+        # the rest of a partially written token goes into a new one
+        populates = [c[1] for c in self.src_dev.commands]
+        self.assertEqual(
+            populates[1], [{"lba": 5, "num_blocks": 3}, {"lba": 4096, "num_blocks": 8}]
+        )
+        self.assertEqual(len(populates), 4)
+        self.assertEqual(self.dst.read16(0, 8).datain, bytes(4096))
+        self.assertEqual(self.dst.read16(100, 8).datain, bytes([1]) * 4096)
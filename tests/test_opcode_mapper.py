@@ -8,7 +8,20 @@
 
 import unittest
 
-from pyscsi.pyscsi.scsi_enum_command import sbc, smc, spc, ssc
+from pyscsi.pyscsi.scsi_cdb_getlbastatus import GetLBAStatus
+from pyscsi.pyscsi.scsi_cdb_read16 import Read16
+from pyscsi.pyscsi.scsi_cdb_report_target_port_groups import ReportTargetPortGroups
+from pyscsi.pyscsi.scsi_enum_command import (
+    dispatch,
+    dispatch_table,
+    mmc,
+    sbc,
+    smc,
+    spc,
+    ssc,
+    supports,
+)
+from tests.mock_device import MockDevice, MockSCSI
 
 
 class OpcodeMapperTest(unittest.TestCase):
@@ -20,3 +33,40 @@ class OpcodeMapperTest(unittest.TestCase):
         self.assertEqual(
             smc.MAINTENANCE_IN.serviceaction.REPORT_DEVICE_IDENTIFICATION, 0x07
         )
+
+    def test_dispatch(self):
+        d = dispatch(0x00, 0x9E, 0x12)
+        self.assertIs(d.opcode, sbc.SBC_OPCODE_9E)
+        self.assertEqual(d.service_action, 0x12)
+        self.assertIs(d.command, GetLBAStatus)
+        self.assertIs(dispatch(0x00, 0x88).command, Read16)
+        self.assertIs(dispatch(0x00, 0x9E, 0x11).opcode, sbc.READ_LONG_16)
+        self.assertIs(dispatch(0x08, 0xA3, 0x0A).command, ReportTargetPortGroups)
+        self.assertIs(dispatch(0x08, 0xA3, 0x07).opcode, smc.MAINTENANCE_IN)
+        # service actions of other opcodes sharing the dict are not listed
+        self.assertIsNone(dispatch(0x00, 0x9E, 0x0A))
+        self.assertIsNone(dispatch(0x05, 0x88))
+        self.assertIsNone(dispatch(0x1F, 0x12))
+
+        self.assertTrue(supports(0x00, "GET_LBA_STATUS"))
+        self.assertTrue(supports(0x08, "OPEN_IMPORTEXPORT_ELEMENT"))
+        self.assertFalse(supports(0x05, "REPORT_TARGET_PORT_GROUPS"))
+        self.assertFalse(supports(0x1F, "INQUIRY"))
+        self.assertTrue(supports(0x05, "READ_CD"))
+
+        with self.assertRaises(TypeError):
+            dispatch_table(spc)["INQUIRY"] = None
+        self.assertIs(dispatch_table(ssc), dispatch_table(ssc))
+
+    def test_scsi(self):
+        s = MockSCSI(MockDevice(sbc))
+        self.assertTrue(s.supports("READ_CAPACITY_16"))
+        self.assertFalse(s.supports("READ_CD"))
+        s._set_devicetype(0x05)
+        self.assertIs(s.device.opcodes, mmc)
+        self.assertTrue(s.supports("READ_CD"))
+        with self.assertRaises(AttributeError):
+            s.readcapacity16()
+        # unknown device types keep their opcodes
+        s._set_devicetype(0x1F)
+        self.assertIs(s.device.opcodes, mmc)
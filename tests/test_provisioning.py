@@ -0,0 +1,84 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import unittest
+
+from pyscsi.pyscsi.scsi import SCSI
+from pyscsi.pyscsi.scsi_device_emulated import SCSIEmulatedDevice
+from pyscsi.pyscsi.scsi_enum_command import sbc
+from pyscsi.pyscsi.scsi_enum_getlbastatus import P_STATUS
+from pyscsi.pyscsi.scsi_provisioning import ProvisioningMap, scan_provisioning
+from tests.mock_device import MockDevice, MockSCSI
+
+MAPPED = getattr(P_STATUS, "MAPPED")
+DEALLOCATED = getattr(P_STATUS, "DEALLOCATED")
+
+
+class MockNoStatus(MockDevice):
+    """
+    A thin device returning GET LBA STATUS data without descriptors
+    """
+
+    def execute(self, cmd, en_raw_sense: bool = False):
+        if cmd.cdb[1] == 0x10:  # READ CAPACITY(16)
+            cmd.datain[0:8] = (4095).to_bytes(8, "big")
+            cmd.datain[8:12] = (512).to_bytes(4, "big")
+            cmd.datain[14] = 0x80
+        else:
+            cmd.datain[0:4] = (4).to_bytes(4, "big")
+
+
+class ProvisioningTest(unittest.TestCase):
+    def setUp(self):
+        self.dev = SCSIEmulatedDevice(
+            blocks=1 << 16, block_limits={"opt_unmap_gran": 8}
+        )
+        self.s = SCSI(self.dev, 512)
+        # every third granule of the first half is mapped
+        for lba in range(0, 1 << 15, 24):
+            self.s.write16(lba, 1, bytes(512))
+
+    def expected(self):
+        m = ProvisioningMap()
+        for g, state in enumerate(self.dev._map):
+            m.append(g * 8, 8, MAPPED if state else DEALLOCATED)
+        return m
+
+    def test_scan(self):
+        expected = self.expected()
+        self.assertEqual(len(expected), 2 * 1366)
+        for workers in (1, 3, 8):
+            # a small allocation length needs many commands per part
+            m = scan_provisioning(self.s, workers=workers, alloclen=8 + 16 * 50)
+            self.assertEqual(m, expected)
+        self.assertEqual(m.blocks(MAPPED), self.dev.mapped_blocks())
+        self.assertEqual(m.blocks(DEALLOCATED), (1 << 16) - self.dev.mapped_blocks())
+        self.assertEqual(m.status(24), MAPPED)
+        self.assertEqual(m.status(23), DEALLOCATED)
+        self.assertEqual(m.status(1 << 16), None)
+        self.assertEqual(m.runs(DEALLOCATED)[-1], (32768, 32768, DEALLOCATED))
+
+    def test_range(self):
+        m = scan_provisioning(self.s, start=20, end=60, workers=2)
+        self.assertEqual(
+            list(m),
+            [
+                (20, 4, DEALLOCATED),
+                (24, 8, MAPPED),
+                (32, 16, DEALLOCATED),
+                (48, 8, MAPPED),
+                (56, 4, DEALLOCATED),
+            ],
+        )
+        self.assertEqual(len(scan_provisioning(self.s, start=100, end=100)), 0)
+
+    def test_fully_provisioned(self):
+        s = SCSI(SCSIEmulatedDevice(blocks=4096, thin=False), 512)
+        self.assertEqual(list(scan_provisioning(s)), [(0, 4096, MAPPED)])
+
+    def test_no_progress(self):
+        with self.assertRaises(OSError):
+            scan_provisioning(MockSCSI(MockNoStatus(sbc)), workers=2)
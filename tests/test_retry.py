@@ -0,0 +1,164 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import asyncio
+import unittest
+
+from pyscsi.pyscsi.scsi_async import AsyncSCSI
+from pyscsi.pyscsi.scsi_cdb_testunitready import TestUnitReady as TUR
+from pyscsi.pyscsi.scsi_device_emulated import fixed_sense
+from pyscsi.pyscsi.scsi_enum_command import SCSI_STATUS, sbc
+from pyscsi.pyscsi.scsi_exception import SCSIDeviceExceptionMeta
+from pyscsi.pyscsi.scsi_retry import (
+    BACKOFF,
+    FAIL,
+    RETRY,
+    RetryPolicy,
+    RetryRule,
+    failure_key,
+)
+from tests.mock_device import MockDevice, MockQueuedDevice, MockSCSI
+
+
+class MockFailingDevice(MockDevice, metaclass=SCSIDeviceExceptionMeta):
+    """
+    Fails the commands it executes with the exceptions in failures
+    """
+
+    def __init__(self, failures):
+        MockDevice.__init__(self, sbc)
+        self.failures = list(failures)
+        self.executed = 0
+
+    def execute(self, cmd, en_raw_sense=False):
+        self.executed += 1
+        if self.failures:
+            raise self.failures.pop(0)
+
+
+def check_condition(dev, key, asc, ascq):
+    return dev.CheckCondition(fixed_sense(key, asc, ascq))
+
+
+class RetryTest(unittest.TestCase):
+    def setUp(self):
+        self.slept = []
+        self.policy = RetryPolicy(
+            budget_minimum=100, sleep=self.slept.append, rng=lambda: 0.5
+        )
+
+    def test_failure_key(self):
+        dev = MockFailingDevice([])
+        self.assertEqual(failure_key(check_condition(dev, 6, 0x29, 0)), (6, 0x2900))
+        self.assertEqual(failure_key(dev.BusyStatus()), SCSI_STATUS.BUSY)
+        self.assertEqual(failure_key(dev.TaskSetFull()), SCSI_STATUS.TASK_SET_FULL)
+        self.assertIsNone(failure_key(OSError()))
+
+    def test_unit_attention(self):
+        dev = MockFailingDevice([])
+        dev.failures = [check_condition(dev, 6, 0x29, 0)]
+        s = MockSCSI(dev)
+        s.retry = self.policy
+        s.execute(TUR(sbc.TEST_UNIT_READY))
+        self.assertEqual(dev.executed, 2)
+        self.assertEqual(self.slept, [])
+        stats = self.policy.stats(dev)
+        self.assertEqual(stats.commands, 1)
+        self.assertEqual(stats.retries, 1)
+        self.assertEqual(stats.by_key, {(6, 0x2900): 1})
+
+    def test_backoff(self):
+        dev = MockFailingDevice([])
+        dev.failures = [dev.BusyStatus(), dev.TaskSetFull(), dev.BusyStatus()]
+        self.policy.execute(dev, TUR(sbc.TEST_UNIT_READY))
+        self.assertEqual(dev.executed, 4)
+        # BUSY and TASK SET FULL back off separately, with half the delay
+        self.assertEqual(self.slept, [0.0005, 0.0005, 0.001])
+
+        dev.failures = [dev.BusyStatus()] * 9
+        with self.assertRaises(dev.BusyStatus):
+            self.policy.execute(dev, TUR(sbc.TEST_UNIT_READY))
+        self.assertEqual(self.slept[-1], 0.064)
+        self.assertEqual(self.policy.stats(dev).failures, 1)
+
+    def test_poll(self):
+        dev = MockFailingDevice([])
+        dev.failures = [check_condition(dev, 2, 4, 1)] * 3
+        self.policy.execute(dev, TUR(sbc.TEST_UNIT_READY))
+        self.assertEqual(self.slept, [0.5, 0.5, 0.5])
+
+        dev.failures = [check_condition(dev, 2, 0x3A, 0)]
+        with self.assertRaises(dev.CheckCondition):
+            self.policy.execute(dev, TUR(sbc.TEST_UNIT_READY))
+
+    def test_fail_fast(self):
+        dev = MockFailingDevice([])
+        dev.failures = [check_condition(dev, 3, 0x11, 0)]
+        with self.assertRaises(dev.CheckCondition):
+            self.policy.execute(dev, TUR(sbc.TEST_UNIT_READY))
+        self.assertEqual(dev.executed, 1)
+
+        policy = RetryPolicy({(3, 0x1100): RetryRule(RETRY, retries=1)})
+        dev.failures = [check_condition(dev, 3, 0x11, 0)]
+        policy.execute(dev, TUR(sbc.TEST_UNIT_READY))
+        self.assertEqual(dev.executed, 3)
+        self.assertEqual(RetryRule(FAIL, retries=3).retries, 0)
+        with self.assertRaises(ValueError):
+            RetryRule("later")
+
+    def test_budget(self):
+        policy = RetryPolicy(
+            {SCSI_STATUS.BUSY: RetryRule(BACKOFF, retries=100)},
+            budget_minimum=3,
+            budget_ratio=0.5,
+            sleep=self.slept.append,
+        )
+        dev = MockFailingDevice([])
+        dev.failures = [dev.BusyStatus()] * 5
+        with self.assertRaises(dev.BusyStatus):
+            policy.execute(dev, TUR(sbc.TEST_UNIT_READY))
+        stats = policy.stats(dev)
+        self.assertEqual(stats.retries, 3)
+        self.assertEqual(stats.exhausted, 1)
+
+        # completed commands earn retries back
+        dev.failures = []
+        policy.execute(dev, TUR(sbc.TEST_UNIT_READY))
+        policy.execute(dev, TUR(sbc.TEST_UNIT_READY))
+        dev.failures = [dev.BusyStatus()] * 2
+        with self.assertRaises(dev.BusyStatus):
+            policy.execute(dev, TUR(sbc.TEST_UNIT_READY))
+        self.assertEqual(stats.retries, 4)
+
+        # every device has a budget of its own
+        other = MockFailingDevice([])
+        other.failures = [other.BusyStatus()] * 3
+        policy.execute(other, TUR(sbc.TEST_UNIT_READY))
+        self.assertEqual(policy.stats(other).retries, 3)
+
+    def test_async(self):
+        dev = MockFailingDevice([])
+        dev.failures = [check_condition(dev, 6, 0x29, 0)]
+
+        async def run(s):
+            await s.testunitready()
+
+        asyncio.run(run(AsyncSCSI(dev, retry=self.policy)))
+        self.assertEqual(dev.executed, 2)
+        self.assertEqual(self.policy.stats(dev).retries, 1)
+
+        # the mock completes TEST UNIT READY with BECOMING READY
+        dev = MockQueuedDevice(queue_depth=4)
+        dev.opcodes = sbc
+        policy = RetryPolicy({(2, 0x0401): RetryRule(RETRY, retries=2)})
+        with self.assertRaises(dev.CheckCondition):
+            asyncio.run(run(AsyncSCSI(dev, retry=policy)))
+        stats = policy.stats(dev)
+        self.assertEqual((stats.retries, stats.failures), (2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
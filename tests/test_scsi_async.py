@@ -0,0 +1,149 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import asyncio
+import threading
+import time
+import unittest
+
+from pyscsi.pyscsi import scsi_async
+from pyscsi.pyscsi.scsi_async import AsyncSCSI
+from pyscsi.pyscsi.scsi_enum_command import sbc, smc
+from tests.mock_device import MockDevice, MockQueuedDevice
+
+
+class MockRecordingDevice(MockDevice):
+    def execute(self, cmd, en_raw_sense=False):
+        if cmd.cdb[0] == 0x12:
+            cmd.datain[0] = 0x08  # medium changer
+        self.executed = cmd
+
+
+class MockSerialDevice(MockDevice):
+    """
+    Records how many threads are in execute at once, like one libiscsi context
+    """
+
+    def __init__(self, opcodes):
+        MockDevice.__init__(self, opcodes)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.closed = False
+        self.threads = set()
+
+    def execute(self, cmd, en_raw_sense=False):
+        with self.lock:
+            self.threads.add(threading.get_ident())
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.001)
+        with self.lock:
+            self.active -= 1
+
+    def close(self):
+        self.closed = True
+
+
+class AsyncSCSITest(unittest.TestCase):
+    def test_init_opcode(self):
+        async def run():
+            async with AsyncSCSI(MockRecordingDevice(sbc)) as s:
+                return s.device.opcodes
+
+        self.assertIs(asyncio.run(run()), smc)
+
+    def test_executor_fallback(self):
+        dev = MockRecordingDevice(sbc)
+
+        async def run():
+            s = AsyncSCSI(dev, blocksize=512)
+            s.device.opcodes = sbc
+            return await s.read16(1024, 8)
+
+        cmd = asyncio.run(run())
+        self.assertIs(dev.executed, cmd)
+        self.assertEqual(cmd.cdb[0], sbc.READ_16.value)
+
+    def test_executor_serialised(self):
+        dev = MockSerialDevice(sbc)
+
+        async def run():
+            async with AsyncSCSI(dev, blocksize=512) as s:
+                s.device.opcodes = sbc
+                await asyncio.gather(*[s.read16(lba, 1) for lba in range(16)])
+
+        asyncio.run(run())
+        self.assertEqual(dev.max_active, 1)
+        self.assertTrue(dev.closed)
+
+    def test_executor_shared(self):
+        devs = [MockSerialDevice(sbc) for _ in range(64)]
+
+        async def run(dev):
+            s = AsyncSCSI(dev, blocksize=512)
+            s.device.opcodes = sbc
+            await asyncio.gather(*[s.read16(lba, 1) for lba in range(4)])
+            await s.close()
+
+        async def run_all():
+            await asyncio.gather(*[run(dev) for dev in devs])
+
+        asyncio.run(run_all())
+        threads = set().union(*[dev.threads for dev in devs])
+        self.assertLessEqual(len(threads), scsi_async._max_workers)
+        self.assertTrue(all(dev.max_active == 1 and dev.closed for dev in devs))
+
+    def test_executor_thread_safe(self):
+        dev = MockSerialDevice(sbc)
+        dev.thread_safe = True
+
+        async def run():
+            s = AsyncSCSI(dev, blocksize=512)
+            s.device.opcodes = sbc
+            await asyncio.gather(*[s.read16(lba, 1) for lba in range(16)])
+
+        asyncio.run(run())
+        self.assertGreater(dev.max_active, 1)
+
+    def test_queued(self):
+        dev = MockQueuedDevice(queue_depth=4)
+        dev.opcodes = sbc
+
+        async def run():
+            s = AsyncSCSI(dev, blocksize=512)
+            return await asyncio.gather(*[s.read16(lba, 1) for lba in range(64)])
+
+        cmds = asyncio.run(run())
+        self.assertEqual(dev.max_in_flight, 4)
+        self.assertEqual(dev.in_flight, 0)
+        for lba, cmd in enumerate(cmds):
+            self.assertEqual(cmd.datain, bytearray([lba & 0xFF]) * 512)
+
+    def test_queued_close(self):
+        dev = MockQueuedDevice(queue_depth=4)
+        dev.opcodes = sbc
+
+        async def run():
+            s = AsyncSCSI(dev, blocksize=512)
+            futures = [asyncio.ensure_future(s.read16(lba, 1)) for lba in range(8)]
+            await asyncio.sleep(0)
+            await s.close()
+            return futures
+
+        futures = asyncio.run(run())
+        self.assertTrue(all(f.done() for f in futures))
+        self.assertEqual(dev.in_flight, 0)
+
+    def test_queued_check_condition(self):
+        dev = MockQueuedDevice(queue_depth=4)
+        dev.opcodes = sbc
+
+        async def run():
+            return await AsyncSCSI(dev).testunitready()
+
+        with self.assertRaises(dev.CheckCondition):
+            asyncio.run(run())
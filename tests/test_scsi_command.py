@@ -0,0 +1,55 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from pyscsi.pyscsi.scsi_cdb_read10 import Read10
+from pyscsi.pyscsi.scsi_cdb_read16 import Read16
+from pyscsi.pyscsi.scsi_cdb_testunitready import TestUnitReady as TUR
+from pyscsi.pyscsi.scsi_cdb_write16 import Write16
+from pyscsi.pyscsi.scsi_command import SCSICommand
+from pyscsi.pyscsi.scsi_enum_command import sbc
+from pyscsi.utils.converter import scsi_ba_to_int
+
+
+class SCSICommandTest(unittest.TestCase):
+    def test_cdb_is_per_class(self):
+        r16 = Read16(sbc.READ_16, 512, 1024, 8)
+        r10 = Read10(sbc.READ_10, 512, 2048, 4)
+        self.assertEqual(len(r16.cdb), 16)
+        self.assertEqual(len(r10.cdb), 10)
+        self.assertIsNot(r16.cdb, r10.cdb)
+
+        # building a Read10 must not change how Read16 marshalls its cdb
+        cdb = Read16.unmarshall_cdb(r16.cdb)
+        self.assertEqual(cdb["lba"], 1024)
+        self.assertEqual(cdb["tl"], 8)
+        self.assertEqual(Read16.marshall_cdb(cdb), r16.cdb)
+        self.assertEqual(Read10.unmarshall_cdb(r10.cdb)["lba"], 2048)
+        self.assertNotIn("rdprotect", TUR.unmarshall_cdb(bytearray(6)))
+        self.assertIsNot(SCSICommand._cdb_bits, Read16._cdb_bits)
+
+        with self.assertRaises(SCSICommand.OpcodeException):
+            Read16.marshall_cdb({"lba": 1})
+        with self.assertRaises(SCSICommand.OpcodeException):
+            SCSICommand.cdb_length(0x7F)
+
+    def test_concurrent_construction(self):
+        def build(i):
+            if i % 2:
+                cmd = Read16(sbc.READ_16, 512, i, 1)
+            else:
+                cmd = Write16(sbc.WRITE_16, 512, i, 1, bytearray(512))
+            return i, cmd
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            for i, cmd in pool.map(build, range(2000)):
+                self.assertEqual(len(cmd.cdb), 16)
+                self.assertEqual(scsi_ba_to_int(cmd.cdb[2:10]), i)
+                self.assertEqual(
+                    cmd.cdb[0], sbc.READ_16.value if i % 2 else sbc.WRITE_16.value
+                )
@@ -0,0 +1,86 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import unittest
+
+from pyscsi.pyscsi.scsi_sense import SCSICheckCondition, SenseRecord, parse_sense
+
+
+def descriptor_sense(key, asc, ascq, descriptors=b""):
+    sense = bytearray(8)
+    sense[0] = 0x72
+    sense[1] = key
+    sense[2] = asc
+    sense[3] = ascq
+    sense[7] = len(descriptors)
+    return sense + descriptors
+
+
+class SenseTest(unittest.TestCase):
+    def test_fixed(self):
+        sense = bytearray(18)
+        sense[0] = 0xF0
+        sense[2] = 0x02
+        sense[3:7] = (0x1234).to_bytes(4, "big")
+        sense[7] = 10
+        sense[12] = 0x04
+        sense[13] = 0x04
+        sense[15] = 0x80
+        sense[16:18] = (0x8000).to_bytes(2, "big")
+        self.assertEqual(parse_sense(sense), SenseRecord(2, 4, 4, 0x1234, 0x8000))
+
+        e = SCSICheckCondition(sense)
+        self.assertEqual(e.record.progress, 0x8000)
+        self.assertEqual(e.data["sense_key"], 2)
+        self.assertEqual(e.data["information"], 0x1234)
+        self.assertEqual(e.descriptors, [])
+        self.assertIn("Not Ready", str(e))
+
+        # no VALID bit, and no progress indication for a MEDIUM ERROR
+        sense[0] = 0x71
+        sense[2] = 0x03
+        self.assertEqual(parse_sense(sense), SenseRecord(3, 4, 4))
+
+    def test_descriptor(self):
+        info = bytes([0x00, 0x0A, 0x80, 0x00]) + (0xABCD).to_bytes(8, "big")
+        cmd = bytes([0x01, 0x0A, 0x00, 0x00]) + (0x42).to_bytes(8, "big")
+        skey = bytes([0x02, 0x06, 0x00, 0x00, 0x80, 0x40, 0x00, 0x00])
+        vendor = bytes([0x80, 0x02, 0x11, 0x22])
+        sense = descriptor_sense(0x02, 0x04, 0x07, info + cmd + skey + vendor)
+        self.assertEqual(parse_sense(sense), SenseRecord(2, 4, 7, 0xABCD, 0x4000))
+
+        e = SCSICheckCondition(sense)
+        self.assertEqual(e.asc, 0x04)
+        self.assertEqual(e.ascq, 0x07)
+        self.assertEqual(e.data["sense_key"], 2)
+        self.assertEqual(
+            [d["desc_type"] for d in e.descriptors], [0x00, 0x01, 0x02, 0x80]
+        )
+        self.assertEqual(e.descriptor(0x00)["information"], 0xABCD)
+        self.assertEqual(e.descriptor(0x01)["cmd_specific_information"], 0x42)
+        self.assertEqual(e.descriptor(0x02)["progress_indication"], 0x4000)
+        self.assertIsNone(e.descriptor(0x0A))
+
+    def test_field_pointer(self):
+        skey = bytes([0x02, 0x06, 0x00, 0x00, 0xC0, 0x00, 0x02, 0x00])
+        e = SCSICheckCondition(descriptor_sense(0x05, 0x24, 0x00, skey))
+        self.assertIsNone(e.record.progress)
+        d = e.descriptor(0x02)
+        self.assertEqual(d["cd"], 1)
+        self.assertEqual(d["field_pointer"], 2)
+
+    def test_truncated(self):
+        info = bytes([0x00, 0x0A, 0x80, 0x00]) + (0xABCD).to_bytes(8, "big")
+        sense = descriptor_sense(0x03, 0x11, 0x00, info)
+        # the additional sense length claims more than was returned
+        sense[7] += 8
+        self.assertEqual(parse_sense(sense[:-4]), SenseRecord(3, 0x11, 0))
+        self.assertEqual(SCSICheckCondition(sense[:-4]).descriptors, [])
+        self.assertEqual(parse_sense(bytearray(18)), SenseRecord(0, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import io
+import os
+import unittest
+
+from pyscsi.pyscsi.scsi_enum_command import sbc
+from pyscsi.pyscsi.scsi_stream import BlockStream, optimal_transfer_length
+from tests.mock_device import MockBlockDevice, MockSCSI
+
+
+class BlockStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.dev = MockBlockDevice(
+            blocks=256,
+            blocksize=512,
+            block_limits={
+                "opt_xfer_len": 24,
+                "max_xfer_len": 128,
+                "opt_xfer_len_gran": 8,
+            },
+        )
+        self.dev.data[:] = os.urandom(len(self.dev.data))
+        self.s = MockSCSI(self.dev)
+        self.s.blocksize = 0
+
+    def test_transfer_length(self):
+        self.assertEqual(optimal_transfer_length({}, 512), 2048)
+        self.assertEqual(optimal_transfer_length({"max_xfer_len": 100}, 512), 100)
+        limits = {"opt_xfer_len": 30, "opt_xfer_len_gran": 8}
+        self.assertEqual(optimal_transfer_length(limits, 512), 24)
+        self.assertEqual(optimal_transfer_length({"opt_xfer_len_gran": 8}, 4096), 256)
+
+    def test_read(self):
+        with BlockStream(self.s) as f:
+            self.assertEqual(f.blocksize, 512)
+            self.assertEqual(f.size, len(self.dev.data))
+            self.assertEqual(f.transfer_length, 24)
+            self.dev.commands = []
+
+            f.seek(1000)
+            self.assertEqual(f.read(20000), self.dev.data[1000:21000])
+            self.assertEqual(f.read(30000), self.dev.data[21000:51000])
+            # commands stay on the transfer_length grid and include read-ahead
+            for opcode, lba, tl in self.dev.commands:
+                self.assertEqual(opcode, sbc.READ_16.value)
+                self.assertEqual(lba % 24, 0)
+                self.assertLessEqual(tl, 24)
+            read = sorted(lba for _, lba, _ in self.dev.commands)
+            self.assertEqual(read, list(range(0, 24 * len(read), 24)))
+            self.assertGreater(read[-1] * 512, 51000)
+
+            f.seek(-100, io.SEEK_END)
+            self.assertEqual(f.read(), self.dev.data[-100:])
+            self.assertEqual(f.read(10), b"")
+
+    def test_readinto_buffer(self):
+        with BlockStream(self.s, read_ahead=0) as f:
+            buf = bytearray(24 * 512 * 3)
+            self.assertEqual(f.readinto(memoryview(buf)), len(buf))
+            self.assertEqual(buf, self.dev.data[: len(buf)])
+
+    def test_write(self):
+        expected = bytearray(self.dev.data)
+        with BlockStream(self.s, write_behind=2) as f:
+            for pos, length in ((0, 512), (700, 100), (1023, 40000), (5000, 1)):
+                data = os.urandom(length)
+                expected[pos : pos + length] = data
+                f.seek(pos)
+                self.assertEqual(f.write(data), length)
+                self.assertEqual(f.tell(), pos + length)
+            f.seek(0)
+            self.assertEqual(f.read(50000), expected[:50000])
+        self.assertEqual(self.dev.data, expected)
+
+        with BlockStream(self.s) as f:
+            f.seek(-10, io.SEEK_END)
+            self.assertEqual(f.write(bytes(20)), 10)
+            with self.assertRaises(OSError):
+                f.write(b"x")
@@ -0,0 +1,76 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import threading
+import time
+import unittest
+
+from pyscsi.pyscsi.scsi_cdb_testunitready import TestUnitReady as TUR
+from pyscsi.pyscsi.scsi_enum_command import sbc
+from pyscsi.pyscsi.scsi_submit import Submitter, concurrent
+from tests.mock_device import MockDevice, MockQueuedDevice, MockSCSI
+
+
+class MockThreadDevice(MockDevice):
+    """
+    Records the threads executing commands and how many run at once
+    """
+
+    def __init__(self, opcodes, thread_safe):
+        MockDevice.__init__(self, opcodes)
+        self.thread_safe = thread_safe
+        self.lock = threading.Lock()
+        self.threads = set()
+        self.active = 0
+        self.max_active = 0
+
+    def execute(self, cmd, en_raw_sense=False):
+        with self.lock:
+            self.threads.add(threading.get_ident())
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.002)
+        with self.lock:
+            self.active -= 1
+
+
+class SubmitterTest(unittest.TestCase):
+    def run_commands(self, dev, workers):
+        submitter = Submitter(MockSCSI(dev), workers)
+        try:
+            futures = [submitter.submit(TUR(sbc.TEST_UNIT_READY)) for _ in range(16)]
+            for future in futures:
+                submitter.wait(future)
+        finally:
+            submitter.close()
+
+    def test_not_thread_safe(self):
+        dev = MockThreadDevice(sbc, thread_safe=False)
+        self.assertFalse(concurrent(dev))
+        self.run_commands(dev, 8)
+        self.assertEqual(dev.threads, {threading.get_ident()})
+        self.assertEqual(dev.max_active, 1)
+
+    def test_thread_safe(self):
+        dev = MockThreadDevice(sbc, thread_safe=True)
+        self.assertTrue(concurrent(dev))
+        self.run_commands(dev, 8)
+        self.assertNotIn(threading.get_ident(), dev.threads)
+        self.assertGreater(dev.max_active, 1)
+
+    def test_queued(self):
+        dev = MockQueuedDevice(queue_depth=4)
+        self.assertTrue(concurrent(dev))
+        submitter = Submitter(MockSCSI(dev))
+        futures = [submitter.submit(TUR(sbc.TEST_UNIT_READY)) for _ in range(4)]
+        self.assertTrue(submitter.completed(futures))
+        submitter.close(futures)
+        self.assertTrue(all(f.done() for f in futures))
+        self.assertEqual(dev.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+# coding: utf-8
+
+# SPDX-FileCopyrightText: 2014 The python-scsi Authors
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import asyncio
+import unittest
+from unittest import mock
+
+from pyscsi.pyscsi import scsi_device_queued
+from pyscsi.pyscsi.scsi_cdb_read16 import Read16
+from pyscsi.pyscsi.scsi_enum_command import sbc
+from pyscsi.pyscsi.scsi_throttle import QueueDepthController
+from tests.mock_device import MockQueuedDevice
+
+
+class MockSharedTarget(MockQueuedDevice):
+    """
+    A target that can only queue capacity commands and completes the others
+    with TASK SET FULL
+    """
+
+    def __init__(self, queue_depth, capacity, throttle=None):
+        self.capacity = capacity
+        self.task_set_full = 0
+        MockQueuedDevice.__init__(self, queue_depth, throttle=throttle)
+
+    def _write_header(self, hdr):
+        MockQueuedDevice._write_header(self, hdr)
+        if len(self._pending) >= self.capacity:
+            self._completed[-1].status = 0x28
+            self.task_set_full += 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class ThrottleTest(unittest.TestCase):
+    def test_aimd(self):
+        c = QueueDepthController(initial=8, minimum=2, maximum=10)
+        tokens = [c.acquire() for _ in range(8)]
+        self.assertFalse(c.available())
+        # only the first congestion of a window shrinks it
+        c.release(tokens[0], congested=True)
+        c.release(tokens[1], congested=True)
+        self.assertEqual(c.window, 4)
+        self.assertEqual(c.congestions, 2)
+        self.assertEqual(c.decreases, 1)
+        for token in tokens[2:]:
+            c.release(token)
+        self.assertEqual(c.outstanding, 0)
+        self.assertEqual(c.window, 5)
+        c.release(c.acquire(), congested=True)
+        c.release(c.acquire(), congested=True)
+        self.assertEqual(c.window, 2)
+        c.release(c.acquire(), congested=True)
+        self.assertEqual(c.window, 2)
+        for _ in range(100):
+            c.release(c.acquire())
+        self.assertEqual(c.window, 10)
+
+        with self.assertRaises(ValueError):
+            QueueDepthController(initial=1, minimum=2)
+        with self.assertRaises(ValueError):
+            QueueDepthController(decrease=1)
+
+    def test_unthrottled(self):
+        dev = MockSharedTarget(queue_depth=16, capacity=4)
+        futures = [dev.submit(Read16(sbc.READ_16, 512, 0, 1)) for _ in range(16)]
+        dev.drain()
+        self.assertTrue(any(f.exception() is not None for f in futures))
+
+    def test_throttled(self):
+        throttle = QueueDepthController(initial=16)
+        dev = MockSharedTarget(queue_depth=16, capacity=4, throttle=throttle)
+        futures = []
+        for lba in range(200):
+            futures.append(dev.submit(Read16(sbc.READ_16, 512, lba, 1)))
+        dev.drain()
+        for lba, future in enumerate(futures):
+            self.assertEqual(future.result().datain, bytearray([lba & 0xFF]) * 512)
+        self.assertGreater(dev.task_set_full, 0)
+        self.assertLessEqual(throttle.window, 5)
+        self.assertEqual(throttle.outstanding, 0)
+        self.assertEqual(throttle.congestions, dev.task_set_full)
+
+    def test_backoff(self):
+        clock = FakeClock()
+        patcher = mock.patch.object(scsi_device_queued, "time", clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # a target that is always full, the command is held between sends
+        throttle = QueueDepthController(initial=4)
+        dev = MockSharedTarget(queue_depth=4, capacity=0, throttle=throttle)
+        future = dev.submit(Read16(sbc.READ_16, 512, 0, 1))
+        dev.drain()
+        self.assertIsInstance(future.exception(), dev.TaskSetFull)
+        self.assertEqual(len(dev.written), 9)
+        self.assertEqual(clock.slept, [0.001 * (1 << i) for i in range(8)])
+
+        # a held command is sent as soon as another one completes
+        clock.slept = []
+        throttle = QueueDepthController(initial=4)
+        dev = MockSharedTarget(queue_depth=4, capacity=1, throttle=throttle)
+        futures = [dev.submit(Read16(sbc.READ_16, 512, lba, 1)) for lba in (1, 2)]
+        dev.drain()
+        self.assertEqual(futures[1].result().datain, bytearray([2]) * 512)
+        self.assertEqual(dev.task_set_full, 1)
+        self.assertEqual(clock.slept, [])
+
+    def test_backoff_async(self):
+        # the held command is sent again from a timer of the event loop
+        throttle = QueueDepthController(initial=4)
+        dev = MockSharedTarget(queue_depth=4, capacity=0, throttle=throttle)
+        with self.assertRaises(dev.TaskSetFull):
+            asyncio.run(dev.execute_async(Read16(sbc.READ_16, 512, 0, 1)))
+        self.assertEqual(len(dev.written), 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
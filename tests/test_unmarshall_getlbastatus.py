@@ -8,7 +8,8 @@
 
 import unittest
 
-from pyscsi.pyscsi.scsi_cdb_getlbastatus import GetLBAStatus
+from pyscsi.pyscsi import scsi_cdb_getlbastatus
+from pyscsi.pyscsi.scsi_cdb_getlbastatus import ExtentTable, GetLBAStatus
 from pyscsi.pyscsi.scsi_enum_command import sbc
 from pyscsi.pyscsi.scsi_enum_getlbastatus import P_STATUS
 from pyscsi.utils.converter import scsi_int_to_ba
@@ -51,3 +52,48 @@ class UnmarshallGetlbastatusTest(unittest.TestCase):
 
             d = GetLBAStatus.unmarshall_datain(GetLBAStatus.marshall_datain(i))
             self.assertEqual(d, i)
+
+    def test_extents(self):
+        with MockSCSI(MockGetLBAStatus(sbc)) as s:
+            cmd = s.getlbastatus(0, extents=True)
+            self.assertNotIn("lbas", cmd.result)
+            i = cmd.result["extents"]
+            self.assertEqual(len(i), 2)
+            self.assertEqual(list(i["lba"]), [1023, 200000])
+            self.assertEqual(list(i["num_blocks"]), [27, 9999])
+            self.assertEqual(
+                list(i["p_status"]), [P_STATUS.MAPPED, P_STATUS.DEALLOCATED]
+            )
+
+            # the stdlib table
+            data = cmd.datain
+            t = GetLBAStatus.unmarshall_extents(data, use_numpy=False)
+            self.assertIsInstance(t, ExtentTable)
+            self.assertEqual(list(t), [(1023, 27, 0), (200000, 9999, 1)])
+            self.assertEqual(t["lba"].itemsize, 8)
+            self.assertEqual(t["num_blocks"].itemsize, 4)
+            with self.assertRaises(KeyError):
+                t["nope"]
+
+            # the reserved bits of p_status are masked and a partial
+            # descriptor is dropped
+            data = bytearray(data[:40])
+            data[28] |= 0xF0
+            for use_numpy in (True, False):
+                t = GetLBAStatus.unmarshall_extents(data, use_numpy=use_numpy)
+                self.assertEqual(
+                    list(t["p_status"]), [P_STATUS.MAPPED, P_STATUS.DEALLOCATED]
+                )
+                t = GetLBAStatus.unmarshall_extents(data[:39], use_numpy=use_numpy)
+                self.assertEqual(list(t["lba"]), [1023])
+            self.assertEqual(
+                GetLBAStatus.unmarshall_datain(data[:39]),
+                {"lbas": [{"lba": 1023, "num_blocks": 27, "p_status": 0}]},
+            )
+
+    @unittest.skipUnless(scsi_cdb_getlbastatus._has_numpy, "numpy is not installed")
+    def test_numpy(self):
+        with MockSCSI(MockGetLBAStatus(sbc)) as s:
+            t = s.getlbastatus(0, extents=True).result["extents"]
+            self.assertEqual(t.dtype, scsi_cdb_getlbastatus.EXTENT_DTYPE)
+            self.assertEqual(int(t["num_blocks"].sum()), 27 + 9999)
@@ -155,6 +155,41 @@ class MockExtendedInquiry(MockDevice):
         cmd.datain[13] = 0x05  # maximum...:5
 
 
+class MockThirdPartyCopy(MockDevice):
+    def execute(self, cmd, en_raw_sense: bool = False):
+        cmd.datain[0] = 0x00  # QUAL:0 TYPE:0
+        cmd.datain[1] = 0x8F  # third-party copy
+        cmd.datain[2:4] = scsi_int_to_ba(36 + 16 + 36 + 8, 2)
+        # block device ROD token limits
+        pos = 4
+        cmd.datain[pos + 2 : pos + 4] = scsi_int_to_ba(0x20, 2)
+        cmd.datain[pos + 10 : pos + 12] = scsi_int_to_ba(8, 2)
+        cmd.datain[pos + 12 : pos + 16] = scsi_int_to_ba(3600, 4)
+        cmd.datain[pos + 16 : pos + 20] = scsi_int_to_ba(60, 4)
+        cmd.datain[pos + 20 : pos + 28] = scsi_int_to_ba(0x10000, 8)
+        cmd.datain[pos + 28 : pos + 36] = scsi_int_to_ba(0x800, 8)
+        # supported commands, padded to 16 bytes
+        pos += 36
+        cmd.datain[pos + 1] = 0x01
+        cmd.datain[pos + 3] = 12
+        cmd.datain[pos + 4] = 10
+        cmd.datain[pos + 5 : pos + 15] = bytes(
+            [0x83, 3, 0x01, 0x10, 0x11, 0x84, 3, 0x03, 0x05, 0x07]
+        )
+        # general copy operations
+        pos += 16
+        cmd.datain[pos : pos + 2] = scsi_int_to_ba(0x8001, 2)
+        cmd.datain[pos + 3] = 0x20
+        cmd.datain[pos + 4 : pos + 8] = scsi_int_to_ba(64, 4)
+        cmd.datain[pos + 12 : pos + 16] = scsi_int_to_ba(0x100000, 4)
+        cmd.datain[pos + 16] = 9
+        # supported ROD types, not decoded
+        pos += 36
+        cmd.datain[pos : pos + 2] = scsi_int_to_ba(0x0108, 2)
+        cmd.datain[pos + 2 : pos + 4] = scsi_int_to_ba(4, 2)
+        cmd.datain[pos + 4 : pos + 8] = b"\xff\xff\x00\x01"
+
+
 class UnmarshallInquiryTest(unittest.TestCase):
     def test_main(self):
         with MockSCSI(MockInquiryStandard(sbc)) as s:
@@ -302,3 +337,31 @@ class UnmarshallInquiryTest(unittest.TestCase):
 
             d = Inquiry.unmarshall_datain(Inquiry.marshall_datain(i), evpd=1)
             self.assertEqual(d, i)
+
+            s.device = MockThirdPartyCopy(sbc)
+            cmd = s.inquiry(evpd=1, page_code=INQUIRY.VPD.THIRD_PARTY_COPY)
+            i = cmd.result
+            self.assertEqual(i["page_code"], INQUIRY.VPD.THIRD_PARTY_COPY)
+            td = i["third_party_copy_descriptors"]
+            self.assertEqual(len(td), 4)
+            self.assertEqual(
+                td[0]["descriptor_type"],
+                INQUIRY.THIRD_PARTY_COPY_DESCRIPTOR.BLOCK_DEVICE_ROD_TOKEN_LIMITS,
+            )
+            self.assertEqual(td[0]["maximum_range_descriptors"], 8)
+            self.assertEqual(td[0]["maximum_inactivity_timeout"], 3600)
+            self.assertEqual(td[0]["default_inactivity_timeout"], 60)
+            self.assertEqual(td[0]["maximum_token_transfer_size"], 0x10000)
+            self.assertEqual(td[0]["optimal_transfer_count"], 0x800)
+            self.assertEqual(
+                td[1]["supported_commands"],
+                {0x83: [0x01, 0x10, 0x11], 0x84: [0x03, 0x05, 0x07]},
+            )
+            self.assertEqual(td[2]["total_concurrent_copies"], 64)
+            self.assertEqual(td[2]["maximum_segment_length"], 0x100000)
+            self.assertEqual(td[2]["data_segment_granularity"], 9)
+            self.assertEqual(td[3]["descriptor_type"], 0x0108)
+            self.assertEqual(td[3]["descriptor"], b"\xff\xff\x00\x01")
+
+            d = Inquiry.unmarshall_datain(Inquiry.marshall_datain(i), evpd=1)
+            self.assertEqual(d, i)
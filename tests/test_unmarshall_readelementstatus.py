@@ -157,3 +157,74 @@ class UnmarshallReadelementstatusTest(unittest.TestCase):
                 ReadElementStatus.marshall_datain(i)
             )
             self.assertEqual(d, i)
+
+    def test_large(self):
+        pages = []
+        for element_type, first, count in (
+            (READELEMENTSTATUS.ELEMENT_TYPE.DATA_TRANSFER, 1, 4),
+            (READELEMENTSTATUS.ELEMENT_TYPE.STORAGE, 1000, 5000),
+        ):
+            pages.append(
+                {
+                    "element_type": element_type,
+                    "pvoltag": 1,
+                    "avoltag": 1,
+                    "element_descriptors": [
+                        {"element_address": first + i, "full": i & 1, "access": 1}
+                        for i in range(count)
+                    ],
+                }
+            )
+        data = ReadElementStatus.marshall_datain(
+            {
+                "first_element_address": 1,
+                "num_elements": 5004,
+                "element_status_pages": pages,
+            }
+        )
+        # volume tags are not marshalled, add one to the last slot
+        data[-76:-40] = b"VOL999L6".ljust(36)
+
+        i = ReadElementStatus.unmarshall_datain(data)
+        slots = i["element_status_pages"][1]["element_descriptors"]
+        self.assertEqual(len(slots), 5000)
+        self.assertEqual(slots[4999]["element_address"], 5999)
+        self.assertEqual(slots[4999].full, 1)
+        self.assertEqual(slots[4999]["primary_volume_tag"], b"VOL999L6".ljust(36))
+        self.assertEqual(slots[4999]["alternate_volume_tag"], bytes(36))
+        self.assertEqual(slots[4998].get("full"), 0)
+        self.assertEqual(
+            dict(slots[0]),
+            dict(
+                element_address=1000,
+                full=0,
+                access=1,
+                primary_volume_tag=bytes(36),
+                alternate_volume_tag=bytes(36),
+                **{
+                    k: 0
+                    for k in (
+                        "except",
+                        "additional_sense_code",
+                        "additional_sense_code_qualifier",
+                        "svalid",
+                        "invert",
+                        "ed",
+                        "medium_type",
+                        "source_storage_element_address",
+                    )
+                }
+            ),
+        )
+        with self.assertRaises(KeyError):
+            slots[0]["oir"]
+        with self.assertRaises(AttributeError):
+            slots[0].oir
+        with self.assertRaises(TypeError):
+            slots[0]["full"] = 1
+
+        # a short allocation length cuts off the last descriptors, a partial
+        # descriptor is not reported
+        i = ReadElementStatus.unmarshall_datain(data[:2000])
+        slots = i["element_status_pages"][1]["element_descriptors"]
+        self.assertEqual(len(slots), (2000 - 8 - 8 - 4 * 88 - 8) // 88)
@@ -11,16 +11,22 @@ import sys
 from pyscsi.pyscsi.scsi import SCSI
 from pyscsi.pyscsi.scsi_device import SCSIDevice
 from pyscsi.pyscsi.scsi_enum_getlbastatus import P_STATUS
+from pyscsi.pyscsi.scsi_provisioning import scan_provisioning
 from pyscsi.utils import init_device
 
 
 def usage():
-    print("Usage: getlbastatus.py [--help] [-l <lba>] <device>")
+    print(
+        "Usage: getlbastatus.py [--help] [-l <lba>] [-n <blocks>] [-j <workers>] "
+        "<device>"
+    )
 
 
 def main():
     i = 1
     lba = 0
+    blocks = None
+    workers = 4
     while i < len(sys.argv):
         if sys.argv[i] == "--help":
             return usage()
@@ -29,6 +35,16 @@ def main():
             lba = int(sys.argv[i], 10)
             del sys.argv[i]
             continue
+        if sys.argv[i] == "-n":
+            del sys.argv[i]
+            blocks = int(sys.argv[i], 10)
+            del sys.argv[i]
+            continue
+        if sys.argv[i] == "-j":
+            del sys.argv[i]
+            workers = int(sys.argv[i], 10)
+            del sys.argv[i]
+            continue
         i += 1
 
     if len(sys.argv) < 2:
@@ -44,16 +60,12 @@ def main():
         print("LUN is fully provisioned.")
         return
 
-    r = s.getlbastatus(lba).result
-    for i in range(len(r["lbas"])):
-        print(
-            "LBA:%d-%d %s"
-            % (
-                r["lbas"][i]["lba"],
-                r["lbas"][i]["lba"] + r["lbas"][i]["num_blocks"] - 1,
-                P_STATUS[r["lbas"][i]["p_status"]],
-            )
-        )
+    end = None if blocks is None else lba + blocks
+    m = scan_provisioning(s, start=lba, end=end, workers=workers)
+    for _lba, num_blocks, p_status in m:
+        print("LBA:%d-%d %s" % (_lba, _lba + num_blocks - 1, P_STATUS[p_status]))
+    for p_status in (P_STATUS.MAPPED, P_STATUS.DEALLOCATED, P_STATUS.ANCHORED):
+        print("%s: %d blocks" % (P_STATUS[p_status], m.blocks(p_status)))
 
 
 if __name__ == "__main__":
@@ -12,27 +12,23 @@
 import sys
 
 from pyscsi.pyscsi import scsi_enum_inquiry as INQUIRY
-from pyscsi.pyscsi import scsi_enum_modesense as MODESENSE6
 from pyscsi.pyscsi import scsi_enum_readelementstatus as READELEMENTSTATUS
 from pyscsi.pyscsi.scsi import SCSI
 from pyscsi.pyscsi.scsi_device import SCSIDevice
+from pyscsi.pyscsi.scsi_inventory import ElementInventory
 from pyscsi.utils import init_device
 
 
-def status(scsi, dte, se):
+def status(inv):
     # For ease of use we renumber the element addresses to start at
     # 0 for data transfer elements and to start at num_data_transfer_elements
     # for the storage elements.
-    _fdte = 99999999
-    for element in dte:
-        if element["element_address"] < _fdte:
-            _fdte = element["element_address"]
-    _fse = 99999999
-    for element in se:
-        if element["element_address"] < _fse:
-            _fse = element["element_address"]
-
-    for element in dte:
+    _fdte, _ndte = inv.assignment[READELEMENTSTATUS.ELEMENT_TYPE.DATA_TRANSFER]
+    _fse, _nse = inv.assignment[READELEMENTSTATUS.ELEMENT_TYPE.STORAGE]
+    inv.refresh(READELEMENTSTATUS.ELEMENT_TYPE.DATA_TRANSFER)
+    inv.refresh(READELEMENTSTATUS.ELEMENT_TYPE.STORAGE)
+
+    for element in inv.elements(READELEMENTSTATUS.ELEMENT_TYPE.DATA_TRANSFER):
         if element["full"]:
             print(
                 "Data Transfer Element: %d:Full VolumeTag:%s"
@@ -45,62 +41,47 @@ def status(scsi, dte, se):
             print(
                 "Data Transfer Element: %d:Empty" % (element["element_address"] - _fdte)
             )
-    for element in se:
+    for element in inv.elements(READELEMENTSTATUS.ELEMENT_TYPE.STORAGE):
         if element["full"]:
             print(
                 "      Storage Element: %d:Full VolumeTag:%s"
                 % (
-                    element["element_address"] - _fse + len(dte),
+                    element["element_address"] - _fse + _ndte,
                     element["primary_volume_tag"][0:32],
                 )
             )
         else:
             print(
                 "      Storage Element: %d:Empty"
-                % (element["element_address"] - _fse + len(dte))
+                % (element["element_address"] - _fse + _ndte)
             )
 
 
-def load(scsi, mte, dte, se, storage_element, data_transfer_element):
-    _fmte = 99999999
-    for element in mte:
-        if element["element_address"] < _fmte:
-            _fmte = element["element_address"]
-    _fdte = 99999999
-    for element in dte:
-        if element["element_address"] < _fdte:
-            _fdte = element["element_address"]
-    _fse = 99999999
-    for element in se:
-        if element["element_address"] < _fse:
-            _fse = element["element_address"]
-
-    res = scsi.movemedium(
-        _fmte, storage_element + _fse - _fdte, data_transfer_element + _fdte
-    ).result
+def _addresses(inv, storage_element, data_transfer_element):
+    _fdte, _ndte = inv.assignment[READELEMENTSTATUS.ELEMENT_TYPE.DATA_TRANSFER]
+    _fse, _nse = inv.assignment[READELEMENTSTATUS.ELEMENT_TYPE.STORAGE]
+    return storage_element - _ndte + _fse, data_transfer_element + _fdte
+
+
+def load(inv, storage_element, data_transfer_element):
+    # only the elements the move touched are read back, not the whole library
+    _se, _dte = _addresses(inv, storage_element, data_transfer_element)
+    inv.move(_se, _dte)
+    if not inv[_dte]["full"]:
+        print("Data Transfer drive %d is still empty" % data_transfer_element)
+        exit(1)
     print(
         "Loaded Storage Element %d into Data Transfer drive %d"
         % (storage_element, data_transfer_element)
     )
 
 
-def unload(scsi, mte, dte, se, storage_element, data_transfer_element):
-    _fmte = 99999999
-    for element in mte:
-        if element["element_address"] < _fmte:
-            _fmte = element["element_address"]
-    _fdte = 99999999
-    for element in dte:
-        if element["element_address"] < _fdte:
-            _fdte = element["element_address"]
-    _fse = 99999999
-    for element in se:
-        if element["element_address"] < _fse:
-            _fse = element["element_address"]
-
-    res = scsi.movemedium(
-        _fmte, data_transfer_element + _fdte, storage_element + _fse - _fdte
-    ).result
+def unload(inv, storage_element, data_transfer_element):
+    _se, _dte = _addresses(inv, storage_element, data_transfer_element)
+    inv.move(_dte, _se)
+    if not inv[_se]["full"]:
+        print("Storage Element %d is still empty" % storage_element)
+        exit(1)
     print(
         "Unloaded Data Transfer drive %d into Storage Element %d "
         % (data_transfer_element, storage_element)
@@ -133,51 +114,16 @@ def main():
         print("%s is not a MediaChanger device" % device)
         exit(1)
 
-    eaa = scsi.modesense6(
-        page_code=MODESENSE6.PAGE_CODE.ELEMENT_ADDRESS_ASSIGNMENT
-    ).result["mode_pages"][0]
-
-    # get the data transfer elements
-    dte = scsi.readelementstatus(
-        start=eaa["first_data_transfer_element_address"],
-        num=eaa["num_data_transfer_elements"],
-        element_type=READELEMENTSTATUS.ELEMENT_TYPE.DATA_TRANSFER,
-        voltag=1,
-        curdata=1,
-        dvcid=1,
-        alloclen=16384,
-    ).result["element_status_pages"][0]["element_descriptors"]
-
-    # get all the storage elements
-    se = scsi.readelementstatus(
-        start=eaa["first_storage_element_address"],
-        num=eaa["num_storage_elements"],
-        element_type=READELEMENTSTATUS.ELEMENT_TYPE.STORAGE,
-        voltag=1,
-        curdata=1,
-        dvcid=1,
-        alloclen=16384,
-    ).result["element_status_pages"][0]["element_descriptors"]
-
-    # get all the medium transport elements
-    mte = scsi.readelementstatus(
-        start=eaa["first_medium_transport_element_address"],
-        num=eaa["num_medium_transport_elements"],
-        element_type=READELEMENTSTATUS.ELEMENT_TYPE.MEDIUM_TRANSPORT,
-        voltag=1,
-        curdata=1,
-        dvcid=1,
-        alloclen=16384,
-    ).result["element_status_pages"][0]["element_descriptors"]
+    inv = ElementInventory(scsi, voltag=1, dvcid=1)
 
     if sys.argv[1] == "status":
-        return status(scsi, dte, se)
+        return status(inv)
 
     if sys.argv[1] == "load":
-        return load(scsi, mte, dte, se, int(sys.argv[2]), int(sys.argv[3]))
+        return load(inv, int(sys.argv[2]), int(sys.argv[3]))
 
     if sys.argv[1] == "unload":
-        return unload(scsi, mte, dte, se, int(sys.argv[2]), int(sys.argv[3]))
+        return unload(inv, int(sys.argv[2]), int(sys.argv[3]))
 
     usage()
     exit(1)